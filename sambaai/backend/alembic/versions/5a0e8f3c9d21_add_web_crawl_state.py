@@ -0,0 +1,36 @@
+"""add web crawl state
+
+Revision ID: 5a0e8f3c9d21
+Revises: 03bf8be6b53a
+Create Date: 2025-06-24 11:02:17.513340
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "5a0e8f3c9d21"
+down_revision = "03bf8be6b53a"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "web_crawl_state",
+        sa.Column("crawl_key", sa.String(), nullable=False),
+        sa.Column("url", sa.String(), nullable=False),
+        sa.Column("etag", sa.String(), nullable=True),
+        sa.Column("last_modified", sa.String(), nullable=True),
+        sa.Column("content_hash", sa.String(), nullable=True),
+        sa.Column("links", postgresql.ARRAY(sa.String()), nullable=True),
+        sa.Column("changed_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("last_crawled_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("crawl_key", "url"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("web_crawl_state")
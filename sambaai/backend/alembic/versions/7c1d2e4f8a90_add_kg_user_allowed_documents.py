@@ -0,0 +1,47 @@
+"""add kg user allowed documents
+
+Revision ID: 7c1d2e4f8a90
+Revises: 5a0e8f3c9d21
+Create Date: 2025-06-30 09:41:52.207316
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "7c1d2e4f8a90"
+down_revision = "5a0e8f3c9d21"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "kg_user_allowed_document",
+        sa.Column("user_email", sa.String(), nullable=False),
+        sa.Column("document_id", sa.String(), nullable=False),
+        sa.ForeignKeyConstraint(["document_id"], ["document.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_email", "document_id"),
+    )
+    op.create_index(
+        op.f("ix_kg_user_allowed_document_document_id"),
+        "kg_user_allowed_document",
+        ["document_id"],
+        unique=False,
+    )
+    op.create_table(
+        "kg_user_allowed_documents_refresh",
+        sa.Column("user_email", sa.String(), nullable=False),
+        sa.Column("refreshed_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("user_email"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("kg_user_allowed_documents_refresh")
+    op.drop_index(
+        op.f("ix_kg_user_allowed_document_document_id"),
+        table_name="kg_user_allowed_document",
+    )
+    op.drop_table("kg_user_allowed_document")
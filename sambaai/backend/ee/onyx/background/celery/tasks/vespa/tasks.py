@@ -41,9 +41,14 @@ def monitor_usergroup_taskset(
     if initial_count is None:
         return
 
+    # the taskset tracks the remaining tasks, the fence and the synced docs
+    # counter track documents
     count = cast(int, r.scard(rug.taskset_key))
+    num_synced_docs = rug.get_num_synced_docs()
     task_logger.info(
-        f"User group sync progress: usergroup_id={usergroup_id} remaining={count} initial={initial_count}"
+        f"User group sync progress: usergroup_id={usergroup_id} "
+        f"remaining_tasks={count} synced_docs={num_synced_docs} "
+        f"initial_docs={initial_count}"
     )
     if count > 0:
         update_sync_record_status(
@@ -51,7 +56,7 @@ def monitor_usergroup_taskset(
             entity_id=usergroup_id,
             sync_type=SyncType.USER_GROUP,
             sync_status=SyncStatus.IN_PROGRESS,
-            num_docs_synced=count,
+            num_docs_synced=num_synced_docs,
         )
         return
 
@@ -7,6 +7,9 @@ from sqlalchemy.orm import Session
 from onyx.access.models import ExternalAccess
 from onyx.access.utils import build_ext_group_name_for_onyx
 from onyx.configs.constants import DocumentSource
+from onyx.db.kg_allowed_docs import (
+    invalidate_kg_allowed_documents_for_document__no_commit,
+)
 from onyx.db.models import Document as DbDocument
 
 
@@ -48,6 +51,13 @@ def upsert_document_external_perms__no_commit(
     document.external_user_emails = list(external_access.external_user_emails)
     document.external_user_group_ids = prefixed_external_groups
     document.is_public = external_access.is_public
+    invalidate_kg_allowed_documents_for_document__no_commit(
+        db_session,
+        document_id=doc_id,
+        is_public=external_access.is_public,
+        external_user_emails=external_access.external_user_emails,
+        external_user_group_ids=prefixed_external_groups,
+    )
 
 
 def upsert_document_external_perms(
@@ -98,6 +108,13 @@ def upsert_document_external_perms(
         document.external_user_group_ids = list(prefixed_external_groups)
         document.is_public = external_access.is_public
         document.last_modified = datetime.now(timezone.utc)
+        invalidate_kg_allowed_documents_for_document__no_commit(
+            db_session,
+            document_id=doc_id,
+            is_public=external_access.is_public,
+            external_user_emails=external_access.external_user_emails,
+            external_user_group_ids=prefixed_external_groups,
+        )
         db_session.commit()
 
     return False
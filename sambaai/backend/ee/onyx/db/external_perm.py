@@ -8,6 +8,9 @@ from sqlalchemy.orm import Session
 
 from onyx.access.utils import build_ext_group_name_for_onyx
 from onyx.configs.constants import DocumentSource
+from onyx.db.kg_allowed_docs import (
+    invalidate_kg_allowed_documents_for_users__no_commit,
+)
 from onyx.db.models import PublicExternalUserGroup
 from onyx.db.models import User
 from onyx.db.models import User__ExternalUserGroupId
@@ -86,6 +89,16 @@ def replace_user__ext_group_for_cc_pair(
         emails=list(all_group_member_emails),
     )
 
+    # the previous and the new members of the cc pair's groups may see other
+    # documents now
+    affected_user_ids = set(
+        db_session.scalars(
+            select(User__ExternalUserGroupId.user_id).where(
+                User__ExternalUserGroupId.cc_pair_id == cc_pair_id
+            )
+        )
+    )
+
     delete_user__ext_group_for_cc_pair__no_commit(
         db_session=db_session,
         cc_pair_id=cc_pair_id,
@@ -132,6 +145,10 @@ def replace_user__ext_group_for_cc_pair(
 
     db_session.add_all(new_external_permissions)
     db_session.add_all(new_public_external_groups)
+    affected_user_ids.update(
+        permission.user_id for permission in new_external_permissions
+    )
+    invalidate_kg_allowed_documents_for_users__no_commit(db_session, affected_user_ids)
     db_session.commit()
 
 
@@ -16,6 +16,9 @@ from ee.onyx.server.user_group.models import UserGroupUpdate
 from onyx.db.connector_credential_pair import get_connector_credential_pair_from_id
 from onyx.db.enums import AccessType
 from onyx.db.enums import ConnectorCredentialPairStatus
+from onyx.db.kg_allowed_docs import (
+    invalidate_kg_allowed_documents_for_users__no_commit,
+)
 from onyx.db.models import ConnectorCredentialPair
 from onyx.db.models import Credential__UserGroup
 from onyx.db.models import Document
@@ -390,6 +393,9 @@ def insert_user_group(db_session: Session, user_group: UserGroupCreate) -> UserG
         user_group_id=db_user_group.id,
         cc_pair_ids=user_group.cc_pair_ids,
     )
+    invalidate_kg_allowed_documents_for_users__no_commit(
+        db_session, user_group.user_ids
+    )
 
     db_session.commit()
     return db_user_group
@@ -628,6 +634,17 @@ def update_user_group(
     if cc_pairs_updated:
         db_user_group.is_up_to_date = False
 
+    # new cc pairs change the access of every member, otherwise only the access of
+    # the added and removed users changes
+    invalidate_kg_allowed_documents_for_users__no_commit(
+        db_session,
+        (
+            current_user_ids | updated_user_ids
+            if cc_pairs_updated
+            else set(added_user_ids + removed_user_ids)
+        ),
+    )
+
     removed_users = db_session.scalars(
         select(User).where(User.id.in_(removed_user_ids))  # type: ignore
     ).unique()
@@ -657,6 +674,8 @@ def prepare_user_group_for_deletion(db_session: Session, user_group_id: int) ->
 
     _check_user_group_is_modifiable(db_user_group)
 
+    member_ids = [user.id for user in db_user_group.users]
+
     _mark_user_group__cc_pair_relationships_outdated__no_commit(
         db_session=db_session, user_group_id=user_group_id
     )
@@ -687,6 +706,7 @@ def prepare_user_group_for_deletion(db_session: Session, user_group_id: int) ->
 
     db_user_group.is_up_to_date = False
     db_user_group.is_up_for_deletion = True
+    invalidate_kg_allowed_documents_for_users__no_commit(db_session, member_ids)
     db_session.commit()
 
 
@@ -25,6 +25,10 @@ from onyx.db.token_limit import fetch_all_user_token_rate_limits
 from onyx.server.query_and_chat.token_limit import _get_cutoff_time
 from onyx.server.query_and_chat.token_limit import _is_rate_limited
 from onyx.server.query_and_chat.token_limit import _user_is_rate_limited_by_global
+from onyx.server.query_and_chat.token_usage import fetch_token_usage
+from onyx.server.query_and_chat.token_usage import TokenUsage
+from onyx.server.query_and_chat.token_usage import user_group_token_usage_scope
+from onyx.server.query_and_chat.token_usage import user_token_usage_scope
 from onyx.utils.threadpool_concurrency import run_functions_tuples_in_parallel
 
 
@@ -60,7 +64,14 @@ def _user_is_rate_limited(user_id: UUID) -> None:
 
         if user_rate_limits:
             user_cutoff_time = _get_cutoff_time(user_rate_limits)
-            user_usage = _fetch_user_usage(user_id, user_cutoff_time, db_session)
+            scope = user_token_usage_scope(user_id)
+            user_usage = fetch_token_usage(
+                [scope],
+                user_cutoff_time,
+                lambda _, cutoff_time: {
+                    scope: _fetch_user_usage(user_id, cutoff_time, db_session)
+                },
+            )[scope]
 
             if _is_rate_limited(user_rate_limits, user_usage):
                 raise HTTPException(
@@ -105,14 +116,31 @@ def _user_is_rate_limited_by_group(user_id: UUID) -> None:
                 [e for sublist in group_rate_limits.values() for e in sublist]
             )
 
-            user_group_ids = list(group_rate_limits.keys())
-            group_usage = _fetch_user_group_usage(
-                user_group_ids, group_cutoff_time, db_session
+            scope_to_group_id = {
+                user_group_token_usage_scope(user_group_id): user_group_id
+                for user_group_id in group_rate_limits
+            }
+
+            def _fetch_group_usage_from_db(
+                scopes: list[str], cutoff_time: datetime
+            ) -> TokenUsage:
+                usage_by_group_id = _fetch_user_group_usage(
+                    [scope_to_group_id[scope] for scope in scopes],
+                    cutoff_time,
+                    db_session,
+                )
+                return {
+                    scope: usage_by_group_id.get(scope_to_group_id[scope], [])
+                    for scope in scopes
+                }
+
+            group_usage = fetch_token_usage(
+                list(scope_to_group_id), group_cutoff_time, _fetch_group_usage_from_db
             )
 
             has_at_least_one_untriggered_limit = False
             for user_group_id, rate_limits in group_rate_limits.items():
-                usage = group_usage.get(user_group_id, [])
+                usage = group_usage.get(user_group_token_usage_scope(user_group_id), [])
 
                 if not _is_rate_limited(rate_limits, usage):
                     has_at_least_one_untriggered_limit = True
@@ -174,6 +202,8 @@ def _fetch_user_group_usage(
         .join(UserGroup, UserGroup.id == User__UserGroup.user_group_id)
         .filter(UserGroup.id.in_(user_group_ids), ChatMessage.time_sent >= cutoff_time)
         .group_by(func.date_trunc("minute", ChatMessage.time_sent), UserGroup.id)
+        # groupby below only groups consecutive rows
+        .order_by(UserGroup.id)
     ).all()
 
     return {
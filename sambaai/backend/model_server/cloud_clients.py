@@ -0,0 +1,263 @@
+import asyncio
+import hashlib
+import random
+import time
+from collections.abc import AsyncIterator
+from collections.abc import Awaitable
+from collections.abc import Callable
+from contextlib import asynccontextmanager
+from typing import Any
+from typing import TypeVar
+
+import httpx
+import openai
+import voyageai.error  # type: ignore
+from cohere import AsyncClient as CohereAsyncClient
+from prometheus_client import Counter
+from prometheus_client import Gauge
+
+from onyx.utils.logger import setup_logger
+from shared_configs.configs import API_BASED_EMBEDDING_TIMEOUT
+from shared_configs.configs import MODEL_SERVER_CLOUD_CLIENT_IDLE_SECONDS
+from shared_configs.configs import MODEL_SERVER_CLOUD_EMBEDDING_MAX_CONCURRENCY
+from shared_configs.configs import MODEL_SERVER_CLOUD_EMBEDDING_RATE_LIMIT_RETRIES
+from shared_configs.configs import OPENAI_EMBEDDING_TIMEOUT
+from shared_configs.enums import EmbeddingProvider
+
+logger = setup_logger()
+
+R = TypeVar("R")
+
+_MAX_RATE_LIMIT_DELAY = 60.0
+
+cloud_clients_open = Gauge(
+    "onyx_model_server_cloud_clients",
+    "Pooled cloud embedding provider clients",
+    ["provider"],
+)
+cloud_calls_rate_limited = Counter(
+    "onyx_model_server_cloud_rate_limited_total",
+    "Cloud embedding provider calls that were rate limited",
+    ["provider"],
+)
+
+
+class ProviderRateLimitError(Exception):
+    """Raised once a provider call is still rate limited after all retries."""
+
+    def __init__(self, provider: str) -> None:
+        self.provider = provider
+        super().__init__(f"{provider} rate limit exceeded")
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    if isinstance(error, (openai.RateLimitError, voyageai.error.RateLimitError)):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code == 429
+    # cohere and litellm errors carry the status code
+    return getattr(error, "status_code", None) == 429
+
+
+def _get_retry_after_seconds(error: BaseException) -> float | None:
+    headers = getattr(getattr(error, "response", None), "headers", None) or getattr(
+        error, "headers", None
+    )
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class PooledCloudClients:
+    """Long lived clients for one provider + API key (+ URL / version), shared by
+    all requests using them so connection pools and TLS sessions are reused.
+
+    Calls go through `call`, which limits the concurrency against the provider and
+    handles 429s for everyone: once a call is rate limited, all calls with these
+    clients wait out the backoff (or the provider's Retry-After) before going on."""
+
+    def __init__(
+        self,
+        provider: EmbeddingProvider,
+        api_key: str,
+        api_url: str | None = None,
+        api_version: str | None = None,
+        timeout: int = API_BASED_EMBEDDING_TIMEOUT,
+        max_concurrency: int = MODEL_SERVER_CLOUD_EMBEDDING_MAX_CONCURRENCY,
+        max_rate_limit_retries: int = MODEL_SERVER_CLOUD_EMBEDDING_RATE_LIMIT_RETRIES,
+        base_delay: float = 1.0,
+    ) -> None:
+        self.provider = provider
+        self.api_key = api_key
+        self.api_url = api_url
+        self.api_version = api_version
+        self.timeout = timeout
+        self.max_rate_limit_retries = max_rate_limit_retries
+        self.base_delay = base_delay
+
+        self.http_client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=max_concurrency,
+            ),
+        )
+        self._openai_client: openai.AsyncOpenAI | None = None
+        self._cohere_client: CohereAsyncClient | None = None
+        self._voyage_client: Any = None
+
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._resume_at = 0.0
+        self.in_use = 0
+        self.last_used = time.monotonic()
+        self.closed = False
+
+    def openai_client(self) -> openai.AsyncOpenAI:
+        if self._openai_client is None:
+            # Use the OpenAI specific timeout for this one
+            self._openai_client = openai.AsyncOpenAI(
+                api_key=self.api_key,
+                timeout=OPENAI_EMBEDDING_TIMEOUT,
+                http_client=self.http_client,
+            )
+        return self._openai_client
+
+    def cohere_client(self) -> CohereAsyncClient:
+        if self._cohere_client is None:
+            self._cohere_client = CohereAsyncClient(
+                api_key=self.api_key,
+                timeout=self.timeout,
+                httpx_client=self.http_client,
+            )
+        return self._cohere_client
+
+    def voyage_client(self) -> Any:
+        if self._voyage_client is None:
+            self._voyage_client = voyageai.AsyncClient(
+                api_key=self.api_key, timeout=self.timeout
+            )
+        return self._voyage_client
+
+    async def call(self, func: Callable[[], Awaitable[R]]) -> R:
+        attempt = 0
+        while True:
+            delay = self._resume_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            async with self._semaphore:
+                try:
+                    return await func()
+                except Exception as e:
+                    if not is_rate_limit_error(e):
+                        raise
+                    cloud_calls_rate_limited.labels(provider=self.provider.value).inc()
+                    if attempt >= self.max_rate_limit_retries:
+                        raise ProviderRateLimitError(self.provider.value) from e
+                    retry_after = _get_retry_after_seconds(e)
+
+            if retry_after is not None:
+                delay = min(retry_after, _MAX_RATE_LIMIT_DELAY)
+            else:
+                delay = min(self.base_delay * 2**attempt, _MAX_RATE_LIMIT_DELAY)
+                delay *= random.uniform(0.5, 1.0)
+            self._resume_at = max(self._resume_at, time.monotonic() + delay)
+            attempt += 1
+            logger.warning(
+                f"{self.provider.value} embedding call rate limited, retrying in "
+                f"{delay:.1f}s (attempt {attempt}/{self.max_rate_limit_retries})"
+            )
+
+    async def aclose(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        # the openai and cohere clients use http_client, which is closed here
+        await self.http_client.aclose()
+
+
+def _build_key(
+    provider: EmbeddingProvider,
+    api_key: str,
+    api_url: str | None,
+    api_version: str | None,
+) -> tuple[str, str, str | None, str | None]:
+    # don't keep the raw API keys around as dict keys
+    api_key_hash = hashlib.sha256(api_key.encode()).hexdigest()
+    return provider.value, api_key_hash, api_url, api_version
+
+
+class CloudClientRegistry:
+    """Keeps one `PooledCloudClients` per provider, API key, URL and version. Clients
+    that haven't been used for `idle_seconds` are closed on the next acquire."""
+
+    def __init__(
+        self, idle_seconds: float = MODEL_SERVER_CLOUD_CLIENT_IDLE_SECONDS
+    ) -> None:
+        self.idle_seconds = idle_seconds
+        self._clients: dict[
+            tuple[str, str, str | None, str | None], PooledCloudClients
+        ] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    async def _evict_idle(self) -> None:
+        now = time.monotonic()
+        for key, clients in list(self._clients.items()):
+            if clients.in_use == 0 and now - clients.last_used > self.idle_seconds:
+                del self._clients[key]
+                cloud_clients_open.labels(provider=clients.provider.value).dec()
+                await clients.aclose()
+
+    @asynccontextmanager
+    async def acquire(
+        self,
+        provider: EmbeddingProvider,
+        api_key: str,
+        api_url: str | None = None,
+        api_version: str | None = None,
+    ) -> AsyncIterator[PooledCloudClients]:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # the clients are bound to the loop they were created on
+            for stale_clients in self._clients.values():
+                cloud_clients_open.labels(provider=stale_clients.provider.value).dec()
+            self._clients = {}
+            self._loop = loop
+
+        await self._evict_idle()
+
+        key = _build_key(provider, api_key, api_url, api_version)
+        clients = self._clients.get(key)
+        if clients is None:
+            clients = PooledCloudClients(
+                provider=provider,
+                api_key=api_key,
+                api_url=api_url,
+                api_version=api_version,
+            )
+            self._clients[key] = clients
+            cloud_clients_open.labels(provider=provider.value).inc()
+
+        clients.in_use += 1
+        try:
+            yield clients
+        finally:
+            clients.in_use -= 1
+            clients.last_used = time.monotonic()
+
+    async def aclose(self) -> None:
+        clients_to_close = list(self._clients.values())
+        self._clients = {}
+        for clients in clients_to_close:
+            cloud_clients_open.labels(provider=clients.provider.value).dec()
+            await clients.aclose()
+
+
+_CLOUD_CLIENT_REGISTRY = CloudClientRegistry()
+
+
+def get_cloud_client_registry() -> CloudClientRegistry:
+    return _CLOUD_CLIENT_REGISTRY
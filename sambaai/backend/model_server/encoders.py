@@ -1,19 +1,22 @@
 import asyncio
 import json
 import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from types import TracebackType
 from typing import cast
 from typing import Optional
 
 import aioboto3  # type: ignore
 import httpx
+import numpy as np
 import openai
 import vertexai  # type: ignore
-import voyageai  # type: ignore
 from cohere import AsyncClient as CohereAsyncClient
 from fastapi import APIRouter
 from fastapi import HTTPException
 from fastapi import Request
+from fastapi import Response
 from google.oauth2 import service_account  # type: ignore
 from litellm import aembedding
 from litellm.exceptions import RateLimitError
@@ -23,19 +26,31 @@ from sentence_transformers import SentenceTransformer  # type: ignore
 from vertexai.language_models import TextEmbeddingInput  # type: ignore
 from vertexai.language_models import TextEmbeddingModel  # type: ignore
 
+from model_server.cloud_clients import get_cloud_client_registry
+from model_server.cloud_clients import PooledCloudClients
+from model_server.cloud_clients import ProviderRateLimitError
 from model_server.constants import DEFAULT_COHERE_MODEL
 from model_server.constants import DEFAULT_OPENAI_MODEL
 from model_server.constants import DEFAULT_VERTEX_MODEL
 from model_server.constants import DEFAULT_VOYAGE_MODEL
 from model_server.constants import EmbeddingModelTextType
 from model_server.constants import EmbeddingProvider
+from model_server.inference_backend import get_inference_backend
+from model_server.inference_backend import load_sentence_transformer
+from model_server.inference_backend import TORCH_BACKEND
+from model_server.micro_batcher import MicroBatcher
 from model_server.utils import pass_aws_key
 from model_server.utils import simple_log_function_time
 from onyx.utils.logger import setup_logger
 from shared_configs.configs import API_BASED_EMBEDDING_TIMEOUT
 from shared_configs.configs import INDEXING_ONLY
-from shared_configs.configs import OPENAI_EMBEDDING_TIMEOUT
+from shared_configs.configs import MODEL_SERVER_MAX_BATCH_TOKENS
+from shared_configs.configs import MODEL_SERVER_MAX_BATCH_WAIT_MS
+from shared_configs.configs import MODEL_SERVER_MICRO_BATCHING_ENABLED
 from shared_configs.configs import VERTEXAI_EMBEDDING_LOCAL_BATCH_SIZE
+from shared_configs.embedding_transport import EMBEDDINGS_BINARY_MEDIA_TYPE
+from shared_configs.embedding_transport import encode_embeddings
+from shared_configs.embedding_transport import parse_accept_header
 from shared_configs.enums import EmbedTextType
 from shared_configs.enums import RerankerProvider
 from shared_configs.model_server_models import Embedding
@@ -53,6 +68,12 @@ router = APIRouter(prefix="/encoder")
 _GLOBAL_MODELS_DICT: dict[str, "SentenceTransformer"] = {}
 _RERANK_MODEL: Optional["CrossEncoder"] = None
 
+# One thread per local model, so forward passes of a model never overlap. This is
+# also what makes changing max_seq_length of a shared model per batch safe.
+_MODEL_EXECUTORS: dict[str, ThreadPoolExecutor] = {}
+_EMBED_BATCHERS: dict[tuple[str, int, bool], MicroBatcher[str, np.ndarray]] = {}
+_RERANK_BATCHERS: dict[str, MicroBatcher[tuple[str, str], float]] = {}
+
 # If we are not only indexing, dont want retry very long
 _RETRY_DELAY = 10 if INDEXING_ONLY else 0.1
 _RETRY_TRIES = 10 if INDEXING_ONLY else 2
@@ -127,13 +148,23 @@ class CloudEmbedding:
         api_url: str | None = None,
         api_version: str | None = None,
         timeout: int = API_BASED_EMBEDDING_TIMEOUT,
+        clients: PooledCloudClients | None = None,
     ) -> None:
         self.provider = provider
         self.api_key = api_key
         self.api_url = api_url
         self.api_version = api_version
         self.timeout = timeout
-        self.http_client = httpx.AsyncClient(timeout=timeout)
+        # clients from the registry are shared and outlive this instance
+        self._owns_clients = clients is None
+        self.clients = clients or PooledCloudClients(
+            provider=provider,
+            api_key=api_key,
+            api_url=api_url,
+            api_version=api_version,
+            timeout=timeout,
+        )
+        self.http_client = self.clients.http_client
         self._closed = False
         self.sanitized_api_key = api_key[:4] + "********" + api_key[-4:]
 
@@ -143,18 +174,17 @@ class CloudEmbedding:
         if not model:
             model = DEFAULT_OPENAI_MODEL
 
-        # Use the OpenAI specific timeout for this one
-        client = openai.AsyncOpenAI(
-            api_key=self.api_key, timeout=OPENAI_EMBEDDING_TIMEOUT
-        )
+        client = self.clients.openai_client()
 
         final_embeddings: list[Embedding] = []
 
         for text_batch in batch_list(texts, _OPENAI_MAX_INPUT_LEN):
-            response = await client.embeddings.create(
-                input=text_batch,
-                model=model,
-                dimensions=reduced_dimension or openai.NOT_GIVEN,
+            response = await self.clients.call(
+                lambda: client.embeddings.create(
+                    input=text_batch,
+                    model=model,
+                    dimensions=reduced_dimension or openai.NOT_GIVEN,
+                )
             )
             final_embeddings.extend(
                 [embedding.embedding for embedding in response.data]
@@ -167,17 +197,19 @@ class CloudEmbedding:
         if not model:
             model = DEFAULT_COHERE_MODEL
 
-        client = CohereAsyncClient(api_key=self.api_key)
+        client = self.clients.cohere_client()
 
         final_embeddings: list[Embedding] = []
         for text_batch in batch_list(texts, _COHERE_MAX_INPUT_LEN):
             # Does not use the same tokenizer as the Onyx API server but it's approximately the same
             # empirically it's only off by a very few tokens so it's not a big deal
-            response = await client.embed(
-                texts=text_batch,
-                model=model,
-                input_type=embedding_type,
-                truncate="END",
+            response = await self.clients.call(
+                lambda: client.embed(
+                    texts=text_batch,
+                    model=model,
+                    input_type=embedding_type,
+                    truncate="END",
+                )
             )
             final_embeddings.extend(cast(list[Embedding], response.embeddings))
         return final_embeddings
@@ -188,28 +220,30 @@ class CloudEmbedding:
         if not model:
             model = DEFAULT_VOYAGE_MODEL
 
-        client = voyageai.AsyncClient(
-            api_key=self.api_key, timeout=API_BASED_EMBEDDING_TIMEOUT
-        )
+        client = self.clients.voyage_client()
 
-        response = await client.embed(
-            texts=texts,
-            model=model,
-            input_type=embedding_type,
-            truncation=True,
+        response = await self.clients.call(
+            lambda: client.embed(
+                texts=texts,
+                model=model,
+                input_type=embedding_type,
+                truncation=True,
+            )
         )
         return response.embeddings
 
     async def _embed_azure(
         self, texts: list[str], model: str | None
     ) -> list[Embedding]:
-        response = await aembedding(
-            model=model,
-            input=texts,
-            timeout=API_BASED_EMBEDDING_TIMEOUT,
-            api_key=self.api_key,
-            api_base=self.api_url,
-            api_version=self.api_version,
+        response = await self.clients.call(
+            lambda: aembedding(
+                model=model,
+                input=texts,
+                timeout=API_BASED_EMBEDDING_TIMEOUT,
+                api_key=self.api_key,
+                api_base=self.api_url,
+                api_version=self.api_version,
+            )
         )
         embeddings = [embedding["embedding"] for embedding in response.data]
         return embeddings
@@ -238,7 +272,10 @@ class CloudEmbedding:
 
         # Dispatch all embedding calls asynchronously at once
         tasks = [
-            client.get_embeddings_async(batch, auto_truncate=True) for batch in batches
+            self.clients.call(
+                partial(client.get_embeddings_async, batch, auto_truncate=True)
+            )
+            for batch in batches
         ]
 
         # Wait for all tasks to complete in parallel
@@ -259,15 +296,21 @@ class CloudEmbedding:
             {} if not self.api_key else {"Authorization": f"Bearer {self.api_key}"}
         )
 
-        response = await self.http_client.post(
-            self.api_url,
-            json={
-                "model": model_name,
-                "input": texts,
-            },
-            headers=headers,
-        )
-        response.raise_for_status()
+        api_url = self.api_url
+
+        async def _post() -> httpx.Response:
+            response = await self.http_client.post(
+                api_url,
+                json={
+                    "model": model_name,
+                    "input": texts,
+                },
+                headers=headers,
+            )
+            response.raise_for_status()
+            return response
+
+        response = await self.clients.call(_post)
         result = response.json()
         return [embedding["embedding"] for embedding in result["data"]]
 
@@ -300,6 +343,8 @@ class CloudEmbedding:
                 raise ValueError(f"Unsupported provider: {self.provider}")
         except openai.AuthenticationError:
             raise AuthenticationError(provider="OpenAI")
+        except ProviderRateLimitError:
+            raise
         except httpx.HTTPStatusError as e:
             if e.response.status_code == 401:
                 raise AuthenticationError(provider=str(self.provider))
@@ -345,7 +390,8 @@ class CloudEmbedding:
     async def aclose(self) -> None:
         """Explicitly close the client."""
         if not self._closed:
-            await self.http_client.aclose()
+            if self._owns_clients:
+                await self.clients.aclose()
             self._closed = True
 
     async def __aenter__(self) -> "CloudEmbedding":
@@ -371,20 +417,11 @@ def get_embedding_model(
     model_name: str,
     max_context_length: int,
 ) -> "SentenceTransformer":
-    from sentence_transformers import SentenceTransformer  # type: ignore
-
     global _GLOBAL_MODELS_DICT  # A dictionary to store models
 
     if model_name not in _GLOBAL_MODELS_DICT:
         logger.notice(f"Loading {model_name}")
-        # Some model architectures that aren't built into the Transformers or Sentence
-        # Transformer need to be downloaded to be loaded locally. This does not mean
-        # data is sent to remote servers for inference, however the remote code can
-        # be fairly arbitrary so only use trusted models
-        model = SentenceTransformer(
-            model_name_or_path=model_name,
-            trust_remote_code=True,
-        )
+        model = load_sentence_transformer(model_name)
         model.max_seq_length = max_context_length
         _GLOBAL_MODELS_DICT[model_name] = model
     elif max_context_length != _GLOBAL_MODELS_DICT[model_name].max_seq_length:
@@ -399,11 +436,87 @@ def get_local_reranking_model(
     global _RERANK_MODEL
     if _RERANK_MODEL is None:
         logger.notice(f"Loading {model_name}")
+        if get_inference_backend(model_name) != TORCH_BACKEND:
+            # CrossEncoder only supports other backends from sentence-transformers 4.1
+            logger.warning(
+                f"Only the {TORCH_BACKEND} backend is supported for reranking models"
+            )
         model = CrossEncoder(model_name)
         _RERANK_MODEL = model
     return _RERANK_MODEL
 
 
+def _get_model_executor(model_name: str) -> ThreadPoolExecutor:
+    if model_name not in _MODEL_EXECUTORS:
+        _MODEL_EXECUTORS[model_name] = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=f"model_{model_name}"
+        )
+    return _MODEL_EXECUTORS[model_name]
+
+
+def _estimate_tokens(text: str) -> int:
+    # roughly 4 characters per token for English, only used to size batches
+    return len(text) // 4 + 2
+
+
+def get_embed_batcher(
+    model_name: str, max_context_length: int, normalize_embeddings: bool
+) -> MicroBatcher[str, np.ndarray]:
+    key = (model_name, max_context_length, normalize_embeddings)
+    if key not in _EMBED_BATCHERS:
+
+        def _encode(texts: list[str]) -> list[np.ndarray]:
+            # runs on the model's executor, see _MODEL_EXECUTORS
+            local_model = get_embedding_model(
+                model_name=model_name, max_context_length=max_context_length
+            )
+            embeddings_vectors = local_model.encode(
+                texts,
+                normalize_embeddings=normalize_embeddings,
+                # the batcher already sized this to a single forward pass
+                batch_size=len(texts),
+            )
+            # rows of the batch, stacked again per request by embed_text
+            return list(np.asarray(embeddings_vectors))
+
+        _EMBED_BATCHERS[key] = MicroBatcher(
+            endpoint="embed",
+            run_batch=_encode,
+            count_tokens=lambda text: min(_estimate_tokens(text), max_context_length),
+            executor=_get_model_executor(model_name),
+            max_batch_tokens=MODEL_SERVER_MAX_BATCH_TOKENS,
+            max_wait_seconds=MODEL_SERVER_MAX_BATCH_WAIT_MS / 1000,
+        )
+    return _EMBED_BATCHERS[key]
+
+
+def get_rerank_batcher(model_name: str) -> MicroBatcher[tuple[str, str], float]:
+    if model_name not in _RERANK_BATCHERS:
+
+        def _predict(pairs: list[tuple[str, str]]) -> list[float]:
+            cross_encoder = get_local_reranking_model(model_name)
+            return cross_encoder.predict(pairs, batch_size=len(pairs)).tolist()  # type: ignore
+
+        _RERANK_BATCHERS[model_name] = MicroBatcher(
+            endpoint="rerank",
+            run_batch=_predict,
+            count_tokens=lambda pair: _estimate_tokens(pair[0])
+            + _estimate_tokens(pair[1]),
+            executor=_get_model_executor(model_name),
+            max_batch_tokens=MODEL_SERVER_MAX_BATCH_TOKENS,
+            max_wait_seconds=MODEL_SERVER_MAX_BATCH_WAIT_MS / 1000,
+        )
+    return _RERANK_BATCHERS[model_name]
+
+
+async def close_encoders() -> None:
+    for embed_batcher in _EMBED_BATCHERS.values():
+        await embed_batcher.aclose()
+    for rerank_batcher in _RERANK_BATCHERS.values():
+        await rerank_batcher.aclose()
+    await get_cloud_client_registry().aclose()
+
+
 @simple_log_function_time()
 async def embed_text(
     texts: list[str],
@@ -419,7 +532,10 @@ async def embed_text(
     api_version: str | None,
     reduced_dimension: int | None,
     gpu_type: str = "UNKNOWN",
-) -> list[Embedding]:
+) -> list[Embedding] | np.ndarray:
+    """Local models return a (len(texts), dim) array, so the binary response format
+    can send it as is. Cloud providers return lists."""
+    embeddings: list[Embedding] | np.ndarray
     if not all(texts):
         logger.error("Empty strings provided for embedding")
         raise ValueError("Empty strings are not allowed for embedding.")
@@ -450,19 +566,26 @@ async def embed_text(
                 "Cloud models take an explicit text type instead."
             )
 
-        async with CloudEmbedding(
-            api_key=api_key,
+        async with get_cloud_client_registry().acquire(
             provider=provider_type,
+            api_key=api_key,
             api_url=api_url,
             api_version=api_version,
-        ) as cloud_model:
-            embeddings = await cloud_model.embed(
-                texts=texts,
-                model_name=model_name,
-                deployment_name=deployment_name,
-                text_type=text_type,
-                reduced_dimension=reduced_dimension,
-            )
+        ) as clients:
+            async with CloudEmbedding(
+                api_key=api_key,
+                provider=provider_type,
+                api_url=api_url,
+                api_version=api_version,
+                clients=clients,
+            ) as cloud_model:
+                embeddings = await cloud_model.embed(
+                    texts=texts,
+                    model_name=model_name,
+                    deployment_name=deployment_name,
+                    text_type=text_type,
+                    reduced_dimension=reduced_dimension,
+                )
 
         if any(embedding is None for embedding in embeddings):
             error_message = "Embeddings contain None values\n"
@@ -486,20 +609,25 @@ async def embed_text(
 
         prefixed_texts = [f"{prefix}{text}" for text in texts] if prefix else texts
 
-        local_model = get_embedding_model(
-            model_name=model_name, max_context_length=max_context_length
-        )
-        # Run CPU-bound embedding in a thread pool
-        embeddings_vectors = await asyncio.get_event_loop().run_in_executor(
-            None,
-            lambda: local_model.encode(
-                prefixed_texts, normalize_embeddings=normalize_embeddings
-            ),
-        )
-        embeddings = [
-            embedding if isinstance(embedding, list) else embedding.tolist()
-            for embedding in embeddings_vectors
-        ]
+        if MODEL_SERVER_MICRO_BATCHING_ENABLED:
+            # shares forward passes with concurrent requests for the same model
+            embeddings = np.stack(
+                await get_embed_batcher(
+                    model_name, max_context_length, normalize_embeddings
+                ).submit(prefixed_texts)
+            )
+        else:
+            local_model = get_embedding_model(
+                model_name=model_name, max_context_length=max_context_length
+            )
+            # Run CPU-bound embedding in a thread pool
+            embeddings_vectors = await asyncio.get_event_loop().run_in_executor(
+                None,
+                lambda: local_model.encode(
+                    prefixed_texts, normalize_embeddings=normalize_embeddings
+                ),
+            )
+            embeddings = np.asarray(embeddings_vectors)
 
         elapsed = time.monotonic() - start
         logger.info(
@@ -525,6 +653,12 @@ async def embed_text(
 
 @simple_log_function_time()
 async def local_rerank(query: str, docs: list[str], model_name: str) -> list[float]:
+    if MODEL_SERVER_MICRO_BATCHING_ENABLED:
+        # shares forward passes with concurrent requests for the same model
+        return await get_rerank_batcher(model_name).submit(
+            [(query, doc) for doc in docs]
+        )
+
     cross_encoder = get_local_reranking_model(model_name)
     # Run CPU-bound reranking in a thread pool
     return await asyncio.get_event_loop().run_in_executor(
@@ -604,17 +738,36 @@ async def litellm_rerank(
         ]
 
 
-@router.post("/bi-encoder-embed")
+@router.post("/bi-encoder-embed", response_model=EmbedResponse)
 async def route_bi_encoder_embed(
     request: Request,
     embed_request: EmbedRequest,
-) -> EmbedResponse:
-    return await process_embed_request(embed_request, request.app.state.gpu_type)
+) -> EmbedResponse | Response:
+    embeddings = await process_embed_request(embed_request, request.app.state.gpu_type)
+
+    # clients that ask for it get raw vectors instead of JSON floats,
+    # see shared_configs.embedding_transport
+    binary_dtype = parse_accept_header(request.headers.get("accept"))
+    if binary_dtype is not None:
+        try:
+            content = encode_embeddings(embeddings, binary_dtype)
+            return Response(content=content, media_type=EMBEDDINGS_BINARY_MEDIA_TYPE)
+        except ValueError:
+            logger.warning("Embeddings have mixed dimensions, responding with JSON")
+    return _to_embed_response(embeddings)
+
+
+def _to_embed_response(embeddings: list[Embedding] | np.ndarray) -> EmbedResponse:
+    if isinstance(embeddings, np.ndarray):
+        # one conversion for the whole batch, only needed for the JSON response
+        return EmbedResponse(embeddings=embeddings.tolist())
+    return EmbedResponse(embeddings=embeddings)
 
 
 async def process_embed_request(
     embed_request: EmbedRequest, gpu_type: str = "UNKNOWN"
-) -> EmbedResponse:
+) -> list[Embedding] | np.ndarray:
+    """Returns the vectors as embed_text does, the route picks the response format."""
     if not embed_request.texts:
         raise HTTPException(status_code=400, detail="No texts to be embedded")
 
@@ -644,7 +797,7 @@ async def process_embed_request(
             prefix=prefix,
             gpu_type=gpu_type,
         )
-        return EmbedResponse(embeddings=embeddings)
+        return embeddings
     except AuthenticationError as e:
         # Handle authentication errors consistently
         logger.error(f"Authentication error: {e.provider}")
@@ -652,7 +805,7 @@ async def process_embed_request(
             status_code=401,
             detail=f"Authentication failed: {e.message}",
         )
-    except RateLimitError as e:
+    except (RateLimitError, ProviderRateLimitError) as e:
         raise HTTPException(
             status_code=429,
             detail=str(e),
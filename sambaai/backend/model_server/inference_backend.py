@@ -0,0 +1,146 @@
+import importlib.util
+import os
+import shutil
+import tempfile
+from typing import TYPE_CHECKING
+
+from onyx.utils.logger import setup_logger
+from shared_configs.configs import MODEL_SERVER_INFERENCE_BACKEND
+from shared_configs.configs import MODEL_SERVER_INFERENCE_BACKEND_OVERRIDES
+from shared_configs.configs import MODEL_SERVER_ONNX_CACHE_DIR
+from shared_configs.configs import MODEL_SERVER_ONNX_QUANTIZATION_TARGET
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer  # type: ignore
+
+logger = setup_logger()
+
+TORCH_BACKEND = "torch"
+ONNX_BACKEND = "onnx"
+ONNX_INT8_BACKEND = "onnx-int8"
+SUPPORTED_INFERENCE_BACKENDS = (TORCH_BACKEND, ONNX_BACKEND, ONNX_INT8_BACKEND)
+
+
+def get_inference_backend(model_name: str) -> str:
+    backend = MODEL_SERVER_INFERENCE_BACKEND_OVERRIDES.get(
+        model_name, MODEL_SERVER_INFERENCE_BACKEND
+    )
+    if backend not in SUPPORTED_INFERENCE_BACKENDS:
+        logger.warning(
+            f"Unknown inference backend {backend} for {model_name}, using {TORCH_BACKEND}"
+        )
+        return TORCH_BACKEND
+    return backend
+
+
+def is_onnx_runtime_available() -> bool:
+    return (
+        importlib.util.find_spec("optimum") is not None
+        and importlib.util.find_spec("onnxruntime") is not None
+    )
+
+
+def get_onnx_export_path(
+    model_name: str, cache_dir: str = MODEL_SERVER_ONNX_CACHE_DIR
+) -> str:
+    return os.path.join(cache_dir, model_name.replace("/", "__"))
+
+
+def get_onnx_file_name(
+    backend: str, quantization_target: str = MODEL_SERVER_ONNX_QUANTIZATION_TARGET
+) -> str:
+    """Path of the ONNX model within the export directory."""
+    if backend == ONNX_INT8_BACKEND:
+        return f"onnx/model_int8_{quantization_target}.onnx"
+    return "onnx/model.onnx"
+
+
+def _export_onnx_model(
+    model_name: str,
+    export_path: str,
+    quantization_target: str,
+    cache_dir: str,
+) -> None:
+    """Converts the model to ONNX plus its int8 dynamically quantized variant and
+    saves both to `export_path`. Everything is written to a temporary directory that
+    is moved into place at the end, so an interrupted export is never picked up."""
+    from sentence_transformers import export_dynamic_quantized_onnx_model
+    from sentence_transformers import SentenceTransformer
+
+    os.makedirs(cache_dir, exist_ok=True)
+    staging_path = tempfile.mkdtemp(prefix=".export_", dir=cache_dir)
+    try:
+        logger.notice(f"Exporting {model_name} to ONNX, this is only done once")
+        model = SentenceTransformer(
+            model_name_or_path=model_name, backend="onnx", trust_remote_code=True
+        )
+        model.save_pretrained(staging_path)
+        if not os.path.exists(
+            os.path.join(staging_path, get_onnx_file_name(ONNX_BACKEND))
+        ):
+            raise RuntimeError(f"ONNX export of {model_name} produced no model.onnx")
+
+        logger.notice(f"Quantizing {model_name} to int8 for {quantization_target} CPUs")
+        export_dynamic_quantized_onnx_model(
+            model,
+            quantization_config=quantization_target,
+            model_name_or_path=staging_path,
+            file_suffix=f"int8_{quantization_target}",
+        )
+
+        # a previous export for another quantization target may be there already
+        shutil.rmtree(export_path, ignore_errors=True)
+        os.replace(staging_path, export_path)
+    finally:
+        shutil.rmtree(staging_path, ignore_errors=True)
+
+
+def load_sentence_transformer(
+    model_name: str,
+    backend: str | None = None,
+    cache_dir: str = MODEL_SERVER_ONNX_CACHE_DIR,
+    quantization_target: str = MODEL_SERVER_ONNX_QUANTIZATION_TARGET,
+) -> "SentenceTransformer":
+    """Loads a local embedding model with the configured inference backend (see
+    `get_inference_backend`). ONNX models are exported and cached on the first load.
+    Falls back to torch if the ONNX Runtime isn't installed or the export fails."""
+    from sentence_transformers import SentenceTransformer
+
+    backend = backend or get_inference_backend(model_name)
+    if backend != TORCH_BACKEND and not is_onnx_runtime_available():
+        logger.error(
+            f"Inference backend {backend} for {model_name} needs "
+            f"optimum[onnxruntime] installed, using {TORCH_BACKEND}"
+        )
+        backend = TORCH_BACKEND
+
+    if backend != TORCH_BACKEND:
+        export_path = get_onnx_export_path(model_name, cache_dir)
+        file_name = get_onnx_file_name(backend, quantization_target)
+        try:
+            if not os.path.exists(os.path.join(export_path, file_name)):
+                _export_onnx_model(
+                    model_name, export_path, quantization_target, cache_dir
+                )
+            model = SentenceTransformer(
+                model_name_or_path=export_path,
+                backend="onnx",
+                model_kwargs={"file_name": file_name},
+                trust_remote_code=True,
+            )
+            logger.notice(f"Loaded {model_name} with the {backend} backend")
+            return model
+        except Exception:
+            logger.exception(
+                f"Failed to load {model_name} with the {backend} backend, "
+                f"using {TORCH_BACKEND}"
+            )
+
+    # Some model architectures that aren't built into the Transformers or Sentence
+    # Transformer need to be downloaded to be loaded locally. This does not mean
+    # data is sent to remote servers for inference, however the remote code can
+    # be fairly arbitrary so only use trusted models
+    return SentenceTransformer(
+        model_name_or_path=model_name,
+        trust_remote_code=True,
+    )
@@ -17,6 +17,7 @@ from transformers import logging as transformer_logging  # type:ignore
 from model_server.custom_models import router as custom_models_router
 from model_server.custom_models import warm_up_information_content_model
 from model_server.custom_models import warm_up_intent_model
+from model_server.encoders import close_encoders
 from model_server.encoders import router as encoders_router
 from model_server.management_endpoints import router as management_router
 from model_server.utils import get_gpu_type
@@ -104,6 +105,8 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
 
     yield
 
+    await close_encoders()
+
 
 def get_model_app() -> FastAPI:
     application = FastAPI(
@@ -0,0 +1,236 @@
+import asyncio
+import time
+from collections.abc import Callable
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from dataclasses import field
+from typing import cast
+from typing import Generic
+from typing import TypeVar
+
+from prometheus_client import Gauge
+from prometheus_client import Histogram
+
+from onyx.utils.logger import setup_logger
+
+logger = setup_logger()
+
+I = TypeVar("I")  # noqa: E741
+O = TypeVar("O")  # noqa: E741
+
+
+micro_batch_queue_depth = Gauge(
+    "onyx_model_server_batch_queue_depth",
+    "Requests waiting to be put into a batch",
+    ["endpoint"],
+)
+micro_batch_size = Histogram(
+    "onyx_model_server_batch_size",
+    "Items per forward pass",
+    ["endpoint"],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512),
+)
+micro_batch_requests = Histogram(
+    "onyx_model_server_batch_requests",
+    "Requests sharing a batch",
+    ["endpoint"],
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+micro_batch_latency = Histogram(
+    "onyx_model_server_batch_latency_seconds",
+    "Time from a request being queued until its results are back",
+    ["endpoint"],
+)
+
+
+@dataclass
+class _PendingRequest(Generic[I, O]):
+    items: list[I]
+    future: asyncio.Future[list[O]]
+    queued_at: float = field(default_factory=time.monotonic)
+
+
+def split_into_buckets(
+    token_counts: list[int], max_batch_tokens: int
+) -> list[list[int]]:
+    """Groups item indices into batches of similar length. Items are padded to the
+    longest item of their batch, so a batch is closed once its padded size
+    (items * longest item) would exceed `max_batch_tokens`. Every batch has at
+    least one item, even if that item alone exceeds the limit."""
+    buckets: list[list[int]] = []
+    current: list[int] = []
+    for index in sorted(range(len(token_counts)), key=lambda i: token_counts[i]):
+        # sorted by length, so the new item is the longest one of the batch
+        if current and (len(current) + 1) * token_counts[index] > max_batch_tokens:
+            buckets.append(current)
+            current = []
+        current.append(index)
+    if current:
+        buckets.append(current)
+    return buckets
+
+
+class MicroBatcher(Generic[I, O]):
+    """Coalesces the items of concurrent requests for the same model into shared
+    forward passes and scatters the results back to the requests.
+
+    Requests are collected for up to `max_wait_seconds` after the first one comes
+    in (or until `max_batch_tokens` is reached), then split into length bucketed
+    batches (see `split_into_buckets`) that run one after the other on `executor`.
+    While a batch runs, new requests queue up and are picked up together
+    afterwards, so batches grow with load. If a batch fails, its requests are re-run
+    one by one, so an error only reaches the request that caused it.
+
+    `run_batch` must return exactly one output per input item. Must be used from
+    a single event loop at a time, it rebinds itself if the loop changes."""
+
+    def __init__(
+        self,
+        endpoint: str,
+        run_batch: Callable[[list[I]], list[O]],
+        count_tokens: Callable[[I], int],
+        executor: Executor,
+        max_batch_tokens: int,
+        max_wait_seconds: float,
+    ) -> None:
+        self.endpoint = endpoint
+        self.run_batch = run_batch
+        self.count_tokens = count_tokens
+        self.executor = executor
+        self.max_batch_tokens = max_batch_tokens
+        self.max_wait_seconds = max_wait_seconds
+
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queue: asyncio.Queue[_PendingRequest[I, O]] | None = None
+        self._worker: asyncio.Task[None] | None = None
+
+    def _ensure_worker(self) -> asyncio.Queue[_PendingRequest[I, O]]:
+        loop = asyncio.get_running_loop()
+        if (
+            self._loop is not loop
+            or self._queue is None
+            or self._worker is None
+            or self._worker.done()
+        ):
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run(self._queue))
+        return self._queue
+
+    async def aclose(self) -> None:
+        """Stops the worker, requests that haven't been batched yet are cancelled."""
+        worker = self._worker
+        queue = self._queue
+        self._loop = self._queue = self._worker = None
+
+        if worker is not None and not worker.done():
+            worker.cancel()
+            try:
+                await worker
+            except asyncio.CancelledError:
+                pass
+        while queue is not None and not queue.empty():
+            queue.get_nowait().future.cancel()
+            micro_batch_queue_depth.labels(endpoint=self.endpoint).dec()
+
+    async def submit(self, items: list[I]) -> list[O]:
+        if not items:
+            return []
+
+        queue = self._ensure_worker()
+        future: asyncio.Future[list[O]] = asyncio.get_running_loop().create_future()
+        queue.put_nowait(_PendingRequest(items=items, future=future))
+        micro_batch_queue_depth.labels(endpoint=self.endpoint).inc()
+        return await future
+
+    async def _collect(
+        self, queue: asyncio.Queue[_PendingRequest[I, O]]
+    ) -> list[_PendingRequest[I, O]]:
+        requests = [await queue.get()]
+        num_tokens = sum(self.count_tokens(item) for item in requests[0].items)
+        deadline = time.monotonic() + self.max_wait_seconds
+
+        while num_tokens < self.max_batch_tokens:
+            try:
+                # anything already queued is taken without waiting
+                request = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    request = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            requests.append(request)
+            num_tokens += sum(self.count_tokens(item) for item in request.items)
+
+        micro_batch_queue_depth.labels(endpoint=self.endpoint).dec(len(requests))
+        # requests whose caller went away (e.g. client disconnect) are dropped
+        return [request for request in requests if not request.future.done()]
+
+    async def _run_items(self, items: list[I]) -> list[O]:
+        loop = asyncio.get_running_loop()
+        outputs: list[O | None] = [None] * len(items)
+        for bucket in split_into_buckets(
+            [self.count_tokens(item) for item in items], self.max_batch_tokens
+        ):
+            bucket_items = [items[i] for i in bucket]
+            micro_batch_size.labels(endpoint=self.endpoint).observe(len(bucket_items))
+            bucket_outputs = await loop.run_in_executor(
+                self.executor, self.run_batch, bucket_items
+            )
+            if len(bucket_outputs) != len(bucket_items):
+                raise RuntimeError(
+                    f"{self.endpoint}: got {len(bucket_outputs)} outputs "
+                    f"for {len(bucket_items)} inputs"
+                )
+            for i, output in zip(bucket, bucket_outputs):
+                outputs[i] = output
+        return cast(list[O], outputs)
+
+    async def _run_alone(self, request: _PendingRequest[I, O]) -> None:
+        try:
+            outputs = await self._run_items(request.items)
+        except Exception as e:
+            if not request.future.done():
+                request.future.set_exception(e)
+            return
+
+        micro_batch_latency.labels(endpoint=self.endpoint).observe(
+            time.monotonic() - request.queued_at
+        )
+        if not request.future.done():
+            request.future.set_result(outputs)
+
+    async def _run(self, queue: asyncio.Queue[_PendingRequest[I, O]]) -> None:
+        while True:
+            requests = await self._collect(queue)
+            if not requests:
+                continue
+
+            items = [item for request in requests for item in request.items]
+            try:
+                outputs = await self._run_items(items)
+            except Exception:
+                logger.exception(
+                    f"{self.endpoint}: batch of {len(items)} items from "
+                    f"{len(requests)} requests failed, running them one by one"
+                )
+                # one bad input must not fail the unrelated requests it was
+                # batched with, each request gets its own result or error
+                for request in requests:
+                    await self._run_alone(request)
+                continue
+
+            micro_batch_requests.labels(endpoint=self.endpoint).observe(len(requests))
+            now = time.monotonic()
+            offset = 0
+            for request in requests:
+                request_outputs = outputs[offset : offset + len(request.items)]
+                offset += len(request.items)
+                micro_batch_latency.labels(endpoint=self.endpoint).observe(
+                    now - request.queued_at
+                )
+                if not request.future.done():
+                    request.future.set_result(request_outputs)
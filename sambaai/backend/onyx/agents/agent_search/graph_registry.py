@@ -0,0 +1,181 @@
+import threading
+import time
+from collections.abc import Callable
+from enum import Enum
+from typing import Any
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langgraph.graph import START
+from langgraph.graph import StateGraph
+from langgraph.graph.state import CompiledStateGraph
+from prometheus_client import Histogram
+
+from onyx.agents.agent_search.basic.graph_builder import basic_graph_builder
+from onyx.agents.agent_search.dc_search_analysis.graph_builder import (
+    divide_and_conquer_graph_builder,
+)
+from onyx.agents.agent_search.deep_search.main.graph_builder import (
+    agent_search_graph_builder,
+)
+from onyx.agents.agent_search.kb_search.graph_builder import kb_graph_builder
+from onyx.configs.agent_configs import AGENT_GRAPH_PROFILING_ENABLED
+from onyx.utils.logger import setup_logger
+
+logger = setup_logger()
+
+agent_graph_compile_seconds = Histogram(
+    "onyx_agent_graph_compile_seconds",
+    "Time to build and compile an agent graph",
+    ["graph"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+agent_graph_node_seconds = Histogram(
+    "onyx_agent_graph_node_seconds",
+    "Execution time of agent graph nodes, including nodes of subgraphs",
+    ["graph", "node"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+
+
+class AgentGraph(str, Enum):
+    BASIC = "basic"
+    KB_SEARCH = "kb_search"
+    DIVIDE_AND_CONQUER = "divide_and_conquer"
+    DEEP_SEARCH = "deep_search"
+
+
+_GRAPH_BUILDERS: dict[AgentGraph, Callable[[], StateGraph]] = {
+    AgentGraph.BASIC: basic_graph_builder,
+    AgentGraph.KB_SEARCH: kb_graph_builder,
+    AgentGraph.DIVIDE_AND_CONQUER: divide_and_conquer_graph_builder,
+    AgentGraph.DEEP_SEARCH: agent_search_graph_builder,
+}
+
+
+class CompiledGraphRegistry:
+    """Compiles every agent graph (including the subgraphs its builder compiles) once
+    per process. Compiled graphs don't hold any per run state, so they are shared by
+    all requests and threads."""
+
+    def __init__(
+        self, builders: dict[AgentGraph, Callable[[], StateGraph]] = _GRAPH_BUILDERS
+    ) -> None:
+        self._builders = builders
+        self._compiled_graphs: dict[AgentGraph, CompiledStateGraph] = {}
+        self._lock = threading.Lock()
+
+    def get(self, graph: AgentGraph) -> CompiledStateGraph:
+        compiled_graph = self._compiled_graphs.get(graph)
+        if compiled_graph is not None:
+            return compiled_graph
+
+        with self._lock:
+            # another thread may have compiled it while we waited
+            compiled_graph = self._compiled_graphs.get(graph)
+            if compiled_graph is None:
+                start = time.monotonic()
+                compiled_graph = self._builders[graph]().compile()
+                elapsed = time.monotonic() - start
+                agent_graph_compile_seconds.labels(graph=graph.value).observe(elapsed)
+                logger.info(f"Compiled the {graph.value} agent graph in {elapsed:.3f}s")
+                self._compiled_graphs[graph] = compiled_graph
+        return compiled_graph
+
+    def warm_up(self) -> None:
+        for graph in self._builders:
+            self.get(graph)
+
+
+_REGISTRY = CompiledGraphRegistry()
+
+
+def get_compiled_graph(graph: AgentGraph) -> CompiledStateGraph:
+    return _REGISTRY.get(graph)
+
+
+def warm_up_agent_graphs() -> None:
+    start = time.monotonic()
+    _REGISTRY.warm_up()
+    logger.notice(f"Compiled all agent graphs in {time.monotonic() - start:.2f}s")
+
+
+class GraphNodeTimingCallbackHandler(BaseCallbackHandler):
+    """Profiling hook for a single graph run. Records how long every node (of the
+    graph and its subgraphs) took and logs the slowest nodes once the run is done.
+    Nodes of parallel branches run in other threads, the bookkeeping only uses
+    atomic dict operations."""
+
+    def __init__(self, graph: AgentGraph) -> None:
+        self.graph = graph
+        self.node_timings: list[tuple[str, float]] = []
+        self._starts: dict[UUID, tuple[str, float]] = {}
+        self._run_start: float | None = None
+
+    def on_chain_start(
+        self,
+        serialized: dict[str, Any],
+        inputs: dict[str, Any],
+        *,
+        run_id: UUID,
+        parent_run_id: UUID | None = None,
+        tags: list[str] | None = None,
+        metadata: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        if parent_run_id is None:
+            self._run_start = time.monotonic()
+            return
+        # nodes run as chains named after the node, everything else (the writes of
+        # a node, runnables called within a node) also carries the node metadata
+        node = (metadata or {}).get("langgraph_node")
+        if node is not None and node != START and kwargs.get("name") == node:
+            self._starts[run_id] = (node, time.monotonic())
+
+    def _finish(self, run_id: UUID, parent_run_id: UUID | None) -> None:
+        if parent_run_id is None and self._run_start is not None:
+            self._log_summary(time.monotonic() - self._run_start)
+            return
+        started = self._starts.pop(run_id, None)
+        if started is None:
+            return
+        node, start = started
+        elapsed = time.monotonic() - start
+        self.node_timings.append((node, elapsed))
+        agent_graph_node_seconds.labels(graph=self.graph.value, node=node).observe(
+            elapsed
+        )
+
+    def on_chain_end(
+        self,
+        outputs: dict[str, Any],
+        *,
+        run_id: UUID,
+        parent_run_id: UUID | None = None,
+        **kwargs: Any,
+    ) -> None:
+        self._finish(run_id, parent_run_id)
+
+    def on_chain_error(
+        self,
+        error: BaseException,
+        *,
+        run_id: UUID,
+        parent_run_id: UUID | None = None,
+        **kwargs: Any,
+    ) -> None:
+        self._finish(run_id, parent_run_id)
+
+    def _log_summary(self, total: float) -> None:
+        slowest = sorted(self.node_timings, key=lambda timing: timing[1], reverse=True)
+        summary = ", ".join(f"{node}={elapsed:.3f}s" for node, elapsed in slowest[:10])
+        logger.debug(
+            f"Agent graph {self.graph.value} took {total:.3f}s, "
+            f"{len(self.node_timings)} nodes, slowest: {summary}"
+        )
+
+
+def get_graph_callbacks(graph: AgentGraph) -> list[BaseCallbackHandler]:
+    if not AGENT_GRAPH_PROFILING_ENABLED:
+        return []
+    return [GraphNodeTimingCallbackHandler(graph)]
@@ -79,7 +79,7 @@ def extract_ert(
     # Now specify core activities in the step (step 1)
     stream_write_step_activities(writer, _KG_STEP_NR)
 
-    # Create temporary views. TODO: move into parallel step, if ultimately materialized
+    # Make sure the user's KG views exist and their allowed documents are current
     kg_views = get_user_view_names(user_email)
     with get_session_with_current_tenant() as db_session:
         create_views(
@@ -30,7 +30,6 @@ from onyx.configs.kg_configs import KG_TEMP_ALLOWED_DOCS_VIEW_NAME_PREFIX
 from onyx.configs.kg_configs import KG_TEMP_KG_ENTITIES_VIEW_NAME_PREFIX
 from onyx.configs.kg_configs import KG_TEMP_KG_RELATIONSHIPS_VIEW_NAME_PREFIX
 from onyx.db.engine import get_db_readonly_user_session_with_current_tenant
-from onyx.db.kg_temp_view import drop_views
 from onyx.llm.interfaces import LLM
 from onyx.prompts.kg_prompts import ENTITY_SOURCE_DETECTION_PROMPT
 from onyx.prompts.kg_prompts import SIMPLE_ENTITY_SQL_PROMPT
@@ -324,12 +323,6 @@ def generate_simple_sql(
         except Exception as e:
             # TODO: restructure with broader node rework
             logger.error(f"Error in SQL generation: {e}")
-
-            drop_views(
-                allowed_docs_view_name=doc_temp_view,
-                kg_relationships_view_name=rel_temp_view,
-                kg_entity_view_name=ent_temp_view,
-            )
             raise e
 
         if state.query_type == KGRelationshipDetection.RELATIONSHIPS.value:
@@ -371,12 +364,6 @@ def generate_simple_sql(
                     f"Error in generating the sql correction: {e}. Original model response: {cleaned_response}"
                 )
 
-                drop_views(
-                    allowed_docs_view_name=doc_temp_view,
-                    kg_relationships_view_name=rel_temp_view,
-                    kg_entity_view_name=ent_temp_view,
-                )
-
                 raise e
 
         logger.debug(f"A3 - sql_statement after correction: {sql_statement}")
@@ -469,11 +456,7 @@ def generate_simple_sql(
             else:
                 source_document_results = None
 
-        drop_views(
-            allowed_docs_view_name=doc_temp_view,
-            kg_relationships_view_name=rel_temp_view,
-            kg_entity_view_name=ent_temp_view,
-        )
+        # the views are kept for the user's next KG query, see create_views
 
         logger.debug(f"A3 - Number of query_results: {len(query_results)}")
 
@@ -2,15 +2,12 @@ from collections.abc import Iterable
 from datetime import datetime
 from typing import cast
 
+from langchain_core.callbacks import BaseCallbackHandler
 from langchain_core.runnables.schema import CustomStreamEvent
 from langchain_core.runnables.schema import StreamEvent
 from langgraph.graph.state import CompiledStateGraph
 
-from onyx.agents.agent_search.basic.graph_builder import basic_graph_builder
 from onyx.agents.agent_search.basic.states import BasicInput
-from onyx.agents.agent_search.dc_search_analysis.graph_builder import (
-    divide_and_conquer_graph_builder,
-)
 from onyx.agents.agent_search.dc_search_analysis.states import MainInput as DCMainInput
 from onyx.agents.agent_search.deep_search.main.graph_builder import (
     agent_search_graph_builder as agent_search_graph_builder,
@@ -18,7 +15,9 @@ from onyx.agents.agent_search.deep_search.main.graph_builder import (
 from onyx.agents.agent_search.deep_search.main.states import (
     MainInput as MainInput,
 )
-from onyx.agents.agent_search.kb_search.graph_builder import kb_graph_builder
+from onyx.agents.agent_search.graph_registry import AgentGraph
+from onyx.agents.agent_search.graph_registry import get_compiled_graph
+from onyx.agents.agent_search.graph_registry import get_graph_callbacks
 from onyx.agents.agent_search.kb_search.states import MainInput as KBMainInput
 from onyx.agents.agent_search.models import GraphConfig
 from onyx.agents.agent_search.shared_graph_utils.utils import get_test_config
@@ -41,8 +40,6 @@ from onyx.utils.logger import setup_logger
 
 logger = setup_logger()
 
-_COMPILED_GRAPH: CompiledStateGraph | None = None
-
 
 def _parse_agent_event(
     event: StreamEvent,
@@ -91,12 +88,16 @@ def manage_sync_streaming(
     compiled_graph: CompiledStateGraph,
     config: GraphConfig,
     graph_input: BasicInput | MainInput | DCMainInput | KBMainInput,
+    callbacks: list[BaseCallbackHandler] | None = None,
 ) -> Iterable[StreamEvent]:
     message_id = config.persistence.message_id if config.persistence else None
     for event in compiled_graph.stream(
         stream_mode="custom",
         input=graph_input,
-        config={"metadata": {"config": config, "thread_id": str(message_id)}},
+        config={
+            "metadata": {"config": config, "thread_id": str(message_id)},
+            "callbacks": callbacks or [],
+        },
     ):
         yield cast(CustomStreamEvent, event)
 
@@ -105,10 +106,14 @@ def run_graph(
     compiled_graph: CompiledStateGraph,
     config: GraphConfig,
     input: BasicInput | MainInput | DCMainInput | KBMainInput,
+    callbacks: list[BaseCallbackHandler] | None = None,
 ) -> AnswerStream:
 
     for event in manage_sync_streaming(
-        compiled_graph=compiled_graph, config=config, graph_input=input
+        compiled_graph=compiled_graph,
+        config=config,
+        graph_input=input,
+        callbacks=callbacks,
     ):
         if not (parsed_object := _parse_agent_event(event)):
             continue
@@ -116,44 +121,43 @@ def run_graph(
         yield parsed_object
 
 
-# It doesn't actually take very long to load the graph, but we'd rather
-# not compile it again on every request.
+def run_registered_graph(
+    graph: AgentGraph,
+    config: GraphConfig,
+    input: BasicInput | MainInput | DCMainInput | KBMainInput,
+) -> AnswerStream:
+    """Runs one of the agent graphs, compiled once per process (see graph_registry)."""
+    return run_graph(
+        get_compiled_graph(graph), config, input, callbacks=get_graph_callbacks(graph)
+    )
+
+
 def load_compiled_graph() -> CompiledStateGraph:
-    global _COMPILED_GRAPH
-    if _COMPILED_GRAPH is None:
-        graph = agent_search_graph_builder()
-        _COMPILED_GRAPH = graph.compile()
-    return _COMPILED_GRAPH
+    return get_compiled_graph(AgentGraph.DEEP_SEARCH)
 
 
 def run_agent_search_graph(
     config: GraphConfig,
 ) -> AnswerStream:
-    compiled_graph = load_compiled_graph()
-
     input = MainInput(log_messages=[])
     # Agent search is not a Tool per se, but this is helpful for the frontend
     yield ToolCallKickoff(
         tool_name="agent_search_0",
         tool_args={"query": config.inputs.prompt_builder.raw_user_query},
     )
-    yield from run_graph(compiled_graph, config, input)
+    yield from run_registered_graph(AgentGraph.DEEP_SEARCH, config, input)
 
 
 def run_basic_graph(
     config: GraphConfig,
 ) -> AnswerStream:
-    graph = basic_graph_builder()
-    compiled_graph = graph.compile()
     input = BasicInput(unused=True)
-    return run_graph(compiled_graph, config, input)
+    return run_registered_graph(AgentGraph.BASIC, config, input)
 
 
 def run_kb_graph(
     config: GraphConfig,
 ) -> AnswerStream:
-    graph = kb_graph_builder()
-    compiled_graph = graph.compile()
     input = KBMainInput(log_messages=[])
 
     yield ToolCallKickoff(
@@ -161,19 +165,17 @@ def run_kb_graph(
         tool_args={"query": config.inputs.prompt_builder.raw_user_query},
     )
 
-    yield from run_graph(compiled_graph, config, input)
+    yield from run_registered_graph(AgentGraph.KB_SEARCH, config, input)
 
 
 def run_dc_graph(
     config: GraphConfig,
 ) -> AnswerStream:
-    graph = divide_and_conquer_graph_builder()
-    compiled_graph = graph.compile()
     input = DCMainInput(log_messages=[])
     config.inputs.prompt_builder.raw_user_query = (
         config.inputs.prompt_builder.raw_user_query.strip()
     )
-    return run_graph(compiled_graph, config, input)
+    return run_registered_graph(AgentGraph.DIVIDE_AND_CONQUER, config, input)
 
 
 if __name__ == "__main__":
@@ -25,6 +25,7 @@ from onyx.background.celery.apps.task_formatters import CeleryTaskPlainFormatter
 from onyx.background.celery.celery_utils import celery_is_worker_primary
 from onyx.background.celery.celery_utils import make_probe_path
 from onyx.configs.constants import ONYX_CLOUD_CELERY_TASK_PREFIX
+from onyx.configs.constants import OnyxCeleryTask
 from onyx.configs.constants import OnyxRedisLocks
 from onyx.db.engine import get_sqlalchemy_engine
 from onyx.document_index.vespa.shared_utils.utils import wait_for_vespa_with_timeout
@@ -95,6 +96,13 @@ def on_task_prerun(
     pass
 
 
+def _counts_synced_docs(task: Task) -> bool:
+    """Vespa metadata sync batch tasks count the documents they synced themselves,
+    postrun only sees the documents of the last attempt. The per document task
+    (still queued from before batching) covers one document."""
+    return task.name == OnyxCeleryTask.VESPA_METADATA_SYNC_BATCH_TASK
+
+
 def on_task_postrun(
     sender: Any | None = None,
     task_id: str | None = None,
@@ -153,14 +161,16 @@ def on_task_postrun(
         document_set_id = RedisDocumentSet.get_id_from_task_id(task_id)
         if document_set_id is not None:
             rds = RedisDocumentSet(tenant_id, int(document_set_id))
-            r.srem(rds.taskset_key, task_id)
+            if r.srem(rds.taskset_key, task_id) and not _counts_synced_docs(task):
+                r.incr(rds.synced_docs_key)
         return
 
     if task_id.startswith(RedisUserGroup.PREFIX):
         usergroup_id = RedisUserGroup.get_id_from_task_id(task_id)
         if usergroup_id is not None:
             rug = RedisUserGroup(tenant_id, int(usergroup_id))
-            r.srem(rug.taskset_key, task_id)
+            if r.srem(rug.taskset_key, task_id) and not _counts_synced_docs(task):
+                r.incr(rug.synced_docs_key)
         return
 
     if task_id.startswith(RedisConnectorDelete.PREFIX):
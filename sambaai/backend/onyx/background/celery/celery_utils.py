@@ -1,3 +1,4 @@
+from collections.abc import Iterator
 from datetime import datetime
 from datetime import timezone
 from pathlib import Path
@@ -30,21 +31,26 @@ def document_batch_to_ids(
     return {doc.id for doc in doc_batch}
 
 
-def extract_ids_from_runnable_connector(
+def yield_ids_from_runnable_connector(
     runnable_connector: BaseConnector,
     callback: IndexingHeartbeatInterface | None = None,
-) -> set[str]:
+) -> Iterator[set[str]]:
     """
-    If the SlimConnector hasnt been implemented for the given connector, just pull
-    all docs using the load_from_state and grab out the IDs.
+    Yields the document IDs of the source in batches. If the SlimConnector hasnt been
+    implemented for the given connector, just pull all docs using the load_from_state
+    and grab out the IDs.
 
     Optionally, a callback can be passed to handle the length of each document batch.
     """
-    all_connector_doc_ids: set[str] = set()
-
     if isinstance(runnable_connector, SlimConnector):
         for metadata_batch in runnable_connector.retrieve_all_slim_documents():
-            all_connector_doc_ids.update({doc.id for doc in metadata_batch})
+            _check_should_stop(callback)
+            yield {doc.id for doc in metadata_batch}
+            if callback:
+                callback.progress(
+                    "yield_ids_from_runnable_connector", len(metadata_batch)
+                )
+        return
 
     doc_batch_generator = None
 
@@ -63,18 +69,17 @@ def extract_ids_from_runnable_connector(
             max_calls=MAX_PRUNING_DOCUMENT_RETRIEVAL_PER_MINUTE, period=60
         )(document_batch_to_ids)
     for doc_batch in doc_batch_generator:
-        if callback:
-            if callback.should_stop():
-                raise RuntimeError(
-                    "extract_ids_from_runnable_connector: Stop signal detected"
-                )
+        _check_should_stop(callback)
 
-        all_connector_doc_ids.update(doc_batch_processing_func(doc_batch))
+        yield doc_batch_processing_func(doc_batch)
 
         if callback:
-            callback.progress("extract_ids_from_runnable_connector", len(doc_batch))
+            callback.progress("yield_ids_from_runnable_connector", len(doc_batch))
+
 
-    return all_connector_doc_ids
+def _check_should_stop(callback: IndexingHeartbeatInterface | None) -> None:
+    if callback and callback.should_stop():
+        raise RuntimeError("yield_ids_from_runnable_connector: Stop signal detected")
 
 
 def celery_is_listening_to_queue(worker: Any, name: str) -> bool:
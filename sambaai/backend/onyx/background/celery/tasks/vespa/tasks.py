@@ -8,6 +8,7 @@ import httpx
 from celery import Celery
 from celery import shared_task
 from celery import Task
+from celery.exceptions import Retry
 from celery.exceptions import SoftTimeLimitExceeded
 from redis import Redis
 from redis.lock import Lock as RedisLock
@@ -15,29 +16,40 @@ from sqlalchemy.orm import Session
 from tenacity import RetryError
 
 from onyx.access.access import get_access_for_document
+from onyx.access.access import get_access_for_documents
 from onyx.background.celery.apps.app_base import task_logger
+from onyx.background.celery.celery_redis import celery_get_queue_length
 from onyx.background.celery.tasks.shared.RetryDocumentIndex import RetryDocumentIndex
 from onyx.background.celery.tasks.shared.tasks import LIGHT_SOFT_TIME_LIMIT
 from onyx.background.celery.tasks.shared.tasks import LIGHT_TIME_LIMIT
 from onyx.background.celery.tasks.shared.tasks import OnyxCeleryTaskCompletionStatus
 from onyx.configs.app_configs import JOB_TIMEOUT
+from onyx.configs.app_configs import VESPA_SYNC_BATCH_MAX_PARALLEL_UPDATES
+from onyx.configs.app_configs import VESPA_SYNC_BATCH_QUEUE_DEPTH_STEP
+from onyx.configs.app_configs import VESPA_SYNC_BATCH_SIZE_MAX
+from onyx.configs.app_configs import VESPA_SYNC_BATCH_SIZE_MIN
 from onyx.configs.app_configs import VESPA_SYNC_MAX_TASKS
 from onyx.configs.constants import CELERY_VESPA_SYNC_BEAT_LOCK_TIMEOUT
+from onyx.configs.constants import OnyxCeleryQueues
 from onyx.configs.constants import OnyxCeleryTask
 from onyx.configs.constants import OnyxRedisConstants
 from onyx.configs.constants import OnyxRedisLocks
 from onyx.db.connector_credential_pair import get_connector_credential_pairs
 from onyx.db.document import count_documents_by_needs_sync
 from onyx.db.document import get_document
+from onyx.db.document import get_documents_by_ids
 from onyx.db.document import mark_document_as_synced
+from onyx.db.document import mark_documents_as_synced
 from onyx.db.document_set import delete_document_set
 from onyx.db.document_set import fetch_document_sets
 from onyx.db.document_set import fetch_document_sets_for_document
+from onyx.db.document_set import fetch_document_sets_for_documents
 from onyx.db.document_set import get_document_set_by_id
 from onyx.db.document_set import mark_document_set_as_synced
 from onyx.db.engine import get_session_with_current_tenant
 from onyx.db.enums import SyncStatus
 from onyx.db.enums import SyncType
+from onyx.db.models import Document
 from onyx.db.models import DocumentSet
 from onyx.db.models import UserGroup
 from onyx.db.search_settings import get_active_search_settings
@@ -57,6 +69,7 @@ from onyx.redis.redis_pool import get_redis_replica_client
 from onyx.redis.redis_pool import redis_lock_dump
 from onyx.redis.redis_usergroup import RedisUserGroup
 from onyx.utils.logger import setup_logger
+from onyx.utils.threadpool_concurrency import run_functions_tuples_in_parallel
 from onyx.utils.variable_functionality import fetch_versioned_implementation
 from onyx.utils.variable_functionality import (
     fetch_versioned_implementation_with_fallback,
@@ -66,6 +79,21 @@ from onyx.utils.variable_functionality import noop_fallback
 
 logger = setup_logger()
 
+# a batch syncs up to VESPA_SYNC_BATCH_SIZE_MAX documents, give it more time than a
+# single document sync
+VESPA_METADATA_SYNC_BATCH_SOFT_TIME_LIMIT = LIGHT_SOFT_TIME_LIMIT * 3
+VESPA_METADATA_SYNC_BATCH_TIME_LIMIT = VESPA_METADATA_SYNC_BATCH_SOFT_TIME_LIMIT + 15
+
+
+def get_vespa_sync_batch_size(queue_depth: int) -> int:
+    """Number of documents per sync task. Small batches spread a short queue over
+    all workers, a deep queue is drained with fewer, larger tasks."""
+    doublings = min(queue_depth // max(VESPA_SYNC_BATCH_QUEUE_DEPTH_STEP, 1), 16)
+    return max(
+        VESPA_SYNC_BATCH_SIZE_MIN,
+        min(VESPA_SYNC_BATCH_SIZE_MIN * 2**doublings, VESPA_SYNC_BATCH_SIZE_MAX),
+    )
+
 
 # celery auto associates tasks created inside another task,
 # which bloats the result metadata considerably. trail=False prevents this.
@@ -99,10 +127,21 @@ def check_for_vespa_sync_task(self: Task, *, tenant_id: str) -> bool | None:
         return None
 
     try:
+        r_celery = self.app.broker_connection().channel().client  # type: ignore
+        batch_size = get_vespa_sync_batch_size(
+            celery_get_queue_length(OnyxCeleryQueues.VESPA_METADATA_SYNC, r_celery)
+        )
+
         # 1/3: KICKOFF
         with get_session_with_current_tenant() as db_session:
             try_generate_stale_document_sync_tasks(
-                self.app, VESPA_SYNC_MAX_TASKS, db_session, r, lock_beat, tenant_id
+                self.app,
+                VESPA_SYNC_MAX_TASKS,
+                db_session,
+                r,
+                lock_beat,
+                tenant_id,
+                batch_size,
             )
 
         # region document set scan
@@ -121,7 +160,13 @@ def check_for_vespa_sync_task(self: Task, *, tenant_id: str) -> bool | None:
             lock_beat.reacquire()
             with get_session_with_current_tenant() as db_session:
                 try_generate_document_set_sync_tasks(
-                    self.app, document_set_id, db_session, r, lock_beat, tenant_id
+                    self.app,
+                    document_set_id,
+                    db_session,
+                    r,
+                    lock_beat,
+                    tenant_id,
+                    batch_size,
                 )
         # endregion
 
@@ -150,7 +195,13 @@ def check_for_vespa_sync_task(self: Task, *, tenant_id: str) -> bool | None:
                     lock_beat.reacquire()
                     with get_session_with_current_tenant() as db_session:
                         try_generate_user_group_sync_tasks(
-                            self.app, usergroup_id, db_session, r, lock_beat, tenant_id
+                            self.app,
+                            usergroup_id,
+                            db_session,
+                            r,
+                            lock_beat,
+                            tenant_id,
+                            batch_size,
                         )
 
         # 2/3: VALIDATE: TODO
@@ -210,6 +261,7 @@ def try_generate_stale_document_sync_tasks(
     r: Redis,
     lock_beat: RedisLock,
     tenant_id: str,
+    batch_size: int = 1,
 ) -> int | None:
     # the fence is up, do nothing
 
@@ -246,7 +298,13 @@ def try_generate_stale_document_sync_tasks(
         rc = RedisConnectorCredentialPair(tenant_id, cc_pair.id)
         rc.set_skip_docs(docs_to_skip)
         result = rc.generate_tasks(
-            tasks_remaining, celery_app, db_session, r, lock_beat, tenant_id
+            tasks_remaining,
+            celery_app,
+            db_session,
+            r,
+            lock_beat,
+            tenant_id,
+            batch_size=batch_size,
         )
 
         if result is None:
@@ -275,7 +333,9 @@ def try_generate_stale_document_sync_tasks(
             f"RedisConnector.generate_tasks finished for all cc_pairs. total_tasks_generated={total_tasks_generated}"
         )
 
-    redis_global_ccpair.set_fence(total_tasks_generated)
+    # the fence holds the number of documents, each task syncs a batch of them.
+    # every enqueued document was added to docs_to_skip
+    redis_global_ccpair.set_fence(len(docs_to_skip))
     return total_tasks_generated
 
 
@@ -286,6 +346,7 @@ def try_generate_document_set_sync_tasks(
     r: Redis,
     lock_beat: RedisLock,
     tenant_id: str,
+    batch_size: int = 1,
 ) -> int | None:
     lock_beat.reacquire()
 
@@ -316,6 +377,7 @@ def try_generate_document_set_sync_tasks(
 
     # add tasks to celery and build up the task set to monitor in redis
     r.delete(rds.taskset_key)
+    r.delete(rds.synced_docs_key)
 
     task_logger.info(
         f"RedisDocumentSet.generate_tasks starting. document_set_id={document_set.id}"
@@ -323,12 +385,18 @@ def try_generate_document_set_sync_tasks(
 
     # Add all documents that need to be updated into the queue
     result = rds.generate_tasks(
-        VESPA_SYNC_MAX_TASKS, celery_app, db_session, r, lock_beat, tenant_id
+        VESPA_SYNC_MAX_TASKS,
+        celery_app,
+        db_session,
+        r,
+        lock_beat,
+        tenant_id,
+        batch_size=batch_size,
     )
     if result is None:
         return None
 
-    tasks_generated = result[0]
+    tasks_generated, docs_generated = result
     # Currently we are allowing the sync to proceed with 0 tasks.
     # It's possible for sets/groups to be generated initially with no entries
     # and they still need to be marked as up to date.
@@ -337,7 +405,8 @@ def try_generate_document_set_sync_tasks(
 
     task_logger.info(
         f"RedisDocumentSet.generate_tasks finished. "
-        f"document_set={document_set.id} tasks_generated={tasks_generated}"
+        f"document_set={document_set.id} tasks_generated={tasks_generated} "
+        f"docs_generated={docs_generated}"
     )
 
     # create before setting fence to avoid race condition where the monitoring
@@ -351,8 +420,9 @@ def try_generate_document_set_sync_tasks(
     except Exception:
         task_logger.exception("insert_sync_record exceptioned.")
 
-    # set this only after all tasks have been added
-    rds.set_fence(tasks_generated)
+    # set this only after all tasks have been added. The fence holds the number
+    # of documents, each task syncs a batch of them
+    rds.set_fence(docs_generated)
     return tasks_generated
 
 
@@ -363,6 +433,7 @@ def try_generate_user_group_sync_tasks(
     r: Redis,
     lock_beat: RedisLock,
     tenant_id: str,
+    batch_size: int = 1,
 ) -> int | None:
     lock_beat.reacquire()
 
@@ -393,18 +464,25 @@ def try_generate_user_group_sync_tasks(
 
     # add tasks to celery and build up the task set to monitor in redis
     r.delete(rug.taskset_key)
+    r.delete(rug.synced_docs_key)
 
     # Add all documents that need to be updated into the queue
     task_logger.info(
         f"RedisUserGroup.generate_tasks starting. usergroup_id={usergroup.id}"
     )
     result = rug.generate_tasks(
-        VESPA_SYNC_MAX_TASKS, celery_app, db_session, r, lock_beat, tenant_id
+        VESPA_SYNC_MAX_TASKS,
+        celery_app,
+        db_session,
+        r,
+        lock_beat,
+        tenant_id,
+        batch_size=batch_size,
     )
     if result is None:
         return None
 
-    tasks_generated = result[0]
+    tasks_generated, docs_generated = result
     # Currently we are allowing the sync to proceed with 0 tasks.
     # It's possible for sets/groups to be generated initially with no entries
     # and they still need to be marked as up to date.
@@ -413,7 +491,8 @@ def try_generate_user_group_sync_tasks(
 
     task_logger.info(
         f"RedisUserGroup.generate_tasks finished. "
-        f"usergroup={usergroup.id} tasks_generated={tasks_generated}"
+        f"usergroup={usergroup.id} tasks_generated={tasks_generated} "
+        f"docs_generated={docs_generated}"
     )
 
     # create before setting fence to avoid race condition where the monitoring
@@ -427,8 +506,9 @@ def try_generate_user_group_sync_tasks(
     except Exception:
         task_logger.exception("insert_sync_record exceptioned.")
 
-    # set this only after all tasks have been added
-    rug.set_fence(tasks_generated)
+    # set this only after all tasks have been added. The fence holds the number
+    # of documents, each task syncs a batch of them
+    rug.set_fence(docs_generated)
 
     return tasks_generated
 
@@ -441,7 +521,8 @@ def monitor_connector_taskset(r: Redis) -> None:
 
     remaining = redis_global_ccpair.get_remaining()
     task_logger.info(
-        f"Stale document sync progress: remaining={remaining} initial={initial_count}"
+        f"Stale document sync progress: remaining_tasks={remaining} "
+        f"initial_docs={initial_count}"
     )
     if remaining == 0:
         redis_global_ccpair.reset()
@@ -467,10 +548,14 @@ def monitor_document_set_taskset(
     if initial_count is None:
         return
 
+    # the taskset tracks the remaining tasks, the fence and the synced docs
+    # counter track documents
     count = cast(int, r.scard(rds.taskset_key))
+    num_synced_docs = rds.get_num_synced_docs()
     task_logger.info(
         f"Document set sync progress: document_set={document_set_id} "
-        f"remaining={count} initial={initial_count}"
+        f"remaining_tasks={count} synced_docs={num_synced_docs} "
+        f"initial_docs={initial_count}"
     )
     if count > 0:
         update_sync_record_status(
@@ -478,7 +563,7 @@ def monitor_document_set_taskset(
             entity_id=document_set_id,
             sync_type=SyncType.DOCUMENT_SET,
             sync_status=SyncStatus.IN_PROGRESS,
-            num_docs_synced=count,
+            num_docs_synced=num_synced_docs,
         )
         return
 
@@ -641,3 +726,212 @@ def vespa_metadata_sync_task(self: Task, document_id: str, *, tenant_id: str) ->
         )
 
     return completion_status == OnyxCeleryTaskCompletionStatus.SUCCEEDED
+
+
+def _count_synced_docs(task_id: str | None, tenant_id: str, num_synced: int) -> None:
+    """Adds the documents synced by this attempt to the progress of the document set
+    or user group sync the task belongs to. Counted per attempt, so a retry of the
+    failed documents doesn't lose the ones synced before."""
+    if not task_id or not num_synced:
+        return
+
+    if task_id.startswith(RedisDocumentSet.PREFIX):
+        object_id = RedisDocumentSet.get_id_from_task_id(task_id)
+        if object_id is not None:
+            synced_docs_key = RedisDocumentSet(
+                tenant_id, int(object_id)
+            ).synced_docs_key
+            get_redis_client(tenant_id=tenant_id).incrby(synced_docs_key, num_synced)
+    elif task_id.startswith(RedisUserGroup.PREFIX):
+        object_id = RedisUserGroup.get_id_from_task_id(task_id)
+        if object_id is not None:
+            synced_docs_key = RedisUserGroup(tenant_id, int(object_id)).synced_docs_key
+            get_redis_client(tenant_id=tenant_id).incrby(synced_docs_key, num_synced)
+
+
+def _unwrap_retry_error(ex: Exception) -> Exception:
+    """The exception tenacity gave up on, if it is of type Exception."""
+    if isinstance(ex, RetryError):
+        inner = ex.last_attempt.exception()
+        if isinstance(inner, Exception):
+            return inner
+    return ex
+
+
+def _update_vespa_document_fields(
+    retry_index: RetryDocumentIndex,
+    doc: Document,
+    fields: VespaDocumentFields,
+    tenant_id: str,
+) -> int | Exception:
+    """Returns the number of chunks updated, or the exception so that one failing
+    document doesn't abort the rest of the batch."""
+    try:
+        return retry_index.update_single(
+            doc.id,
+            tenant_id=tenant_id,
+            chunk_count=doc.chunk_count,
+            fields=fields,
+            user_fields=None,
+        )
+    except Exception as e:
+        return e
+
+
+@shared_task(
+    name=OnyxCeleryTask.VESPA_METADATA_SYNC_BATCH_TASK,
+    bind=True,
+    soft_time_limit=VESPA_METADATA_SYNC_BATCH_SOFT_TIME_LIMIT,
+    time_limit=VESPA_METADATA_SYNC_BATCH_TIME_LIMIT,
+    max_retries=3,
+)
+def vespa_metadata_sync_batch_task(
+    self: Task, document_ids: list[str], *, tenant_id: str
+) -> bool:
+    """Same as vespa_metadata_sync_task, but for a batch of documents. Document sets
+    and access are loaded with one query each for the whole batch, the Vespa updates
+    run in parallel and the documents are marked as synced in a single update.
+
+    On failure, only the documents that failed with a retryable error are retried."""
+    start = time.monotonic()
+
+    completion_status = OnyxCeleryTaskCompletionStatus.UNDEFINED
+    num_synced = 0
+    num_skipped = 0
+    failures: dict[str, Exception] = {}
+
+    try:
+        with get_session_with_current_tenant() as db_session:
+            active_search_settings = get_active_search_settings(db_session)
+            doc_index = get_default_document_index(
+                search_settings=active_search_settings.primary,
+                secondary_search_settings=active_search_settings.secondary,
+                httpx_client=HttpxPool.get("vespa"),
+            )
+
+            retry_index = RetryDocumentIndex(doc_index)
+
+            docs = get_documents_by_ids(db_session, document_ids)
+            num_skipped = len(set(document_ids)) - len(docs)
+
+            doc_ids = [doc.id for doc in docs]
+            doc_sets_by_id = dict(
+                fetch_document_sets_for_documents(doc_ids, db_session)
+            )
+            access_by_id = get_access_for_documents(doc_ids, db_session)
+
+            results = run_functions_tuples_in_parallel(
+                [
+                    (
+                        _update_vespa_document_fields,
+                        (
+                            retry_index,
+                            doc,
+                            VespaDocumentFields(
+                                document_sets=set(doc_sets_by_id.get(doc.id, [])),
+                                access=access_by_id[doc.id],
+                                boost=doc.boost,
+                                hidden=doc.hidden,
+                            ),
+                            tenant_id,
+                        ),
+                    )
+                    for doc in docs
+                ],
+                max_workers=VESPA_SYNC_BATCH_MAX_PARALLEL_UPDATES,
+            )
+
+            synced_doc_ids: list[str] = []
+            chunks_affected = 0
+            for doc_id, result in zip(doc_ids, results):
+                if isinstance(result, Exception):
+                    failures[doc_id] = _unwrap_retry_error(result)
+                else:
+                    synced_doc_ids.append(doc_id)
+                    chunks_affected += result
+
+            # update db last. Worst case = we crash right before this and
+            # the sync might repeat again later
+            mark_documents_as_synced(synced_doc_ids, db_session)
+            num_synced = len(synced_doc_ids)
+            _count_synced_docs(self.request.id, tenant_id, num_synced)
+
+        elapsed = time.monotonic() - start
+        task_logger.info(
+            f"docs={len(document_ids)} "
+            f"action=sync "
+            f"synced={num_synced} "
+            f"skipped={num_skipped} "
+            f"failed={len(failures)} "
+            f"chunks={chunks_affected} "
+            f"elapsed={elapsed:.2f}"
+        )
+
+        if not failures:
+            completion_status = (
+                OnyxCeleryTaskCompletionStatus.SUCCEEDED
+                if num_synced or not num_skipped
+                else OnyxCeleryTaskCompletionStatus.SKIPPED
+            )
+        else:
+            # like the single document task, HTTP errors from Vespa are not retried
+            retryable = {
+                doc_id: e
+                for doc_id, e in failures.items()
+                if not isinstance(e, httpx.HTTPStatusError)
+            }
+            for doc_id, e in failures.items():
+                if isinstance(e, httpx.HTTPStatusError):
+                    task_logger.error(
+                        f"Non-retryable HTTPStatusError: "
+                        f"doc={doc_id} "
+                        f"status={e.response.status_code}"
+                    )
+                else:
+                    task_logger.error(
+                        f"vespa_metadata_sync_batch_task failed: doc={doc_id} "
+                        f"exception={e!r}"
+                    )
+
+            completion_status = OnyxCeleryTaskCompletionStatus.NON_RETRYABLE_EXCEPTION
+            if retryable and (
+                self.max_retries is None or self.request.retries < self.max_retries
+            ):
+                completion_status = OnyxCeleryTaskCompletionStatus.RETRYABLE_EXCEPTION
+                # Exponential backoff from 2^4 to 2^6 ... i.e. 16, 32, 64
+                countdown = 2 ** (self.request.retries + 4)
+                # this will raise a celery exception
+                self.retry(
+                    exc=next(iter(retryable.values())),
+                    countdown=countdown,
+                    kwargs={"document_ids": list(retryable), "tenant_id": tenant_id},
+                )
+    except SoftTimeLimitExceeded:
+        task_logger.info(
+            f"SoftTimeLimitExceeded exception. docs={len(document_ids)} "
+            f"first_doc={document_ids[0] if document_ids else None}"
+        )
+        completion_status = OnyxCeleryTaskCompletionStatus.SOFT_TIME_LIMIT
+    except Retry:
+        raise
+    except Exception as ex:
+        # failed before any document could be synced (e.g. the db is unreachable),
+        # retry the whole batch
+        e = _unwrap_retry_error(ex)
+        task_logger.exception(
+            f"vespa_metadata_sync_batch_task exceptioned: docs={len(document_ids)}"
+        )
+
+        completion_status = OnyxCeleryTaskCompletionStatus.RETRYABLE_EXCEPTION
+        if self.max_retries is not None and self.request.retries >= self.max_retries:
+            completion_status = OnyxCeleryTaskCompletionStatus.NON_RETRYABLE_EXCEPTION
+
+        countdown = 2 ** (self.request.retries + 4)
+        self.retry(exc=e, countdown=countdown)  # this will raise a celery exception
+    finally:
+        task_logger.info(
+            f"vespa_metadata_sync_batch_task completed: "
+            f"status={completion_status.value} docs={len(document_ids)}"
+        )
+
+    return completion_status == OnyxCeleryTaskCompletionStatus.SUCCEEDED
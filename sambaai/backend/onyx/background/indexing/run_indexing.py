@@ -13,6 +13,7 @@ from onyx.background.indexing.checkpointing_utils import check_checkpoint_size
 from onyx.background.indexing.checkpointing_utils import get_latest_valid_checkpoint
 from onyx.background.indexing.checkpointing_utils import save_checkpoint
 from onyx.background.indexing.memory_tracer import MemoryTracer
+from onyx.configs.app_configs import ENABLE_PIPELINED_INDEXING
 from onyx.configs.app_configs import INDEX_BATCH_SIZE
 from onyx.configs.app_configs import INDEXING_SIZE_WARNING_THRESHOLD
 from onyx.configs.app_configs import INDEXING_TRACER_INTERVAL
@@ -56,6 +57,10 @@ from onyx.httpx.httpx_pool import HttpxPool
 from onyx.indexing.embedder import DefaultIndexingEmbedder
 from onyx.indexing.indexing_heartbeat import IndexingHeartbeatInterface
 from onyx.indexing.indexing_pipeline import build_indexing_pipeline
+from onyx.indexing.indexing_pipeline import IndexingPipelineProtocol
+from onyx.indexing.indexing_pipeline import IndexingPipelineResult
+from onyx.indexing.pipelined_indexing import build_pipelined_indexing_pipeline
+from onyx.indexing.pipelined_indexing import PipelinedIndexingPipeline
 from onyx.natural_language_processing.search_nlp_models import (
     InformationContentClassificationModel,
 )
@@ -382,18 +387,31 @@ def _run_indexing(
         httpx_client=HttpxPool.get("vespa"),
     )
 
-    indexing_pipeline = build_indexing_pipeline(
-        embedder=embedding_model,
-        information_content_classification_model=information_content_classification_model,
-        document_index=document_index,
-        ignore_time_skip=(
-            ctx.from_beginning
-            or (ctx.search_settings_status == IndexModelStatus.FUTURE)
-        ),
-        db_session=db_session,
-        tenant_id=tenant_id,
-        callback=callback,
+    ignore_time_skip = ctx.from_beginning or (
+        ctx.search_settings_status == IndexModelStatus.FUTURE
     )
+    indexing_pipeline: IndexingPipelineProtocol | None = None
+    pipelined_indexing: PipelinedIndexingPipeline | None = None
+    if ENABLE_PIPELINED_INDEXING:
+        pipelined_indexing = build_pipelined_indexing_pipeline(
+            embedder=embedding_model,
+            information_content_classification_model=information_content_classification_model,
+            document_index=document_index,
+            ignore_time_skip=ignore_time_skip,
+            db_session=db_session,
+            tenant_id=tenant_id,
+            callback=callback,
+        )
+    else:
+        indexing_pipeline = build_indexing_pipeline(
+            embedder=embedding_model,
+            information_content_classification_model=information_content_classification_model,
+            document_index=document_index,
+            ignore_time_skip=ignore_time_skip,
+            db_session=db_session,
+            tenant_id=tenant_id,
+            callback=callback,
+        )
 
     # Initialize memory tracer. NOTE: won't actually do anything if
     # `INDEXING_TRACER_INTERVAL` is 0.
@@ -412,6 +430,88 @@ def _run_indexing(
     document_count = 0
     chunk_count = 0
     index_attempt: IndexAttempt | None = None
+    doc_id_to_unresolved_errors: dict[str, list[IndexAttemptError]] = defaultdict(list)
+
+    def _process_indexing_result(
+        completed_batch: list[Document],
+        index_pipeline_result: IndexingPipelineResult,
+    ) -> None:
+        """Records the outcome of an indexed batch (counts, errors and progress)."""
+        nonlocal total_failures, net_doc_change, chunk_count, document_count
+
+        net_doc_change += index_pipeline_result.new_docs
+        chunk_count += index_pipeline_result.total_chunks
+        document_count += index_pipeline_result.total_docs
+
+        # resolve errors for documents that were successfully indexed
+        failed_document_ids = [
+            failure.failed_document.document_id
+            for failure in index_pipeline_result.failures
+            if failure.failed_document
+        ]
+        successful_document_ids = [
+            document.id
+            for document in completed_batch
+            if document.id not in failed_document_ids
+        ]
+        for document_id in successful_document_ids:
+            with get_session_with_current_tenant() as db_session_temp:
+                if document_id in doc_id_to_unresolved_errors:
+                    logger.info(
+                        f"Resolving IndexAttemptError for document '{document_id}'"
+                    )
+                    for error in doc_id_to_unresolved_errors[document_id]:
+                        error.is_resolved = True
+                        db_session_temp.add(error)
+                db_session_temp.commit()
+
+        # add brand new failures
+        if index_pipeline_result.failures:
+            total_failures += len(index_pipeline_result.failures)
+            with get_session_with_current_tenant() as db_session_temp:
+                for failure in index_pipeline_result.failures:
+                    create_index_attempt_error(
+                        index_attempt_id,
+                        ctx.cc_pair_id,
+                        failure,
+                        db_session_temp,
+                    )
+
+            _check_failure_threshold(
+                total_failures,
+                document_count,
+                batch_num,
+                index_pipeline_result.failures[-1],
+            )
+
+        # This new value is updated every batch, so UI can refresh per batch update
+        with get_session_with_current_tenant() as db_session_temp:
+            # NOTE: Postgres uses the start of the transactions when computing `NOW()`
+            # so we need either to commit() or to use a new session
+            update_docs_indexed(
+                db_session=db_session_temp,
+                index_attempt_id=index_attempt_id,
+                total_docs_indexed=document_count,
+                new_docs_indexed=net_doc_change,
+                docs_removed_from_index=0,
+            )
+
+        if callback:
+            callback.progress("_run_indexing", len(completed_batch))
+
+        # Add telemetry for indexing progress
+        optional_telemetry(
+            record_type=RecordType.INDEXING_PROGRESS,
+            data={
+                "index_attempt_id": index_attempt_id,
+                "cc_pair_id": ctx.cc_pair_id,
+                "current_docs_indexed": document_count,
+                "current_chunks_indexed": chunk_count,
+                "source": ctx.source.value,
+            },
+            tenant_id=tenant_id,
+        )
+
     try:
         with get_session_with_current_tenant() as db_session_temp:
             index_attempt = get_index_attempt(db_session_temp, index_attempt_id)
@@ -459,9 +559,6 @@ def _run_indexing(
                 unresolved_only=True,
                 db_session=db_session_temp,
             )
-            doc_id_to_unresolved_errors: dict[str, list[IndexAttemptError]] = (
-                defaultdict(list)
-            )
             for error in unresolved_errors:
                 if error.document_id:
                     doc_id_to_unresolved_errors[error.document_id].append(error)
@@ -552,87 +649,32 @@ def _run_indexing(
                 index_attempt_md.batch_num = batch_num + 1  # use 1-index for this
 
                 # real work happens here!
-                index_pipeline_result = indexing_pipeline(
-                    document_batch=doc_batch_cleaned,
-                    index_attempt_metadata=index_attempt_md,
-                )
-
-                batch_num += 1
-                net_doc_change += index_pipeline_result.new_docs
-                chunk_count += index_pipeline_result.total_chunks
-                document_count += index_pipeline_result.total_docs
-
-                # resolve errors for documents that were successfully indexed
-                failed_document_ids = [
-                    failure.failed_document.document_id
-                    for failure in index_pipeline_result.failures
-                    if failure.failed_document
-                ]
-                successful_document_ids = [
-                    document.id
-                    for document in document_batch
-                    if document.id not in failed_document_ids
-                ]
-                for document_id in successful_document_ids:
-                    with get_session_with_current_tenant() as db_session_temp:
-                        if document_id in doc_id_to_unresolved_errors:
-                            logger.info(
-                                f"Resolving IndexAttemptError for document '{document_id}'"
-                            )
-                            for error in doc_id_to_unresolved_errors[document_id]:
-                                error.is_resolved = True
-                                db_session_temp.add(error)
-                        db_session_temp.commit()
-
-                # add brand new failures
-                if index_pipeline_result.failures:
-                    total_failures += len(index_pipeline_result.failures)
-                    with get_session_with_current_tenant() as db_session_temp:
-                        for failure in index_pipeline_result.failures:
-                            create_index_attempt_error(
-                                index_attempt_id,
-                                ctx.cc_pair_id,
-                                failure,
-                                db_session_temp,
-                            )
-
-                    _check_failure_threshold(
-                        total_failures,
-                        document_count,
-                        batch_num,
-                        index_pipeline_result.failures[-1],
+                if pipelined_indexing:
+                    pipelined_indexing.submit(
+                        document_batch=doc_batch_cleaned,
+                        index_attempt_metadata=index_attempt_md,
                     )
-
-                # This new value is updated every batch, so UI can refresh per batch update
-                with get_session_with_current_tenant() as db_session_temp:
-                    # NOTE: Postgres uses the start of the transactions when computing `NOW()`
-                    # so we need either to commit() or to use a new session
-                    update_docs_indexed(
-                        db_session=db_session_temp,
-                        index_attempt_id=index_attempt_id,
-                        total_docs_indexed=document_count,
-                        new_docs_indexed=net_doc_change,
-                        docs_removed_from_index=0,
+                    batch_num += 1
+                    for completed in pipelined_indexing.get_completed():
+                        _process_indexing_result(
+                            completed.document_batch, completed.result
+                        )
+                else:
+                    assert indexing_pipeline is not None
+                    index_pipeline_result = indexing_pipeline(
+                        document_batch=doc_batch_cleaned,
+                        index_attempt_metadata=index_attempt_md,
                     )
-
-                if callback:
-                    callback.progress("_run_indexing", len(doc_batch_cleaned))
-
-                # Add telemetry for indexing progress
-                optional_telemetry(
-                    record_type=RecordType.INDEXING_PROGRESS,
-                    data={
-                        "index_attempt_id": index_attempt_id,
-                        "cc_pair_id": ctx.cc_pair_id,
-                        "current_docs_indexed": document_count,
-                        "current_chunks_indexed": chunk_count,
-                        "source": ctx.source.value,
-                    },
-                    tenant_id=tenant_id,
-                )
+                    batch_num += 1
+                    _process_indexing_result(doc_batch_cleaned, index_pipeline_result)
 
                 memory_tracer.increment_and_maybe_trace()
 
+            # all batches up to the checkpoint must be indexed before it is saved
+            if pipelined_indexing:
+                for completed in pipelined_indexing.drain():
+                    _process_indexing_result(completed.document_batch, completed.result)
+
             # `make sure the checkpoints aren't getting too large`at some regular interval
             CHECKPOINT_SIZE_CHECK_INTERVAL = 100
             if batch_num % CHECKPOINT_SIZE_CHECK_INTERVAL == 0:
@@ -664,6 +706,8 @@ def _run_indexing(
             "Connector run exceptioned after elapsed time: "
             f"{time.monotonic() - start_time} seconds"
         )
+        if pipelined_indexing:
+            pipelined_indexing.close()
         if isinstance(e, ConnectorValidationError):
             # On validation errors during indexing, we want to cancel the indexing attempt
             # and mark the CCPair as invalid. This prevents the connector from being
@@ -758,6 +802,8 @@ def _run_indexing(
             raise e
 
     memory_tracer.stop()
+    if pipelined_indexing:
+        pipelined_indexing.close()
 
     # we know index attempt is successful (at least partially) at this point,
     # all other cases have been short-circuited
@@ -1,6 +1,5 @@
 import json
 from collections import defaultdict
-from copy import deepcopy
 from typing import TypeVar
 
 from pydantic import BaseModel
@@ -16,6 +15,8 @@ from onyx.configs.model_configs import DOC_EMBEDDING_CONTEXT_SIZE
 from onyx.context.search.models import InferenceChunk
 from onyx.context.search.models import InferenceSection
 from onyx.llm.interfaces import LLMConfig
+from onyx.natural_language_processing.utils import count_tokens
+from onyx.natural_language_processing.utils import count_tokens_batch
 from onyx.natural_language_processing.utils import get_tokenizer
 from onyx.natural_language_processing.utils import tokenizer_trim_content
 from onyx.prompts.prompt_utils import build_doc_context_str
@@ -31,6 +32,9 @@ _METADATA_TOKEN_ESTIMATE = 75
 # Title and additional tokens as part of the tool message json
 # this is only used to log a warning so we can be more forgiving with the buffer
 _OVERCOUNT_ESTIMATE = 256
+# sections are token counted this many at a time, pruning usually stops before the
+# end of the list so they aren't all counted up front
+_TOKEN_COUNT_BATCH_SIZE = 16
 
 
 class PruningError(Exception):
@@ -131,6 +135,24 @@ def _remove_sections_to_ignore(
     ]
 
 
+def _section_to_prompt_str(
+    section: InferenceSection, ind: int, using_tool_message: bool
+) -> str:
+    # If using tool message, it will be a bit of an overestimate as the extra json text around the section
+    # will be counted towards the token count. However, once the Sections are merged, the extra json parts
+    # that overlap will not be counted multiple times like it is in the pruning step.
+    if using_tool_message:
+        return json.dumps(section_to_dict(section, ind))
+    return build_doc_context_str(
+        semantic_identifier=section.center_chunk.semantic_identifier,
+        source_type=section.center_chunk.source_type,
+        content=section.combined_content,
+        metadata_dict=section.center_chunk.metadata,
+        updated_at=section.center_chunk.updated_at,
+        ind=ind,
+    )
+
+
 def _apply_pruning(
     sections: list[InferenceSection],
     section_relevance_list: list[bool] | None,
@@ -144,7 +166,8 @@ def _apply_pruning(
         provider_type=llm_config.model_provider,
         model_name=llm_config.model_name,
     )
-    sections = deepcopy(sections)  # don't modify in place
+    # NOTE: sections are never modified in place, a section whose content gets trimmed
+    # is replaced by a shallow copy (the chunks are shared with the input sections)
 
     # re-order docs with all the "relevant" docs at the front
     sections = reorder_sections(
@@ -154,28 +177,27 @@ def _apply_pruning(
     sections = _remove_sections_to_ignore(sections=sections)
 
     section_idx_token_count: dict[int, int] = {}
+    section_token_counts: list[int] = []
 
     ind = 0
     final_section_ind = None
     total_tokens = 0
     for ind, section in enumerate(sections):
-        section_str = (
-            # If using tool message, it will be a bit of an overestimate as the extra json text around the section
-            # will be counted towards the token count. However, once the Sections are merged, the extra json parts
-            # that overlap will not be counted multiple times like it is in the pruning step.
-            json.dumps(section_to_dict(section, ind))
-            if using_tool_message
-            else build_doc_context_str(
-                semantic_identifier=section.center_chunk.semantic_identifier,
-                source_type=section.center_chunk.source_type,
-                content=section.combined_content,
-                metadata_dict=section.center_chunk.metadata,
-                updated_at=section.center_chunk.updated_at,
-                ind=ind,
+        if ind == len(section_token_counts):
+            batch = sections[ind : ind + _TOKEN_COUNT_BATCH_SIZE]
+            section_token_counts.extend(
+                count_tokens_batch(
+                    [
+                        _section_to_prompt_str(
+                            batch_section, batch_ind, using_tool_message
+                        )
+                        for batch_ind, batch_section in enumerate(batch, start=ind)
+                    ],
+                    llm_tokenizer,
+                )
             )
-        )
 
-        section_token_count = len(llm_tokenizer.encode(section_str))
+        section_token_count = section_token_counts[ind]
         # if not using sections (specifically, using Sections where each section maps exactly to the one center chunk),
         # truncate chunks that are way too long. This can happen if the embedding model tokenizer is different
         # than the LLM tokenizer
@@ -197,10 +219,14 @@ def _apply_pruning(
                     "Found more tokens in Section than expected, "
                     "likely mismatch between embedding and LLM tokenizers. Trimming content..."
                 )
-            section.combined_content = tokenizer_trim_content(
-                content=section.combined_content,
-                desired_length=DOC_EMBEDDING_CONTEXT_SIZE,
-                tokenizer=llm_tokenizer,
+            sections[ind] = section.model_copy(
+                update={
+                    "combined_content": tokenizer_trim_content(
+                        content=section.combined_content,
+                        desired_length=DOC_EMBEDDING_CONTEXT_SIZE,
+                        tokenizer=llm_tokenizer,
+                    )
+                }
             )
             section_token_count = DOC_EMBEDDING_CONTEXT_SIZE
 
@@ -241,8 +267,8 @@ def _apply_pruning(
             amount_to_truncate = total_tokens - token_limit
             # NOTE: need to recalculate the length here, since the previous calculation included
             # overhead from JSON-fying the doc / the metadata
-            final_doc_content_length = len(
-                llm_tokenizer.encode(sections[final_section_ind].combined_content)
+            final_doc_content_length = count_tokens(
+                sections[final_section_ind].combined_content, llm_tokenizer
             ) - (amount_to_truncate)
             # this could occur if we only have space for the title / metadata
             # not ideal, but it's the most reasonable thing to do
@@ -256,10 +282,15 @@ def _apply_pruning(
                 )
                 sections.pop()
             else:
-                sections[final_section_ind].combined_content = tokenizer_trim_content(
-                    content=sections[final_section_ind].combined_content,
-                    desired_length=final_doc_content_length,
-                    tokenizer=llm_tokenizer,
+                final_section = sections[final_section_ind]
+                sections[final_section_ind] = final_section.model_copy(
+                    update={
+                        "combined_content": tokenizer_trim_content(
+                            content=final_section.combined_content,
+                            desired_length=final_doc_content_length,
+                            tokenizer=llm_tokenizer,
+                        )
+                    }
                 )
         else:
             # For search on chunk level (Section is just a chunk), don't truncate the final Chunk/Section unless it's the only one
@@ -267,12 +298,17 @@ def _apply_pruning(
             if final_section_ind != 0:
                 sections = sections[:final_section_ind]
             else:
-                sections[0].combined_content = tokenizer_trim_content(
-                    content=sections[0].combined_content,
-                    desired_length=token_limit - _METADATA_TOKEN_ESTIMATE,
-                    tokenizer=llm_tokenizer,
-                )
-                sections = [sections[0]]
+                sections = [
+                    sections[0].model_copy(
+                        update={
+                            "combined_content": tokenizer_trim_content(
+                                content=sections[0].combined_content,
+                                desired_length=token_limit - _METADATA_TOKEN_ESTIMATE,
+                                tokenizer=llm_tokenizer,
+                            )
+                        }
+                    )
+                ]
 
     return sections
 
@@ -12,11 +12,50 @@ from onyx.utils.logger import setup_logger
 logger = setup_logger()
 
 
+CITATION_PATTERN = re.compile(r"\[(\d+)\]|\[\[(\d+)\]\]")  # [1], [[1]], etc.
+POSSIBLE_CITATION_PATTERN = re.compile(r"(\[+\d*$)")  # [1, [, [[, [[2, etc.
+MANUAL_CITATION_PATTERN = re.compile(r"\[\[(\d+)\]\]")
+_BACKTICK_RUN_PATTERN = re.compile(r"`+")
+
+
 def in_code_block(llm_text: str) -> bool:
     count = llm_text.count(TRIPLE_BACKTICK)
     return count % 2 != 0
 
 
+class CodeFenceTracker:
+    """Incremental version of `in_code_block` for streamed text: each piece is fed
+    once, so the cost is proportional to the piece rather than to everything
+    streamed so far.
+
+    `str.count` doesn't count overlapping matches, so every maximal run of k
+    backticks contains k // 3 fences. Only the trailing run can still grow."""
+
+    def __init__(self) -> None:
+        self._closed_run_fences = 0
+        self._trailing_backticks = 0
+
+    def feed(self, text: str) -> None:
+        if "`" in text:
+            for match in _BACKTICK_RUN_PATTERN.finditer(text):
+                if match.start() > 0:
+                    self._closed_run_fences += self._trailing_backticks // 3
+                    self._trailing_backticks = 0
+                self._trailing_backticks += match.end() - match.start()
+
+        if text and not text.endswith("`"):
+            self._closed_run_fences += self._trailing_backticks // 3
+            self._trailing_backticks = 0
+
+    @property
+    def fence_count(self) -> int:
+        return self._closed_run_fences + self._trailing_backticks // 3
+
+    @property
+    def in_code_block(self) -> bool:
+        return self.fence_count % 2 != 0
+
+
 class CitationProcessor:
     def __init__(
         self,
@@ -31,9 +70,13 @@ class CitationProcessor:
         self.stop_stream = stop_stream
         self.final_order_mapping = final_doc_id_to_rank_map.order_mapping
         self.display_order_mapping = display_doc_id_to_rank_map.order_mapping
-        self.llm_out = ""
+        # the full output is only needed for its length and the code fences, so
+        # only those are tracked instead of keeping (and re-scanning) all of it
+        self._llm_out_len = 0
+        self._code_fences = CodeFenceTracker()
         self.max_citation_num = len(context_docs)
         self.citation_order: list[int] = []  # order of citations in the LLM output
+        self._citation_order_idx: dict[int, int] = {}
         self.curr_segment = ""
         self.cited_inds: set[int] = set()
         self.hold = ""
@@ -59,7 +102,8 @@ class CitationProcessor:
             self.hold = ""
 
         self.curr_segment += token
-        self.llm_out += token
+        self._llm_out_len += len(token)
+        self._code_fences.feed(token)
 
         # Handle code blocks without language tags
         if "`" in self.curr_segment:
@@ -67,21 +111,17 @@ class CitationProcessor:
                 pass
             elif "```" in self.curr_segment:
                 piece_that_comes_after = self.curr_segment.split("```")[1][0]
-                if piece_that_comes_after == "\n" and in_code_block(self.llm_out):
+                if piece_that_comes_after == "\n" and self._code_fences.in_code_block:
                     self.curr_segment = self.curr_segment.replace("```", "```plaintext")
 
-        citation_pattern = r"\[(\d+)\]|\[\[(\d+)\]\]"  # [1], [[1]], etc.
-        citations_found = list(re.finditer(citation_pattern, self.curr_segment))
-        possible_citation_pattern = r"(\[+\d*$)"  # [1, [, [[, [[2, etc.
-        possible_citation_found = re.search(
-            possible_citation_pattern, self.curr_segment
-        )
+        citations_found = list(CITATION_PATTERN.finditer(self.curr_segment))
+        possible_citation_found = POSSIBLE_CITATION_PATTERN.search(self.curr_segment)
 
-        if len(citations_found) == 0 and len(self.llm_out) - self.past_cite_count > 5:
+        if len(citations_found) == 0 and self._llm_out_len - self.past_cite_count > 5:
             self.current_citations = []
 
         result = ""
-        if citations_found and not in_code_block(self.llm_out):
+        if citations_found and not self._code_fences.in_code_block:
             last_citation_end = 0
             length_to_add = 0
             while len(citations_found) > 0:
@@ -98,10 +138,13 @@ class CitationProcessor:
                     context_llm_doc.document_id
                 ]
 
-                if final_citation_num not in self.citation_order:
+                if final_citation_num not in self._citation_order_idx:
+                    self._citation_order_idx[final_citation_num] = len(
+                        self.citation_order
+                    )
                     self.citation_order.append(final_citation_num)
 
-                citation_order_idx = self.citation_order.index(final_citation_num) + 1
+                citation_order_idx = self._citation_order_idx[final_citation_num] + 1
 
                 # get the value that was displayed to user, should always
                 # be in the display_doc_order_dict. But check anyways
@@ -129,7 +172,7 @@ class CitationProcessor:
 
                 # Handle edge case where LLM outputs citation itself
                 if self.curr_segment.startswith("[["):
-                    match = re.match(r"\[\[(\d+)\]\]", self.curr_segment)
+                    match = MANUAL_CITATION_PATTERN.match(self.curr_segment)
                     if match:
                         try:
                             doc_id = int(match.group(1))
@@ -151,7 +194,7 @@ class CitationProcessor:
 
                 link = context_llm_doc.link
 
-                self.past_cite_count = len(self.llm_out)
+                self.past_cite_count = self._llm_out_len
                 self.current_citations.append(final_citation_num)
 
                 if citation_order_idx not in self.cited_inds:
@@ -380,3 +380,12 @@ AGENT_MAX_TOKENS_HISTORY_SUMMARY = int(
 )
 
 GRAPH_VERSION_NAME: str = "a"
+
+# Compile all agent graphs when the API server starts instead of on their first use
+AGENT_GRAPH_WARM_UP_ON_STARTUP = (
+    os.environ.get("AGENT_GRAPH_WARM_UP_ON_STARTUP", "").lower() == "true"
+)
+# Record the execution time of every agent graph node (prometheus + debug logs)
+AGENT_GRAPH_PROFILING_ENABLED = (
+    os.environ.get("AGENT_GRAPH_PROFILING_ENABLED", "").lower() == "true"
+)
@@ -9,6 +9,7 @@ from onyx.auth.schemas import AuthBackend
 from onyx.configs.constants import AuthType
 from onyx.configs.constants import DocumentIndexType
 from onyx.configs.constants import QueryHistoryType
+from onyx.configs.constants import VespaFeedMode
 from onyx.file_processing.enums import HtmlBasedConnectorTransformLinksStrategy
 from onyx.prompts.image_analysis import DEFAULT_IMAGE_ANALYSIS_SYSTEM_PROMPT
 from onyx.prompts.image_analysis import DEFAULT_IMAGE_SUMMARIZATION_SYSTEM_PROMPT
@@ -339,6 +340,19 @@ CELERY_WORKER_KG_PROCESSING_CONCURRENCY = int(
 # The maximum number of tasks that can be queued up to sync to Vespa in a single pass
 VESPA_SYNC_MAX_TASKS = 1024
 
+# Each sync task handles a batch of documents. The batch size starts at the minimum
+# and doubles for every VESPA_SYNC_BATCH_QUEUE_DEPTH_STEP tasks already waiting in
+# the sync queue, so a large backlog is worked off with fewer, larger tasks
+VESPA_SYNC_BATCH_SIZE_MIN = int(os.environ.get("VESPA_SYNC_BATCH_SIZE_MIN") or 16)
+VESPA_SYNC_BATCH_SIZE_MAX = int(os.environ.get("VESPA_SYNC_BATCH_SIZE_MAX") or 256)
+VESPA_SYNC_BATCH_QUEUE_DEPTH_STEP = int(
+    os.environ.get("VESPA_SYNC_BATCH_QUEUE_DEPTH_STEP") or 100
+)
+# Number of documents of a batch that are updated in Vespa concurrently
+VESPA_SYNC_BATCH_MAX_PARALLEL_UPDATES = int(
+    os.environ.get("VESPA_SYNC_BATCH_MAX_PARALLEL_UPDATES") or 16
+)
+
 DB_YIELD_PER_DEFAULT = 64
 
 #####
@@ -369,6 +383,17 @@ WEB_CONNECTOR_OAUTH_CLIENT_ID = os.environ.get("WEB_CONNECTOR_OAUTH_CLIENT_ID")
 WEB_CONNECTOR_OAUTH_CLIENT_SECRET = os.environ.get("WEB_CONNECTOR_OAUTH_CLIENT_SECRET")
 WEB_CONNECTOR_OAUTH_TOKEN_URL = os.environ.get("WEB_CONNECTOR_OAUTH_TOKEN_URL")
 WEB_CONNECTOR_VALIDATE_URLS = os.environ.get("WEB_CONNECTOR_VALIDATE_URLS")
+# Number of pages crawled at once, each crawler thread runs its own headless browser
+WEB_CONNECTOR_MAX_CONCURRENCY = int(
+    os.environ.get("WEB_CONNECTOR_MAX_CONCURRENCY") or 4
+)
+# Politeness limits, applied per host
+WEB_CONNECTOR_MAX_CONCURRENCY_PER_HOST = int(
+    os.environ.get("WEB_CONNECTOR_MAX_CONCURRENCY_PER_HOST") or 4
+)
+WEB_CONNECTOR_HOST_CRAWL_DELAY_SECONDS = float(
+    os.environ.get("WEB_CONNECTOR_HOST_CRAWL_DELAY_SECONDS") or 0
+)
 
 HTML_BASED_CONNECTOR_TRANSFORM_LINKS_STRATEGY = os.environ.get(
     "HTML_BASED_CONNECTOR_TRANSFORM_LINKS_STRATEGY",
@@ -473,6 +498,11 @@ JIRA_CONNECTOR_MAX_TICKET_SIZE = int(
 
 GONG_CONNECTOR_START_TIME = os.environ.get("GONG_CONNECTOR_START_TIME")
 
+# Number of Salesforce object types whose CSVs are loaded into sqlite in parallel
+SALESFORCE_CSV_LOAD_MAX_WORKERS = int(
+    os.environ.get("SALESFORCE_CSV_LOAD_MAX_WORKERS") or 4
+)
+
 GITHUB_CONNECTOR_BASE_URL = os.environ.get("GITHUB_CONNECTOR_BASE_URL") or None
 
 GITLAB_CONNECTOR_INCLUDE_CODE_FILES = (
@@ -517,6 +547,12 @@ MAX_PRUNING_DOCUMENT_RETRIEVAL_PER_MINUTE = int(
     os.environ.get("MAX_PRUNING_DOCUMENT_RETRIEVAL_PER_MINUTE", 0)
 )
 
+# Pruning sorts the document ids of the source in runs of this many ids, each
+# written to a temporary file in PRUNING_SPILL_DIR (the system temp dir if unset),
+# so the worker's memory doesn't grow with the size of the source
+PRUNING_SORT_RUN_SIZE = int(os.environ.get("PRUNING_SORT_RUN_SIZE") or 200_000)
+PRUNING_SPILL_DIR = os.environ.get("PRUNING_SPILL_DIR") or None
+
 # comma delimited list of zendesk article labels to skip indexing for
 ZENDESK_CONNECTOR_SKIP_ARTICLE_LABELS = os.environ.get(
     "ZENDESK_CONNECTOR_SKIP_ARTICLE_LABELS", ""
@@ -577,6 +613,17 @@ INDEXING_EMBEDDING_MODEL_NUM_THREADS = int(
     os.environ.get("INDEXING_EMBEDDING_MODEL_NUM_THREADS") or 8
 )
 
+# Overlap the stages of consecutive indexing batches: the next connector batch is
+# fetched and embedded while the previous one is being written to the document index.
+ENABLE_PIPELINED_INDEXING = (
+    os.environ.get("ENABLE_PIPELINED_INDEXING", "").lower() == "true"
+)
+# Max number of batches waiting in front of each pipelined indexing stage. Bounds
+# memory usage and makes a slow stage apply backpressure to the ones before it.
+PIPELINED_INDEXING_MAX_QUEUED_BATCHES = int(
+    os.environ.get("PIPELINED_INDEXING_MAX_QUEUED_BATCHES") or 2
+)
+
 # During an indexing attempt, specifies the number of batches which are allowed to
 # exception without aborting the attempt.
 INDEXING_EXCEPTION_LIMIT = int(os.environ.get("INDEXING_EXCEPTION_LIMIT") or 0)
@@ -597,6 +644,20 @@ AVERAGE_SUMMARY_EMBEDDINGS = (
 )
 
 MAX_TOKENS_FOR_FULL_INCLUSION = 4096
+# Cache LLM generated document / chunk summaries by (model, prompt version, content
+# hash) so that re-indexing unchanged content doesn't call the LLM again. Off by
+# default like the embedding cache, it needs room for its entries in Redis
+CONTEXTUAL_RAG_SUMMARY_CACHE_ENABLED = (
+    os.environ.get("CONTEXTUAL_RAG_SUMMARY_CACHE_ENABLED", "false").lower() == "true"
+)
+# Entries are refreshed on every hit, so this acts as an idle expiry (default 30 days)
+CONTEXTUAL_RAG_SUMMARY_CACHE_TTL_SECONDS = int(
+    os.environ.get("CONTEXTUAL_RAG_SUMMARY_CACHE_TTL_SECONDS") or 60 * 60 * 24 * 30
+)
+# Per tenant cap, the least recently used summaries are evicted beyond this
+CONTEXTUAL_RAG_SUMMARY_CACHE_MAX_ENTRIES = int(
+    os.environ.get("CONTEXTUAL_RAG_SUMMARY_CACHE_MAX_ENTRIES") or 500_000
+)
 
 #####
 # Miscellaneous
@@ -642,6 +703,26 @@ CUSTOM_ANSWER_VALIDITY_CONDITIONS = json.loads(
 )
 
 VESPA_REQUEST_TIMEOUT = int(os.environ.get("VESPA_REQUEST_TIMEOUT") or "15")
+# Connection pool of the long lived client used for Vespa searches / visits.
+# Reusing connections avoids a TLS + HTTP/2 handshake on every query.
+VESPA_QUERY_MAX_CONNECTIONS = int(os.environ.get("VESPA_QUERY_MAX_CONNECTIONS") or 100)
+VESPA_QUERY_MAX_KEEPALIVE_CONNECTIONS = int(
+    os.environ.get("VESPA_QUERY_MAX_KEEPALIVE_CONNECTIONS") or 20
+)
+VESPA_QUERY_KEEPALIVE_EXPIRY = float(
+    os.environ.get("VESPA_QUERY_KEEPALIVE_EXPIRY") or 60
+)
+# How chunks are written to Vespa during indexing:
+# "per_chunk" - one blocking request per chunk from a thread pool (default)
+# "streaming" - puts / deletes are streamed over HTTP/2 (h2c for self-hosted Vespa)
+#               with a bounded number of requests in flight, see
+#               onyx/document_index/vespa/feed.py
+VESPA_FEED_MODE = VespaFeedMode(
+    (os.environ.get("VESPA_FEED_MODE") or VespaFeedMode.PER_CHUNK.value).lower()
+)
+VESPA_FEED_MAX_IN_FLIGHT = int(os.environ.get("VESPA_FEED_MAX_IN_FLIGHT") or 256)
+# HTTP/2 connections used by the streaming feed, requests are multiplexed over them
+VESPA_FEED_MAX_CONNECTIONS = int(os.environ.get("VESPA_FEED_MAX_CONNECTIONS") or 4)
 
 SYSTEM_RECURSION_LIMIT = int(os.environ.get("SYSTEM_RECURSION_LIMIT") or "1000")
 
@@ -772,6 +853,29 @@ IMAGE_ANALYSIS_SYSTEM_PROMPT = os.environ.get(
     DEFAULT_IMAGE_ANALYSIS_SYSTEM_PROMPT,
 )
 
+# Max concurrent vision LLM calls when summarizing the images of an indexing batch
+IMAGE_SUMMARIZATION_MAX_WORKERS = int(
+    os.environ.get("IMAGE_SUMMARIZATION_MAX_WORKERS") or 4
+)
+# Retries of a rate limited vision LLM call (exponential backoff / Retry-After)
+IMAGE_SUMMARIZATION_RATE_LIMIT_RETRIES = int(
+    os.environ.get("IMAGE_SUMMARIZATION_RATE_LIMIT_RETRIES") or 5
+)
+# Cache image summaries by (vision model, prompts, image content hash) so that the
+# same image is only summarized once across documents and re-index runs. Off by
+# default like the other Redis backed indexing caches
+IMAGE_SUMMARY_CACHE_ENABLED = (
+    os.environ.get("IMAGE_SUMMARY_CACHE_ENABLED", "false").lower() == "true"
+)
+# Entries are refreshed on every hit, so this acts as an idle expiry (default 90 days)
+IMAGE_SUMMARY_CACHE_TTL_SECONDS = int(
+    os.environ.get("IMAGE_SUMMARY_CACHE_TTL_SECONDS") or 60 * 60 * 24 * 90
+)
+# Per tenant cap, the least recently used summaries are evicted beyond this
+IMAGE_SUMMARY_CACHE_MAX_ENTRIES = int(
+    os.environ.get("IMAGE_SUMMARY_CACHE_MAX_ENTRIES") or 200_000
+)
+
 DISABLE_AUTO_AUTH_REFRESH = (
     os.environ.get("DISABLE_AUTO_AUTH_REFRESH", "").lower() == "true"
 )
@@ -104,3 +104,35 @@ USE_SEMANTIC_KEYWORD_EXPANSIONS_BASIC_SEARCH = (
 )
 
 USE_DIV_CON_AGENT = os.environ.get("USE_DIV_CON_AGENT", "false").lower() == "true"
+
+# Token usage for the token rate limits is counted in per minute buckets in Redis,
+# so the limit checks don't aggregate the chat messages in Postgres on every message
+TOKEN_USAGE_COUNTERS_ENABLED = (
+    os.environ.get("TOKEN_USAGE_COUNTERS_ENABLED", "true").lower() == "true"
+)
+# How long the buckets are kept. Rate limits with a longer period are checked
+# against Postgres.
+TOKEN_USAGE_COUNTER_RETENTION_HOURS = int(
+    os.environ.get("TOKEN_USAGE_COUNTER_RETENTION_HOURS") or 7 * 24
+)
+# How often the buckets are rebuilt from Postgres, which corrects for lost Redis data
+# and messages that were counted but never committed
+TOKEN_USAGE_COUNTER_RECONCILE_SECONDS = int(
+    os.environ.get("TOKEN_USAGE_COUNTER_RECONCILE_SECONDS") or 60 * 60
+)
+
+# Run the /send-message answer pipeline on a dedicated thread pool that feeds the
+# response through an asyncio queue, instead of advancing the answer generator on
+# Starlette's shared threadpool for every packet
+ASYNC_CHAT_STREAMING_ENABLED = (
+    os.environ.get("ASYNC_CHAT_STREAMING_ENABLED", "").lower() == "true"
+)
+# Answers streamed at the same time per API server process, further ones wait
+CHAT_STREAM_WORKER_THREADS = int(os.environ.get("CHAT_STREAM_WORKER_THREADS") or 64)
+# Packets an answer can produce ahead of the client before it is paused
+CHAT_STREAM_MAX_BUFFERED_PACKETS = int(
+    os.environ.get("CHAT_STREAM_MAX_BUFFERED_PACKETS") or 256
+)
+# How long packets are collected into one write to the client, 0 only writes the
+# packets that are already waiting together
+CHAT_STREAM_COALESCE_MS = int(os.environ.get("CHAT_STREAM_COALESCE_MS", "10"))
@@ -54,6 +54,22 @@ KG_NORMALIZATION_RETRIEVE_ENTITIES_LIMIT: int = int(
     os.environ.get("KG_NORMALIZATION_RETRIEVE_ENTITIES_LIMIT", "100")
 )
 
+# in-memory name indices used for entity normalization, one per tenant and entity
+# type. They are rebuilt whenever an entity of the type changes
+KG_NORMALIZATION_INDEX_CACHE_MAX_TYPES: int = int(
+    os.environ.get("KG_NORMALIZATION_INDEX_CACHE_MAX_TYPES", "256")
+)
+
+KG_NORMALIZATION_INDEX_CACHE_TTL_SECONDS: int = int(
+    os.environ.get("KG_NORMALIZATION_INDEX_CACHE_TTL_SECONDS", "3600")
+)
+
+# per-user sets of the KG documents a user may see (kg_user_allowed_document) are
+# refreshed on ACL / group membership changes and at the latest after this long
+KG_ALLOWED_DOCS_REFRESH_INTERVAL_SECONDS: int = int(
+    os.environ.get("KG_ALLOWED_DOCS_REFRESH_INTERVAL_SECONDS", "600")
+)
+
 KG_FILTERED_SEARCH_TIMEOUT: int = int(
     os.environ.get("KG_FILTERED_SEARCH_TIMEOUT", "30")
 )
@@ -50,6 +50,53 @@ BATCH_SIZE_ENCODE_CHUNKS_FOR_API_EMBEDDING_SERVICES = EMBEDDING_BATCH_SIZE or 51
 CROSS_ENCODER_RANGE_MAX = 1
 CROSS_ENCODER_RANGE_MIN = 0
 
+# Content-addressed cache of embeddings returned by the model server, keyed by the
+# embedding model settings and a hash of the (trimmed) text. Unchanged chunks are
+# then not re-embedded on re-index runs.
+EMBEDDING_CACHE_ENABLED = (
+    os.environ.get("EMBEDDING_CACHE_ENABLED") or "false"
+).lower() == "true"
+# Entries are refreshed on every hit, so this acts as an idle expiry (default 7 days)
+EMBEDDING_CACHE_TTL_SECONDS = int(
+    os.environ.get("EMBEDDING_CACHE_TTL_SECONDS") or 60 * 60 * 24 * 7
+)
+# "float16" halves the storage at a negligible loss in retrieval quality
+EMBEDDING_CACHE_DTYPE = os.environ.get("EMBEDDING_CACHE_DTYPE") or "float16"
+# Size of the in-process LRU layer in front of Redis, set to 0 to disable it
+EMBEDDING_CACHE_LOCAL_MAX_ENTRIES = int(
+    os.environ.get("EMBEDDING_CACHE_LOCAL_MAX_ENTRIES") or 10_000
+)
+# Format the model server returns embeddings in: "json", or raw "float32"/"float16"
+# vectors which are much cheaper to (de)serialize for large indexing batches.
+# float16 halves the payload again at a negligible loss in retrieval quality.
+MODEL_SERVER_EMBEDDING_TRANSPORT = (
+    os.environ.get("MODEL_SERVER_EMBEDDING_TRANSPORT") or "json"
+).lower()
+# Process-wide cache of query embeddings so repeated searches (Slack retries, agent
+# sub-questions, query expansions) skip the model server. Set the TTL to 0 to disable.
+QUERY_EMBEDDING_CACHE_TTL_SECONDS = int(
+    os.environ.get("QUERY_EMBEDDING_CACHE_TTL_SECONDS") or 300
+)
+QUERY_EMBEDDING_CACHE_MAX_ENTRIES = int(
+    os.environ.get("QUERY_EMBEDDING_CACHE_MAX_ENTRIES") or 2048
+)
+# Process-wide cache of the query embedding models (and their tokenizers), one per
+# tenant and search settings. Set the TTL to 0 to build a model for every search.
+QUERY_EMBEDDING_MODEL_CACHE_TTL_SECONDS = int(
+    os.environ.get("QUERY_EMBEDDING_MODEL_CACHE_TTL_SECONDS") or 60 * 60
+)
+QUERY_EMBEDDING_MODEL_CACHE_MAX_ENTRIES = int(
+    os.environ.get("QUERY_EMBEDDING_MODEL_CACHE_MAX_ENTRIES") or 64
+)
+# Process-wide cache of token counts keyed by tokenizer and content hash, used when
+# pruning retrieved sections to fit the prompt. Set the TTL to 0 to disable.
+TOKEN_COUNT_CACHE_TTL_SECONDS = int(
+    os.environ.get("TOKEN_COUNT_CACHE_TTL_SECONDS") or 3600
+)
+TOKEN_COUNT_CACHE_MAX_ENTRIES = int(
+    os.environ.get("TOKEN_COUNT_CACHE_MAX_ENTRIES") or 50_000
+)
+
 
 #####
 # Generative AI Model Configs
@@ -71,3 +71,46 @@ DANSWER_BOT_RESPONSE_LIMIT_PER_TIME_PERIOD = int(
 DANSWER_BOT_RESPONSE_LIMIT_TIME_PERIOD_SECONDS = int(
     os.environ.get("DANSWER_BOT_RESPONSE_LIMIT_TIME_PERIOD_SECONDS", "86400")
 )
+
+# Slack users, channels and the bot's own ids are cached in process and in Redis for
+# this many seconds. Set to 0 to disable the cache
+DANSWER_BOT_SLACK_CACHE_TTL_SECONDS = int(
+    os.environ.get("DANSWER_BOT_SLACK_CACHE_TTL_SECONDS") or 600
+)
+DANSWER_BOT_SLACK_CACHE_MAX_ENTRIES = int(
+    os.environ.get("DANSWER_BOT_SLACK_CACHE_MAX_ENTRIES") or 10_000
+)
+# Thread histories are cached for this many seconds after the last message, follow
+# ups in a cached thread only fetch the new messages. Set to 0 to disable
+DANSWER_BOT_SLACK_THREAD_CACHE_TTL_SECONDS = int(
+    os.environ.get("DANSWER_BOT_SLACK_THREAD_CACHE_TTL_SECONDS") or 3600
+)
+DANSWER_BOT_SLACK_THREAD_CACHE_MAX_ENTRIES = int(
+    os.environ.get("DANSWER_BOT_SLACK_THREAD_CACHE_MAX_ENTRIES") or 1000
+)
+
+# Slack events are processed by a pool of this many worker threads shared by all
+# tenants of the pod, with fair scheduling between the tenants. Set to 0 to process
+# the events on the socket mode listener threads instead
+DANSWER_BOT_WORKER_THREADS = int(os.environ.get("DANSWER_BOT_WORKER_THREADS") or 16)
+# A tenant never occupies more than this many workers at once
+DANSWER_BOT_MAX_CONCURRENT_EVENTS_PER_TENANT = int(
+    os.environ.get("DANSWER_BOT_MAX_CONCURRENT_EVENTS_PER_TENANT") or 4
+)
+# Events beyond this many waiting ones are rejected, messages addressed to the bot
+# get a short "busy" reply
+DANSWER_BOT_MAX_QUEUED_EVENTS_PER_TENANT = int(
+    os.environ.get("DANSWER_BOT_MAX_QUEUED_EVENTS_PER_TENANT") or 50
+)
+# Share of the workers of a tenant relative to others (default 1),
+# e.g. "tenant_a=2,tenant_b=0.5"
+DANSWER_BOT_TENANT_WEIGHTS = {
+    tenant_id.strip(): float(weight)
+    for tenant_id, _, weight in (
+        tenant_weight.rpartition("=")
+        for tenant_weight in (os.environ.get("DANSWER_BOT_TENANT_WEIGHTS") or "").split(
+            ","
+        )
+        if "=" in tenant_weight
+    )
+}
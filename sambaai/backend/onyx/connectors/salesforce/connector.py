@@ -1,15 +1,17 @@
-import csv
 import gc
 import os
+import shutil
 import sys
 import tempfile
 import time
 from collections import defaultdict
+from collections.abc import Generator
 from pathlib import Path
 from typing import Any
 from typing import cast
 
 from onyx.configs.app_configs import INDEX_BATCH_SIZE
+from onyx.configs.app_configs import SALESFORCE_CSV_LOAD_MAX_WORKERS
 from onyx.connectors.interfaces import GenerateDocumentsOutput
 from onyx.connectors.interfaces import GenerateSlimDocumentOutput
 from onyx.connectors.interfaces import LoadConnector
@@ -27,6 +29,7 @@ from onyx.connectors.salesforce.doc_conversion import convert_sf_query_result_to
 from onyx.connectors.salesforce.doc_conversion import ID_PREFIX
 from onyx.connectors.salesforce.onyx_salesforce import OnyxSalesforce
 from onyx.connectors.salesforce.salesforce_calls import fetch_all_csvs_in_parallel
+from onyx.connectors.salesforce.sqlite_bulk_load import stage_csvs_in_parallel
 from onyx.connectors.salesforce.sqlite_functions import OnyxSalesforceSQLite
 from onyx.connectors.salesforce.utils import BASE_DATA_PATH
 from onyx.connectors.salesforce.utils import get_sqlite_db_path
@@ -232,77 +235,62 @@ class SalesforceConnector(LoadConnector, PollConnector, SlimConnector):
     @staticmethod
     def _load_csvs_to_db(
         csv_directory: str, remove_ids: bool, sf_db: OnyxSalesforceSQLite
-    ) -> dict[str, str]:
+    ) -> Generator[list[Document], None, dict[str, str]]:
         """
+        Loads all downloaded CSVs into the db and deletes them. Yields an empty batch
+        whenever an object type is staged or merged to keep the connector alive.
+
         Returns a dict of id to object type. Each id is a newly seen row in salesforce.
         """
 
-        updated_ids: dict[str, str] = {}
-
-        object_type_to_csv_path = SalesforceConnector.reconstruct_object_types(
+        object_type_to_csv_paths = SalesforceConnector.reconstruct_object_types(
             csv_directory
         )
 
-        # NOTE(rkuo): this timing note is meaningless without a reference point in terms
-        # of number of records, etc
-        # This takes like 10 seconds
-
-        # This is for testing the rest of the functionality if data has
-        # already been fetched and put in sqlite
-        # from import onyx.connectors.salesforce.sf_db.sqlite_functions find_ids_by_type
-        # for object_type in self.parent_object_list:
-        #     updated_ids.update(list(find_ids_by_type(object_type)))
-
-        # This takes 10-70 minutes first time (idk why the range is so big)
-        total_types = len(object_type_to_csv_path)
+        # This used to take 10-70 minutes the first time with row by row inserts,
+        # so every object type is now staged in parallel and merged in bulk
+        total_types = len(object_type_to_csv_paths)
         logger.info(f"Starting to process {total_types} object types")
 
-        for i, (object_type, csv_paths) in enumerate(
-            object_type_to_csv_path.items(), 1
-        ):
-            logger.info(f"Processing object type {object_type} ({i}/{total_types})")
-            # If path is None, it means it failed to fetch the csv
-            if csv_paths is None:
-                continue
-
-            # Go through each csv path and use it to update the db
-            for csv_path in csv_paths:
-                num_records = 0
-
-                logger.debug(
-                    f"Processing CSV: object_type={object_type} "
-                    f"csv={csv_path} "
-                    f"len={Path(csv_path).stat().st_size} "
-                    f"records={num_records}"
-                )
-
-                with open(csv_path, "r", newline="", encoding="utf-8") as f:
-                    reader = csv.DictReader(f)
-                    for row in reader:
-                        num_records += 1
-
-                new_ids = sf_db.update_from_csv(
-                    object_type=object_type,
-                    csv_download_path=csv_path,
-                    remove_ids=remove_ids,
+        staging_dir = os.path.join(csv_directory, "staging")
+        staging_paths: list[str] = []
+        try:
+            for i, staged in enumerate(
+                stage_csvs_in_parallel(
+                    object_type_to_csv_paths,
+                    staging_dir,
+                    remove_ids,
+                    SALESFORCE_CSV_LOAD_MAX_WORKERS,
+                ),
+                1,
+            ):
+                logger.info(
+                    f"Staged object type {staged.object_type} ({i}/{total_types}): "
+                    f"records={staged.num_records}"
                 )
-                for new_id in new_ids:
-                    updated_ids[new_id] = object_type
+                staging_paths.append(staged.staging_path)
+                for csv_path in object_type_to_csv_paths[staged.object_type] or []:
+                    os.remove(csv_path)
 
-                sf_db.flush()
+                # yield an empty list to keep the connector alive
+                yield []
 
-                logger.debug(
-                    f"Added {len(new_ids)} new/updated records for {object_type}"
-                )
+            start = time.monotonic()
+            updated_ids: dict[str, str] = {}
+            for step_ids in sf_db.iter_merge_staging_dbs(staging_paths):
+                updated_ids.update(step_ids)
 
-                logger.info(
-                    f"Processed CSV: object_type={object_type} "
-                    f"csv={csv_path} "
-                    f"len={Path(csv_path).stat().st_size} "
-                    f"records={num_records} "
-                    f"db_len={sf_db.file_size}"
-                )
-                os.remove(csv_path)
+                # merging a large initial load takes a while, keep the connector
+                # alive between the staging dbs
+                yield []
+            logger.info(
+                f"Merged staged object types: "
+                f"records={len(updated_ids)} "
+                f"db_len={sf_db.file_size} "
+                f"elapsed={time.monotonic() - start:.2f}"
+            )
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
 
         return updated_ids
 
@@ -387,63 +375,9 @@ class SalesforceConnector(LoadConnector, PollConnector, SlimConnector):
             gc.collect()
 
             # Step 2 - load CSV's to sqlite
-            object_type_to_csv_paths = SalesforceConnector.reconstruct_object_types(
-                temp_dir
+            changed_ids_to_type = yield from SalesforceConnector._load_csvs_to_db(
+                temp_dir, True, sf_db
             )
-
-            total_types = len(object_type_to_csv_paths)
-            logger.info(f"Starting to process {total_types} object types")
-
-            for i, (object_type, csv_paths) in enumerate(
-                object_type_to_csv_paths.items(), 1
-            ):
-                logger.info(f"Processing object type {object_type} ({i}/{total_types})")
-                # If path is None, it means it failed to fetch the csv
-                if csv_paths is None:
-                    continue
-
-                # Go through each csv path and use it to update the db
-                for csv_path in csv_paths:
-                    num_records = 0
-                    with open(csv_path, "r", newline="", encoding="utf-8") as f:
-                        reader = csv.DictReader(f)
-                        for row in reader:
-                            num_records += 1
-
-                    logger.debug(
-                        f"Processing CSV: object_type={object_type} "
-                        f"csv={csv_path} "
-                        f"len={Path(csv_path).stat().st_size} "
-                        f"records={num_records}"
-                    )
-
-                    # yield an empty list to keep the connector alive
-                    yield docs_to_yield
-
-                    new_ids = sf_db.update_from_csv(
-                        object_type=object_type,
-                        csv_download_path=csv_path,
-                    )
-                    for new_id in new_ids:
-                        changed_ids_to_type[new_id] = object_type
-
-                    sf_db.flush()
-
-                    logger.debug(
-                        f"Added {len(new_ids)} new/updated records for {object_type}"
-                    )
-
-                    logger.info(
-                        f"Processed CSV: object_type={object_type} "
-                        f"csv={csv_path} "
-                        f"len={Path(csv_path).stat().st_size} "
-                        f"records={num_records} "
-                        f"db_len={sf_db.file_size}"
-                    )
-
-                    os.remove(csv_path)
-                    gc.collect()
-
             gc.collect()
 
             logger.info(f"Found {len(changed_ids_to_type)} total updated records")
@@ -569,7 +503,7 @@ class SalesforceConnector(LoadConnector, PollConnector, SlimConnector):
             gc.collect()
 
             # Step 2 - load CSV's to sqlite
-            changed_ids_to_type = SalesforceConnector._load_csvs_to_db(
+            changed_ids_to_type = yield from SalesforceConnector._load_csvs_to_db(
                 temp_dir, False, sf_db
             )
             gc.collect()
@@ -0,0 +1,182 @@
+"""Bulk loading of the bulk API CSVs into the Salesforce SQLite db.
+
+Every object type is parsed into its own staging db, in parallel, without any
+indexes or durability guarantees. The staging dbs are then merged into the main db
+with a handful of INSERT ... SELECT statements, see
+OnyxSalesforceSQLite.merge_staging_dbs."""
+
+import csv
+import json
+import os
+import sqlite3
+import time
+from collections.abc import Iterator
+from concurrent.futures import as_completed
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from onyx.connectors.salesforce.sqlite_functions import OnyxSalesforceSQLite
+from onyx.utils.logger import setup_logger
+
+logger = setup_logger()
+
+
+# rows buffered in memory before they are handed to executemany
+_STAGING_INSERT_BATCH_SIZE = 10_000
+
+
+@dataclass
+class StagedObjectType:
+    object_type: str
+    staging_path: str
+    num_records: int
+
+
+def _open_staging_db(staging_path: str) -> sqlite3.Connection:
+    if os.path.exists(staging_path):
+        os.remove(staging_path)
+
+    conn = sqlite3.connect(staging_path)
+    # the staging db is thrown away if anything goes wrong, so skip the journal
+    # and fsyncs entirely
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-262144")  # 256MB
+    # rowid order is the order records are merged in (last record wins)
+    conn.execute(
+        "CREATE TABLE salesforce_objects "
+        "(id TEXT NOT NULL, object_type TEXT NOT NULL, data TEXT NOT NULL)"
+    )
+    conn.execute(
+        "CREATE TABLE relationships (child_id TEXT NOT NULL, parent_id TEXT NOT NULL)"
+    )
+    return conn
+
+
+def stage_csvs(
+    object_type: str, csv_paths: list[str], staging_path: str, remove_ids: bool
+) -> int:
+    """Parses the CSVs of one object type into a new staging db at `staging_path`.
+    Records are normalized exactly like OnyxSalesforceSQLite.update_from_csv does.
+    If an id shows up more than once, the last record wins.
+
+    Returns the number of records staged."""
+
+    # some customers need this to be larger than the default 128KB, go with 16MB
+    csv.field_size_limit(16 * 1024 * 1024)
+
+    start = time.monotonic()
+    seen_ids: set[str] = set()
+    objects: list[tuple[str, str, str]] = []
+    relationships: list[tuple[str, str]] = []
+
+    conn = _open_staging_db(staging_path)
+    try:
+
+        def flush() -> None:
+            conn.executemany(
+                "INSERT INTO salesforce_objects (id, object_type, data) "
+                "VALUES (?, ?, ?)",
+                objects,
+            )
+            conn.executemany(
+                "INSERT INTO relationships (child_id, parent_id) VALUES (?, ?)",
+                relationships,
+            )
+            objects.clear()
+            relationships.clear()
+
+        # a single transaction for the whole staging db
+        with conn:
+            for csv_path in csv_paths:
+                with open(csv_path, "r", newline="", encoding="utf-8") as f:
+                    for row in csv.DictReader(f):
+                        if "Id" not in row:
+                            logger.warning(
+                                f"Row {row} does not have an Id field in {csv_path}"
+                            )
+                            continue
+
+                        row_id = row["Id"]
+                        if row_id in seen_ids:
+                            # rare, so it's fine for this to be slow
+                            flush()
+                            conn.execute(
+                                "DELETE FROM salesforce_objects WHERE id = ?",
+                                (row_id,),
+                            )
+                            conn.execute(
+                                "DELETE FROM relationships WHERE child_id = ?",
+                                (row_id,),
+                            )
+                        seen_ids.add(row_id)
+
+                        normalized_record, parent_ids = (
+                            OnyxSalesforceSQLite.normalize_record(row, remove_ids)
+                        )
+                        objects.append(
+                            (row_id, object_type, json.dumps(normalized_record))
+                        )
+                        relationships.extend(
+                            (row_id, parent_id) for parent_id in parent_ids
+                        )
+
+                        if len(objects) >= _STAGING_INSERT_BATCH_SIZE:
+                            flush()
+
+            flush()
+    finally:
+        conn.close()
+
+    logger.info(
+        f"Staged CSVs: object_type={object_type} "
+        f"csvs={len(csv_paths)} "
+        f"records={len(seen_ids)} "
+        f"elapsed={time.monotonic() - start:.2f}"
+    )
+    return len(seen_ids)
+
+
+def stage_csvs_in_parallel(
+    object_type_to_csv_paths: dict[str, list[str] | None],
+    staging_dir: str,
+    remove_ids: bool,
+    max_workers: int,
+) -> Iterator[StagedObjectType]:
+    """Stages every object type into its own db in `staging_dir`, yielding each
+    object type as soon as it is staged (in no particular order).
+
+    This uses threads rather than processes since the connector runs inside
+    daemonized celery workers, which can't have child processes. The CSV parsing
+    holds the GIL, the inserts and file IO mostly don't."""
+    work = {
+        object_type: csv_paths
+        for object_type, csv_paths in object_type_to_csv_paths.items()
+        # None means the csv failed to download
+        if csv_paths
+    }
+    if not work:
+        return
+
+    os.makedirs(staging_dir, exist_ok=True)
+
+    with ThreadPoolExecutor(max_workers=max(min(max_workers, len(work)), 1)) as pool:
+        future_to_staged = {}
+        for object_type, csv_paths in work.items():
+            staging_path = os.path.join(staging_dir, f"{object_type}.staging.sqlite")
+            future = pool.submit(
+                stage_csvs, object_type, csv_paths, staging_path, remove_ids
+            )
+            future_to_staged[future] = StagedObjectType(
+                object_type=object_type, staging_path=staging_path, num_records=0
+            )
+
+        try:
+            for future in as_completed(future_to_staged):
+                staged = future_to_staged[future]
+                staged.num_records = future.result()
+                yield staged
+        finally:
+            for future in future_to_staged:
+                future.cancel()
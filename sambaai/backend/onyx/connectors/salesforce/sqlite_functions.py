@@ -27,6 +27,28 @@ class OnyxSalesforceSQLite:
     # might be appropriate here.
     NULL_ID_STRING = "N/A"
 
+    # secondary indexes, these are dropped while bulk loading into an empty db
+    INDEXES: dict[str, str] = {
+        "idx_object_type": """
+            CREATE INDEX idx_object_type
+            ON salesforce_objects(object_type, id)
+            WHERE object_type IS NOT NULL
+        """,
+        "idx_parent_id": """
+            CREATE INDEX idx_parent_id
+            ON relationships(parent_id, child_id)
+        """,
+        "idx_child_parent": """
+            CREATE INDEX idx_child_parent
+            ON relationships(child_id)
+            WHERE child_id IS NOT NULL
+        """,
+        "idx_relationship_types_lookup": """
+            CREATE INDEX idx_relationship_types_lookup
+            ON relationship_types(parent_type, child_id, parent_id)
+        """,
+    }
+
     def __init__(self, filename: str, isolation_level: str | None = None):
         self.filename = filename
         self.isolation_level = isolation_level
@@ -163,49 +185,7 @@ class OnyxSalesforceSQLite:
             """
             )
 
-            # Create indexes if they don't exist (SQLite ignores IF NOT EXISTS for indexes)
-            def create_index_if_not_exists(
-                index_name: str, create_statement: str
-            ) -> None:
-                cursor.execute(
-                    f"SELECT name FROM sqlite_master WHERE type='index' AND name='{index_name}'"
-                )
-                if not cursor.fetchone():
-                    cursor.execute(create_statement)
-
-            create_index_if_not_exists(
-                "idx_object_type",
-                """
-                CREATE INDEX idx_object_type
-                ON salesforce_objects(object_type, id)
-                WHERE object_type IS NOT NULL
-                """,
-            )
-
-            create_index_if_not_exists(
-                "idx_parent_id",
-                """
-                CREATE INDEX idx_parent_id
-                ON relationships(parent_id, child_id)
-                """,
-            )
-
-            create_index_if_not_exists(
-                "idx_child_parent",
-                """
-                CREATE INDEX idx_child_parent
-                ON relationships(child_id)
-                WHERE child_id IS NOT NULL
-                """,
-            )
-
-            create_index_if_not_exists(
-                "idx_relationship_types_lookup",
-                """
-                CREATE INDEX idx_relationship_types_lookup
-                ON relationship_types(parent_type, child_id, parent_id)
-                """,
-            )
+            OnyxSalesforceSQLite._create_indexes(cursor)
 
             elapsed = time.monotonic() - start
             logger.info(f"init_db - create tables and indices: elapsed={elapsed:.2f}")
@@ -572,6 +552,120 @@ class OnyxSalesforceSQLite:
 
         return updated_ids
 
+    def merge_staging_dbs(self, staging_paths: list[str]) -> dict[str, str]:
+        """Merges staging dbs (see sqlite_bulk_load.stage_csvs) into this db. The end
+        result is the same as calling update_from_csv for every staged CSV, but
+        done with set based statements instead of row by row.
+
+        Returns a dict of id to object type of every merged record."""
+        merged_ids: dict[str, str] = {}
+        for step_ids in self.iter_merge_staging_dbs(staging_paths):
+            merged_ids.update(step_ids)
+        return merged_ids
+
+    def iter_merge_staging_dbs(
+        self, staging_paths: list[str]
+    ) -> Iterator[dict[str, str]]:
+        """Same as merge_staging_dbs, but yields after every staging db, so callers
+        can keep alive while a large merge runs. Yields the id to object type of the
+        records merged in the step (empty for the relationship type steps).
+
+        If this db has no objects yet, the secondary indexes are dropped during the
+        merge and rebuilt once at the end, which is much cheaper than maintaining
+        them on every insert."""
+        if self._conn is None:
+            raise RuntimeError("Database connection is closed")
+
+        conn = self._conn
+        merged_types: set[str] = set()
+
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-2000000")  # Use 2GB memory for cache
+        conn.execute("PRAGMA mmap_size=1073741824")  # 1GB
+
+        defer_indexes = (
+            conn.execute("SELECT 1 FROM salesforce_objects LIMIT 1").fetchone() is None
+        )
+        if defer_indexes:
+            with conn:
+                for index_name in OnyxSalesforceSQLite.INDEXES:
+                    conn.execute(f"DROP INDEX IF EXISTS {index_name}")
+
+        try:
+            for staging_path in staging_paths:
+                # ATTACH/DETACH can't run inside a transaction
+                conn.execute("ATTACH DATABASE ? AS staging", (staging_path,))
+                try:
+                    with conn:
+                        step_ids = dict(
+                            conn.execute(
+                                "SELECT id, object_type FROM staging.salesforce_objects"
+                            )
+                        )
+                        conn.execute(
+                            """
+                            DELETE FROM relationships WHERE child_id IN
+                            (SELECT id FROM staging.salesforce_objects)
+                            """
+                        )
+                        conn.execute(
+                            """
+                            DELETE FROM relationship_types WHERE child_id IN
+                            (SELECT id FROM staging.salesforce_objects)
+                            """
+                        )
+                        conn.execute(
+                            """
+                            INSERT OR REPLACE INTO salesforce_objects (id, object_type, data)
+                            SELECT id, object_type, data FROM staging.salesforce_objects
+                            ORDER BY rowid
+                            """
+                        )
+                        conn.execute(
+                            """
+                            INSERT OR IGNORE INTO relationships (child_id, parent_id)
+                            SELECT child_id, parent_id FROM staging.relationships
+                            """
+                        )
+                finally:
+                    conn.execute("DETACH DATABASE staging")
+                merged_types.update(step_ids.values())
+                yield step_ids
+
+            # parents can be of any type, so their types are only known once
+            # everything is merged
+            for staging_path in staging_paths:
+                conn.execute("ATTACH DATABASE ? AS staging", (staging_path,))
+                try:
+                    with conn:
+                        conn.execute(
+                            """
+                            INSERT OR IGNORE INTO relationship_types
+                            (child_id, parent_id, parent_type)
+                            SELECT r.child_id, r.parent_id, o.object_type
+                            FROM staging.relationships r
+                            JOIN salesforce_objects o ON o.id = r.parent_id
+                            """
+                        )
+                finally:
+                    conn.execute("DETACH DATABASE staging")
+                yield {}
+
+            if "User" in merged_types:
+                with conn:
+                    OnyxSalesforceSQLite._update_user_email_map(conn.cursor())
+        finally:
+            if defer_indexes:
+                start = time.monotonic()
+                with conn:
+                    OnyxSalesforceSQLite._create_indexes(conn.cursor())
+                logger.info(
+                    f"merge_staging_dbs - create indices: "
+                    f"elapsed={time.monotonic() - start:.2f}"
+                )
+
+        self.flush()
+
     def get_child_ids(self, parent_id: str) -> set[str]:
         """Get all child IDs for a given parent ID."""
         if self._conn is None:
@@ -738,6 +832,17 @@ class OnyxSalesforceSQLite:
             )
             raise
 
+    @staticmethod
+    def _create_indexes(cursor: sqlite3.Cursor) -> None:
+        # Create indexes if they don't exist (SQLite ignores IF NOT EXISTS for indexes)
+        for index_name, create_statement in OnyxSalesforceSQLite.INDEXES.items():
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type='index' AND name=?",
+                (index_name,),
+            )
+            if not cursor.fetchone():
+                cursor.execute(create_statement)
+
     @staticmethod
     def _update_user_email_map(cursor: sqlite3.Cursor) -> None:
         """Update the user_email_map table with current User objects.
@@ -166,19 +166,23 @@ def expert_info_from_slack_id(
         return None
 
     user: dict = cast(dict[Any, dict], response.data).get("user", {})
-    profile = user.get("profile", {})
+    expert = expert_info_from_slack_user(user)
+
+    user_cache[user_id] = expert
+
+    return expert
+
 
-    expert = BasicExpertInfo(
+def expert_info_from_slack_user(user: dict[str, Any]) -> BasicExpertInfo:
+    """Builds the expert info from the `user` object of a users.info response."""
+    profile = user.get("profile", {})
+    return BasicExpertInfo(
         display_name=user.get("real_name") or profile.get("display_name"),
         first_name=profile.get("first_name"),
         last_name=profile.get("last_name"),
         email=profile.get("email"),
     )
 
-    user_cache[user_id] = expert
-
-    return expert
-
 
 class SlackTextCleaner:
     """Utility class to replace user IDs with usernames in a message.
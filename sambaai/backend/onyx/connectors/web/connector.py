@@ -1,8 +1,11 @@
+import hashlib
 import io
 import ipaddress
 import random
 import socket
 import time
+from dataclasses import dataclass
+from dataclasses import field
 from datetime import datetime
 from datetime import timezone
 from enum import Enum
@@ -18,10 +21,14 @@ from oauthlib.oauth2 import BackendApplicationClient
 from playwright.sync_api import BrowserContext
 from playwright.sync_api import Playwright
 from playwright.sync_api import sync_playwright
+from requests.adapters import HTTPAdapter
 from requests_oauthlib import OAuth2Session  # type:ignore
 from urllib3.exceptions import MaxRetryError
 
 from onyx.configs.app_configs import INDEX_BATCH_SIZE
+from onyx.configs.app_configs import WEB_CONNECTOR_HOST_CRAWL_DELAY_SECONDS
+from onyx.configs.app_configs import WEB_CONNECTOR_MAX_CONCURRENCY
+from onyx.configs.app_configs import WEB_CONNECTOR_MAX_CONCURRENCY_PER_HOST
 from onyx.configs.app_configs import WEB_CONNECTOR_OAUTH_CLIENT_ID
 from onyx.configs.app_configs import WEB_CONNECTOR_OAUTH_CLIENT_SECRET
 from onyx.configs.app_configs import WEB_CONNECTOR_OAUTH_TOKEN_URL
@@ -33,8 +40,17 @@ from onyx.connectors.exceptions import InsufficientPermissionsError
 from onyx.connectors.exceptions import UnexpectedValidationError
 from onyx.connectors.interfaces import GenerateDocumentsOutput
 from onyx.connectors.interfaces import LoadConnector
+from onyx.connectors.interfaces import PollConnector
+from onyx.connectors.interfaces import SecondsSinceUnixEpoch
 from onyx.connectors.models import Document
 from onyx.connectors.models import TextSection
+from onyx.connectors.web.crawler import CrawlerThreadPool
+from onyx.connectors.web.crawler import CrawlFrontier
+from onyx.db.engine import get_session_with_current_tenant
+from onyx.db.models import WebCrawlState
+from onyx.db.web_crawl_state import fetch_web_crawl_links
+from onyx.db.web_crawl_state import fetch_web_crawl_states
+from onyx.db.web_crawl_state import upsert_web_crawl_states
 from onyx.file_processing.extract_file_text import read_pdf_file
 from onyx.file_processing.html_utils import web_html_cleanup
 from onyx.utils.logger import setup_logger
@@ -47,24 +63,31 @@ logger = setup_logger()
 class ScrapeSessionContext:
     """Session level context for scraping"""
 
-    def __init__(self, base_url: str, to_visit: list[str]):
+    def __init__(self, base_url: str):
         self.base_url = base_url
-        self.to_visit = to_visit
-        self.visited_links: set[str] = set()
-        self.content_hashes: set[int] = set()
+        self.content_hashes: set[str] = set()
 
         self.doc_batch: list[Document] = []
+        # crawl state of the pages in doc_batch, saved when the batch is yielded
+        self.crawl_states: list[WebCrawlState] = []
 
         self.at_least_one_doc: bool = False
+        self.num_unchanged: int = 0
         self.last_error: str | None = None
-        self.needs_retry: bool = False
 
+
+class PlaywrightBrowser:
+    """A headless browser owned by a single crawler thread, started on first use.
+    The sync Playwright API can only be used from the thread that started it."""
+
+    def __init__(self) -> None:
         self.playwright: Playwright | None = None
         self.playwright_context: BrowserContext | None = None
 
-    def initialize(self) -> None:
-        self.stop()
-        self.playwright, self.playwright_context = start_playwright()
+    def get_context(self) -> BrowserContext:
+        if self.playwright_context is None:
+            self.playwright, self.playwright_context = start_playwright()
+        return self.playwright_context
 
     def stop(self) -> None:
         if self.playwright_context:
@@ -76,9 +99,29 @@ class ScrapeSessionContext:
             self.playwright = None
 
 
+@dataclass
+class CrawlTask:
+    index: int
+    url: str
+    # set if the page may be skipped when it is unchanged since it was last indexed
+    known_page: WebCrawlState | None = None
+
+
+@dataclass
 class ScrapeResult:
     doc: Document | None = None
     retry: bool = False
+    error: str | None = None
+
+    # set if the page redirected somewhere else
+    final_url: str | None = None
+    links: set[str] = field(default_factory=set)
+
+    # the page is the same as its known version, no doc is built for it
+    unchanged: bool = False
+    etag: str | None = None
+    last_modified: str | None = None
+    content_hash: str | None = None
 
 
 WEB_CONNECTOR_MAX_SCROLL_ATTEMPTS = 20
@@ -387,6 +430,53 @@ def _get_datetime_from_last_modified_header(last_modified: str) -> datetime | No
         return None
 
 
+def _hash_content(*parts: str | None) -> str:
+    # unlike hash(), stable across processes so it can be persisted
+    return hashlib.sha256(
+        "\0".join(part or "" for part in parts).encode("utf-8", "surrogatepass")
+    ).hexdigest()
+
+
+def _build_conditional_headers(known_page: WebCrawlState | None) -> dict[str, str]:
+    headers: dict[str, str] = {}
+    if known_page is None:
+        return headers
+
+    if known_page.etag:
+        headers["If-None-Match"] = known_page.etag
+    if known_page.last_modified:
+        headers["If-Modified-Since"] = known_page.last_modified
+    return headers
+
+
+def _is_unchanged(response: requests.Response, known_page: WebCrawlState) -> bool:
+    """Whether the response to a conditional request says that the page didn't
+    change. The validators are compared here as well, for servers that ignore
+    conditional headers."""
+    if response.status_code == 304:
+        return True
+    if not response.ok:
+        return False
+
+    etag = response.headers.get("ETag")
+    if etag and known_page.etag:
+        # servers may weaken etags when compressing, the version is the same
+        return etag.removeprefix("W/") == known_page.etag.removeprefix("W/")
+
+    last_modified = response.headers.get("Last-Modified")
+    return bool(last_modified) and last_modified == known_page.last_modified
+
+
+def _build_http_session() -> requests.Session:
+    """Shared by the crawler threads so connections to the site are reused"""
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    adapter = HTTPAdapter(pool_maxsize=WEB_CONNECTOR_MAX_CONCURRENCY)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
 def _handle_cookies(context: BrowserContext, url: str) -> None:
     """Handle cookies for the given URL to help with bot detection"""
     try:
@@ -428,7 +518,7 @@ def _handle_cookies(context: BrowserContext, url: str) -> None:
         )
 
 
-class WebConnector(LoadConnector):
+class WebConnector(LoadConnector, PollConnector):
     MAX_RETRIES = 3
 
     def __init__(
@@ -445,6 +535,8 @@ class WebConnector(LoadConnector):
         self.recursive = False
         self.scroll_before_scraping = scroll_before_scraping
         self.web_connector_type = web_connector_type
+        # identifies this crawl in the persisted crawl state
+        self.crawl_key = _hash_content(web_connector_type, base_url)
         if web_connector_type == WEB_CONNECTOR_VALID_SETTINGS.RECURSIVE.value:
             self.recursive = True
             self.to_visit_list = [_ensure_valid_url(base_url)]
@@ -483,35 +575,52 @@ class WebConnector(LoadConnector):
         self,
         index: int,
         initial_url: str,
-        session_ctx: ScrapeSessionContext,
+        browser: PlaywrightBrowser,
+        http_session: requests.Session,
+        known_page: WebCrawlState | None = None,
     ) -> ScrapeResult:
-        """Returns a ScrapeResult object with a doc and retry flag."""
-
-        if session_ctx.playwright is None:
-            raise RuntimeError("scrape_context.playwright is None")
+        """Returns a ScrapeResult object with a doc and retry flag. Runs on a
+        crawler thread, so it must not touch the session context."""
 
-        if session_ctx.playwright_context is None:
-            raise RuntimeError("scrape_context.playwright_context is None")
+        playwright_context = browser.get_context()
 
         result = ScrapeResult()
 
         # Handle cookies for the URL
-        _handle_cookies(session_ctx.playwright_context, initial_url)
-
-        # First do a HEAD request to check content type without downloading the entire content
-        head_response = requests.head(
-            initial_url, headers=DEFAULT_HEADERS, allow_redirects=True
+        _handle_cookies(playwright_context, initial_url)
+
+        # First do a HEAD request to check content type without downloading the entire content.
+        # For known pages it is a conditional request, unchanged pages are skipped
+        # without rendering them
+        head_response = http_session.head(
+            initial_url,
+            headers=_build_conditional_headers(known_page),
+            allow_redirects=True,
         )
+        result.etag = head_response.headers.get("ETag")
+        result.last_modified = head_response.headers.get("Last-Modified")
+        if known_page is not None and _is_unchanged(head_response, known_page):
+            result.unchanged = True
+            return result
+
         is_pdf = is_pdf_content(head_response)
 
         if is_pdf or initial_url.lower().endswith(".pdf"):
             # PDF files are not checked for links
-            response = requests.get(initial_url, headers=DEFAULT_HEADERS)
+            response = http_session.get(initial_url)
             page_text, metadata, images = read_pdf_file(
                 file=io.BytesIO(response.content)
             )
             last_modified = response.headers.get("Last-Modified")
 
+            result.content_hash = _hash_content(page_text)
+            if (
+                known_page is not None
+                and result.content_hash == known_page.content_hash
+            ):
+                result.unchanged = True
+                return result
+
             result.doc = Document(
                 id=initial_url,
                 sections=[TextSection(link=initial_url, text=page_text)],
@@ -527,7 +636,7 @@ class WebConnector(LoadConnector):
 
             return result
 
-        page = session_ctx.playwright_context.new_page()
+        page = playwright_context.new_page()
         try:
             # Can't use wait_until="networkidle" because it interferes with the scrolling behavior
             page_response = page.goto(
@@ -542,16 +651,9 @@ class WebConnector(LoadConnector):
             final_url = page.url
             if final_url != initial_url:
                 protected_url_check(final_url)
-                initial_url = final_url
-                if initial_url in session_ctx.visited_links:
-                    logger.info(
-                        f"{index}: {initial_url} redirected to {final_url} - already indexed"
-                    )
-                    page.close()
-                    return result
-
                 logger.info(f"{index}: {initial_url} redirected to {final_url}")
-                session_ctx.visited_links.add(initial_url)
+                initial_url = final_url
+                result.final_url = final_url
 
             # If we got here, the request was successful
             if self.scroll_before_scraping:
@@ -573,16 +675,13 @@ class WebConnector(LoadConnector):
             soup = BeautifulSoup(content, "html.parser")
 
             if self.recursive:
-                internal_links = get_internal_links(
-                    session_ctx.base_url, initial_url, soup
+                result.links = get_internal_links(
+                    self.to_visit_list[0], initial_url, soup
                 )
-                for link in internal_links:
-                    if link not in session_ctx.visited_links:
-                        session_ctx.to_visit.append(link)
 
             if page_response and str(page_response.status)[0] in ("4", "5"):
-                session_ctx.last_error = f"Skipped indexing {initial_url} due to HTTP {page_response.status} response"
-                logger.info(session_ctx.last_error)
+                result.error = f"Skipped indexing {initial_url} due to HTTP {page_response.status} response"
+                logger.info(result.error)
                 result.retry = True
                 return result
 
@@ -609,17 +708,18 @@ class WebConnector(LoadConnector):
                     else:
                         parsed_html.cleaned_text += "\n" + document_text
 
-            # Sometimes pages with #! will serve duplicate content
-            # There are also just other ways this can happen
-            hashed_text = hash((parsed_html.title, parsed_html.cleaned_text))
-            if hashed_text in session_ctx.content_hashes:
-                logger.info(
-                    f"{index}: Skipping duplicate title + content for {initial_url}"
-                )
+            # Sometimes pages with #! will serve duplicate content, the caller
+            # skips pages with a content hash it has seen before
+            result.content_hash = _hash_content(
+                parsed_html.title, parsed_html.cleaned_text
+            )
+            if (
+                known_page is not None
+                and result.content_hash == known_page.content_hash
+            ):
+                result.unchanged = True
                 return result
 
-            session_ctx.content_hashes.add(hashed_text)
-
             result.doc = Document(
                 id=initial_url,
                 sections=[TextSection(link=initial_url, text=parsed_html.cleaned_text)],
@@ -637,81 +737,284 @@ class WebConnector(LoadConnector):
 
         return result
 
-    def load_from_state(self) -> GenerateDocumentsOutput:
-        """Traverses through all pages found on the website
-        and converts them into documents"""
-
-        if not self.to_visit_list:
-            raise ValueError("No URLs to visit")
+    def _scrape_with_retries(
+        self,
+        browser: PlaywrightBrowser,
+        http_session: requests.Session,
+        task: CrawlTask,
+    ) -> ScrapeResult:
+        """Runs on a crawler thread."""
+        try:
+            protected_url_check(task.url)
+        except Exception as e:
+            error = f"Invalid URL {task.url} due to {e}"
+            logger.warning(error)
+            return ScrapeResult(error=error)
 
-        base_url = self.to_visit_list[0]  # For the recursive case
-        check_internet_connection(base_url)  # make sure we can connect to the base url
+        result = ScrapeResult()
+        # links found by failed attempts are still crawled
+        links: set[str] = set()
 
-        session_ctx = ScrapeSessionContext(base_url, self.to_visit_list)
-        session_ctx.initialize()
+        # Add retry mechanism with exponential backoff
+        retry_count = 0
 
-        while session_ctx.to_visit:
-            initial_url = session_ctx.to_visit.pop()
-            if initial_url in session_ctx.visited_links:
-                continue
-            session_ctx.visited_links.add(initial_url)
+        while retry_count < self.MAX_RETRIES:
+            if retry_count > 0:
+                # Add a random delay between retries (exponential backoff)
+                delay = min(2**retry_count + random.uniform(0, 1), 10)
+                logger.info(
+                    f"Retry {retry_count}/{self.MAX_RETRIES} for {task.url} after {delay:.2f}s delay"
+                )
+                time.sleep(delay)
 
             try:
-                protected_url_check(initial_url)
+                result = self._do_scrape(
+                    task.index, task.url, browser, http_session, task.known_page
+                )
+                links |= result.links
+                if result.retry:
+                    continue
             except Exception as e:
-                session_ctx.last_error = f"Invalid URL {initial_url} due to {e}"
-                logger.warning(session_ctx.last_error)
+                result = ScrapeResult(error=f"Failed to fetch '{task.url}': {e}")
+                logger.exception(result.error)
+                # restarted on the next attempt
+                browser.stop()
                 continue
+            finally:
+                retry_count += 1
 
-            index = len(session_ctx.visited_links)
-            logger.info(f"{index}: Visiting {initial_url}")
+            break  # success / don't retry
 
-            # Add retry mechanism with exponential backoff
-            retry_count = 0
+        result.links = links
+        return result
 
-            while retry_count < self.MAX_RETRIES:
-                if retry_count > 0:
-                    # Add a random delay between retries (exponential backoff)
-                    delay = min(2**retry_count + random.uniform(0, 1), 10)
-                    logger.info(
-                        f"Retry {retry_count}/{self.MAX_RETRIES} for {initial_url} after {delay:.2f}s delay"
+    def _process_scrape_result(
+        self,
+        session_ctx: ScrapeSessionContext,
+        frontier: CrawlFrontier,
+        task: CrawlTask,
+        result: ScrapeResult,
+        known_pages: dict[str, WebCrawlState],
+        track_crawl_state: bool,
+    ) -> None:
+        if result.error:
+            session_ctx.last_error = result.error
+
+        if result.final_url and not frontier.mark_seen(result.final_url):
+            logger.info(
+                f"{task.index}: {task.url} redirected to {result.final_url} - already indexed"
+            )
+            return
+
+        for link in result.links:
+            frontier.add(link)
+
+        now = datetime.now(timezone.utc)
+        if result.unchanged and task.known_page is not None:
+            known_page = task.known_page
+            session_ctx.num_unchanged += 1
+            if known_page.content_hash:
+                session_ctx.content_hashes.add(known_page.content_hash)
+
+            if result.content_hash is None:
+                # skipped before rendering, continue the crawl from the links found
+                # the last time the page was indexed
+                if self.recursive:
+                    with get_session_with_current_tenant() as db_session:
+                        for link in fetch_web_crawl_links(
+                            db_session, self.crawl_key, task.url
+                        ):
+                            frontier.add(link)
+                return
+
+            # rendered to find out it's unchanged, keep the new validators so that
+            # the next crawl can skip it without rendering
+            session_ctx.crawl_states.append(
+                WebCrawlState(
+                    crawl_key=self.crawl_key,
+                    url=task.url,
+                    etag=result.etag,
+                    last_modified=result.last_modified,
+                    content_hash=known_page.content_hash,
+                    links=sorted(result.links) if self.recursive else None,
+                    changed_at=known_page.changed_at,
+                    last_crawled_at=now,
+                )
+            )
+            return
+
+        if result.doc is None or result.content_hash is None:
+            return
+
+        if result.content_hash in session_ctx.content_hashes:
+            logger.info(
+                f"{task.index}: Skipping duplicate title + content for {result.doc.id}"
+            )
+            return
+        session_ctx.content_hashes.add(result.content_hash)
+
+        session_ctx.doc_batch.append(result.doc)
+
+        if not track_crawl_state:
+            return
+
+        previous = known_pages.get(task.url)
+        session_ctx.crawl_states.append(
+            WebCrawlState(
+                crawl_key=self.crawl_key,
+                url=task.url,
+                etag=result.etag,
+                last_modified=result.last_modified,
+                content_hash=result.content_hash,
+                links=sorted(result.links) if self.recursive else None,
+                changed_at=(
+                    previous.changed_at
+                    if previous is not None
+                    and previous.content_hash == result.content_hash
+                    else now
+                ),
+                last_crawled_at=now,
+            )
+        )
+
+    def _save_crawl_states(self, session_ctx: ScrapeSessionContext) -> None:
+        if not session_ctx.crawl_states:
+            return
+
+        with get_session_with_current_tenant() as db_session:
+            upsert_web_crawl_states(db_session, session_ctx.crawl_states)
+        session_ctx.crawl_states = []
+
+    def _crawl(self, poll_start: datetime | None = None) -> GenerateDocumentsOutput:
+        """Traverses through all pages found on the website and converts them into
+        documents, with up to WEB_CONNECTOR_MAX_CONCURRENCY pages in flight.
+
+        With `poll_start`, the crawl state of the pages is persisted and pages that
+        haven't changed since before `poll_start` are skipped."""
+
+        if not self.to_visit_list:
+            raise ValueError("No URLs to visit")
+
+        base_url = self.to_visit_list[0]  # For the recursive case
+        check_internet_connection(base_url)  # make sure we can connect to the base url
+
+        track_crawl_state = poll_start is not None
+        known_pages: dict[str, WebCrawlState] = {}
+        if track_crawl_state:
+            with get_session_with_current_tenant() as db_session:
+                known_pages = fetch_web_crawl_states(db_session, self.crawl_key)
+
+        session_ctx = ScrapeSessionContext(base_url)
+        frontier = CrawlFrontier(
+            WEB_CONNECTOR_MAX_CONCURRENCY_PER_HOST,
+            WEB_CONNECTOR_HOST_CRAWL_DELAY_SECONDS,
+        )
+        for url in self.to_visit_list:
+            frontier.add(url)
+
+        http_session = _build_http_session()
+        pool: CrawlerThreadPool[PlaywrightBrowser, CrawlTask, ScrapeResult] = (
+            CrawlerThreadPool(
+                WEB_CONNECTOR_MAX_CONCURRENCY,
+                state_fn=PlaywrightBrowser,
+                crawl_fn=lambda browser, task: self._scrape_with_retries(
+                    browser, http_session, task
+                ),
+                close_fn=PlaywrightBrowser.stop,
+            )
+        )
+
+        num_started = 0
+        num_in_flight = 0
+        try:
+            while frontier or num_in_flight:
+                while num_in_flight < WEB_CONNECTOR_MAX_CONCURRENCY:
+                    next_url = frontier.pop()
+                    if next_url is None:
+                        break
+
+                    num_started += 1
+                    logger.info(f"{num_started}: Visiting {next_url}")
+
+                    known_page = known_pages.get(next_url)
+                    pool.submit(
+                        CrawlTask(
+                            index=num_started,
+                            url=next_url,
+                            known_page=(
+                                known_page
+                                if poll_start is not None
+                                and known_page is not None
+                                and known_page.changed_at < poll_start
+                                else None
+                            ),
+                        )
+                    )
+                    num_in_flight += 1
+
+                # if there is room for more pages, wake up when the host crawl delay
+                # releases the next one, even if nothing finished by then
+                completed = pool.get_result(
+                    timeout=(
+                        frontier.seconds_until_ready()
+                        if num_in_flight < WEB_CONNECTOR_MAX_CONCURRENCY
+                        else None
                     )
-                    time.sleep(delay)
-
-                try:
-                    result = self._do_scrape(index, initial_url, session_ctx)
-                    if result.retry:
-                        continue
-
-                    if result.doc:
-                        session_ctx.doc_batch.append(result.doc)
-                except Exception as e:
-                    session_ctx.last_error = f"Failed to fetch '{initial_url}': {e}"
-                    logger.exception(session_ctx.last_error)
-                    session_ctx.initialize()
+                )
+                if completed is None:
                     continue
-                finally:
-                    retry_count += 1
 
-                break  # success / don't retry
+                task, result = completed
+                num_in_flight -= 1
+                frontier.done(task.url)
+                if isinstance(result, Exception):
+                    session_ctx.last_error = f"Failed to fetch '{task.url}': {result}"
+                    logger.error(session_ctx.last_error)
+                    continue
+
+                self._process_scrape_result(
+                    session_ctx, frontier, task, result, known_pages, track_crawl_state
+                )
+
+                if len(session_ctx.doc_batch) >= self.batch_size:
+                    self._save_crawl_states(session_ctx)
+                    session_ctx.at_least_one_doc = True
+                    yield session_ctx.doc_batch
+                    session_ctx.doc_batch = []
 
-            if len(session_ctx.doc_batch) >= self.batch_size:
-                session_ctx.initialize()
+            self._save_crawl_states(session_ctx)
+            if session_ctx.doc_batch:
                 session_ctx.at_least_one_doc = True
                 yield session_ctx.doc_batch
-                session_ctx.doc_batch = []
+        finally:
+            pool.shutdown()
+            http_session.close()
 
-        if session_ctx.doc_batch:
-            session_ctx.stop()
-            session_ctx.at_least_one_doc = True
-            yield session_ctx.doc_batch
+        if session_ctx.num_unchanged:
+            logger.info(
+                f"Skipped {session_ctx.num_unchanged} of {num_started} pages that "
+                f"didn't change since they were last indexed"
+            )
 
-        if not session_ctx.at_least_one_doc:
+        if not session_ctx.at_least_one_doc and not session_ctx.num_unchanged:
             if session_ctx.last_error:
                 raise RuntimeError(session_ctx.last_error)
             raise RuntimeError("No valid pages found.")
 
-        session_ctx.stop()
+    def load_from_state(self) -> GenerateDocumentsOutput:
+        """Traverses through all pages found on the website
+        and converts them into documents"""
+        yield from self._crawl()
+
+    def poll_source(
+        self, start: SecondsSinceUnixEpoch, end: SecondsSinceUnixEpoch
+    ) -> GenerateDocumentsOutput:
+        """Crawls the whole website, but only returns the pages that changed since
+        `start`. Unchanged pages are found with conditional requests against the
+        crawl state saved by previous polls."""
+        yield from self._crawl(
+            poll_start=datetime.fromtimestamp(start, tz=timezone.utc)
+        )
 
     def validate_connector_settings(self) -> None:
         # Make sure we have at least one valid URL to check
@@ -0,0 +1,166 @@
+"""Scheduling for the concurrent crawl of the web connector, see WebConnector._crawl"""
+
+import contextvars
+import queue
+import threading
+import time
+from collections import Counter
+from collections import deque
+from collections.abc import Callable
+from typing import Generic
+from typing import TypeVar
+from urllib.parse import urlparse
+
+S = TypeVar("S")
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class CrawlFrontier:
+    """URLs waiting to be crawled, queued per host. A URL is only handed out if its
+    host has fewer than `max_per_host` requests in flight and at least
+    `host_delay_seconds` passed since the last request to that host started.
+
+    Every URL is crawled at most once, URLs that were seen before are ignored."""
+
+    def __init__(self, max_per_host: int, host_delay_seconds: float = 0) -> None:
+        self._max_per_host = max(max_per_host, 1)
+        self._host_delay_seconds = host_delay_seconds
+
+        self._seen: set[str] = set()
+        self._queues: dict[str, deque[str]] = {}
+        self._in_flight: Counter[str] = Counter()
+        self._next_start: dict[str, float] = {}
+        self._num_queued = 0
+
+    def __len__(self) -> int:
+        return self._num_queued
+
+    def mark_seen(self, url: str) -> bool:
+        """Returns False if the url was already seen."""
+        if url in self._seen:
+            return False
+        self._seen.add(url)
+        return True
+
+    def add(self, url: str) -> None:
+        if not self.mark_seen(url):
+            return
+        self._queues.setdefault(urlparse(url).netloc, deque()).append(url)
+        self._num_queued += 1
+
+    def pop(self) -> str | None:
+        """The next URL that can be crawled right now, if any. Hosts take turns,
+        within a host the most recently found URL goes first (depth first, like
+        the sequential crawl). The URL counts as in flight until `done`."""
+        now = time.monotonic()
+        for host, host_queue in self._queues.items():
+            if self._in_flight[host] >= self._max_per_host:
+                continue
+            if self._next_start.get(host, 0) > now:
+                continue
+
+            url = host_queue.pop()
+            # move the host to the back of the line
+            del self._queues[host]
+            if host_queue:
+                self._queues[host] = host_queue
+
+            self._num_queued -= 1
+            self._in_flight[host] += 1
+            self._next_start[host] = now + self._host_delay_seconds
+            return url
+
+        return None
+
+    def done(self, url: str) -> None:
+        self._in_flight[urlparse(url).netloc] -= 1
+
+    def seconds_until_ready(self) -> float | None:
+        """Time until a queued URL is released by the host crawl delay. None if
+        nothing is waiting on the delay, only on requests in flight."""
+        now = time.monotonic()
+        waits = [
+            self._next_start.get(host, 0) - now
+            for host in self._queues
+            if self._in_flight[host] < self._max_per_host
+        ]
+        if not waits:
+            return None
+        return max(min(waits), 0)
+
+
+class CrawlerThreadPool(Generic[S, T, R]):
+    """Runs `crawl_fn` on a fixed set of threads. Each thread makes its own state
+    with `state_fn` (e.g. a browser, which can't be shared between threads) and
+    cleans it up with `close_fn`, both on that thread."""
+
+    def __init__(
+        self,
+        num_threads: int,
+        state_fn: Callable[[], S],
+        crawl_fn: Callable[[S, T], R],
+        close_fn: Callable[[S], None],
+    ) -> None:
+        self._state_fn = state_fn
+        self._crawl_fn = crawl_fn
+        self._close_fn = close_fn
+
+        self._tasks: queue.Queue[tuple[T] | None] = queue.Queue()
+        self._results: queue.Queue[tuple[T, R | Exception]] = queue.Queue()
+        self._threads = [
+            threading.Thread(
+                # keep contextvars like the tenant id for the crawler threads
+                target=contextvars.copy_context().run,
+                args=(self._run,),
+                name=f"web_crawler_{i}",
+                daemon=True,
+            )
+            for i in range(max(num_threads, 1))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _run(self) -> None:
+        state = self._state_fn()
+        try:
+            while True:
+                item = self._tasks.get()
+                if item is None:
+                    return
+
+                task = item[0]
+                result: R | Exception
+                try:
+                    result = self._crawl_fn(state, task)
+                except Exception as e:
+                    result = e
+                self._results.put((task, result))
+        finally:
+            self._close_fn(state)
+
+    def submit(self, task: T) -> None:
+        self._tasks.put((task,))
+
+    def get_result(
+        self, timeout: float | None = None
+    ) -> tuple[T, R | Exception] | None:
+        """Waits for the next finished task, None if `timeout` passed first."""
+        try:
+            return self._results.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def shutdown(self, timeout: float = 60) -> None:
+        """Drops tasks that haven't started and waits for the threads to finish
+        their current task and clean up."""
+        while True:
+            try:
+                self._tasks.get_nowait()
+            except queue.Empty:
+                break
+
+        for _ in self._threads:
+            self._tasks.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
@@ -1,10 +1,16 @@
+import hashlib
 import string
 from collections.abc import Callable
+from typing import cast
 
 import nltk  # type:ignore
 from sqlalchemy.orm import Session
 
 from onyx.agents.agent_search.shared_graph_utils.models import QueryExpansionType
+from onyx.configs.model_configs import QUERY_EMBEDDING_CACHE_MAX_ENTRIES
+from onyx.configs.model_configs import QUERY_EMBEDDING_CACHE_TTL_SECONDS
+from onyx.configs.model_configs import QUERY_EMBEDDING_MODEL_CACHE_MAX_ENTRIES
+from onyx.configs.model_configs import QUERY_EMBEDDING_MODEL_CACHE_TTL_SECONDS
 from onyx.context.search.enums import SearchType
 from onyx.context.search.models import ChunkMetric
 from onyx.context.search.models import IndexFilters
@@ -18,6 +24,7 @@ from onyx.context.search.postprocessing.postprocessing import cleanup_chunks
 from onyx.context.search.preprocessing.preprocessing import HYBRID_ALPHA
 from onyx.context.search.preprocessing.preprocessing import HYBRID_ALPHA_KEYWORD
 from onyx.context.search.utils import inference_section_from_chunks
+from onyx.db.models import SearchSettings
 from onyx.db.search_settings import get_current_search_settings
 from onyx.db.search_settings import get_multilingual_expansion
 from onyx.document_index.interfaces import DocumentIndex
@@ -33,13 +40,26 @@ from onyx.utils.threadpool_concurrency import run_in_background
 from onyx.utils.threadpool_concurrency import TimeoutThread
 from onyx.utils.threadpool_concurrency import wait_on_background
 from onyx.utils.timing import log_function_time
+from onyx.utils.ttl_cache import TTLCache
 from shared_configs.configs import MODEL_SERVER_HOST
 from shared_configs.configs import MODEL_SERVER_PORT
+from shared_configs.contextvars import get_current_tenant_id
 from shared_configs.enums import EmbedTextType
 from shared_configs.model_server_models import Embedding
 
 logger = setup_logger()
 
+# keyed by (query embedding model key, normalized query)
+_QUERY_EMBEDDINGS: TTLCache[tuple[tuple, str], Embedding] = TTLCache(
+    max_entries=QUERY_EMBEDDING_CACHE_MAX_ENTRIES,
+    ttl_seconds=QUERY_EMBEDDING_CACHE_TTL_SECONDS,
+)
+# one model (and tokenizer) per tenant + search settings, rebuilt if they change
+_QUERY_EMBEDDING_MODELS: TTLCache[tuple, EmbeddingModel] = TTLCache(
+    max_entries=QUERY_EMBEDDING_MODEL_CACHE_MAX_ENTRIES,
+    ttl_seconds=QUERY_EMBEDDING_MODEL_CACHE_TTL_SECONDS,
+)
+
 
 def _dedupe_chunks(
     chunks: list[InferenceChunkUncleaned],
@@ -115,32 +135,74 @@ def combine_retrieval_results(
     return sorted_chunks
 
 
-def get_query_embedding(query: str, db_session: Session) -> Embedding:
-    search_settings = get_current_search_settings(db_session)
+def _normalize_query(query: str) -> str:
+    return " ".join(query.split())
+
 
-    model = EmbeddingModel.from_db_model(
-        search_settings=search_settings,
-        # The below are globally set, this flow always uses the indexing one
-        server_host=MODEL_SERVER_HOST,
-        server_port=MODEL_SERVER_PORT,
+def _query_embedding_model_key(search_settings: SearchSettings) -> tuple:
+    # the search settings row can be edited in place (e.g. a rotated api key or
+    # a different model), so key on everything the model is built from rather
+    # than just the id. The api key is hashed so it isn't kept around in cache keys
+    api_key_hash = (
+        hashlib.sha256(search_settings.api_key.encode()).hexdigest()[:16]
+        if search_settings.api_key
+        else None
+    )
+    return (
+        get_current_tenant_id(),
+        search_settings.id,
+        search_settings.model_name,
+        search_settings.normalize,
+        search_settings.query_prefix,
+        search_settings.provider_type,
+        api_key_hash,
+        search_settings.api_url,
+        search_settings.api_version,
+        search_settings.deployment_name,
+        search_settings.reduced_dimension,
     )
 
-    query_embedding = model.encode([query], text_type=EmbedTextType.QUERY)[0]
-    return query_embedding
+
+def _get_query_embedding_model(search_settings: SearchSettings) -> EmbeddingModel:
+    model_key = _query_embedding_model_key(search_settings)
+    model = _QUERY_EMBEDDING_MODELS.get(model_key)
+    if model is None:
+        model = EmbeddingModel.from_db_model(
+            search_settings=search_settings,
+            # The below are globally set, this flow always uses the indexing one
+            server_host=MODEL_SERVER_HOST,
+            server_port=MODEL_SERVER_PORT,
+        )
+        _QUERY_EMBEDDING_MODELS.set(model_key, model)
+
+    return model
 
 
 def get_query_embeddings(queries: list[str], db_session: Session) -> list[Embedding]:
     search_settings = get_current_search_settings(db_session)
+    model_key = _query_embedding_model_key(search_settings)
 
-    model = EmbeddingModel.from_db_model(
-        search_settings=search_settings,
-        # The below are globally set, this flow always uses the indexing one
-        server_host=MODEL_SERVER_HOST,
-        server_port=MODEL_SERVER_PORT,
+    cache_keys = [(model_key, _normalize_query(query)) for query in queries]
+    embeddings = [_QUERY_EMBEDDINGS.get(cache_key) for cache_key in cache_keys]
+
+    missing_indices = [i for i, embedding in enumerate(embeddings) if embedding is None]
+    if missing_indices:
+        model = _get_query_embedding_model(search_settings)
+        new_embeddings = model.encode(
+            [queries[i] for i in missing_indices], text_type=EmbedTextType.QUERY
+        )
+        for i, embedding in zip(missing_indices, new_embeddings):
+            _QUERY_EMBEDDINGS.set(cache_keys[i], embedding)
+            embeddings[i] = embedding
+
+    logger.debug(
+        f"Query embedding cache: {len(queries) - len(missing_indices)}/{len(queries)} hits"
     )
+    return cast(list[Embedding], embeddings)
+
 
-    query_embedding = model.encode(queries, text_type=EmbedTextType.QUERY)
-    return query_embedding
+def get_query_embedding(query: str, db_session: Session) -> Embedding:
+    return get_query_embeddings([query], db_session)[0]
 
 
 @log_function_time(print_only=True)
@@ -26,6 +26,7 @@ from onyx.agents.agent_search.shared_graph_utils.models import (
 from onyx.auth.schemas import UserRole
 from onyx.chat.models import DocumentRelevance
 from onyx.configs.chat_configs import HARD_DELETE_CHATS
+from onyx.configs.chat_configs import TOKEN_USAGE_COUNTERS_ENABLED
 from onyx.configs.constants import DocumentSource
 from onyx.configs.constants import MessageType
 from onyx.context.search.models import InferenceSection
@@ -45,9 +46,11 @@ from onyx.db.models import SearchDoc
 from onyx.db.models import SearchDoc as DBSearchDoc
 from onyx.db.models import ToolCall
 from onyx.db.models import User
+from onyx.db.models import User__UserGroup
 from onyx.db.models import UserFile
 from onyx.db.persona import get_best_persona_id_for_user
 from onyx.db.pg_file_store import delete_lobj_by_name
+from onyx.db.token_limit import any_rate_limit_exists
 from onyx.file_store.models import FileDescriptor
 from onyx.file_store.models import InMemoryChatFile
 from onyx.llm.override_models import LLMOverride
@@ -55,6 +58,7 @@ from onyx.llm.override_models import PromptOverride
 from onyx.server.query_and_chat.models import ChatMessageDetail
 from onyx.server.query_and_chat.models import SubQueryDetail
 from onyx.server.query_and_chat.models import SubQuestionDetail
+from onyx.server.query_and_chat.token_usage import record_token_usage
 from onyx.tools.tool_runner import ToolCallFinalResult
 from onyx.utils.logger import setup_logger
 from onyx.utils.special_types import JSON_ro
@@ -655,6 +659,8 @@ def create_new_chat_message(
         if existing_message is None:
             raise ValueError(f"No message found with id {reserved_message_id}")
 
+        # reserved messages are saved with the real token count once answered
+        counted_token_count = existing_message.token_count
         existing_message.chat_session_id = chat_session_id
         existing_message.parent_message = parent_message.id
         existing_message.message = message
@@ -672,6 +678,7 @@ def create_new_chat_message(
         existing_message.is_agentic = is_agentic
         new_chat_message = existing_message
     else:
+        counted_token_count = 0
         # Create new message
         new_chat_message = ChatMessage(
             chat_session_id=chat_session_id,
@@ -704,9 +711,40 @@ def create_new_chat_message(
     if commit:
         db_session.commit()
 
+    _record_chat_message_token_usage(
+        chat_session_id, token_count - counted_token_count, db_session
+    )
+
     return new_chat_message
 
 
+def _record_chat_message_token_usage(
+    chat_session_id: UUID, token_count: int, db_session: Session
+) -> None:
+    """Counts the tokens for the token rate limits of the session's user and their
+    user groups. Skipped while no rate limit is enabled, the buckets of a rate limit
+    enabled later are built from Postgres."""
+    if (
+        not TOKEN_USAGE_COUNTERS_ENABLED
+        or token_count <= 0
+        or not any_rate_limit_exists()
+    ):
+        return
+
+    chat_session = db_session.get(ChatSession, chat_session_id)
+    user_id = chat_session.user_id if chat_session else None
+    user_group_ids: list[int] = []
+    if user_id is not None:
+        user_group_ids = list(
+            db_session.scalars(
+                select(User__UserGroup.user_group_id).where(
+                    User__UserGroup.user_id == user_id
+                )
+            ).all()
+        )
+    record_token_usage(token_count, user_id, user_group_ids)
+
+
 def set_as_latest_chat_message(
     chat_message: ChatMessage,
     user_id: UUID | None,
@@ -21,6 +21,9 @@ from onyx.db.credentials import fetch_credential_by_id_for_user
 from onyx.db.engine import get_session_context_manager
 from onyx.db.enums import AccessType
 from onyx.db.enums import ConnectorCredentialPairStatus
+from onyx.db.kg_allowed_docs import (
+    invalidate_kg_allowed_documents_for_cc_pair__no_commit,
+)
 from onyx.db.models import Connector
 from onyx.db.models import ConnectorCredentialPair
 from onyx.db.models import Credential
@@ -335,6 +338,13 @@ def _update_connector_credential_pair(
     if net_docs is not None:
         cc_pair.total_docs_indexed += net_docs
     if status is not None:
+        # the KG allowed documents only depend on whether the cc pair is deleting
+        if (status == ConnectorCredentialPairStatus.DELETING) != (
+            cc_pair.status == ConnectorCredentialPairStatus.DELETING
+        ):
+            invalidate_kg_allowed_documents_for_cc_pair__no_commit(
+                db_session, cc_pair.id
+            )
         cc_pair.status = status
     if cc_pair.is_user_file:
         cc_pair.status = ConnectorCredentialPairStatus.PAUSED
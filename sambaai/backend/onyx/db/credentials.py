@@ -15,6 +15,9 @@ from onyx.connectors.google_utils.shared_constants import (
     DB_CREDENTIALS_DICT_SERVICE_ACCOUNT_KEY,
 )
 from onyx.db.enums import ConnectorCredentialPairStatus
+from onyx.db.kg_allowed_docs import (
+    invalidate_kg_allowed_documents_for_cc_pair__no_commit,
+)
 from onyx.db.models import ConnectorCredentialPair
 from onyx.db.models import Credential
 from onyx.db.models import Credential__UserGroup
@@ -230,6 +233,9 @@ def swap_credentials_connector(
             f"New credential source {new_credential.source} does not match connector source {existing_pair.connector.source}"
         )
 
+    # the documents move from the owner of the old credential to the new one
+    invalidate_kg_allowed_documents_for_cc_pair__no_commit(db_session, existing_pair.id)
+
     db_session.execute(
         update(DocumentByConnectorCredentialPair)
         .where(
@@ -245,6 +251,7 @@ def swap_credentials_connector(
     # Update the existing pair with the new credential
     existing_pair.credential_id = new_credential_id
     existing_pair.credential = new_credential
+    invalidate_kg_allowed_documents_for_cc_pair__no_commit(db_session, existing_pair.id)
 
     # Update ccpair status if it's in INVALID state
     if existing_pair.status == ConnectorCredentialPairStatus.INVALID:
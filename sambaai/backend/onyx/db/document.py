@@ -226,6 +226,26 @@ def get_documents_for_connector_credential_pair(
     return db_session.scalars(stmt).all()
 
 
+def stream_document_ids_for_connector_credential_pair(
+    db_session: Session,
+    connector_id: int,
+    credential_id: int,
+    batch_size: int = 10_000,
+) -> Generator[str, None, None]:
+    """Ids of the documents of the cc pair, sorted by code point (the "C" collation)
+    like Python sorts strings, so they can be merged with sorted ids from elsewhere.
+    The ids are streamed from a server side cursor."""
+    stmt = (
+        select(DocumentByConnectorCredentialPair.id)
+        .where(
+            DocumentByConnectorCredentialPair.connector_id == connector_id,
+            DocumentByConnectorCredentialPair.credential_id == credential_id,
+        )
+        .order_by(DocumentByConnectorCredentialPair.id.collate("C"))
+    )
+    yield from db_session.scalars(stmt).yield_per(batch_size)
+
+
 def get_documents_by_ids(
     db_session: Session,
     document_ids: list[str],
@@ -557,6 +577,16 @@ def mark_document_as_synced(document_id: str, db_session: Session) -> None:
     db_session.commit()
 
 
+def mark_documents_as_synced(document_ids: list[str], db_session: Session) -> None:
+    stmt = (
+        update(DbDocument)
+        .where(DbDocument.id.in_(document_ids))
+        .values(last_synced=datetime.now(timezone.utc))
+    )
+    db_session.execute(stmt)
+    db_session.commit()
+
+
 def delete_document_by_connector_credential_pair__no_commit(
     db_session: Session,
     document_id: str,
@@ -1,10 +1,14 @@
 import uuid
 from datetime import datetime
 from datetime import timezone
+from typing import Any
 from typing import List
 
+from sqlalchemy import func
 from sqlalchemy import select
+from sqlalchemy import String
 from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 
@@ -16,6 +20,7 @@ from onyx.db.models import KGEntityType
 from onyx.kg.models import KGGroundingType
 from onyx.kg.models import KGStage
 from onyx.kg.utils.formatting_utils import make_entity_id
+from shared_configs.configs import POSTGRES_DEFAULT_SCHEMA_STANDARD_VALUE
 
 
 def upsert_staging_entity(
@@ -298,3 +303,53 @@ def get_entity_name(db_session: Session, entity_id_name: str) -> str | None:
         db_session.query(KGEntity).filter(KGEntity.id_name == entity_id_name).first()
     )
     return entity.name if entity else None
+
+
+def get_entity_type_versions(
+    db_session: Session, entity_types: list[str]
+) -> dict[str, tuple[int, datetime | None]]:
+    """Get the number of entities and the latest update time per entity type. Any
+    insert, update or delete of an entity changes the version of its type."""
+    rows = db_session.execute(
+        select(
+            KGEntity.entity_type_id_name,
+            func.count(KGEntity.id_name),
+            func.max(KGEntity.time_updated),
+        )
+        .where(KGEntity.entity_type_id_name.in_(entity_types))
+        .group_by(KGEntity.entity_type_id_name)
+    ).all()
+    return {entity_type: (count, updated) for entity_type, count, updated in rows}
+
+
+def get_entity_names_by_types(
+    db_session: Session, entity_types: list[str]
+) -> list[tuple[str, str, str, list[str], str | None, Any]]:
+    """Get (entity type, id_name, name, name trigrams, document id, subtype
+    attribute) for all entities of the given types that have name trigrams."""
+    rows = db_session.execute(
+        select(
+            KGEntity.entity_type_id_name,
+            KGEntity.id_name,
+            KGEntity.name,
+            KGEntity.name_trigrams,
+            KGEntity.document_id,
+            KGEntity.attributes["subtype"],
+        ).where(
+            KGEntity.entity_type_id_name.in_(entity_types),
+            KGEntity.name_trigrams.is_not(None),
+        )
+    ).all()
+    return [tuple(row) for row in rows]  # type: ignore
+
+
+def get_name_trigrams(db_session: Session, names: list[str]) -> list[list[str]]:
+    """Get the trigrams of each name, computed the same way as KGEntity.name_trigrams
+    (pg_trgm's show_trgm), in a single query."""
+    if not names:
+        return []
+    show_trgm = getattr(func, POSTGRES_DEFAULT_SCHEMA_STANDARD_VALUE).show_trgm
+    row = db_session.execute(
+        select(*[show_trgm(name).cast(ARRAY(String(3))) for name in names])
+    ).one()
+    return [list(trigrams) for trigrams in row]
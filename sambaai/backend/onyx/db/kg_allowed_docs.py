@@ -0,0 +1,293 @@
+from collections.abc import Collection
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from uuid import UUID
+
+from sqlalchemy import delete
+from sqlalchemy import exists
+from sqlalchemy import select
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from onyx.configs.kg_configs import KG_ALLOWED_DOCS_REFRESH_INTERVAL_SECONDS
+from onyx.db.models import ConnectorCredentialPair
+from onyx.db.models import Credential
+from onyx.db.models import KGEntity
+from onyx.db.models import KGUserAllowedDocument
+from onyx.db.models import KGUserAllowedDocumentsRefresh
+from onyx.db.models import User
+from onyx.db.models import User__ExternalUserGroupId
+from onyx.db.models import User__UserGroup
+from onyx.db.models import UserGroup__ConnectorCredentialPair
+from onyx.utils.logger import setup_logger
+
+logger = setup_logger()
+
+# KG documents (documents with entities) the user has access to
+_ALLOWED_KG_DOCS_QUERY = """
+    WITH kg_used_docs AS (
+        SELECT document_id as kg_used_doc_id
+        FROM kg_entity d
+        WHERE document_id IS NOT NULL
+    ),
+
+    public_docs AS (
+        SELECT d.id as allowed_doc_id
+        FROM document d
+        INNER JOIN kg_used_docs kud ON kud.kg_used_doc_id = d.id
+        WHERE d.is_public
+    ),
+    user_owned_docs AS (
+        SELECT d.id as allowed_doc_id
+        FROM document_by_connector_credential_pair d
+        JOIN credential c ON d.credential_id = c.id
+        JOIN connector_credential_pair ccp ON
+            d.connector_id = ccp.connector_id AND
+            d.credential_id = ccp.credential_id
+        JOIN "user" u ON c.user_id = u.id
+        INNER JOIN kg_used_docs kud ON kud.kg_used_doc_id = d.id
+        WHERE ccp.status != 'DELETING'
+        AND ccp.access_type != 'SYNC'
+        AND u.email = :user_email
+    ),
+    user_group_accessible_docs AS (
+        SELECT d.id as allowed_doc_id
+        FROM document_by_connector_credential_pair d
+        JOIN connector_credential_pair ccp ON
+            d.connector_id = ccp.connector_id AND
+            d.credential_id = ccp.credential_id
+        JOIN user_group__connector_credential_pair ugccp ON
+            ccp.id = ugccp.cc_pair_id
+        JOIN user__user_group uug ON
+            uug.user_group_id = ugccp.user_group_id
+        JOIN "user" u ON uug.user_id = u.id
+        INNER JOIN kg_used_docs kud ON kud.kg_used_doc_id = d.id
+        WHERE kud.kg_used_doc_id IS NOT NULL
+        AND ccp.status != 'DELETING'
+        AND ccp.access_type != 'SYNC'
+        AND u.email = :user_email
+    ),
+    external_user_docs AS (
+        SELECT d.id as allowed_doc_id
+        FROM document d
+        INNER JOIN kg_used_docs kud ON kud.kg_used_doc_id = d.id
+        WHERE kud.kg_used_doc_id IS NOT NULL
+        AND :user_email = ANY(external_user_emails)
+    ),
+    external_group_docs AS (
+        SELECT d.id as allowed_doc_id
+        FROM document d
+        INNER JOIN kg_used_docs kud ON kud.kg_used_doc_id = d.id
+        JOIN user__external_user_group_id ueg ON ueg.external_user_group_id = ANY(d.external_user_group_ids)
+        JOIN "user" u ON ueg.user_id = u.id
+        WHERE kud.kg_used_doc_id IS NOT NULL
+        AND u.email = :user_email
+    )
+    SELECT DISTINCT allowed_doc_id FROM (
+        SELECT allowed_doc_id FROM public_docs
+        UNION
+        SELECT allowed_doc_id FROM user_owned_docs
+        UNION
+        SELECT allowed_doc_id FROM user_group_accessible_docs
+        UNION
+        SELECT allowed_doc_id FROM external_user_docs
+        UNION
+        SELECT allowed_doc_id FROM external_group_docs
+    ) combined_docs
+"""
+
+_INSERT_BATCH_SIZE = 5000
+
+
+def compute_allowed_kg_doc_ids(db_session: Session, user_email: str) -> set[str]:
+    """Evaluates the ACLs of all KG documents for the user. Expensive, use the
+    materialized set (refresh_kg_allowed_documents) for queries."""
+    return set(
+        db_session.execute(
+            text(_ALLOWED_KG_DOCS_QUERY), {"user_email": user_email}
+        ).scalars()
+    )
+
+
+def refresh_kg_allowed_documents(
+    db_session: Session,
+    user_email: str,
+    max_age: timedelta = timedelta(seconds=KG_ALLOWED_DOCS_REFRESH_INTERVAL_SECONDS),
+) -> bool:
+    """Brings the user's rows in kg_user_allowed_document up to date if they were
+    invalidated or are older than `max_age`. Only the difference to the stored set is
+    written. Returns whether a refresh was needed. Commits."""
+    now = datetime.now(timezone.utc)
+    refreshed_at = db_session.scalar(
+        select(KGUserAllowedDocumentsRefresh.refreshed_at).where(
+            KGUserAllowedDocumentsRefresh.user_email == user_email
+        )
+    )
+    if refreshed_at is not None and now - refreshed_at < max_age:
+        return False
+
+    allowed_doc_ids = compute_allowed_kg_doc_ids(db_session, user_email)
+    stored_doc_ids = set(
+        db_session.scalars(
+            select(KGUserAllowedDocument.document_id).where(
+                KGUserAllowedDocument.user_email == user_email
+            )
+        )
+    )
+
+    removed_doc_ids = list(stored_doc_ids - allowed_doc_ids)
+    added_doc_ids = list(allowed_doc_ids - stored_doc_ids)
+    for i in range(0, len(removed_doc_ids), _INSERT_BATCH_SIZE):
+        db_session.execute(
+            delete(KGUserAllowedDocument).where(
+                KGUserAllowedDocument.user_email == user_email,
+                KGUserAllowedDocument.document_id.in_(
+                    removed_doc_ids[i : i + _INSERT_BATCH_SIZE]
+                ),
+            )
+        )
+    for i in range(0, len(added_doc_ids), _INSERT_BATCH_SIZE):
+        db_session.execute(
+            insert(KGUserAllowedDocument).values(
+                [
+                    {"user_email": user_email, "document_id": document_id}
+                    for document_id in added_doc_ids[i : i + _INSERT_BATCH_SIZE]
+                ]
+            )
+            # a concurrent refresh for the same user may have added them already
+            .on_conflict_do_nothing()
+        )
+
+    db_session.execute(
+        insert(KGUserAllowedDocumentsRefresh)
+        .values(user_email=user_email, refreshed_at=now)
+        .on_conflict_do_update(
+            index_elements=[KGUserAllowedDocumentsRefresh.user_email],
+            set_={"refreshed_at": now},
+        )
+    )
+    db_session.commit()
+
+    logger.debug(
+        f"Refreshed KG allowed documents for {user_email}: "
+        f"total={len(allowed_doc_ids)} added={len(added_doc_ids)} "
+        f"removed={len(removed_doc_ids)}"
+    )
+    return True
+
+
+def invalidate_kg_allowed_documents__no_commit(db_session: Session) -> None:
+    """Forces a refresh of the allowed documents of all users on their next KG query.
+    For changes that only affect some users (group memberships, a single document or
+    cc pair) use the scoped variants below."""
+    db_session.execute(delete(KGUserAllowedDocumentsRefresh))
+
+
+def _invalidate_users__no_commit(db_session: Session, user_emails: set[str]) -> None:
+    if not user_emails:
+        return
+
+    db_session.execute(
+        delete(KGUserAllowedDocumentsRefresh).where(
+            KGUserAllowedDocumentsRefresh.user_email.in_(user_emails)
+        )
+    )
+
+
+def invalidate_kg_allowed_documents_for_users__no_commit(
+    db_session: Session, user_ids: Collection[UUID]
+) -> None:
+    """Call when the users' group memberships changed, or when a user group's cc pairs
+    changed (with the group's members)."""
+    if not user_ids:
+        return
+
+    _invalidate_users__no_commit(
+        db_session,
+        set(
+            db_session.scalars(
+                select(User.email).where(User.id.in_(user_ids))  # type: ignore
+            )
+        ),
+    )
+
+
+def invalidate_kg_allowed_documents_for_document__no_commit(
+    db_session: Session,
+    document_id: str,
+    is_public: bool,
+    external_user_emails: Collection[str],
+    external_user_group_ids: Collection[str],
+) -> None:
+    """Call after the ACL of a single document changed, with its new ACL. Only the
+    users who currently have the document and the users the new ACL grants it to
+    are refreshed. Documents without KG entities are never in the allowed sets."""
+    is_kg_document = db_session.scalar(
+        select(exists().where(KGEntity.document_id == document_id))
+    )
+    if not is_kg_document:
+        return
+
+    if is_public:
+        invalidate_kg_allowed_documents__no_commit(db_session)
+        return
+
+    user_emails = set(
+        db_session.scalars(
+            select(KGUserAllowedDocument.user_email).where(
+                KGUserAllowedDocument.document_id == document_id
+            )
+        )
+    )
+    user_emails.update(external_user_emails)
+    if external_user_group_ids:
+        user_emails.update(
+            db_session.scalars(
+                select(User.email)  # type: ignore
+                .join(
+                    User__ExternalUserGroupId,
+                    User__ExternalUserGroupId.user_id == User.id,
+                )
+                .where(
+                    User__ExternalUserGroupId.external_user_group_id.in_(
+                        external_user_group_ids
+                    )
+                )
+            )
+        )
+    _invalidate_users__no_commit(db_session, user_emails)
+
+
+def invalidate_kg_allowed_documents_for_cc_pair__no_commit(
+    db_session: Session, cc_pair_id: int
+) -> None:
+    """Call when a change to the cc pair itself (status, access type) changes who can
+    see its documents through it. Only the owner of its credential and the members
+    of its user groups are refreshed, access through external permissions does not
+    depend on the cc pair."""
+    user_emails = set(
+        db_session.scalars(
+            select(User.email)  # type: ignore
+            .join(Credential, Credential.user_id == User.id)
+            .join(
+                ConnectorCredentialPair,
+                ConnectorCredentialPair.credential_id == Credential.id,
+            )
+            .where(ConnectorCredentialPair.id == cc_pair_id)
+        )
+    )
+    user_emails.update(
+        db_session.scalars(
+            select(User.email)  # type: ignore
+            .join(User__UserGroup, User__UserGroup.user_id == User.id)
+            .join(
+                UserGroup__ConnectorCredentialPair,
+                UserGroup__ConnectorCredentialPair.user_group_id
+                == User__UserGroup.user_group_id,
+            )
+            .where(UserGroup__ConnectorCredentialPair.cc_pair_id == cc_pair_id)
+        )
+    )
+    _invalidate_users__no_commit(db_session, user_emails)
@@ -1,3 +1,8 @@
+import threading
+
+from sqlalchemy import column
+from sqlalchemy import select
+from sqlalchemy import table
 from sqlalchemy import text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import Session
@@ -8,6 +13,8 @@ from onyx.configs.kg_configs import KG_TEMP_ALLOWED_DOCS_VIEW_NAME_PREFIX
 from onyx.configs.kg_configs import KG_TEMP_KG_ENTITIES_VIEW_NAME_PREFIX
 from onyx.configs.kg_configs import KG_TEMP_KG_RELATIONSHIPS_VIEW_NAME_PREFIX
 from onyx.db.engine import get_session_with_current_tenant
+from onyx.db.kg_allowed_docs import refresh_kg_allowed_documents
+from shared_configs.contextvars import get_current_tenant_id
 
 
 Base = declarative_base()
@@ -22,7 +29,24 @@ def get_user_view_names(user_email: str) -> KGViewNames:
     )
 
 
-# First, create the view definition
+# views known to exist with their current definition, (tenant, view name)
+_CREATED_VIEWS: set[tuple[str, str]] = set()
+_CREATED_VIEWS_LOCK = threading.Lock()
+
+
+def _views_exist(db_session: Session, view_names: list[str]) -> bool:
+    # a catalog lookup, unlike CREATE OR REPLACE this doesn't write to the catalog
+    return bool(
+        db_session.execute(
+            text(
+                "SELECT bool_and(to_regclass(view_name) IS NOT NULL) "
+                "FROM unnest(CAST(:view_names AS text[])) AS view_name"
+            ),
+            {"view_names": view_names},
+        ).scalar()
+    )
+
+
 def create_views(
     db_session: Session,
     user_email: str,
@@ -30,80 +54,32 @@ def create_views(
     kg_relationships_view_name: str,
     kg_entity_view_name: str,
 ) -> None:
+    """Makes sure the user's KG views exist and their allowed documents are up to date.
+
+    The views filter on the user's rows of the materialized kg_user_allowed_document
+    table (see onyx/db/kg_allowed_docs.py), so they don't change between queries.
+    They are created once per process and user instead of on every query, and the
+    ACL joins only run when the user's allowed documents are refreshed."""
+    refresh_kg_allowed_documents(db_session, user_email)
+
+    tenant_id = get_current_tenant_id()
+    view_names = [
+        allowed_docs_view_name,
+        kg_relationships_view_name,
+        kg_entity_view_name,
+    ]
+    with _CREATED_VIEWS_LOCK:
+        created = all((tenant_id, name) in _CREATED_VIEWS for name in view_names)
+    if created and _views_exist(db_session, view_names):
+        return
 
     # Create ALLOWED_DOCS view
     allowed_docs_view = text(
         f"""
     CREATE OR REPLACE VIEW {allowed_docs_view_name} AS
-    WITH kg_used_docs AS (
-        SELECT document_id as kg_used_doc_id
-        FROM kg_entity d
-        WHERE document_id IS NOT NULL
-    ),
-
-    public_docs AS (
-        SELECT d.id as allowed_doc_id
-        FROM document d
-        INNER JOIN kg_used_docs kud ON kud.kg_used_doc_id = d.id
-        WHERE d.is_public
-    ),
-    user_owned_docs AS (
-        SELECT d.id as allowed_doc_id
-        FROM document_by_connector_credential_pair d
-        JOIN credential c ON d.credential_id = c.id
-        JOIN connector_credential_pair ccp ON
-            d.connector_id = ccp.connector_id AND
-            d.credential_id = ccp.credential_id
-        JOIN "user" u ON c.user_id = u.id
-        INNER JOIN kg_used_docs kud ON kud.kg_used_doc_id = d.id
-        WHERE ccp.status != 'DELETING'
-        AND ccp.access_type != 'SYNC'
-        AND u.email = :user_email
-    ),
-    user_group_accessible_docs AS (
-        SELECT d.id as allowed_doc_id
-        FROM document_by_connector_credential_pair d
-        JOIN connector_credential_pair ccp ON
-            d.connector_id = ccp.connector_id AND
-            d.credential_id = ccp.credential_id
-        JOIN user_group__connector_credential_pair ugccp ON
-            ccp.id = ugccp.cc_pair_id
-        JOIN user__user_group uug ON
-            uug.user_group_id = ugccp.user_group_id
-        JOIN "user" u ON uug.user_id = u.id
-        INNER JOIN kg_used_docs kud ON kud.kg_used_doc_id = d.id
-        WHERE kud.kg_used_doc_id IS NOT NULL
-        AND ccp.status != 'DELETING'
-        AND ccp.access_type != 'SYNC'
-        AND u.email = :user_email
-    ),
-    external_user_docs AS (
-        SELECT d.id as allowed_doc_id
-        FROM document d
-        INNER JOIN kg_used_docs kud ON kud.kg_used_doc_id = d.id
-        WHERE kud.kg_used_doc_id IS NOT NULL
-        AND :user_email = ANY(external_user_emails)
-    ),
-    external_group_docs AS (
-        SELECT d.id as allowed_doc_id
-        FROM document d
-        INNER JOIN kg_used_docs kud ON kud.kg_used_doc_id = d.id
-        JOIN user__external_user_group_id ueg ON ueg.external_user_group_id = ANY(d.external_user_group_ids)
-        JOIN "user" u ON ueg.user_id = u.id
-        WHERE kud.kg_used_doc_id IS NOT NULL
-        AND u.email = :user_email
-    )
-    SELECT DISTINCT allowed_doc_id FROM (
-        SELECT allowed_doc_id FROM public_docs
-        UNION
-        SELECT allowed_doc_id FROM user_owned_docs
-        UNION
-        SELECT allowed_doc_id FROM user_group_accessible_docs
-        UNION
-        SELECT allowed_doc_id FROM external_user_docs
-        UNION
-        SELECT allowed_doc_id FROM external_group_docs
-    ) combined_docs
+    SELECT document_id as allowed_doc_id
+    FROM kg_user_allowed_document
+    WHERE user_email = :user_email
     """
     ).bindparams(user_email=user_email)
 
@@ -161,6 +137,9 @@ def create_views(
 
     db_session.commit()
 
+    with _CREATED_VIEWS_LOCK:
+        _CREATED_VIEWS.update((tenant_id, name) for name in view_names)
+
     return None
 
 
@@ -170,7 +149,8 @@ def drop_views(
     kg_entity_view_name: str | None = None,
 ) -> None:
     """
-    Drops the temporary views created by create_views.
+    Drops the views created by create_views. They are kept between queries, so this
+    is only needed for cleanup.
 
     Args:
         db_session: SQLAlchemy session
@@ -203,4 +183,23 @@ def drop_views(
             db_drop_session.execute(drop_allowed_docs)
 
         db_drop_session.commit()
+
+    with _CREATED_VIEWS_LOCK:
+        _CREATED_VIEWS.difference_update(
+            (get_current_tenant_id(), name)
+            for name in [
+                allowed_docs_view_name,
+                kg_relationships_view_name,
+                kg_entity_view_name,
+            ]
+            if name
+        )
     return None
+
+
+def get_allowed_doc_ids(db_session: Session, allowed_docs_view_name: str) -> set[str]:
+    """Get the ids of all documents in the user's allowed docs view."""
+    allowed_docs_view = table(allowed_docs_view_name, column("allowed_doc_id"))
+    return set(
+        db_session.execute(select(allowed_docs_view.c.allowed_doc_id)).scalars().all()
+    )
@@ -1227,6 +1227,30 @@ class KGTerm(Base):
     )
 
 
+class KGUserAllowedDocument(Base):
+    """The KG documents a user has access to, materialized so that KG queries don't
+    evaluate the ACL joins on every statement. See onyx/db/kg_allowed_docs.py."""
+
+    __tablename__ = "kg_user_allowed_document"
+
+    user_email: Mapped[str] = mapped_column(String, primary_key=True)
+    document_id: Mapped[str] = mapped_column(
+        ForeignKey("document.id", ondelete="CASCADE"), primary_key=True, index=True
+    )
+
+
+class KGUserAllowedDocumentsRefresh(Base):
+    """When the allowed documents of a user were last refreshed. Rows are deleted to
+    force a refresh, e.g. when group memberships or document ACLs change."""
+
+    __tablename__ = "kg_user_allowed_documents_refresh"
+
+    user_email: Mapped[str] = mapped_column(String, primary_key=True)
+    refreshed_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False
+    )
+
+
 class ChunkStats(Base):
     __tablename__ = "chunk_stats"
     # NOTE: if more sensitive data is added here for display, make sure to add user/group permission
@@ -2700,6 +2724,34 @@ class PGFileStore(Base):
     lobj_oid: Mapped[int] = mapped_column(Integer, nullable=False)
 
 
+class WebCrawlState(Base):
+    """What the web connector saw the last time it indexed a page. Used to make
+    conditional requests on re-crawl and skip pages that haven't changed."""
+
+    __tablename__ = "web_crawl_state"
+
+    # identifies the web connector config (type + base url) the page was crawled for
+    crawl_key: Mapped[str] = mapped_column(String, primary_key=True)
+    url: Mapped[str] = mapped_column(String, primary_key=True)
+
+    etag: Mapped[str | None] = mapped_column(String, nullable=True)
+    last_modified: Mapped[str | None] = mapped_column(String, nullable=True)
+    content_hash: Mapped[str | None] = mapped_column(String, nullable=True)
+    # internal links found on the page, so a recursive crawl can continue past
+    # pages that are skipped. Null for non-recursive crawls.
+    links: Mapped[list[str] | None] = mapped_column(
+        postgresql.ARRAY(String), nullable=True
+    )
+
+    # when the current version of the page (content_hash) was first seen
+    changed_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False
+    )
+    last_crawled_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False
+    )
+
+
 class AgentSearchMetrics(Base):
     __tablename__ = "agent__search_metrics"
 
@@ -3,6 +3,8 @@ from io import BytesIO
 from typing import IO
 
 from psycopg2.extensions import connection
+from sqlalchemy import func
+from sqlalchemy import LargeBinary
 from sqlalchemy.orm import Session
 from sqlalchemy.sql import and_
 from sqlalchemy.sql import select
@@ -41,6 +43,25 @@ def get_pgfilestore_by_file_name(
     return pgfilestore
 
 
+def read_pgfilestores_with_content(
+    file_names: list[str],
+    db_session: Session,
+) -> list[tuple[PGFileStore, bytes]]:
+    """Loads the files and the contents of their large objects in a single query.
+    Only meant for small files (e.g. images), everything is read into memory.
+    Files that don't exist are skipped."""
+    if not file_names:
+        return []
+
+    stmt = select(
+        PGFileStore, func.lo_get(PGFileStore.lobj_oid, type_=LargeBinary)
+    ).where(PGFileStore.file_name.in_(file_names))
+    return [
+        (pgfilestore, bytes(content))
+        for pgfilestore, content in db_session.execute(stmt).tuples()
+    ]
+
+
 def delete_pgfilestore_by_file_name(
     file_name: str,
     db_session: Session,
@@ -1,12 +1,17 @@
 from collections.abc import Sequence
+from functools import lru_cache
 
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from onyx.configs.constants import TokenRateLimitScope
+from onyx.db.engine import get_session_context_manager
 from onyx.db.models import TokenRateLimit
 from onyx.db.models import TokenRateLimit__UserGroup
 from onyx.server.token_rate_limits.models import TokenRateLimitArgs
+from onyx.utils.logger import setup_logger
+
+logger = setup_logger()
 
 
 def fetch_all_user_token_rate_limits(
@@ -109,3 +114,19 @@ def delete_token_rate_limit(
 
     db_session.delete(token_limit)
     db_session.commit()
+
+
+@lru_cache()
+def any_rate_limit_exists() -> bool:
+    """Checks if any rate limit exists in the database. Is cached, so that if no rate limits
+    are setup, we don't have any effect on average query latency."""
+    logger.debug("Checking for any rate limits...")
+    with get_session_context_manager() as db_session:
+        return (
+            db_session.scalar(
+                select(TokenRateLimit.id).where(
+                    TokenRateLimit.enabled == True  # noqa: E712
+                )
+            )
+            is not None
+        )
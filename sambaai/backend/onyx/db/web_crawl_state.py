@@ -0,0 +1,66 @@
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import defer
+from sqlalchemy.orm import Session
+
+from onyx.db.models import WebCrawlState
+
+
+def fetch_web_crawl_states(
+    db_session: Session, crawl_key: str
+) -> dict[str, WebCrawlState]:
+    """All known pages of a crawl by url. `links` is not loaded, it can be large
+    and is only needed for the pages that end up being skipped, see
+    `fetch_web_crawl_links`."""
+    stmt = (
+        select(WebCrawlState)
+        .where(WebCrawlState.crawl_key == crawl_key)
+        .options(defer(WebCrawlState.links))
+    )
+    return {state.url: state for state in db_session.scalars(stmt)}
+
+
+def fetch_web_crawl_links(db_session: Session, crawl_key: str, url: str) -> list[str]:
+    stmt = select(WebCrawlState.links).where(
+        WebCrawlState.crawl_key == crawl_key, WebCrawlState.url == url
+    )
+    return db_session.scalar(stmt) or []
+
+
+def upsert_web_crawl_states(
+    db_session: Session, crawl_states: list[WebCrawlState]
+) -> None:
+    if not crawl_states:
+        return
+
+    insert_stmt = insert(WebCrawlState).values(
+        [
+            {
+                "crawl_key": state.crawl_key,
+                "url": state.url,
+                "etag": state.etag,
+                "last_modified": state.last_modified,
+                "content_hash": state.content_hash,
+                "links": state.links,
+                "changed_at": state.changed_at,
+                "last_crawled_at": state.last_crawled_at,
+            }
+            # the same url can be reached twice in a batch (e.g. via redirects)
+            for state in {
+                (state.crawl_key, state.url): state for state in crawl_states
+            }.values()
+        ]
+    )
+    on_conflict_stmt = insert_stmt.on_conflict_do_update(
+        index_elements=["crawl_key", "url"],
+        set_={
+            "etag": insert_stmt.excluded.etag,
+            "last_modified": insert_stmt.excluded.last_modified,
+            "content_hash": insert_stmt.excluded.content_hash,
+            "links": insert_stmt.excluded.links,
+            "changed_at": insert_stmt.excluded.changed_at,
+            "last_crawled_at": insert_stmt.excluded.last_crawled_at,
+        },
+    )
+    db_session.execute(on_conflict_stmt)
+    db_session.commit()
@@ -0,0 +1,259 @@
+"""Streaming writer for the Vespa document/v1 API.
+
+Vespa has no bulk endpoint for document/v1, every put / delete is its own request.
+Instead of one blocking request per chunk from a thread pool, the streaming feed
+keeps up to `max_in_flight` requests open at once on a single event loop and lets
+HTTP/2 multiplex them over a handful of connections (this is what Vespa's own feed
+client does). See scripts/benchmarks/vespa_feed.py for a comparison with the per
+chunk path."""
+
+import asyncio
+import json
+import time
+from collections.abc import Sequence
+from types import TracebackType
+from typing import Any
+from typing import cast
+from typing import Literal
+from uuid import UUID
+
+import httpx
+from pydantic import BaseModel
+
+from onyx.configs.app_configs import MANAGED_VESPA
+from onyx.configs.app_configs import VESPA_CLOUD_CERT_PATH
+from onyx.configs.app_configs import VESPA_CLOUD_KEY_PATH
+from onyx.configs.app_configs import VESPA_FEED_MAX_CONNECTIONS
+from onyx.configs.app_configs import VESPA_FEED_MAX_IN_FLIGHT
+from onyx.configs.app_configs import VESPA_REQUEST_TIMEOUT
+from onyx.document_index.document_index_utils import get_uuid_from_chunk
+from onyx.document_index.vespa.indexing_utils import build_vespa_chunk_fields
+from onyx.document_index.vespa_constants import DOCUMENT_ID_ENDPOINT
+from onyx.indexing.models import DocMetadataAwareIndexChunk
+from onyx.utils.logger import setup_logger
+
+logger = setup_logger()
+
+# statuses worth retrying, everything else fails the operation right away
+_RETRYABLE_STATUS_CODES = {429, 502, 503, 504}
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+class VespaFeedOperation(BaseModel):
+    method: Literal["POST", "DELETE"]
+    url: str
+    document_id: str | None = None
+    body: bytes | None = None
+
+
+class VespaFeedStats(BaseModel):
+    puts: int = 0
+    deletes: int = 0
+    bytes_sent: int = 0
+    elapsed_seconds: float = 0.0
+
+    @property
+    def operations_per_second(self) -> float:
+        if self.elapsed_seconds <= 0:
+            return 0.0
+        return (self.puts + self.deletes) / self.elapsed_seconds
+
+    @property
+    def bytes_per_second(self) -> float:
+        if self.elapsed_seconds <= 0:
+            return 0.0
+        return self.bytes_sent / self.elapsed_seconds
+
+    def __add__(self, other: "VespaFeedStats") -> "VespaFeedStats":
+        return VespaFeedStats(
+            puts=self.puts + other.puts,
+            deletes=self.deletes + other.deletes,
+            bytes_sent=self.bytes_sent + other.bytes_sent,
+            elapsed_seconds=self.elapsed_seconds + other.elapsed_seconds,
+        )
+
+    def __str__(self) -> str:
+        return (
+            f"puts={self.puts} deletes={self.deletes} "
+            f"elapsed={self.elapsed_seconds:.2f}s "
+            f"ops/s={self.operations_per_second:.1f} "
+            f"MB/s={self.bytes_per_second / 1_000_000:.2f}"
+        )
+
+
+def build_put_operation(
+    chunk: DocMetadataAwareIndexChunk, index_name: str, multitenant: bool
+) -> VespaFeedOperation:
+    vespa_chunk_id = str(get_uuid_from_chunk(chunk))
+    return VespaFeedOperation(
+        method="POST",
+        url=f"{DOCUMENT_ID_ENDPOINT.format(index_name=index_name)}/{vespa_chunk_id}",
+        document_id=chunk.source_document.id,
+        body=json.dumps(
+            {"fields": build_vespa_chunk_fields(chunk, multitenant)}
+        ).encode(),
+    )
+
+
+def build_delete_operation(doc_chunk_id: UUID, index_name: str) -> VespaFeedOperation:
+    return VespaFeedOperation(
+        method="DELETE",
+        url=f"{DOCUMENT_ID_ENDPOINT.format(index_name=index_name)}/{doc_chunk_id}",
+    )
+
+
+def _get_feed_client_kwargs() -> dict[str, Any]:
+    return dict(
+        cert=(
+            cast(tuple[str, str], (VESPA_CLOUD_CERT_PATH, VESPA_CLOUD_KEY_PATH))
+            if MANAGED_VESPA
+            else None
+        ),
+        verify=False if not MANAGED_VESPA else True,
+        timeout=VESPA_REQUEST_TIMEOUT,
+        http2=True,
+        # Managed Vespa negotiates HTTP/2 over TLS. Self-hosted Vespa is plain http,
+        # where HTTP/2 needs prior knowledge (h2c), which Vespa supports. Falling
+        # back to HTTP/1.1 would need one connection per request in flight.
+        http1=MANAGED_VESPA,
+        limits=httpx.Limits(max_connections=VESPA_FEED_MAX_CONNECTIONS),
+    )
+
+
+async def _send_operation(
+    client: httpx.AsyncClient,
+    operation: VespaFeedOperation,
+    semaphore: asyncio.Semaphore,
+    tries: int,
+    delay: float,
+    backoff: float,
+) -> None:
+    async with semaphore:
+        for attempt in range(tries):
+            try:
+                response = await client.request(
+                    operation.method,
+                    operation.url,
+                    content=operation.body,
+                    headers=_JSON_HEADERS if operation.body is not None else None,
+                )
+                response.raise_for_status()
+                return
+            except httpx.HTTPError as e:
+                retryable = not isinstance(e, httpx.HTTPStatusError) or (
+                    e.response.status_code in _RETRYABLE_STATUS_CODES
+                )
+                if not retryable or attempt == tries - 1:
+                    details = (
+                        e.response.text if isinstance(e, httpx.HTTPStatusError) else e
+                    )
+                    logger.error(
+                        f"Vespa feed {operation.method} failed for "
+                        f"'{operation.document_id or operation.url}': {details}"
+                    )
+                    raise
+            await asyncio.sleep(delay)
+            delay *= backoff
+
+
+async def _feed(
+    operations: Sequence[VespaFeedOperation],
+    max_in_flight: int,
+    client: httpx.AsyncClient,
+    tries: int,
+    delay: float,
+    backoff: float,
+) -> None:
+    semaphore = asyncio.Semaphore(max_in_flight)
+    tasks = [
+        asyncio.create_task(
+            _send_operation(client, operation, semaphore, tries, delay, backoff)
+        )
+        for operation in operations
+    ]
+    try:
+        # fail fast like the per chunk path, the first error is raised
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class VespaFeeder:
+    """Feeds operations to Vespa from sync code. All feeds of one feeder run on the
+    same event loop and share one HTTP/2 client, so consecutive feeds (e.g. the
+    deletes and then the puts of an index call) reuse the connections. Use it as a
+    context manager, `close` shuts down the client (unless it was passed in) and
+    the event loop."""
+
+    def __init__(
+        self,
+        max_in_flight: int = VESPA_FEED_MAX_IN_FLIGHT,
+        client: httpx.AsyncClient | None = None,
+    ) -> None:
+        self.max_in_flight = max_in_flight
+        self._client = client
+        self._owns_client = client is None
+        self._runner = asyncio.Runner()
+
+    def feed(
+        self,
+        operations: Sequence[VespaFeedOperation],
+        tries: int = 5,
+        delay: float = 1,
+        backoff: float = 2,
+    ) -> VespaFeedStats:
+        """Sends all operations with at most `max_in_flight` outstanding requests
+        and returns the throughput of the feed. Raises the first error once retries
+        are exhausted, in which case some operations may already have been
+        applied."""
+        stats = VespaFeedStats(
+            puts=sum(1 for operation in operations if operation.method == "POST"),
+            deletes=sum(1 for operation in operations if operation.method == "DELETE"),
+            bytes_sent=sum(len(operation.body or b"") for operation in operations),
+        )
+        if not operations:
+            return stats
+
+        if self._client is None:
+            self._client = httpx.AsyncClient(**_get_feed_client_kwargs())
+
+        start = time.monotonic()
+        self._runner.run(
+            _feed(operations, self.max_in_flight, self._client, tries, delay, backoff)
+        )
+        stats.elapsed_seconds = time.monotonic() - start
+        return stats
+
+    def close(self) -> None:
+        try:
+            if self._owns_client and self._client is not None:
+                self._runner.run(self._client.aclose())
+        finally:
+            self._client = None
+            self._runner.close()
+
+    def __enter__(self) -> "VespaFeeder":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+
+def feed_vespa_operations(
+    operations: Sequence[VespaFeedOperation],
+    max_in_flight: int = VESPA_FEED_MAX_IN_FLIGHT,
+    client: httpx.AsyncClient | None = None,
+    tries: int = 5,
+    delay: float = 1,
+    backoff: float = 2,
+) -> VespaFeedStats:
+    """Single feed on a VespaFeeder of its own, see `VespaFeeder.feed`."""
+    with VespaFeeder(max_in_flight=max_in_flight, client=client) as feeder:
+        return feeder.feed(operations, tries=tries, delay=delay, backoff=backoff)
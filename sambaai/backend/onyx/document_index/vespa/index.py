@@ -22,11 +22,13 @@ from pydantic import BaseModel
 from retry import retry
 
 from onyx.agents.agent_search.shared_graph_utils.models import QueryExpansionType
+from onyx.configs.app_configs import VESPA_FEED_MODE
 from onyx.configs.chat_configs import DOC_TIME_DECAY
 from onyx.configs.chat_configs import NUM_RETURNED_HITS
 from onyx.configs.chat_configs import TITLE_CONTENT_RATIO
 from onyx.configs.chat_configs import VESPA_SEARCHER_THREADS
 from onyx.configs.constants import KV_REINDEX_KEY
+from onyx.configs.constants import VespaFeedMode
 from onyx.context.search.models import IndexFilters
 from onyx.context.search.models import InferenceChunkUncleaned
 from onyx.db.enums import EmbeddingPrecision
@@ -47,6 +49,9 @@ from onyx.document_index.vespa.chunk_retrieval import (
 )
 from onyx.document_index.vespa.chunk_retrieval import query_vespa
 from onyx.document_index.vespa.deletion import delete_vespa_chunks
+from onyx.document_index.vespa.feed import build_delete_operation
+from onyx.document_index.vespa.feed import build_put_operation
+from onyx.document_index.vespa.feed import VespaFeeder
 from onyx.document_index.vespa.indexing_utils import BaseHTTPXClientContext
 from onyx.document_index.vespa.indexing_utils import batch_index_vespa_chunks
 from onyx.document_index.vespa.indexing_utils import check_for_final_chunk_existence
@@ -463,16 +468,23 @@ class VespaIndex(DocumentIndex):
             # documents that have `chunk_count` in the database, but not for
             # `old_version` documents.
 
-            enriched_doc_infos: list[EnrichedDocumentIndexingInfo] = [
-                VespaIndex.enrich_basic_chunk_info(
-                    index_name=self.index_name,
-                    http_client=http_client,
-                    document_id=doc_id,
-                    previous_chunk_count=doc_id_to_previous_chunk_cnt.get(doc_id, 0),
-                    new_chunk_count=doc_id_to_new_chunk_cnt.get(doc_id, 0),
+            # the lookups for `old_version` documents probe Vespa chunk by chunk,
+            # so run them in parallel
+            doc_ids = list(doc_id_to_new_chunk_cnt.keys())
+            enriched_doc_infos: list[EnrichedDocumentIndexingInfo] = list(
+                executor.map(
+                    lambda doc_id: VespaIndex.enrich_basic_chunk_info(
+                        index_name=self.index_name,
+                        http_client=http_client,
+                        document_id=doc_id,
+                        previous_chunk_count=doc_id_to_previous_chunk_cnt.get(
+                            doc_id, 0
+                        ),
+                        new_chunk_count=doc_id_to_new_chunk_cnt.get(doc_id, 0),
+                    ),
+                    doc_ids,
                 )
-                for doc_id in doc_id_to_new_chunk_cnt.keys()
-            ]
+            )
 
             for cleaned_doc_info in enriched_doc_infos:
                 # If the document has previously indexed chunks, we know it previously existed
@@ -487,22 +499,52 @@ class VespaIndex(DocumentIndex):
                 large_chunks_enabled=large_chunks_enabled,
             )
 
-            # Delete old Vespa documents
-            for doc_chunk_ids_batch in batch_generator(chunks_to_delete, BATCH_SIZE):
-                delete_vespa_chunks(
-                    doc_chunk_ids=doc_chunk_ids_batch,
-                    index_name=self.index_name,
-                    http_client=http_client,
-                    executor=executor,
-                )
+            start = time.monotonic()
+            if VESPA_FEED_MODE == VespaFeedMode.STREAMING:
+                # deletes go out first, same as in the per chunk path
+                with VespaFeeder() as feeder:
+                    feed_stats = feeder.feed(
+                        [
+                            build_delete_operation(doc_chunk_id, self.index_name)
+                            for doc_chunk_id in chunks_to_delete
+                        ],
+                        tries=10,
+                    ) + feeder.feed(
+                        [
+                            build_put_operation(
+                                chunk, self.index_name, self.multitenant
+                            )
+                            for chunk in cleaned_chunks
+                        ]
+                    )
+                logger.info(f"Vespa streaming feed: {feed_stats}")
+            else:
+                # Delete old Vespa documents
+                for doc_chunk_ids_batch in batch_generator(
+                    chunks_to_delete, BATCH_SIZE
+                ):
+                    delete_vespa_chunks(
+                        doc_chunk_ids=doc_chunk_ids_batch,
+                        index_name=self.index_name,
+                        http_client=http_client,
+                        executor=executor,
+                    )
 
-            for chunk_batch in batch_generator(cleaned_chunks, BATCH_SIZE):
-                batch_index_vespa_chunks(
-                    chunks=chunk_batch,
-                    index_name=self.index_name,
-                    http_client=http_client,
-                    multitenant=self.multitenant,
-                    executor=executor,
+                for chunk_batch in batch_generator(cleaned_chunks, BATCH_SIZE):
+                    batch_index_vespa_chunks(
+                        chunks=chunk_batch,
+                        index_name=self.index_name,
+                        http_client=http_client,
+                        multitenant=self.multitenant,
+                        executor=executor,
+                    )
+
+                elapsed = time.monotonic() - start
+                num_ops = len(cleaned_chunks) + len(chunks_to_delete)
+                logger.info(
+                    f"Vespa per chunk feed: puts={len(cleaned_chunks)} "
+                    f"deletes={len(chunks_to_delete)} elapsed={elapsed:.2f}s "
+                    f"ops/s={num_ops / max(elapsed, 1e-9):.1f}"
                 )
 
         all_cleaned_doc_ids = {chunk.source_document.id for chunk in cleaned_chunks}
@@ -1,18 +1,35 @@
 import re
 import time
+from collections.abc import Generator
+from contextlib import contextmanager
+from typing import Any
 from typing import cast
 
 import httpx
+from prometheus_client import Histogram
 
 from onyx.configs.app_configs import MANAGED_VESPA
 from onyx.configs.app_configs import VESPA_CLOUD_CERT_PATH
 from onyx.configs.app_configs import VESPA_CLOUD_KEY_PATH
+from onyx.configs.app_configs import VESPA_QUERY_KEEPALIVE_EXPIRY
+from onyx.configs.app_configs import VESPA_QUERY_MAX_CONNECTIONS
+from onyx.configs.app_configs import VESPA_QUERY_MAX_KEEPALIVE_CONNECTIONS
 from onyx.configs.app_configs import VESPA_REQUEST_TIMEOUT
 from onyx.document_index.vespa_constants import VESPA_APP_CONTAINER_URL
+from onyx.httpx.httpx_pool import HttpxPool
 from onyx.utils.logger import setup_logger
 
 logger = setup_logger()
 
+VESPA_QUERY_HTTPX_POOL_NAME = "vespa_query"
+
+vespa_request_latency = Histogram(
+    "onyx_vespa_request_latency_seconds",
+    "Latency of requests to Vespa by endpoint",
+    ["endpoint"],  # search | visit | ...
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
 # NOTE: This does not seem to be used in reality despite the Vespa Docs pointing to this code
 # See here for reference: https://docs.vespa.ai/en/documents.html
 # https://github.com/vespa-engine/vespa/blob/master/vespajlib/src/main/java/com/yahoo/text/Text.java
@@ -80,6 +97,47 @@ def get_vespa_http_client(no_timeout: bool = False, http2: bool = True) -> httpx
     )
 
 
+def _vespa_query_client_kwargs() -> dict[str, Any]:
+    return dict(
+        cert=(
+            cast(tuple[str, str], (VESPA_CLOUD_CERT_PATH, VESPA_CLOUD_KEY_PATH))
+            if MANAGED_VESPA
+            else None
+        ),
+        verify=False if not MANAGED_VESPA else True,
+        timeout=VESPA_REQUEST_TIMEOUT,
+        http2=True,
+        limits=httpx.Limits(
+            max_connections=VESPA_QUERY_MAX_CONNECTIONS,
+            max_keepalive_connections=VESPA_QUERY_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=VESPA_QUERY_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+def get_vespa_query_http_client() -> httpx.Client:
+    """
+    Shared, pooled HTTP client for the Vespa search / retrieval paths. Unlike
+    `get_vespa_http_client`, this client is long lived and must NOT be closed
+    by the caller.
+    """
+    return HttpxPool.get_or_init(
+        VESPA_QUERY_HTTPX_POOL_NAME, **_vespa_query_client_kwargs()
+    )
+
+
+@contextmanager
+def observe_vespa_latency(endpoint: str) -> Generator[None, None, None]:
+    """Records the duration of the wrapped Vespa request, failed requests included."""
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        vespa_request_latency.labels(endpoint=endpoint).observe(
+            time.monotonic() - start
+        )
+
+
 def wait_for_vespa_with_timeout(wait_interval: int = 5, wait_limit: int = 60) -> bool:
     """Waits for Vespa to become ready subject to a timeout.
     Returns True if Vespa is ready, False otherwise."""
@@ -1,3 +1,4 @@
+import os
 import threading
 from typing import Any
 
@@ -5,10 +6,15 @@ import httpx
 
 
 class HttpxPool:
-    """Class to manage a global httpx Client instance"""
+    """Class to manage global httpx Client instances.
+
+    Clients are per process: after a fork the child drops the clients inherited
+    from the parent (without closing them, the sockets still belong to the parent)
+    and lazily creates its own."""
 
     _clients: dict[str, httpx.Client] = {}
     _lock: threading.Lock = threading.Lock()
+    _pid: int = os.getpid()
 
     # Default parameters for creation
     DEFAULT_KWARGS = {
@@ -19,16 +25,30 @@ class HttpxPool:
     def __init__(self) -> None:
         pass
 
+    @classmethod
+    def _merge_kwargs(cls, **kwargs: Any) -> dict[str, Any]:
+        merged_kwargs = {**cls.DEFAULT_KWARGS, **kwargs}
+        if callable(merged_kwargs["limits"]):
+            merged_kwargs["limits"] = merged_kwargs["limits"]()
+        return merged_kwargs
+
     @classmethod
     def _init_client(cls, **kwargs: Any) -> httpx.Client:
         """Private helper method to create and return an httpx.Client."""
-        merged_kwargs = {**cls.DEFAULT_KWARGS, **kwargs}
-        return httpx.Client(**merged_kwargs)
+        return httpx.Client(**cls._merge_kwargs(**kwargs))
+
+    @classmethod
+    def _reset_after_fork(cls) -> None:
+        """Must be called with the lock held."""
+        if cls._pid != os.getpid():
+            cls._clients = {}
+            cls._pid = os.getpid()
 
     @classmethod
     def init_client(cls, name: str, **kwargs: Any) -> None:
         """Allow the caller to init the client with extra params."""
         with cls._lock:
+            cls._reset_after_fork()
             if name not in cls._clients:
                 cls._clients[name] = cls._init_client(**kwargs)
 
@@ -36,6 +56,7 @@ class HttpxPool:
     def close_client(cls, name: str) -> None:
         """Allow the caller to close the client."""
         with cls._lock:
+            cls._reset_after_fork()
             client = cls._clients.pop(name, None)
             if client:
                 client.close()
@@ -44,6 +65,7 @@ class HttpxPool:
     def close_all(cls) -> None:
         """Close all registered clients."""
         with cls._lock:
+            cls._reset_after_fork()
             for client in cls._clients.values():
                 client.close()
             cls._clients.clear()
@@ -52,6 +74,16 @@ class HttpxPool:
     def get(cls, name: str) -> httpx.Client:
         """Gets the httpx.Client. Will init to default settings if not init'd."""
         with cls._lock:
+            cls._reset_after_fork()
             if name not in cls._clients:
                 cls._clients[name] = cls._init_client()
             return cls._clients[name]
+
+    @classmethod
+    def get_or_init(cls, name: str, **kwargs: Any) -> httpx.Client:
+        """Gets the httpx.Client, creating it with the given params if not init'd."""
+        with cls._lock:
+            cls._reset_after_fork()
+            if name not in cls._clients:
+                cls._clients[name] = cls._init_client(**kwargs)
+            return cls._clients[name]
@@ -0,0 +1,174 @@
+import hashlib
+import time
+from typing import cast
+from typing import Self
+
+from prometheus_client import Counter
+from redis.client import Redis
+
+from onyx.configs.app_configs import CONTEXTUAL_RAG_SUMMARY_CACHE_MAX_ENTRIES
+from onyx.configs.app_configs import CONTEXTUAL_RAG_SUMMARY_CACHE_TTL_SECONDS
+from onyx.llm.interfaces import LLM
+from onyx.redis.redis_pool import get_raw_redis_client
+from onyx.utils.logger import setup_logger
+from shared_configs.contextvars import get_current_tenant_id
+
+logger = setup_logger()
+
+CONTEXTUAL_SUMMARY_CACHE_KEY_PREFIX = "contextual_rag_summary"
+
+# Bump whenever the way summaries are generated changes in a way that isn't
+# captured by the prompt text itself (e.g. max_tokens or post-processing)
+CONTEXTUAL_SUMMARY_PROMPT_VERSION = "1"
+
+contextual_summary_cache_lookups = Counter(
+    "onyx_contextual_summary_cache_lookups_total",
+    "Contextual RAG summary cache lookups",
+    ["result"],  # hit | miss
+)
+
+
+class ContextualSummaryCache:
+    """Cache of LLM generated contextual RAG summaries (document summaries and
+    chunk contexts).
+
+    Entries are keyed by the LLM (provider + model), the prompt version and a hash
+    of the exact prompt sent to the LLM, so a hit is interchangeable with a fresh
+    LLM call. Lookups are done in one Redis round trip per document, new summaries
+    are buffered and written in a single pipeline by `flush`.
+
+    Entries expire after `ttl_seconds` without being used. On top of that every
+    tenant has an index (sorted by last use) that caps the number of entries at
+    `max_entries`, evicting the least recently used ones. Redis failures are logged
+    and treated as misses, the cache never fails indexing.
+
+    Subclasses can cache other LLM generations by overriding the class attributes
+    below, see ImageSummaryCache."""
+
+    cache_name = CONTEXTUAL_SUMMARY_CACHE_KEY_PREFIX
+    prompt_version = CONTEXTUAL_SUMMARY_PROMPT_VERSION
+    lookups_counter = contextual_summary_cache_lookups
+
+    def __init__(
+        self,
+        model_provider: str,
+        model_name: str,
+        tenant_id: str | None = None,
+        redis_client: Redis | None = None,
+        ttl_seconds: int = CONTEXTUAL_RAG_SUMMARY_CACHE_TTL_SECONDS,
+        max_entries: int = CONTEXTUAL_RAG_SUMMARY_CACHE_MAX_ENTRIES,
+    ) -> None:
+        namespace = hashlib.sha256(
+            "\x1f".join([model_provider, model_name, self.prompt_version]).encode()
+        ).hexdigest()
+
+        self.tenant_id = tenant_id or get_current_tenant_id()
+        self.key_prefix = f"{self.tenant_id}:{self.cache_name}:{namespace[:32]}:"
+        self.index_key = f"{self.tenant_id}:{self.cache_name}_index"
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._redis_client = redis_client
+        self._pending: dict[str, str] = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def for_llm(cls, llm: LLM, tenant_id: str | None = None) -> Self:
+        return cls(
+            model_provider=llm.config.model_provider,
+            model_name=llm.config.model_name,
+            tenant_id=tenant_id,
+        )
+
+    @property
+    def redis_client(self) -> Redis:
+        # keys are already tenant prefixed and the prefixing client does not
+        # handle pipelines, so go through the raw client
+        if self._redis_client is None:
+            self._redis_client = get_raw_redis_client()
+        return self._redis_client
+
+    def build_key(self, prompt: str) -> str:
+        return self.key_prefix + hashlib.sha256(prompt.encode()).hexdigest()
+
+    def get_many(self, prompts: list[str]) -> list[str | None]:
+        """Returns the cached summary for each prompt, or None where missing."""
+        if not prompts:
+            return []
+
+        keys = [self.build_key(prompt) for prompt in prompts]
+        summaries: list[str | None] = [self._pending.get(key) for key in keys]
+        remote_indices = [i for i, summary in enumerate(summaries) if summary is None]
+
+        if remote_indices:
+            try:
+                now = time.time()
+                pipe = self.redis_client.pipeline(transaction=False)
+                for i in remote_indices:
+                    # GETEX refreshes the expiry so summaries that are still in use stay
+                    pipe.getex(keys[i], ex=self.ttl_seconds)
+                results = pipe.execute()
+
+                pipe = self.redis_client.pipeline(transaction=False)
+                found_keys: dict[str, float] = {}
+                for i, raw in zip(remote_indices, results):
+                    if raw is None:
+                        continue
+                    summaries[i] = raw.decode() if isinstance(raw, bytes) else raw
+                    found_keys[keys[i]] = now
+                if found_keys:
+                    pipe.zadd(self.index_key, found_keys)
+                    pipe.execute()
+            except Exception:
+                logger.exception(f"Failed to read from the {self.cache_name} cache")
+
+        num_hits = sum(1 for summary in summaries if summary is not None)
+        num_misses = len(summaries) - num_hits
+        self.hits += num_hits
+        self.misses += num_misses
+        self.lookups_counter.labels(result="hit").inc(num_hits)
+        self.lookups_counter.labels(result="miss").inc(num_misses)
+
+        return summaries
+
+    def add(self, prompt: str, summary: str) -> None:
+        """Buffers a freshly generated summary, written out on the next `flush`."""
+        if not summary:
+            # don't pin empty/failed generations, retry them next time
+            return
+        self._pending[self.build_key(prompt)] = summary
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+
+        pending = self._pending
+        self._pending = {}
+        now = time.time()
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for key, summary in pending.items():
+                pipe.set(key, summary, ex=self.ttl_seconds)
+            pipe.zadd(self.index_key, {key: now for key in pending})
+            # drop index entries whose keys have already expired
+            pipe.zremrangebyscore(self.index_key, "-inf", now - self.ttl_seconds)
+            pipe.zcard(self.index_key)
+            num_entries = pipe.execute()[-1]
+
+            if self.max_entries > 0 and num_entries > self.max_entries:
+                evicted = cast(
+                    list[tuple[bytes, float]],
+                    self.redis_client.zpopmin(
+                        self.index_key, num_entries - self.max_entries
+                    ),
+                )
+                evicted_keys = [key for key, _ in evicted]
+                if evicted_keys:
+                    self.redis_client.delete(*evicted_keys)
+                    logger.info(
+                        f"Evicted {len(evicted_keys)} {self.cache_name} entries "
+                        f"for tenant {self.tenant_id}"
+                    )
+        except Exception:
+            logger.exception(f"Failed to write to the {self.cache_name} cache")
@@ -0,0 +1,282 @@
+import hashlib
+import random
+import threading
+import time
+from collections.abc import Callable
+from typing import TypeVar
+
+from prometheus_client import Counter
+from redis.client import Redis
+
+from onyx.configs.app_configs import IMAGE_SUMMARIZATION_MAX_WORKERS
+from onyx.configs.app_configs import IMAGE_SUMMARIZATION_RATE_LIMIT_RETRIES
+from onyx.configs.app_configs import IMAGE_SUMMARIZATION_SYSTEM_PROMPT
+from onyx.configs.app_configs import IMAGE_SUMMARIZATION_USER_PROMPT
+from onyx.configs.app_configs import IMAGE_SUMMARY_CACHE_MAX_ENTRIES
+from onyx.configs.app_configs import IMAGE_SUMMARY_CACHE_TTL_SECONDS
+from onyx.db.engine import get_session_with_current_tenant
+from onyx.db.pg_file_store import read_pgfilestores_with_content
+from onyx.file_processing.image_summarization import (
+    summarize_image_with_error_handling,
+)
+from onyx.indexing.contextual_summary_cache import ContextualSummaryCache
+from onyx.llm.chat_llm import LLMRateLimitError
+from onyx.llm.interfaces import LLM
+from onyx.utils.logger import setup_logger
+from onyx.utils.threadpool_concurrency import run_functions_tuples_in_parallel
+
+logger = setup_logger()
+
+R = TypeVar("R")
+
+IMAGE_SUMMARY_CACHE_KEY_PREFIX = "image_summary"
+
+# Bump whenever the way image summaries are generated changes in a way that isn't
+# captured by the prompt text itself
+IMAGE_SUMMARY_PROMPT_VERSION = "1"
+
+IMAGE_NOT_FOUND_TEXT = "[Image could not be processed]"
+IMAGE_NOT_SUMMARIZED_TEXT = "[Image could not be summarized]"
+IMAGE_ERROR_TEXT = "[Error processing image]"
+
+image_summary_cache_lookups = Counter(
+    "onyx_image_summary_cache_lookups_total",
+    "Image summary cache lookups",
+    ["result"],  # hit | miss
+)
+
+
+class ImageSummaryCache(ContextualSummaryCache):
+    """Cache of vision LLM image summaries, keyed by the LLM, the summarization
+    prompts and a hash of the image content (see `build_cache_prompt`).
+
+    The file name of the image is part of the prompt sent to the LLM, but not of
+    the key. The same image (e.g. a logo on every page) is summarized once no
+    matter which file or document it comes from."""
+
+    cache_name = IMAGE_SUMMARY_CACHE_KEY_PREFIX
+    prompt_version = IMAGE_SUMMARY_PROMPT_VERSION
+    lookups_counter = image_summary_cache_lookups
+
+    def __init__(
+        self,
+        model_provider: str,
+        model_name: str,
+        tenant_id: str | None = None,
+        redis_client: Redis | None = None,
+        ttl_seconds: int = IMAGE_SUMMARY_CACHE_TTL_SECONDS,
+        max_entries: int = IMAGE_SUMMARY_CACHE_MAX_ENTRIES,
+    ) -> None:
+        super().__init__(
+            model_provider=model_provider,
+            model_name=model_name,
+            tenant_id=tenant_id,
+            redis_client=redis_client,
+            ttl_seconds=ttl_seconds,
+            max_entries=max_entries,
+        )
+
+    @staticmethod
+    def build_cache_prompt(
+        image_data: bytes,
+        system_prompt: str = IMAGE_SUMMARIZATION_SYSTEM_PROMPT,
+        user_prompt_template: str = IMAGE_SUMMARIZATION_USER_PROMPT,
+    ) -> str:
+        return "\x1f".join(
+            [
+                system_prompt,
+                user_prompt_template,
+                hashlib.sha256(image_data).hexdigest(),
+            ]
+        )
+
+
+def _find_rate_limit_error(error: BaseException) -> BaseException | None:
+    # summarization failures are re-raised as ValueErrors, so look at the causes too
+    current: BaseException | None = error
+    while current is not None:
+        if (
+            isinstance(current, LLMRateLimitError)
+            or getattr(current, "status_code", None) == 429
+        ):
+            return current
+        current = current.__cause__ or current.__context__
+    return None
+
+
+def _get_retry_after_seconds(error: BaseException) -> float | None:
+    # LLMRateLimitError wraps the provider (litellm) error, which has the response
+    for candidate in [error, *error.args]:
+        headers = getattr(getattr(candidate, "response", None), "headers", None)
+        if not headers:
+            continue
+        try:
+            return float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+class RateLimitBackoff:
+    """Retries rate limited LLM calls with exponential backoff (or the provider's
+    Retry-After). Shared by all workers of a summarization run: once a call is
+    rate limited, every worker waits out the backoff before its next call instead
+    of piling more requests onto the provider."""
+
+    def __init__(
+        self,
+        max_retries: int = IMAGE_SUMMARIZATION_RATE_LIMIT_RETRIES,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+    ) -> None:
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._lock = threading.Lock()
+        self._resume_at = 0.0
+
+    def _wait(self) -> None:
+        with self._lock:
+            delay = self._resume_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _backoff(self, attempt: int, retry_after: float | None) -> float:
+        if retry_after is not None:
+            delay = min(retry_after, self.max_delay)
+        else:
+            delay = min(self.base_delay * 2**attempt, self.max_delay)
+            delay *= random.uniform(0.5, 1.0)
+
+        with self._lock:
+            self._resume_at = max(self._resume_at, time.monotonic() + delay)
+        return delay
+
+    def call(self, func: Callable[[], R]) -> R:
+        attempt = 0
+        while True:
+            self._wait()
+            try:
+                return func()
+            except Exception as e:
+                rate_limit_error = _find_rate_limit_error(e)
+                if rate_limit_error is None or attempt >= self.max_retries:
+                    raise
+
+                delay = self._backoff(
+                    attempt, _get_retry_after_seconds(rate_limit_error)
+                )
+                attempt += 1
+                logger.warning(
+                    f"Vision LLM call rate limited, retrying in {delay:.1f}s "
+                    f"(attempt {attempt}/{self.max_retries})"
+                )
+
+
+def _summarize_image(
+    llm: LLM, image_data: bytes, context_name: str, backoff: RateLimitBackoff
+) -> str | None:
+    """Returns the summary ("" if there is none), None if summarization failed."""
+    try:
+        summary = backoff.call(
+            lambda: summarize_image_with_error_handling(
+                llm=llm,
+                image_data=image_data,
+                context_name=context_name,
+                system_prompt=IMAGE_SUMMARIZATION_SYSTEM_PROMPT,
+                user_prompt_template=IMAGE_SUMMARIZATION_USER_PROMPT,
+            )
+        )
+    except Exception as e:
+        logger.error(f"Error processing image section {context_name}: {e}")
+        return None
+    return summary or ""
+
+
+def summarize_image_files(
+    file_names: list[str],
+    llm: LLM,
+    summary_cache: ImageSummaryCache | None = None,
+    max_workers: int = IMAGE_SUMMARIZATION_MAX_WORKERS,
+) -> dict[str, str]:
+    """Summarizes images from the file store with the vision LLM. All images are
+    read in one query, identical images are summarized once and the LLM calls run
+    on up to `max_workers` threads.
+
+    Returns the section text for every file name: the summary, or a placeholder if
+    the image couldn't be summarized. Placeholders are never cached."""
+    unique_file_names = list(dict.fromkeys(file_names))
+    if not unique_file_names:
+        return {}
+
+    try:
+        with get_session_with_current_tenant() as db_session:
+            files = read_pgfilestores_with_content(unique_file_names, db_session)
+    except Exception as e:
+        logger.error(f"Error reading images from the file store: {e}")
+        return {file_name: IMAGE_ERROR_TEXT for file_name in unique_file_names}
+
+    # cache prompt -> image data and name of the first file with that content
+    images: dict[str, tuple[bytes, str]] = {}
+    cache_prompt_by_file_name: dict[str, str] = {}
+    for pgfilestore, image_data in files:
+        cache_prompt = ImageSummaryCache.build_cache_prompt(image_data)
+        cache_prompt_by_file_name[pgfilestore.file_name] = cache_prompt
+        images.setdefault(
+            cache_prompt, (image_data, pgfilestore.display_name or "Image")
+        )
+
+    cache_prompts = list(images)
+    cached_summaries = (
+        summary_cache.get_many(cache_prompts)
+        if summary_cache
+        else [None] * len(cache_prompts)
+    )
+    texts_by_cache_prompt = {
+        cache_prompt: summary
+        for cache_prompt, summary in zip(cache_prompts, cached_summaries)
+        if summary is not None
+    }
+
+    to_summarize = [
+        cache_prompt
+        for cache_prompt in cache_prompts
+        if cache_prompt not in texts_by_cache_prompt
+    ]
+    backoff = RateLimitBackoff()
+    summaries = run_functions_tuples_in_parallel(
+        [
+            (_summarize_image, (llm, *images[cache_prompt], backoff))
+            for cache_prompt in to_summarize
+        ],
+        max_workers=max_workers,
+    )
+    for cache_prompt, summary in zip(to_summarize, summaries):
+        if summary is None:
+            texts_by_cache_prompt[cache_prompt] = IMAGE_ERROR_TEXT
+        elif not summary:
+            texts_by_cache_prompt[cache_prompt] = IMAGE_NOT_SUMMARIZED_TEXT
+        else:
+            texts_by_cache_prompt[cache_prompt] = summary
+            if summary_cache:
+                summary_cache.add(cache_prompt, summary)
+
+    if summary_cache:
+        summary_cache.flush()
+
+    logger.debug(
+        f"Summarized images: files={len(unique_file_names)} "
+        f"unique={len(images)} "
+        f"llm_calls={len(to_summarize)}"
+    )
+
+    texts: dict[str, str] = {}
+    for file_name in unique_file_names:
+        cache_prompt_for_file = cache_prompt_by_file_name.get(file_name)
+        if cache_prompt_for_file is None:
+            logger.warning(f"Image file {file_name} not found in PGFileStore")
+            texts[file_name] = IMAGE_NOT_FOUND_TEXT
+        else:
+            texts[file_name] = texts_by_cache_prompt[cache_prompt_for_file]
+    return texts
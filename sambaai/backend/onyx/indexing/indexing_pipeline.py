@@ -1,6 +1,7 @@
 from collections import defaultdict
 from collections.abc import Callable
 from functools import partial
+from typing import cast
 from typing import Protocol
 
 from pydantic import BaseModel
@@ -9,9 +10,12 @@ from sqlalchemy.orm import Session
 
 from onyx.access.access import get_access_for_documents
 from onyx.access.models import DocumentAccess
+from onyx.configs.app_configs import CONTEXTUAL_RAG_SUMMARY_CACHE_ENABLED
 from onyx.configs.app_configs import DEFAULT_CONTEXTUAL_RAG_LLM_NAME
 from onyx.configs.app_configs import DEFAULT_CONTEXTUAL_RAG_LLM_PROVIDER
+from onyx.configs.app_configs import DISABLE_GENERATIVE_AI
 from onyx.configs.app_configs import ENABLE_CONTEXTUAL_RAG
+from onyx.configs.app_configs import IMAGE_SUMMARY_CACHE_ENABLED
 from onyx.configs.app_configs import MAX_DOCUMENT_CHARS
 from onyx.configs.app_configs import MAX_TOKENS_FOR_FULL_INCLUSION
 from onyx.configs.app_configs import USE_CHUNK_SUMMARY
@@ -41,11 +45,9 @@ from onyx.db.document import update_docs_updated_at__no_commit
 from onyx.db.document import upsert_document_by_connector_credential_pair
 from onyx.db.document import upsert_documents
 from onyx.db.document_set import fetch_document_sets_for_documents
-from onyx.db.engine import get_session_with_current_tenant
+from onyx.db.llm import fetch_default_provider
 from onyx.db.models import Document as DBDocument
 from onyx.db.models import IndexModelStatus
-from onyx.db.pg_file_store import get_pgfilestore_by_file_name
-from onyx.db.pg_file_store import read_lobj
 from onyx.db.search_settings import get_active_search_settings
 from onyx.db.tag import create_or_add_document_tag
 from onyx.db.tag import create_or_add_document_tag_list
@@ -58,11 +60,13 @@ from onyx.document_index.document_index_utils import (
 from onyx.document_index.interfaces import DocumentIndex
 from onyx.document_index.interfaces import DocumentMetadata
 from onyx.document_index.interfaces import IndexBatchParams
-from onyx.file_processing.image_summarization import summarize_image_with_error_handling
 from onyx.file_store.utils import store_user_file_plaintext
 from onyx.indexing.chunker import Chunker
+from onyx.indexing.contextual_summary_cache import ContextualSummaryCache
 from onyx.indexing.embedder import embed_chunks_with_failure_handling
 from onyx.indexing.embedder import IndexingEmbedder
+from onyx.indexing.image_summaries import ImageSummaryCache
+from onyx.indexing.image_summaries import summarize_image_files
 from onyx.indexing.indexing_heartbeat import IndexingHeartbeatInterface
 from onyx.indexing.models import DocAwareChunk
 from onyx.indexing.models import DocMetadataAwareIndexChunk
@@ -71,7 +75,6 @@ from onyx.indexing.models import UpdatableChunkData
 from onyx.indexing.vector_db_insertion import write_chunks_to_vector_db_with_backoff
 from onyx.llm.chat_llm import LLMRateLimitError
 from onyx.llm.factory import get_default_llm_with_vision
-from onyx.llm.factory import get_default_llms
 from onyx.llm.factory import get_llm_for_contextual_rag
 from onyx.llm.interfaces import LLM
 from onyx.llm.utils import MAX_CONTEXT_TOKENS
@@ -116,6 +119,18 @@ class IndexingPipelineResult(BaseModel):
     failures: list[ConnectorFailure]
 
 
+class EmbeddedDocumentBatch(BaseModel):
+    """Output of the embedding half of the pipeline (filtering, chunking, contextual
+    RAG and embedding) and the input of the write half (access lookups, vector db
+    write and Postgres bookkeeping)."""
+
+    filtered_documents: list[Document]
+    ctx: DocumentBatchPrepareContext
+    chunks_with_embeddings: list[IndexChunk]
+    embedding_failures: list[ConnectorFailure]
+    chunk_content_scores: list[float]
+
+
 class IndexingPipelineProtocol(Protocol):
     def __call__(
         self,
@@ -292,32 +307,39 @@ def index_doc_batch_with_handler(
             llm=llm,
         )
     except Exception as e:
-        # don't log the batch directly, it's too much text
-        document_ids = [doc.id for doc in document_batch]
-        logger.exception(f"Failed to index document batch: {document_ids}")
-
-        index_pipeline_result = IndexingPipelineResult(
-            new_docs=0,
-            total_docs=len(document_batch),
-            total_chunks=0,
-            failures=[
-                ConnectorFailure(
-                    failed_document=DocumentFailure(
-                        document_id=document.id,
-                        document_link=(
-                            document.sections[0].link if document.sections else None
-                        ),
-                    ),
-                    failure_message=str(e),
-                    exception=e,
-                )
-                for document in document_batch
-            ],
-        )
+        index_pipeline_result = build_failed_batch_result(document_batch, e)
 
     return index_pipeline_result
 
 
+def build_failed_batch_result(
+    document_batch: list[Document], e: Exception
+) -> IndexingPipelineResult:
+    """Marks every document in the batch as failed with the given exception."""
+    # don't log the batch directly, it's too much text
+    document_ids = [doc.id for doc in document_batch]
+    logger.exception(f"Failed to index document batch: {document_ids}")
+
+    return IndexingPipelineResult(
+        new_docs=0,
+        total_docs=len(document_batch),
+        total_chunks=0,
+        failures=[
+            ConnectorFailure(
+                failed_document=DocumentFailure(
+                    document_id=document.id,
+                    document_link=(
+                        document.sections[0].link if document.sections else None
+                    ),
+                ),
+                failure_message=str(e),
+                exception=e,
+            )
+            for document in document_batch
+        ],
+    )
+
+
 def index_doc_batch_prepare(
     documents: list[Document],
     index_attempt_metadata: IndexAttemptMetadata,
@@ -480,56 +502,33 @@ def process_image_sections(documents: list[Document]) -> list[IndexingDocument]:
             for document in documents
         ]
 
+    # summarize the images of the whole batch at once (deduplicated, concurrent)
+    image_texts = summarize_image_files(
+        file_names=[
+            section.image_file_name
+            for document in documents
+            for section in document.sections
+            if isinstance(section, ImageSection)
+        ],
+        llm=llm,
+        summary_cache=(
+            ImageSummaryCache.for_llm(llm) if IMAGE_SUMMARY_CACHE_ENABLED else None
+        ),
+    )
+
     indexed_documents: list[IndexingDocument] = []
 
     for document in documents:
         processed_sections: list[Section] = []
 
         for section in document.sections:
-            # For ImageSection, process and create base Section with both text and image_file_name
+            # For ImageSection, create base Section with both the summary and image_file_name
             if isinstance(section, ImageSection):
-                # Default section with image path preserved - ensure text is always a string
                 processed_section = Section(
                     link=section.link,
                     image_file_name=section.image_file_name,
-                    text="",  # Initialize with empty string
+                    text=image_texts[section.image_file_name],
                 )
-
-                # Try to get image summary
-                try:
-                    with get_session_with_current_tenant() as db_session:
-                        pgfilestore = get_pgfilestore_by_file_name(
-                            file_name=section.image_file_name, db_session=db_session
-                        )
-
-                        if not pgfilestore:
-                            logger.warning(
-                                f"Image file {section.image_file_name} not found in PGFileStore"
-                            )
-
-                            processed_section.text = "[Image could not be processed]"
-                        else:
-                            # Get the image data
-                            image_data_io = read_lobj(
-                                pgfilestore.lobj_oid, db_session, mode="rb"
-                            )
-                            pgfilestore_data = image_data_io.read()
-                            summary = summarize_image_with_error_handling(
-                                llm=llm,
-                                image_data=pgfilestore_data,
-                                context_name=pgfilestore.display_name or "Image",
-                            )
-
-                            if summary:
-                                processed_section.text = summary
-                            else:
-                                processed_section.text = (
-                                    "[Image could not be summarized]"
-                                )
-                except Exception as e:
-                    logger.error(f"Error processing image section: {e}")
-                    processed_section.text = "[Error processing image]"
-
                 processed_sections.append(processed_section)
 
             # For TextSection, create a base Section with text and link
@@ -560,11 +559,26 @@ def process_image_sections(documents: list[Document]) -> list[IndexingDocument]:
     return indexed_documents
 
 
+def _summarize_with_cache(
+    prompt: str, llm: LLM, summary_cache: ContextualSummaryCache | None
+) -> str:
+    if summary_cache is not None:
+        cached_summary = summary_cache.get_many([prompt])[0]
+        if cached_summary is not None:
+            return cached_summary
+
+    summary = message_to_string(llm.invoke(prompt, max_tokens=MAX_CONTEXT_TOKENS))
+    if summary_cache is not None:
+        summary_cache.add(prompt, summary)
+    return summary
+
+
 def add_document_summaries(
     chunks_by_doc: list[DocAwareChunk],
     llm: LLM,
     tokenizer: BaseTokenizer,
     trunc_doc_tokens: int,
+    summary_cache: ContextualSummaryCache | None = None,
 ) -> list[int] | None:
     """
     Adds a document summary to a list of chunks from the same document.
@@ -581,9 +595,7 @@ def add_document_summaries(
     doc_tokens = tokenizer.encode(chunks_by_doc[0].source_document.get_text_content())
     doc_content = tokenizer_trim_middle(doc_tokens, trunc_doc_tokens, tokenizer)
     summary_prompt = DOCUMENT_SUMMARY_PROMPT.format(document=doc_content)
-    doc_summary = message_to_string(
-        llm.invoke(summary_prompt, max_tokens=MAX_CONTEXT_TOKENS)
-    )
+    doc_summary = _summarize_with_cache(summary_prompt, llm, summary_cache)
 
     for chunk in chunks_by_doc:
         chunk.doc_summary = doc_summary
@@ -597,11 +609,13 @@ def add_chunk_summaries(
     tokenizer: BaseTokenizer,
     trunc_doc_chunk_tokens: int,
     doc_tokens: list[int] | None,
+    summary_cache: ContextualSummaryCache | None = None,
 ) -> None:
     """
     Adds chunk summaries to the chunks grouped by document id.
     Chunk summaries look at the chunk as well as the entire document (or a summary,
     if the document is too long) and describe how the chunk relates to the document.
+    Only chunks without a cached summary go to the LLM.
     """
     # all chunks within a document have the same contextual_rag_reserved_tokens
     if chunks_by_doc[0].contextual_rag_reserved_tokens == 0:
@@ -622,24 +636,29 @@ def add_chunk_summaries(
     if not doc_info:
         # This happens if the document is too long AND document summaries are turned off
         # In this case we compute a doc summary using the LLM
-        doc_info = message_to_string(
-            llm.invoke(
-                DOCUMENT_SUMMARY_PROMPT.format(document=doc_content),
-                max_tokens=MAX_CONTEXT_TOKENS,
-            )
+        doc_info = _summarize_with_cache(
+            DOCUMENT_SUMMARY_PROMPT.format(document=doc_content), llm, summary_cache
         )
 
     context_prompt1 = CONTEXTUAL_RAG_PROMPT1.format(document=doc_info)
 
-    def assign_context(chunk: DocAwareChunk) -> None:
-        context_prompt2 = CONTEXTUAL_RAG_PROMPT2.format(chunk=chunk.content)
+    prompts = [
+        context_prompt1 + CONTEXTUAL_RAG_PROMPT2.format(chunk=chunk.content)
+        for chunk in chunks_by_doc
+    ]
+    cached_contexts = (
+        summary_cache.get_many(prompts)
+        if summary_cache is not None
+        else [None] * len(prompts)
+    )
+
+    def assign_context(chunk: DocAwareChunk, prompt: str) -> None:
         try:
             chunk.chunk_context = message_to_string(
-                llm.invoke(
-                    context_prompt1 + context_prompt2,
-                    max_tokens=MAX_CONTEXT_TOKENS,
-                )
+                llm.invoke(prompt, max_tokens=MAX_CONTEXT_TOKENS)
             )
+            if summary_cache is not None:
+                summary_cache.add(prompt, chunk.chunk_context)
         except LLMRateLimitError as e:
             # Erroring during chunker is undesirable, so we log the error and continue
             # TODO: for v2, add robust retry logic
@@ -649,9 +668,17 @@ def add_chunk_summaries(
             logger.exception(f"Error adding chunk summary: {e}", exc_info=e)
             chunk.chunk_context = ""
 
-    run_functions_tuples_in_parallel(
-        [(assign_context, (chunk,)) for chunk in chunks_by_doc]
-    )
+    uncached: list[tuple[DocAwareChunk, str]] = []
+    for chunk, prompt, cached_context in zip(chunks_by_doc, prompts, cached_contexts):
+        if cached_context is None:
+            uncached.append((chunk, prompt))
+        else:
+            chunk.chunk_context = cached_context
+
+    if uncached:
+        run_functions_tuples_in_parallel(
+            [(assign_context, (chunk, prompt)) for chunk, prompt in uncached]
+        )
 
 
 def add_contextual_summaries(
@@ -659,10 +686,12 @@ def add_contextual_summaries(
     llm: LLM,
     tokenizer: BaseTokenizer,
     chunk_token_limit: int,
+    summary_cache: ContextualSummaryCache | None = None,
 ) -> list[DocAwareChunk]:
     """
     Adds Document summary and chunk-within-document context to the chunks
-    based on which environment variables are set.
+    based on which environment variables are set. If a summary cache is passed,
+    summaries of unchanged content are reused instead of calling the LLM.
     """
     doc2chunks = defaultdict(list)
     for chunk in chunks:
@@ -685,17 +714,119 @@ def add_contextual_summaries(
         doc_tokens = None
         if USE_DOCUMENT_SUMMARY:
             doc_tokens = add_document_summaries(
-                chunks_by_doc, llm, tokenizer, trunc_doc_summary_tokens
+                chunks_by_doc,
+                llm,
+                tokenizer,
+                trunc_doc_summary_tokens,
+                summary_cache=summary_cache,
             )
 
         if USE_CHUNK_SUMMARY:
             add_chunk_summaries(
-                chunks_by_doc, llm, tokenizer, trunc_doc_chunk_tokens, doc_tokens
+                chunks_by_doc,
+                llm,
+                tokenizer,
+                trunc_doc_chunk_tokens,
+                doc_tokens,
+                summary_cache=summary_cache,
             )
 
+    if summary_cache is not None:
+        summary_cache.flush()
+        logger.debug(
+            f"Contextual summary cache: hits={summary_cache.hits} "
+            f"misses={summary_cache.misses}"
+        )
+
     return chunks
 
 
+def group_chunks_by_document(
+    chunks: list[IndexChunk],
+) -> dict[str, list[IndexChunk]]:
+    """Groups chunks by their source document in a single pass, preserving order."""
+    doc_id_to_chunks: dict[str, list[IndexChunk]] = defaultdict(list)
+    for chunk in chunks:
+        doc_id_to_chunks[chunk.source_document.id].append(chunk)
+    return doc_id_to_chunks
+
+
+def get_default_llm_tokenizer(db_session: Session) -> BaseTokenizer | None:
+    """Tokenizer of the default LLM, used to count user file tokens. Only looks up
+    the default provider, get_tokenizer already caches the tokenizer per model."""
+    if DISABLE_GENERATIVE_AI:
+        return None
+
+    try:
+        llm_provider = fetch_default_provider(db_session)
+        if not llm_provider or not llm_provider.default_model_name:
+            raise ValueError("No default LLM provider found")
+
+        return get_tokenizer(
+            model_name=llm_provider.default_model_name,
+            provider_type=llm_provider.provider,
+        )
+    except Exception as e:
+        logger.error(f"Error getting tokenizer: {e}")
+        return None
+
+
+def build_access_aware_chunks(
+    *,
+    chunks: list[IndexChunk],
+    chunk_content_scores: list[float],
+    doc_id_to_access_info: dict[str, DocumentAccess],
+    doc_id_to_document_set: dict[str, list[str]],
+    doc_id_to_user_file_id: dict[str, int | None],
+    doc_id_to_user_folder_id: dict[str, int | None],
+    id_to_db_doc_map: dict[str, DBDocument],
+    tenant_id: str,
+) -> list[DocMetadataAwareIndexChunk]:
+    """Attaches the document level metadata to each chunk. The metadata is resolved
+    once per document and the chunks are built without re-validating their fields."""
+    no_access = DocumentAccess.build(
+        user_emails=[],
+        user_groups=[],
+        external_user_emails=[],
+        external_user_group_ids=[],
+        is_public=False,
+    )
+
+    doc_id_to_metadata: dict[
+        str, tuple[DocumentAccess, set[str], int | None, int | None, int]
+    ] = {}
+    access_aware_chunks: list[DocMetadataAwareIndexChunk] = []
+    for chunk, score in zip(chunks, chunk_content_scores):
+        document_id = chunk.source_document.id
+        metadata = doc_id_to_metadata.get(document_id)
+        if metadata is None:
+            db_doc = id_to_db_doc_map.get(document_id)
+            metadata = (
+                doc_id_to_access_info.get(document_id, no_access),
+                set(doc_id_to_document_set.get(document_id, [])),
+                doc_id_to_user_file_id.get(document_id),
+                doc_id_to_user_folder_id.get(document_id),
+                db_doc.boost if db_doc else DEFAULT_BOOST,
+            )
+            doc_id_to_metadata[document_id] = metadata
+
+        access, document_sets, user_file, user_folder, boost = metadata
+        access_aware_chunks.append(
+            DocMetadataAwareIndexChunk.from_index_chunk(
+                index_chunk=chunk,
+                access=access,
+                document_sets=document_sets,
+                user_file=user_file,
+                user_folder=user_folder,
+                boost=boost,
+                tenant_id=tenant_id,
+                aggregated_chunk_boost_factor=score,
+            )
+        )
+
+    return access_aware_chunks
+
+
 @log_function_time(debug_only=True)
 def index_doc_batch(
     *,
@@ -718,15 +849,49 @@ def index_doc_batch(
 
     Returns a tuple where the first element is the number of new docs and the
     second element is the number of chunks."""
+    embedded_batch = embed_doc_batch(
+        document_batch=document_batch,
+        chunker=chunker,
+        embedder=embedder,
+        information_content_classification_model=information_content_classification_model,
+        index_attempt_metadata=index_attempt_metadata,
+        db_session=db_session,
+        tenant_id=tenant_id,
+        enable_contextual_rag=enable_contextual_rag,
+        llm=llm,
+        ignore_time_skip=ignore_time_skip,
+        filter_fnc=filter_fnc,
+    )
+    if isinstance(embedded_batch, IndexingPipelineResult):
+        return embedded_batch
 
-    no_access = DocumentAccess.build(
-        user_emails=[],
-        user_groups=[],
-        external_user_emails=[],
-        external_user_group_ids=[],
-        is_public=False,
+    return write_doc_batch(
+        embedded_batch=embedded_batch,
+        chunker=chunker,
+        document_index=document_index,
+        index_attempt_metadata=index_attempt_metadata,
+        db_session=db_session,
+        tenant_id=tenant_id,
     )
 
+
+def embed_doc_batch(
+    *,
+    document_batch: list[Document],
+    chunker: Chunker,
+    embedder: IndexingEmbedder,
+    information_content_classification_model: InformationContentClassificationModel,
+    index_attempt_metadata: IndexAttemptMetadata,
+    db_session: Session,
+    tenant_id: str,
+    enable_contextual_rag: bool = False,
+    llm: LLM | None = None,
+    ignore_time_skip: bool = False,
+    filter_fnc: Callable[[list[Document]], list[Document]] = filter_documents,
+) -> EmbeddedDocumentBatch | IndexingPipelineResult:
+    """First half of index_doc_batch: upserts the documents into Postgres, then
+    chunks and embeds them. Returns the final result directly if there is nothing
+    left to write to the document index."""
     filtered_documents = filter_fnc(document_batch)
 
     ctx = index_doc_batch_prepare(
@@ -787,6 +952,11 @@ def index_doc_batch(
             llm=llm,
             tokenizer=llm_tokenizer,
             chunk_token_limit=chunker.chunk_token_limit * 2,
+            summary_cache=(
+                ContextualSummaryCache.for_llm(llm, tenant_id=tenant_id)
+                if CONTEXTUAL_RAG_SUMMARY_CACHE_ENABLED
+                else None
+            ),
         )
 
     logger.debug("Starting embedding")
@@ -809,6 +979,33 @@ def index_doc_batch(
         else [1.0] * len(chunks_with_embeddings)
     )
 
+    return EmbeddedDocumentBatch(
+        filtered_documents=filtered_documents,
+        ctx=ctx,
+        chunks_with_embeddings=chunks_with_embeddings,
+        embedding_failures=embedding_failures,
+        chunk_content_scores=chunk_content_scores,
+    )
+
+
+def write_doc_batch(
+    *,
+    embedded_batch: EmbeddedDocumentBatch,
+    chunker: Chunker,
+    document_index: DocumentIndex,
+    index_attempt_metadata: IndexAttemptMetadata,
+    db_session: Session,
+    tenant_id: str,
+) -> IndexingPipelineResult:
+    """Second half of index_doc_batch: attaches access / document set info to the
+    embedded chunks, writes them to the document index and records the results
+    in Postgres."""
+    filtered_documents = embedded_batch.filtered_documents
+    ctx = embedded_batch.ctx
+    chunks_with_embeddings = embedded_batch.chunks_with_embeddings
+    embedding_failures = embedded_batch.embedding_failures
+    chunk_content_scores = embedded_batch.chunk_content_scores
+
     updatable_ids = [doc.id for doc in ctx.updatable_docs]
     updatable_chunk_data = [
         UpdatableChunkData(
@@ -850,85 +1047,52 @@ def index_doc_batch(
             )
         }
 
+        doc_id_to_chunks = group_chunks_by_document(chunks_with_embeddings)
         doc_id_to_new_chunk_cnt: dict[str, int] = {
-            document_id: len(
-                [
-                    chunk
-                    for chunk in chunks_with_embeddings
-                    if chunk.source_document.id == document_id
-                ]
-            )
+            document_id: len(doc_id_to_chunks.get(document_id, []))
             for document_id in updatable_ids
         }
 
-        try:
-            llm, _ = get_default_llms()
-
-            llm_tokenizer = get_tokenizer(
-                model_name=llm.config.model_name,
-                provider_type=llm.config.model_provider,
-            )
-        except Exception as e:
-            logger.error(f"Error getting tokenizer: {e}")
-            llm_tokenizer = None
-
         # Calculate token counts for each document by combining all its chunks' content
+        # Only calculate token counts for documents that have a user file ID
+        user_file_doc_ids = [
+            document_id
+            for document_id in updatable_ids
+            if doc_id_to_user_file_id.get(document_id)
+        ]
+        llm_tokenizer = (
+            get_default_llm_tokenizer(db_session) if user_file_doc_ids else None
+        )
         user_file_id_to_token_count: dict[int, int | None] = {}
         user_file_id_to_raw_text: dict[int, str] = {}
-        for document_id in updatable_ids:
-            # Only calculate token counts for documents that have a user file ID
-            if (
-                document_id in doc_id_to_user_file_id
-                and doc_id_to_user_file_id[document_id] is not None
-            ):
-                user_file_id = doc_id_to_user_file_id[document_id]
-                if not user_file_id:
-                    continue
-                document_chunks = [
-                    chunk
-                    for chunk in chunks_with_embeddings
-                    if chunk.source_document.id == document_id
-                ]
-                if document_chunks:
-                    combined_content = " ".join(
-                        [chunk.content for chunk in document_chunks]
-                    )
-                    token_count = (
-                        len(llm_tokenizer.encode(combined_content))
-                        if llm_tokenizer
-                        else 0
-                    )
-                    user_file_id_to_token_count[user_file_id] = token_count
-                    user_file_id_to_raw_text[user_file_id] = combined_content
-                else:
-                    user_file_id_to_token_count[user_file_id] = None
+        for document_id in user_file_doc_ids:
+            user_file_id = cast(int, doc_id_to_user_file_id[document_id])
+            document_chunks = doc_id_to_chunks.get(document_id)
+            if document_chunks:
+                combined_content = " ".join(chunk.content for chunk in document_chunks)
+                token_count = (
+                    len(llm_tokenizer.encode(combined_content)) if llm_tokenizer else 0
+                )
+                user_file_id_to_token_count[user_file_id] = token_count
+                user_file_id_to_raw_text[user_file_id] = combined_content
+            else:
+                user_file_id_to_token_count[user_file_id] = None
 
         # we're concerned about race conditions where multiple simultaneous indexings might result
         # in one set of metadata overwriting another one in vespa.
         # we still write data here for the immediate and most likely correct sync, but
         # to resolve this, an update of the last modified field at the end of this loop
         # always triggers a final metadata sync via the celery queue
-        access_aware_chunks = [
-            DocMetadataAwareIndexChunk.from_index_chunk(
-                index_chunk=chunk,
-                access=doc_id_to_access_info.get(chunk.source_document.id, no_access),
-                document_sets=set(
-                    doc_id_to_document_set.get(chunk.source_document.id, [])
-                ),
-                user_file=doc_id_to_user_file_id.get(chunk.source_document.id, None),
-                user_folder=doc_id_to_user_folder_id.get(
-                    chunk.source_document.id, None
-                ),
-                boost=(
-                    ctx.id_to_db_doc_map[chunk.source_document.id].boost
-                    if chunk.source_document.id in ctx.id_to_db_doc_map
-                    else DEFAULT_BOOST
-                ),
-                tenant_id=tenant_id,
-                aggregated_chunk_boost_factor=chunk_content_scores[chunk_num],
-            )
-            for chunk_num, chunk in enumerate(chunks_with_embeddings)
-        ]
+        access_aware_chunks = build_access_aware_chunks(
+            chunks=chunks_with_embeddings,
+            chunk_content_scores=chunk_content_scores,
+            doc_id_to_access_info=doc_id_to_access_info,
+            doc_id_to_document_set=doc_id_to_document_set,
+            doc_id_to_user_file_id=doc_id_to_user_file_id,
+            doc_id_to_user_folder_id=doc_id_to_user_folder_id,
+            id_to_db_doc_map=ctx.id_to_db_doc_map,
+            tenant_id=tenant_id,
+        )
 
         short_descriptor_list = [
             chunk.to_short_descriptor() for chunk in access_aware_chunks
@@ -1046,18 +1210,23 @@ def index_doc_batch(
     return result
 
 
-def build_indexing_pipeline(
+class IndexingPipelineComponents(BaseModel):
+    chunker: Chunker
+    enable_contextual_rag: bool
+    llm: LLM | None
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+
+def get_indexing_pipeline_components(
     *,
     embedder: IndexingEmbedder,
-    information_content_classification_model: InformationContentClassificationModel,
-    document_index: DocumentIndex,
     db_session: Session,
-    tenant_id: str,
     chunker: Chunker | None = None,
-    ignore_time_skip: bool = False,
     callback: IndexingHeartbeatInterface | None = None,
-) -> IndexingPipelineProtocol:
-    """Builds a pipeline which takes in a list (batch) of docs and indexes them."""
+) -> IndexingPipelineComponents:
+    """Resolves the chunker and contextual RAG settings for the search settings
+    currently being indexed into."""
     all_search_settings = get_active_search_settings(db_session)
     if (
         all_search_settings.secondary
@@ -1089,15 +1258,39 @@ def build_indexing_pipeline(
         callback=callback,
     )
 
+    return IndexingPipelineComponents(
+        chunker=chunker, enable_contextual_rag=enable_contextual_rag, llm=llm
+    )
+
+
+def build_indexing_pipeline(
+    *,
+    embedder: IndexingEmbedder,
+    information_content_classification_model: InformationContentClassificationModel,
+    document_index: DocumentIndex,
+    db_session: Session,
+    tenant_id: str,
+    chunker: Chunker | None = None,
+    ignore_time_skip: bool = False,
+    callback: IndexingHeartbeatInterface | None = None,
+) -> IndexingPipelineProtocol:
+    """Builds a pipeline which takes in a list (batch) of docs and indexes them."""
+    components = get_indexing_pipeline_components(
+        embedder=embedder,
+        db_session=db_session,
+        chunker=chunker,
+        callback=callback,
+    )
+
     return partial(
         index_doc_batch_with_handler,
-        chunker=chunker,
+        chunker=components.chunker,
         embedder=embedder,
         information_content_classification_model=information_content_classification_model,
         document_index=document_index,
         ignore_time_skip=ignore_time_skip,
         db_session=db_session,
         tenant_id=tenant_id,
-        enable_contextual_rag=enable_contextual_rag,
-        llm=llm,
+        enable_contextual_rag=components.enable_contextual_rag,
+        llm=components.llm,
     )
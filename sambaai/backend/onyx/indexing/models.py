@@ -117,9 +117,10 @@ class DocMetadataAwareIndexChunk(IndexChunk):
         aggregated_chunk_boost_factor: float,
         tenant_id: str,
     ) -> "DocMetadataAwareIndexChunk":
-        index_chunk_data = index_chunk.model_dump()
-        return cls(
-            **index_chunk_data,
+        # the index chunk is already validated, so copy its fields over shallowly
+        # instead of dumping and re-validating them (embeddings included) per chunk
+        return cls.model_construct(
+            **dict(index_chunk),
             access=access,
             document_sets=document_sets,
             user_file=user_file,
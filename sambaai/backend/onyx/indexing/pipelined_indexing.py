@@ -0,0 +1,315 @@
+import contextvars
+import queue
+import threading
+import time
+from collections.abc import Callable
+
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from onyx.configs.app_configs import PIPELINED_INDEXING_MAX_QUEUED_BATCHES
+from onyx.connectors.models import Document
+from onyx.connectors.models import IndexAttemptMetadata
+from onyx.db.engine import get_session_with_current_tenant
+from onyx.document_index.interfaces import DocumentIndex
+from onyx.indexing.chunker import Chunker
+from onyx.indexing.embedder import IndexingEmbedder
+from onyx.indexing.indexing_heartbeat import IndexingHeartbeatInterface
+from onyx.indexing.indexing_pipeline import build_failed_batch_result
+from onyx.indexing.indexing_pipeline import embed_doc_batch
+from onyx.indexing.indexing_pipeline import EmbeddedDocumentBatch
+from onyx.indexing.indexing_pipeline import get_indexing_pipeline_components
+from onyx.indexing.indexing_pipeline import IndexingPipelineResult
+from onyx.indexing.indexing_pipeline import write_doc_batch
+from onyx.natural_language_processing.search_nlp_models import (
+    InformationContentClassificationModel,
+)
+from onyx.utils.logger import setup_logger
+
+logger = setup_logger()
+
+_STAGE_POLL_INTERVAL = 1.0
+
+EmbedStage = Callable[
+    [list[Document], IndexAttemptMetadata],
+    EmbeddedDocumentBatch | IndexingPipelineResult,
+]
+WriteStage = Callable[
+    [EmbeddedDocumentBatch, IndexAttemptMetadata], IndexingPipelineResult
+]
+
+
+class PipelineStageStats(BaseModel):
+    name: str
+    batches: int = 0
+    # time spent doing actual work
+    busy_seconds: float = 0.0
+    # time spent waiting for the next stage to accept a batch (i.e. backpressure)
+    blocked_seconds: float = 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.name}: batches={self.batches} "
+            f"busy={self.busy_seconds:.2f}s blocked={self.blocked_seconds:.2f}s"
+        )
+
+
+class PipelinedBatchResult(BaseModel):
+    document_batch: list[Document]
+    index_attempt_metadata: IndexAttemptMetadata
+    result: IndexingPipelineResult
+
+
+class _QueuedBatch(BaseModel):
+    document_batch: list[Document]
+    index_attempt_metadata: IndexAttemptMetadata
+    embedded_batch: EmbeddedDocumentBatch | None = None
+
+
+class PipelinedIndexingPipeline:
+    """Runs the embedding half and the write half of the indexing pipeline on two
+    dedicated threads connected by bounded queues. While batch N is written to the
+    document index, batch N+1 is embedded and the caller is free to fetch the next
+    batch from the connector.
+
+    Each queue holds at most `max_queued_batches` batches, so a slow stage blocks
+    the stages in front of it (and eventually `submit`) instead of letting batches
+    pile up in memory. Results are handed back in completion order, which may
+    differ from submission order for batches that had nothing to write.
+
+    Exceptions in a stage are converted into failures for the whole batch, the same
+    way `index_doc_batch_with_handler` does for the sequential pipeline."""
+
+    def __init__(
+        self,
+        embed_stage: EmbedStage,
+        write_stage: WriteStage,
+        max_queued_batches: int = PIPELINED_INDEXING_MAX_QUEUED_BATCHES,
+    ) -> None:
+        self._embed_stage = embed_stage
+        self._write_stage = write_stage
+
+        self._embed_queue: queue.Queue[_QueuedBatch | None] = queue.Queue(
+            maxsize=max_queued_batches
+        )
+        self._write_queue: queue.Queue[_QueuedBatch | None] = queue.Queue(
+            maxsize=max_queued_batches
+        )
+        self._results: queue.Queue[PipelinedBatchResult] = queue.Queue()
+        self._num_in_flight = 0
+        self._abort = threading.Event()
+
+        self.submit_stats = PipelineStageStats(name="connector")
+        self.embed_stats = PipelineStageStats(name="embed")
+        self.write_stats = PipelineStageStats(name="write")
+
+        # copy the context so that the stages get the right tenant for db sessions
+        self._threads = [
+            threading.Thread(
+                target=contextvars.copy_context().run,
+                args=(self._run_embed_stage,),
+                name="indexing-embed-stage",
+                daemon=True,
+            ),
+            threading.Thread(
+                target=contextvars.copy_context().run,
+                args=(self._run_write_stage,),
+                name="indexing-write-stage",
+                daemon=True,
+            ),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    @staticmethod
+    def _put(
+        target_queue: queue.Queue[_QueuedBatch | None],
+        item: _QueuedBatch | None,
+        stats: PipelineStageStats,
+    ) -> None:
+        start = time.monotonic()
+        target_queue.put(item)
+        stats.blocked_seconds += time.monotonic() - start
+
+    def _run_embed_stage(self) -> None:
+        while True:
+            item = self._embed_queue.get()
+            if item is None:
+                self._put(self._write_queue, None, self.embed_stats)
+                return
+            if self._abort.is_set():
+                continue
+
+            start = time.monotonic()
+            try:
+                embedded_batch = self._embed_stage(
+                    item.document_batch, item.index_attempt_metadata
+                )
+            except Exception as e:
+                embedded_batch = build_failed_batch_result(item.document_batch, e)
+            self.embed_stats.busy_seconds += time.monotonic() - start
+            self.embed_stats.batches += 1
+
+            if isinstance(embedded_batch, IndexingPipelineResult):
+                self._results.put(
+                    PipelinedBatchResult(
+                        document_batch=item.document_batch,
+                        index_attempt_metadata=item.index_attempt_metadata,
+                        result=embedded_batch,
+                    )
+                )
+                continue
+
+            item.embedded_batch = embedded_batch
+            self._put(self._write_queue, item, self.embed_stats)
+
+    def _run_write_stage(self) -> None:
+        while True:
+            item = self._write_queue.get()
+            if item is None:
+                return
+            if self._abort.is_set() or item.embedded_batch is None:
+                continue
+
+            start = time.monotonic()
+            try:
+                result = self._write_stage(
+                    item.embedded_batch, item.index_attempt_metadata
+                )
+            except Exception as e:
+                result = build_failed_batch_result(item.document_batch, e)
+            self.write_stats.busy_seconds += time.monotonic() - start
+            self.write_stats.batches += 1
+
+            self._results.put(
+                PipelinedBatchResult(
+                    document_batch=item.document_batch,
+                    index_attempt_metadata=item.index_attempt_metadata,
+                    result=result,
+                )
+            )
+
+    def _check_stages_alive(self) -> None:
+        if not all(thread.is_alive() for thread in self._threads):
+            raise RuntimeError("Pipelined indexing stage exited unexpectedly")
+
+    def submit(
+        self,
+        document_batch: list[Document],
+        index_attempt_metadata: IndexAttemptMetadata,
+    ) -> None:
+        """Queues a batch for indexing. Blocks while the embed stage is backed up."""
+        self._check_stages_alive()
+        self._put(
+            self._embed_queue,
+            _QueuedBatch(
+                document_batch=document_batch,
+                # the caller mutates its metadata object between batches
+                index_attempt_metadata=index_attempt_metadata.model_copy(),
+            ),
+            self.submit_stats,
+        )
+        self.submit_stats.batches += 1
+        self._num_in_flight += 1
+
+    def get_completed(self) -> list[PipelinedBatchResult]:
+        """Returns the results of all batches finished so far without blocking."""
+        completed: list[PipelinedBatchResult] = []
+        while True:
+            try:
+                completed.append(self._results.get_nowait())
+            except queue.Empty:
+                break
+
+        self._num_in_flight -= len(completed)
+        return completed
+
+    def drain(self) -> list[PipelinedBatchResult]:
+        """Blocks until every submitted batch has finished and returns their results."""
+        completed: list[PipelinedBatchResult] = []
+        while self._num_in_flight > 0:
+            try:
+                completed.append(self._results.get(timeout=_STAGE_POLL_INTERVAL))
+                self._num_in_flight -= 1
+            except queue.Empty:
+                self._check_stages_alive()
+
+        return completed
+
+    def close(self) -> None:
+        """Stops the stage threads. Batches that haven't started a stage yet are
+        dropped, so call `drain` first to finish all submitted work."""
+        if self._num_in_flight > 0:
+            self._abort.set()
+
+        # the stages skip queued work once aborted, so this can't block for long
+        self._embed_queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+        logger.info(
+            "Pipelined indexing stage timings: "
+            + ", ".join(
+                str(stats)
+                for stats in (self.submit_stats, self.embed_stats, self.write_stats)
+            )
+        )
+
+
+def build_pipelined_indexing_pipeline(
+    *,
+    embedder: IndexingEmbedder,
+    information_content_classification_model: InformationContentClassificationModel,
+    document_index: DocumentIndex,
+    db_session: Session,
+    tenant_id: str,
+    chunker: Chunker | None = None,
+    ignore_time_skip: bool = False,
+    callback: IndexingHeartbeatInterface | None = None,
+    max_queued_batches: int = PIPELINED_INDEXING_MAX_QUEUED_BATCHES,
+) -> PipelinedIndexingPipeline:
+    """Pipelined counterpart of `build_indexing_pipeline`. The write stage owns
+    `db_session`, the embed stage opens its own session per batch."""
+    components = get_indexing_pipeline_components(
+        embedder=embedder,
+        db_session=db_session,
+        chunker=chunker,
+        callback=callback,
+    )
+
+    def _embed_stage(
+        document_batch: list[Document],
+        index_attempt_metadata: IndexAttemptMetadata,
+    ) -> EmbeddedDocumentBatch | IndexingPipelineResult:
+        with get_session_with_current_tenant() as embed_db_session:
+            return embed_doc_batch(
+                document_batch=document_batch,
+                chunker=components.chunker,
+                embedder=embedder,
+                information_content_classification_model=information_content_classification_model,
+                index_attempt_metadata=index_attempt_metadata,
+                db_session=embed_db_session,
+                tenant_id=tenant_id,
+                enable_contextual_rag=components.enable_contextual_rag,
+                llm=components.llm,
+                ignore_time_skip=ignore_time_skip,
+            )
+
+    def _write_stage(
+        embedded_batch: EmbeddedDocumentBatch,
+        index_attempt_metadata: IndexAttemptMetadata,
+    ) -> IndexingPipelineResult:
+        return write_doc_batch(
+            embedded_batch=embedded_batch,
+            chunker=components.chunker,
+            document_index=document_index,
+            index_attempt_metadata=index_attempt_metadata,
+            db_session=db_session,
+            tenant_id=tenant_id,
+        )
+
+    return PipelinedIndexingPipeline(
+        embed_stage=_embed_stage,
+        write_stage=_write_stage,
+        max_queued_batches=max_queued_batches,
+    )
@@ -16,6 +16,7 @@ from onyx.db.entities import KGEntity
 from onyx.db.entities import KGEntityExtractionStaging
 from onyx.db.entities import merge_entities
 from onyx.db.entities import transfer_entity
+from onyx.db.kg_allowed_docs import invalidate_kg_allowed_documents__no_commit
 from onyx.db.kg_config import get_kg_config_settings
 from onyx.db.kg_config import validate_kg_settings
 from onyx.db.models import Document
@@ -374,6 +375,11 @@ def kg_clustering(
         )
     logger.info("Finished transferring all relationships")
 
+    # new KG documents may be visible to users, see kg_user_allowed_document
+    with get_session_with_current_tenant() as db_session:
+        invalidate_kg_allowed_documents__no_commit(db_session)
+        db_session.commit()
+
     # Delete the transferred objects from the staging tables
     try:
         with get_session_with_current_tenant() as db_session:
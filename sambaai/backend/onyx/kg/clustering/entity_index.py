@@ -0,0 +1,152 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Any
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from onyx.configs.kg_configs import KG_NORMALIZATION_INDEX_CACHE_MAX_TYPES
+from onyx.configs.kg_configs import KG_NORMALIZATION_INDEX_CACHE_TTL_SECONDS
+from onyx.db.entities import get_entity_names_by_types
+from onyx.db.entities import get_entity_type_versions
+from onyx.utils.logger import setup_logger
+from onyx.utils.ttl_cache import TTLCache
+
+logger = setup_logger()
+
+
+class KGEntityTypeIndex:
+    """In-memory trigram index over the names of all entities of one entity type.
+
+    Mirrors the trigram retrieval that used to run in Postgres per entity: the
+    candidates of a query are the entities sharing at least one trigram with it,
+    scored by | Q ∩ E | / min(|Q|, |E|)."""
+
+    def __init__(
+        self,
+        version: tuple[int, datetime | None],
+        rows: list[tuple[str, str, list[str], str | None, Any]],
+    ) -> None:
+        self.version = version
+        self.id_names = [row[0] for row in rows]
+        self.names = [row[1] for row in rows]
+        self.document_ids = [row[3] for row in rows]
+        self.subtypes = [row[4] for row in rows]
+
+        postings: dict[str, list[int]] = defaultdict(list)
+        trigram_counts = np.zeros(len(rows), dtype=np.int32)
+        for ind, row in enumerate(rows):
+            trigrams = set(row[2])
+            trigram_counts[ind] = len(trigrams)
+            for trigram in trigrams:
+                postings[trigram].append(ind)
+
+        self.trigram_counts = trigram_counts
+        self.postings = {
+            trigram: np.array(inds, dtype=np.int32)
+            for trigram, inds in postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.id_names)
+
+    def allowed_mask(self, allowed_doc_ids: set[str]) -> np.ndarray:
+        """Entities not tied to a document, or tied to one of the allowed docs."""
+        return np.fromiter(
+            (
+                document_id is None or document_id in allowed_doc_ids
+                for document_id in self.document_ids
+            ),
+            dtype=bool,
+            count=len(self),
+        )
+
+    def subtype_mask(self, subtype: str) -> np.ndarray:
+        """Same semantics as attributes @> {"subtype": subtype} in Postgres."""
+        return np.fromiter(
+            (
+                value == subtype or (isinstance(value, list) and subtype in value)
+                for value in self.subtypes
+            ),
+            dtype=bool,
+            count=len(self),
+        )
+
+    def search(
+        self, query_trigrams: list[str], mask: np.ndarray, limit: int
+    ) -> list[tuple[str, str, float]]:
+        """Returns up to `limit` (id_name, name, score) candidates allowed by
+        `mask`, best first."""
+        query_trigram_set = set(query_trigrams)
+        matches = [
+            self.postings[trigram]
+            for trigram in query_trigram_set
+            if trigram in self.postings
+        ]
+        if not matches:
+            return []
+
+        candidate_inds, overlaps = np.unique(
+            np.concatenate(matches), return_counts=True
+        )
+        allowed = mask[candidate_inds]
+        candidate_inds, overlaps = candidate_inds[allowed], overlaps[allowed]
+        scores = overlaps / np.minimum(
+            len(query_trigram_set), self.trigram_counts[candidate_inds]
+        )
+
+        top = np.argsort(-scores, kind="stable")[:limit]
+        return [
+            (
+                self.id_names[candidate_inds[i]],
+                self.names[candidate_inds[i]],
+                float(scores[i]),
+            )
+            for i in top
+        ]
+
+
+_ENTITY_TYPE_INDICES: TTLCache[tuple[str, str], KGEntityTypeIndex] = TTLCache(
+    max_entries=KG_NORMALIZATION_INDEX_CACHE_MAX_TYPES,
+    ttl_seconds=KG_NORMALIZATION_INDEX_CACHE_TTL_SECONDS,
+)
+
+
+def get_entity_type_indices(
+    db_session: Session, tenant_id: str, entity_types: list[str]
+) -> dict[str, KGEntityTypeIndex]:
+    """Get the name indices of the given entity types. Indices are cached per
+    tenant and entity type, and rebuilt when an entity of that type changed."""
+    versions = get_entity_type_versions(db_session, entity_types)
+
+    indices: dict[str, KGEntityTypeIndex] = {}
+    stale_types: list[str] = []
+    for entity_type in entity_types:
+        version = versions.get(entity_type, (0, None))
+        index = _ENTITY_TYPE_INDICES.get((tenant_id, entity_type))
+        if index is not None and index.version == version:
+            indices[entity_type] = index
+        else:
+            stale_types.append(entity_type)
+
+    if not stale_types:
+        return indices
+
+    rows_by_type: dict[str, list[tuple[str, str, list[str], str | None, Any]]] = (
+        defaultdict(list)
+    )
+    for entity_type, *row in get_entity_names_by_types(db_session, stale_types):
+        rows_by_type[entity_type].append(tuple(row))  # type: ignore
+
+    for entity_type in stale_types:
+        index = KGEntityTypeIndex(
+            version=versions.get(entity_type, (0, None)),
+            rows=rows_by_type[entity_type],
+        )
+        _ENTITY_TYPE_INDICES.set((tenant_id, entity_type), index)
+        indices[entity_type] = index
+        logger.debug(
+            f"Built KG name index for entity type {entity_type} with {len(index)} entities"
+        )
+
+    return indices
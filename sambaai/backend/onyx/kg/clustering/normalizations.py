@@ -1,26 +1,19 @@
 import re
 from collections import defaultdict
-from typing import cast
 
 import numpy as np
 from nltk import ngrams  # type: ignore
 from rapidfuzz.distance.DamerauLevenshtein import normalized_similarity
-from sqlalchemy import desc
-from sqlalchemy import Float
-from sqlalchemy import func
-from sqlalchemy import MetaData
-from sqlalchemy import select
-from sqlalchemy import String
-from sqlalchemy import Table
-from sqlalchemy.dialects.postgresql import ARRAY
 
 from onyx.configs.kg_configs import KG_NORMALIZATION_RERANK_LEVENSHTEIN_WEIGHT
 from onyx.configs.kg_configs import KG_NORMALIZATION_RERANK_NGRAM_WEIGHTS
 from onyx.configs.kg_configs import KG_NORMALIZATION_RERANK_THRESHOLD
 from onyx.configs.kg_configs import KG_NORMALIZATION_RETRIEVE_ENTITIES_LIMIT
 from onyx.db.engine import get_session_with_current_tenant
-from onyx.db.models import KGEntity
+from onyx.db.entities import get_name_trigrams
+from onyx.db.kg_temp_view import get_allowed_doc_ids
 from onyx.db.relationships import get_relationships_for_entity_type_pairs
+from onyx.kg.clustering.entity_index import get_entity_type_indices
 from onyx.kg.models import NormalizedEntities
 from onyx.kg.models import NormalizedRelationships
 from onyx.kg.utils.embeddings import encode_string_batch
@@ -32,8 +25,7 @@ from onyx.kg.utils.formatting_utils import make_relationship_id
 from onyx.kg.utils.formatting_utils import split_entity_id
 from onyx.kg.utils.formatting_utils import split_relationship_id
 from onyx.utils.logger import setup_logger
-from onyx.utils.threadpool_concurrency import run_functions_tuples_in_parallel
-from shared_configs.configs import POSTGRES_DEFAULT_SCHEMA_STANDARD_VALUE
+from shared_configs.contextvars import get_current_tenant_id
 
 logger = setup_logger()
 
@@ -54,95 +46,13 @@ def _clean_name(entity_name: str) -> str:
     )
 
 
-def _normalize_one_entity(
-    entity: str,
-    attributes: dict[str, str],
-    allowed_docs_temp_view_name: str | None = None,
+def _rerank_candidates(
+    cleaned_entity: str, candidates: list[tuple[str, str, float]]
 ) -> str | None:
     """
-    Matches a single entity to the best matching entity of the same type.
+    Reranks the trigram candidates of an entity with a weighted ngram analysis and
+    the damerau levenshtein distance, and returns the best match (if good enough).
     """
-    entity_type, entity_name = split_entity_id(entity)
-    if entity_name == "*":
-        return entity
-
-    cleaned_entity = _clean_name(entity_name)
-
-    # narrow filter to subtype if requested
-    type_filters = [KGEntity.entity_type_id_name == entity_type]
-    if "subtype" in attributes:
-        type_filters.append(
-            KGEntity.attributes.op("@>")({"subtype": attributes["subtype"]})
-        )
-
-    # step 1: find entities containing the entity_name or something similar
-    with get_session_with_current_tenant() as db_session:
-
-        # get allowed documents
-        metadata = MetaData()
-        if allowed_docs_temp_view_name is None:
-            raise ValueError("allowed_docs_temp_view_name is not available")
-        allowed_docs_temp_view = Table(
-            allowed_docs_temp_view_name,
-            metadata,
-            autoload_with=db_session.get_bind(),
-        )
-
-        # generate trigrams of the queried entity Q
-        query_trigrams = db_session.query(
-            getattr(func, POSTGRES_DEFAULT_SCHEMA_STANDARD_VALUE)
-            .show_trgm(cleaned_entity)
-            .cast(ARRAY(String(3)))
-            .label("trigrams")
-        ).cte("query")
-
-        candidates = cast(
-            list[tuple[str, str, float]],
-            db_session.query(
-                KGEntity.id_name,
-                KGEntity.name,
-                (
-                    # for each entity E, compute score = | Q ∩ E | / min(|Q|, |E|)
-                    func.cardinality(
-                        func.array(
-                            select(func.unnest(KGEntity.name_trigrams))
-                            .correlate(KGEntity)
-                            .intersect(
-                                select(
-                                    func.unnest(query_trigrams.c.trigrams)
-                                ).correlate(query_trigrams)
-                            )
-                            .scalar_subquery()
-                        )
-                    ).cast(Float)
-                    / func.least(
-                        func.cardinality(query_trigrams.c.trigrams),
-                        func.cardinality(KGEntity.name_trigrams),
-                    )
-                ).label("score"),
-            )
-            .select_from(KGEntity, query_trigrams)
-            .outerjoin(
-                allowed_docs_temp_view,
-                KGEntity.document_id == allowed_docs_temp_view.c.allowed_doc_id,
-            )
-            .filter(
-                *type_filters,
-                KGEntity.name_trigrams.overlap(query_trigrams.c.trigrams),
-                # Add filter for allowed docs - either document_id is NULL or it's in allowed_docs
-                (
-                    KGEntity.document_id.is_(None)
-                    | allowed_docs_temp_view.c.allowed_doc_id.isnot(None)
-                ),
-            )
-            .order_by(desc("score"))
-            .limit(KG_NORMALIZATION_RETRIEVE_ENTITIES_LIMIT)
-            .all(),
-        )
-    if not candidates:
-        return None
-
-    # step 2: do a weighted ngram analysis and damerau levenshtein distance to rerank
     n1, n2, n3 = (
         set(ngrams(cleaned_entity, 1)),
         set(ngrams(cleaned_entity, 2)),
@@ -186,6 +96,76 @@ def _normalize_one_entity(
     return candidates[0][0]
 
 
+def _normalize_entities_batch(
+    entities: list[str],
+    entity_attributes: list[dict[str, str]],
+    allowed_docs_temp_view_name: str | None,
+) -> list[str | None]:
+    """
+    Matches each entity to the best matching entity of the same type. The allowed
+    documents, the name indices of the entity types and the trigrams of all
+    entities are fetched once for the whole batch.
+    """
+    split_entities = [split_entity_id(entity) for entity in entities]
+    to_match = [
+        ind for ind, (_, entity_name) in enumerate(split_entities) if entity_name != "*"
+    ]
+    mapping: list[str | None] = [
+        entity if split_entities[ind][1] == "*" else None
+        for ind, entity in enumerate(entities)
+    ]
+    if not to_match:
+        return mapping
+
+    if allowed_docs_temp_view_name is None:
+        raise ValueError("allowed_docs_temp_view_name is not available")
+
+    cleaned_entities = {ind: _clean_name(split_entities[ind][1]) for ind in to_match}
+    entity_types = sorted({split_entities[ind][0] for ind in to_match})
+
+    # step 1: find entities containing the entity_name or something similar
+    with get_session_with_current_tenant() as db_session:
+        allowed_doc_ids = get_allowed_doc_ids(db_session, allowed_docs_temp_view_name)
+        indices = get_entity_type_indices(
+            db_session, get_current_tenant_id(), entity_types
+        )
+        query_trigrams = dict(
+            zip(
+                to_match,
+                get_name_trigrams(
+                    db_session, [cleaned_entities[ind] for ind in to_match]
+                ),
+            )
+        )
+
+    masks: dict[tuple[str, str | None], np.ndarray] = {}
+
+    def _get_mask(entity_type: str, subtype: str | None) -> np.ndarray:
+        if (entity_type, subtype) not in masks:
+            index = indices[entity_type]
+            if subtype is None:
+                masks[(entity_type, subtype)] = index.allowed_mask(allowed_doc_ids)
+            else:
+                # narrow filter to subtype if requested
+                masks[(entity_type, subtype)] = _get_mask(
+                    entity_type, None
+                ) & index.subtype_mask(subtype)
+        return masks[(entity_type, subtype)]
+
+    for ind in to_match:
+        entity_type = split_entities[ind][0]
+        candidates = indices[entity_type].search(
+            query_trigrams[ind],
+            _get_mask(entity_type, entity_attributes[ind].get("subtype")),
+            KG_NORMALIZATION_RETRIEVE_ENTITIES_LIMIT,
+        )
+        if candidates:
+            # step 2: do a weighted ngram analysis and damerau levenshtein distance to rerank
+            mapping[ind] = _rerank_candidates(cleaned_entities[ind], candidates)
+
+    return mapping
+
+
 def _get_existing_normalized_relationships(
     raw_relationships: list[str],
 ) -> dict[str, dict[str, list[str]]]:
@@ -243,11 +223,10 @@ def normalize_entities(
         get_attributes(attr_entity) for attr_entity in raw_entities_w_attributes
     ]
 
-    mapping: list[str | None] = run_functions_tuples_in_parallel(
-        [
-            (_normalize_one_entity, (entity, attributes, allowed_docs_temp_view_name))
-            for entity, attributes in zip(raw_entities, entity_attributes)
-        ]
+    mapping = _normalize_entities_batch(
+        raw_entities[: len(entity_attributes)],
+        entity_attributes,
+        allowed_docs_temp_view_name,
     )
     for entity, attributes, normalized_entity in zip(
         raw_entities, entity_attributes, mapping
@@ -24,12 +24,14 @@ from sentry_sdk.integrations.starlette import StarletteIntegration
 from starlette.types import Lifespan
 
 from onyx import __version__
+from onyx.agents.agent_search.graph_registry import warm_up_agent_graphs
 from onyx.auth.schemas import UserCreate
 from onyx.auth.schemas import UserRead
 from onyx.auth.schemas import UserUpdate
 from onyx.auth.users import auth_backend
 from onyx.auth.users import create_onyx_oauth_router
 from onyx.auth.users import fastapi_users
+from onyx.configs.agent_configs import AGENT_GRAPH_WARM_UP_ON_STARTUP
 from onyx.configs.app_configs import APP_API_PREFIX
 from onyx.configs.app_configs import APP_HOST
 from onyx.configs.app_configs import APP_PORT
@@ -95,6 +97,7 @@ from onyx.server.openai_assistants_api.full_openai_assistants_api import (
     get_full_openai_assistants_api_router,
 )
 from onyx.server.query_and_chat.chat_backend import router as chat_router
+from onyx.server.query_and_chat.chat_streaming import shutdown_chat_stream_executor
 from onyx.server.query_and_chat.query_backend import (
     admin_router as admin_query_router,
 )
@@ -267,8 +270,14 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     if AUTH_RATE_LIMITING_ENABLED:
         await setup_auth_limiter()
 
+    if AGENT_GRAPH_WARM_UP_ON_STARTUP and not DISABLE_GENERATIVE_AI:
+        # otherwise each graph is compiled by the first chat request using it
+        warm_up_agent_graphs()
+
     yield
 
+    shutdown_chat_stream_executor()
+
     SqlEngine.reset_engine()
 
     if AUTH_RATE_LIMITING_ENABLED:
@@ -0,0 +1,205 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from prometheus_client import Counter
+from redis.client import Redis
+
+from onyx.configs.model_configs import EMBEDDING_CACHE_DTYPE
+from onyx.configs.model_configs import EMBEDDING_CACHE_LOCAL_MAX_ENTRIES
+from onyx.configs.model_configs import EMBEDDING_CACHE_TTL_SECONDS
+from onyx.redis.redis_pool import get_raw_redis_client
+from onyx.utils.logger import setup_logger
+from shared_configs.contextvars import get_current_tenant_id
+from shared_configs.enums import EmbeddingProvider
+from shared_configs.enums import EmbedTextType
+from shared_configs.model_server_models import Embedding
+
+logger = setup_logger()
+
+EMBEDDING_CACHE_KEY_PREFIX = "embedding_cache"
+
+_SUPPORTED_DTYPES = {
+    # explicit little-endian so the stored bytes are portable across hosts
+    "float16": np.dtype("<f2"),
+    "float32": np.dtype("<f4"),
+}
+
+embedding_cache_lookups = Counter(
+    "onyx_embedding_cache_lookups_total",
+    "Embedding cache lookups by the layer that served them",
+    ["result"],  # local_hit | redis_hit | miss
+)
+
+
+class _LocalLRU:
+    """Small thread-safe LRU shared by every EmbeddingModel in the process so that
+    texts repeated within a run (titles, boilerplate chunks) skip the Redis round
+    trip."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._data: OrderedDict[str, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> bytes | None:
+        if self.max_entries <= 0:
+            return None
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: bytes) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+_local_lru = _LocalLRU(EMBEDDING_CACHE_LOCAL_MAX_ENTRIES)
+
+
+def encode_vector(embedding: Embedding, dtype: str = EMBEDDING_CACHE_DTYPE) -> bytes:
+    return np.asarray(embedding, dtype=_SUPPORTED_DTYPES[dtype]).tobytes()
+
+
+def decode_vector(raw: bytes, dtype: str = EMBEDDING_CACHE_DTYPE) -> Embedding:
+    return (
+        np.frombuffer(raw, dtype=_SUPPORTED_DTYPES[dtype]).astype(np.float32).tolist()
+    )
+
+
+class EmbeddingCache:
+    """Content-addressed embedding cache.
+
+    Keys are derived from everything that influences the vector the model server
+    returns (model, provider, text type, prefix, dimension, normalization and
+    context length) plus a hash of the exact text that would be sent, so a hit is
+    always interchangeable with a fresh model server call.
+
+    Values live in Redis with a sliding TTL and are scoped to the tenant. Failures
+    talking to Redis are logged and treated as misses, the cache never fails an
+    embedding call."""
+
+    def __init__(
+        self,
+        model_name: str | None,
+        provider_type: EmbeddingProvider | None,
+        text_type: EmbedTextType,
+        prefix: str | None,
+        normalize: bool,
+        max_seq_length: int,
+        reduced_dimension: int | None = None,
+        deployment_name: str | None = None,
+        api_url: str | None = None,
+        api_version: str | None = None,
+        tenant_id: str | None = None,
+        redis_client: Redis | None = None,
+        ttl_seconds: int = EMBEDDING_CACHE_TTL_SECONDS,
+        dtype: str = EMBEDDING_CACHE_DTYPE,
+    ) -> None:
+        if dtype not in _SUPPORTED_DTYPES:
+            raise ValueError(f"Unsupported embedding cache dtype: {dtype}")
+
+        namespace_parts = [
+            model_name or "",
+            deployment_name or "",
+            api_url or "",
+            api_version or "",
+            provider_type.value if provider_type else "local",
+            text_type.value,
+            prefix or "",
+            str(reduced_dimension),
+            str(normalize),
+            str(max_seq_length),
+            dtype,
+        ]
+        namespace = hashlib.sha256("\x1f".join(namespace_parts).encode()).hexdigest()
+
+        self.tenant_id = tenant_id or get_current_tenant_id()
+        self.key_prefix = (
+            f"{self.tenant_id}:{EMBEDDING_CACHE_KEY_PREFIX}:{namespace[:32]}:"
+        )
+        self.ttl_seconds = ttl_seconds
+        self.dtype = dtype
+        self._redis_client = redis_client
+
+    @property
+    def redis_client(self) -> Redis:
+        # keys are already tenant prefixed and the prefixing client does not
+        # handle pipelines, so go through the raw client
+        if self._redis_client is None:
+            self._redis_client = get_raw_redis_client()
+        return self._redis_client
+
+    def build_key(self, text: str) -> str:
+        return self.key_prefix + hashlib.sha256(text.encode()).hexdigest()
+
+    def get_many(self, texts: list[str]) -> list[Embedding | None]:
+        """Returns the cached embedding for each text, or None where missing."""
+        keys = [self.build_key(text) for text in texts]
+        raw_values: list[bytes | None] = [_local_lru.get(key) for key in keys]
+
+        remote_indices = [i for i, raw in enumerate(raw_values) if raw is None]
+        num_local_hits = len(keys) - len(remote_indices)
+        num_redis_hits = 0
+
+        if remote_indices:
+            try:
+                pipe = self.redis_client.pipeline(transaction=False)
+                for i in remote_indices:
+                    # GETEX refreshes the expiry so frequently reused entries stay
+                    pipe.getex(keys[i], ex=self.ttl_seconds)
+                for i, raw in zip(remote_indices, pipe.execute()):
+                    if raw is None:
+                        continue
+                    raw_values[i] = raw
+                    _local_lru.put(keys[i], raw)
+                    num_redis_hits += 1
+            except Exception:
+                logger.exception("Failed to read from the embedding cache")
+
+        num_misses = len(keys) - num_local_hits - num_redis_hits
+        embedding_cache_lookups.labels(result="local_hit").inc(num_local_hits)
+        embedding_cache_lookups.labels(result="redis_hit").inc(num_redis_hits)
+        embedding_cache_lookups.labels(result="miss").inc(num_misses)
+        logger.debug(
+            f"Embedding cache: local_hits={num_local_hits} "
+            f"redis_hits={num_redis_hits} misses={num_misses}"
+        )
+
+        return [
+            decode_vector(raw, self.dtype) if raw is not None else None
+            for raw in raw_values
+        ]
+
+    def set_many(self, texts: list[str], embeddings: list[Embedding]) -> None:
+        if len(texts) != len(embeddings):
+            raise ValueError(
+                f"Mismatched texts and embeddings: {len(texts)} != {len(embeddings)}"
+            )
+
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for text, embedding in zip(texts, embeddings):
+                key = self.build_key(text)
+                raw = encode_vector(embedding, self.dtype)
+                _local_lru.put(key, raw)
+                pipe.set(key, raw, ex=self.ttl_seconds)
+            pipe.execute()
+        except Exception:
+            logger.exception("Failed to write to the embedding cache")
+
+
+def clear_local_embedding_cache() -> None:
+    _local_lru.clear()
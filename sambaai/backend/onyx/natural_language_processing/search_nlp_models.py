@@ -6,6 +6,7 @@ from concurrent.futures import ThreadPoolExecutor
 from functools import partial
 from functools import wraps
 from typing import Any
+from typing import cast
 
 import requests
 from httpx import HTTPError
@@ -22,8 +23,11 @@ from onyx.configs.model_configs import (
     BATCH_SIZE_ENCODE_CHUNKS_FOR_API_EMBEDDING_SERVICES,
 )
 from onyx.configs.model_configs import DOC_EMBEDDING_CONTEXT_SIZE
+from onyx.configs.model_configs import EMBEDDING_CACHE_ENABLED
+from onyx.configs.model_configs import MODEL_SERVER_EMBEDDING_TRANSPORT
 from onyx.db.models import SearchSettings
 from onyx.indexing.indexing_heartbeat import IndexingHeartbeatInterface
+from onyx.natural_language_processing.embedding_cache import EmbeddingCache
 from onyx.natural_language_processing.exceptions import (
     ModelServerRateLimitError,
 )
@@ -34,6 +38,10 @@ from shared_configs.configs import INDEXING_MODEL_SERVER_HOST
 from shared_configs.configs import INDEXING_MODEL_SERVER_PORT
 from shared_configs.configs import MODEL_SERVER_HOST
 from shared_configs.configs import MODEL_SERVER_PORT
+from shared_configs.embedding_transport import build_accept_header
+from shared_configs.embedding_transport import decode_embeddings
+from shared_configs.embedding_transport import EMBEDDINGS_BINARY_MEDIA_TYPE
+from shared_configs.embedding_transport import SUPPORTED_EMBEDDING_DTYPES
 from shared_configs.enums import EmbeddingProvider
 from shared_configs.enums import EmbedTextType
 from shared_configs.enums import RerankerProvider
@@ -78,6 +86,16 @@ def build_model_server_url(
     return f"http://{model_server_url}"
 
 
+def _parse_embed_response(response: Response) -> EmbedResponse:
+    content_type = response.headers.get("content-type", "")
+    if content_type.startswith(EMBEDDINGS_BINARY_MEDIA_TYPE):
+        # skip validation, the payload can only contain floats
+        return EmbedResponse.model_construct(
+            embeddings=decode_embeddings(response.content).tolist()
+        )
+    return EmbedResponse(**response.json())
+
+
 class EmbeddingModel:
     def __init__(
         self,
@@ -112,6 +130,11 @@ class EmbeddingModel:
         )
         self.callback = callback
 
+        if MODEL_SERVER_EMBEDDING_TRANSPORT in SUPPORTED_EMBEDDING_DTYPES:
+            self.binary_transport_dtype: str | None = MODEL_SERVER_EMBEDDING_TRANSPORT
+        else:
+            self.binary_transport_dtype = None
+
         model_server_url = build_model_server_url(server_host, server_port)
         self.embed_server_endpoint = f"{model_server_url}/encoder/bi-encoder-embed"
 
@@ -129,6 +152,9 @@ class EmbeddingModel:
             if request_id:
                 headers["X-Onyx-Request-ID"] = request_id
 
+            if self.binary_transport_dtype:
+                headers["Accept"] = build_accept_header(self.binary_transport_dtype)
+
             response = requests.post(
                 self.embed_server_endpoint,
                 headers=headers,
@@ -160,7 +186,7 @@ class EmbeddingModel:
 
         try:
             response = final_make_request_func()
-            return EmbedResponse(**response.json())
+            return _parse_embed_response(response)
         except requests.HTTPError as e:
             if not response:
                 raise HTTPError("HTTP error occurred - response is None.") from e
@@ -182,6 +208,72 @@ class EmbeddingModel:
         num_threads: int = INDEXING_EMBEDDING_MODEL_NUM_THREADS,
         tenant_id: str | None = None,
         request_id: str | None = None,
+    ) -> list[Embedding]:
+        if not EMBEDDING_CACHE_ENABLED:
+            return self._encode_texts_with_model_server(
+                texts=texts,
+                text_type=text_type,
+                batch_size=batch_size,
+                max_seq_length=max_seq_length,
+                num_threads=num_threads,
+                tenant_id=tenant_id,
+                request_id=request_id,
+            )
+
+        embedding_cache = EmbeddingCache(
+            model_name=self.model_name,
+            provider_type=self.provider_type,
+            text_type=text_type,
+            prefix=(
+                self.query_prefix
+                if text_type == EmbedTextType.QUERY
+                else self.passage_prefix
+            ),
+            normalize=self.normalize,
+            max_seq_length=max_seq_length,
+            reduced_dimension=self.reduced_dimension,
+            deployment_name=self.deployment_name,
+            api_url=self.api_url,
+            api_version=self.api_version,
+            tenant_id=tenant_id,
+        )
+        embeddings = embedding_cache.get_many(texts)
+
+        # only send each distinct missing text to the model server once
+        missing_texts = list(
+            dict.fromkeys(
+                text for text, embedding in zip(texts, embeddings) if embedding is None
+            )
+        )
+        if missing_texts:
+            new_embeddings = self._encode_texts_with_model_server(
+                texts=missing_texts,
+                text_type=text_type,
+                batch_size=batch_size,
+                max_seq_length=max_seq_length,
+                num_threads=num_threads,
+                tenant_id=tenant_id,
+                request_id=request_id,
+            )
+            embedding_cache.set_many(missing_texts, new_embeddings)
+
+            text_to_embedding = dict(zip(missing_texts, new_embeddings))
+            embeddings = [
+                embedding if embedding is not None else text_to_embedding[text]
+                for text, embedding in zip(texts, embeddings)
+            ]
+
+        return cast(list[Embedding], embeddings)
+
+    def _encode_texts_with_model_server(
+        self,
+        texts: list[str],
+        text_type: EmbedTextType,
+        batch_size: int,
+        max_seq_length: int,
+        num_threads: int = INDEXING_EMBEDDING_MODEL_NUM_THREADS,
+        tenant_id: str | None = None,
+        request_id: str | None = None,
     ) -> list[Embedding]:
         text_batches = batch_list(texts, batch_size)
 
@@ -1,3 +1,4 @@
+import hashlib
 import os
 from abc import ABC
 from abc import abstractmethod
@@ -9,8 +10,11 @@ from transformers import logging as transformer_logging  # type:ignore
 
 from onyx.configs.model_configs import DOC_EMBEDDING_CONTEXT_SIZE
 from onyx.configs.model_configs import DOCUMENT_ENCODER_MODEL
+from onyx.configs.model_configs import TOKEN_COUNT_CACHE_MAX_ENTRIES
+from onyx.configs.model_configs import TOKEN_COUNT_CACHE_TTL_SECONDS
 from onyx.context.search.models import InferenceChunk
 from onyx.utils.logger import setup_logger
+from onyx.utils.ttl_cache import TTLCache
 from shared_configs.enums import EmbeddingProvider
 
 TRIM_SEP_PAT = "\n... {n} tokens removed...\n"
@@ -35,6 +39,14 @@ class BaseTokenizer(ABC):
     def decode(self, tokens: list[int]) -> str:
         pass
 
+    @property
+    def cache_id(self) -> str:
+        """Identifies the tokenizer in caches keyed by tokenizer."""
+        return f"{type(self).__name__}:{id(self)}"
+
+    def encode_batch(self, strings: list[str]) -> list[list[int]]:
+        return [self.encode(string) for string in strings]
+
 
 class TiktokenTokenizer(BaseTokenizer):
     _instances: dict[str, "TiktokenTokenizer"] = {}
@@ -48,12 +60,20 @@ class TiktokenTokenizer(BaseTokenizer):
         if not hasattr(self, "encoder"):
             import tiktoken
 
+            self.model_name = model_name
             self.encoder = tiktoken.encoding_for_model(model_name)
 
+    @property
+    def cache_id(self) -> str:
+        return f"tiktoken:{self.model_name}"
+
     def encode(self, string: str) -> list[int]:
         # this ignores special tokens that the model is trained on, see encode_ordinary for details
         return self.encoder.encode_ordinary(string)
 
+    def encode_batch(self, strings: list[str]) -> list[list[int]]:
+        return self.encoder.encode_ordinary_batch(strings)
+
     def tokenize(self, string: str) -> list[str]:
         encoded = self.encode(string)
         decoded = [self.encoder.decode([token]) for token in encoded]
@@ -71,8 +91,13 @@ class TiktokenTokenizer(BaseTokenizer):
 
 class HuggingFaceTokenizer(BaseTokenizer):
     def __init__(self, model_name: str):
+        self.model_name = model_name
         self.encoder: Tokenizer = Tokenizer.from_pretrained(model_name)
 
+    @property
+    def cache_id(self) -> str:
+        return f"huggingface:{self.model_name}"
+
     def _safer_encode(self, string: str) -> Encoding:
         """
         Encode a string using the HuggingFaceTokenizer, but if it fails,
@@ -90,6 +115,14 @@ class HuggingFaceTokenizer(BaseTokenizer):
         # this returns no special tokens
         return self._safer_encode(string).ids
 
+    def encode_batch(self, strings: list[str]) -> list[list[int]]:
+        try:
+            encodings = self.encoder.encode_batch(strings, add_special_tokens=False)
+        except Exception:
+            # fall back to encoding one by one so only the bad strings get cleaned
+            return [self.encode(string) for string in strings]
+        return [encoding.ids for encoding in encodings]
+
     def tokenize(self, string: str) -> list[str]:
         return self._safer_encode(string).tokens
 
@@ -170,6 +203,48 @@ def get_tokenizer(
     return _check_tokenizer_cache(provider_type, model_name)
 
 
+_TOKEN_COUNTS: TTLCache[tuple[str, bytes], int] = TTLCache(
+    max_entries=TOKEN_COUNT_CACHE_MAX_ENTRIES,
+    ttl_seconds=TOKEN_COUNT_CACHE_TTL_SECONDS,
+)
+
+
+def _token_count_key(tokenizer: BaseTokenizer, string: str) -> tuple[str, bytes]:
+    # surrogatepass, LLM output / documents can contain lone surrogates
+    content_hash = hashlib.blake2b(
+        string.encode("utf-8", "surrogatepass"), digest_size=16
+    ).digest()
+    return (tokenizer.cache_id, content_hash)
+
+
+def count_tokens_batch(strings: list[str], tokenizer: BaseTokenizer) -> list[int]:
+    """Number of tokens in each string, memoized by tokenizer and content hash.
+    Strings that aren't cached yet are encoded together in a single batch."""
+    keys = [_token_count_key(tokenizer, string) for string in strings]
+    counts: dict[tuple[str, bytes], int] = {}
+    uncached: dict[tuple[str, bytes], str] = {}
+    for key, string in zip(keys, strings):
+        if key in counts or key in uncached:
+            continue
+        cached_count = _TOKEN_COUNTS.get(key)
+        if cached_count is None:
+            uncached[key] = string
+        else:
+            counts[key] = cached_count
+
+    if uncached:
+        encoded = tokenizer.encode_batch(list(uncached.values()))
+        for key, tokens in zip(uncached.keys(), encoded):
+            counts[key] = len(tokens)
+            _TOKEN_COUNTS.set(key, len(tokens))
+
+    return [counts[key] for key in keys]
+
+
+def count_tokens(string: str, tokenizer: BaseTokenizer) -> int:
+    return count_tokens_batch([string], tokenizer)[0]
+
+
 def tokenizer_trim_content(
     content: str, desired_length: int, tokenizer: BaseTokenizer
 ) -> str:
@@ -0,0 +1,198 @@
+import contextvars
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass
+from dataclasses import field
+
+from prometheus_client import Counter
+from prometheus_client import Gauge
+from prometheus_client import Histogram
+
+from onyx.utils.logger import setup_logger
+
+logger = setup_logger()
+
+_MIN_WEIGHT = 0.01
+
+slack_events_queued = Gauge(
+    "onyx_slack_bot_queued_events",
+    "Slack events waiting for a worker",
+    ["tenant_id"],
+)
+slack_events_running = Gauge(
+    "onyx_slack_bot_running_events",
+    "Slack events being processed",
+    ["tenant_id"],
+)
+slack_events_rejected = Counter(
+    "onyx_slack_bot_rejected_events_total",
+    "Slack events rejected because the tenant's queue was full",
+    ["tenant_id"],
+)
+slack_event_queue_wait = Histogram(
+    "onyx_slack_bot_event_queue_wait_seconds",
+    "Time Slack events waited for a worker",
+    ["tenant_id"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0),
+)
+
+
+@dataclass
+class _Task:
+    func: Callable[[], None]
+    context: contextvars.Context
+    enqueued_at: float
+
+
+@dataclass
+class _TenantQueue:
+    weight: float
+    tasks: deque[_Task] = field(default_factory=deque)
+    running: int = 0
+    # processing time received so far, divided by the weight
+    virtual_time: float = 0.0
+
+    @property
+    def active(self) -> bool:
+        return bool(self.tasks) or self.running > 0
+
+
+class TenantFairScheduler:
+    """A bounded pool of worker threads shared by all tenants, with a queue per
+    tenant. Free workers pick the next event of the tenant that received the least
+    processing time (weighted), so a tenant with a burst of slow answers can't hold
+    back the others. A tenant also never occupies more than
+    `max_concurrent_per_tenant` workers, and `submit` rejects events once
+    `max_queued_per_tenant` are waiting.
+
+    Tasks run in the contextvars context they were submitted from (tenant id etc.)."""
+
+    def __init__(
+        self,
+        num_workers: int,
+        max_concurrent_per_tenant: int,
+        max_queued_per_tenant: int,
+        tenant_weights: dict[str, float] | None = None,
+        name: str = "fair_scheduler",
+    ) -> None:
+        self.num_workers = num_workers
+        self.max_concurrent_per_tenant = max(max_concurrent_per_tenant, 1)
+        self.max_queued_per_tenant = max_queued_per_tenant
+        self.tenant_weights = tenant_weights or {}
+        self.name = name
+
+        self._tenants: dict[str, _TenantQueue] = {}
+        self._condition = threading.Condition()
+        self._workers: list[threading.Thread] = []
+        self._stopping = False
+
+    def start(self) -> None:
+        for i in range(self.num_workers):
+            worker = threading.Thread(
+                target=self._work, name=f"{self.name}_{i}", daemon=True
+            )
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, tenant_id: str, func: Callable[[], None]) -> bool:
+        """Queues `func` for the tenant. Returns False if the tenant's queue is full."""
+        with self._condition:
+            if self._stopping:
+                return False
+
+            tenant = self._tenants.get(tenant_id)
+            if tenant is None:
+                weight = max(self.tenant_weights.get(tenant_id, 1.0), _MIN_WEIGHT)
+                tenant = _TenantQueue(weight=weight)
+                self._tenants[tenant_id] = tenant
+
+            if len(tenant.tasks) >= self.max_queued_per_tenant:
+                slack_events_rejected.labels(tenant_id=tenant_id).inc()
+                return False
+
+            if not tenant.active:
+                # idle tenants don't bank processing time, they start level with
+                # the least served active tenant
+                active_virtual_times = [
+                    other.virtual_time
+                    for other in self._tenants.values()
+                    if other.active
+                ]
+                if active_virtual_times:
+                    tenant.virtual_time = max(
+                        tenant.virtual_time, min(active_virtual_times)
+                    )
+
+            tenant.tasks.append(
+                _Task(
+                    func=func,
+                    context=contextvars.copy_context(),
+                    enqueued_at=time.monotonic(),
+                )
+            )
+            slack_events_queued.labels(tenant_id=tenant_id).inc()
+            self._condition.notify()
+        return True
+
+    def _next_task(self) -> tuple[str, _TenantQueue, _Task] | None:
+        eligible = [
+            (tenant.virtual_time, tenant_id, tenant)
+            for tenant_id, tenant in self._tenants.items()
+            if tenant.tasks and tenant.running < self.max_concurrent_per_tenant
+        ]
+        if not eligible:
+            return None
+        _, tenant_id, tenant = min(eligible, key=lambda candidate: candidate[0])
+        return tenant_id, tenant, tenant.tasks.popleft()
+
+    def _work(self) -> None:
+        while True:
+            with self._condition:
+                next_task = self._next_task()
+                while not self._stopping and next_task is None:
+                    self._condition.wait()
+                    next_task = self._next_task()
+                if self._stopping or next_task is None:
+                    return
+                tenant_id, tenant, task = next_task
+                tenant.running += 1
+
+            slack_events_queued.labels(tenant_id=tenant_id).dec()
+            slack_events_running.labels(tenant_id=tenant_id).inc()
+            start = time.monotonic()
+            slack_event_queue_wait.labels(tenant_id=tenant_id).observe(
+                start - task.enqueued_at
+            )
+            try:
+                task.context.run(task.func)
+            except Exception:
+                logger.exception(f"Failed to process event for tenant {tenant_id}")
+            finally:
+                elapsed = time.monotonic() - start
+                slack_events_running.labels(tenant_id=tenant_id).dec()
+                with self._condition:
+                    tenant.running -= 1
+                    tenant.virtual_time += elapsed / tenant.weight
+                    # the tenant may have been at its concurrency limit
+                    self._condition.notify()
+
+    def queued(self, tenant_id: str) -> int:
+        with self._condition:
+            tenant = self._tenants.get(tenant_id)
+            return len(tenant.tasks) if tenant else 0
+
+    def shutdown(self, timeout: float | None = None) -> None:
+        """Stops the workers after their current event, queued events are dropped."""
+        with self._condition:
+            self._stopping = True
+            dropped = sum(len(tenant.tasks) for tenant in self._tenants.values())
+            for tenant_id, tenant in self._tenants.items():
+                slack_events_queued.labels(tenant_id=tenant_id).dec(len(tenant.tasks))
+                tenant.tasks.clear()
+            self._condition.notify_all()
+        if dropped:
+            logger.warning(f"Dropped {dropped} queued events on shutdown")
+        for worker in self._workers:
+            worker.join(timeout=timeout)
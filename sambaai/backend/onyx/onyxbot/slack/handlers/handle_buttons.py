@@ -14,7 +14,6 @@ from onyx.chat.models import QADocsResponse
 from onyx.configs.constants import MessageType
 from onyx.configs.constants import SearchFeedbackType
 from onyx.configs.onyxbot_configs import DANSWER_FOLLOWUP_EMOJI
-from onyx.connectors.slack.utils import expert_info_from_slack_id
 from onyx.context.search.models import SavedSearchDoc
 from onyx.db.chat import get_chat_message
 from onyx.db.chat import translate_db_message_to_chat_message_detail
@@ -39,6 +38,7 @@ from onyx.onyxbot.slack.handlers.handle_regular_answer import (
     handle_regular_answer,
 )
 from onyx.onyxbot.slack.models import SlackMessageInfo
+from onyx.onyxbot.slack.slack_cache import get_slack_expert_info
 from onyx.onyxbot.slack.utils import build_feedback_id
 from onyx.onyxbot.slack.utils import decompose_action_id
 from onyx.onyxbot.slack.utils import fetch_group_ids_from_names
@@ -51,6 +51,7 @@ from onyx.onyxbot.slack.utils import TenantSocketModeClient
 from onyx.onyxbot.slack.utils import update_emote_react
 from onyx.server.query_and_chat.models import ChatMessageDetail
 from onyx.utils.logger import setup_logger
+from shared_configs.contextvars import get_current_tenant_id
 
 
 logger = setup_logger()
@@ -130,7 +131,7 @@ def handle_generate_answer_button(
     message_ts = req.payload["message"]["ts"]
     thread_ts = req.payload["container"].get("thread_ts", None)
     user_id = req.payload["user"]["id"]
-    expert_info = expert_info_from_slack_id(user_id, client.web_client, user_cache={})
+    expert_info = get_slack_expert_info(client._tenant_id, user_id, client.web_client)
     email = expert_info.email if expert_info else None
 
     if not thread_ts:
@@ -375,8 +376,8 @@ def handle_slack_feedback(
     message_id, doc_id, doc_rank = decompose_action_id(feedback_id)
 
     # Get Onyx user from Slack ID
-    expert_info = expert_info_from_slack_id(
-        user_id_to_post_confirmation, client, user_cache={}
+    expert_info = get_slack_expert_info(
+        get_current_tenant_id(), user_id_to_post_confirmation, client
     )
     email = expert_info.email if expert_info else None
 
@@ -31,10 +31,13 @@ from onyx.configs.app_configs import POD_NAME
 from onyx.configs.app_configs import POD_NAMESPACE
 from onyx.configs.constants import MessageType
 from onyx.configs.constants import OnyxRedisLocks
+from onyx.configs.onyxbot_configs import DANSWER_BOT_MAX_CONCURRENT_EVENTS_PER_TENANT
+from onyx.configs.onyxbot_configs import DANSWER_BOT_MAX_QUEUED_EVENTS_PER_TENANT
 from onyx.configs.onyxbot_configs import DANSWER_BOT_REPHRASE_MESSAGE
 from onyx.configs.onyxbot_configs import DANSWER_BOT_RESPOND_EVERY_CHANNEL
+from onyx.configs.onyxbot_configs import DANSWER_BOT_TENANT_WEIGHTS
+from onyx.configs.onyxbot_configs import DANSWER_BOT_WORKER_THREADS
 from onyx.configs.onyxbot_configs import NOTIFY_SLACKBOT_NO_ANSWER
-from onyx.connectors.slack.utils import expert_info_from_slack_id
 from onyx.context.search.retrieval.search_runner import (
     download_nltk_data,
 )
@@ -65,6 +68,7 @@ from onyx.onyxbot.slack.constants import KEEP_TO_YOURSELF_ACTION_ID
 from onyx.onyxbot.slack.constants import LIKE_BLOCK_ACTION_ID
 from onyx.onyxbot.slack.constants import SHOW_EVERYONE_ACTION_ID
 from onyx.onyxbot.slack.constants import VIEW_DOC_FEEDBACK_ID
+from onyx.onyxbot.slack.fair_scheduler import TenantFairScheduler
 from onyx.onyxbot.slack.handlers.handle_buttons import handle_doc_feedback_button
 from onyx.onyxbot.slack.handlers.handle_buttons import handle_followup_button
 from onyx.onyxbot.slack.handlers.handle_buttons import (
@@ -83,6 +87,7 @@ from onyx.onyxbot.slack.handlers.handle_message import (
 )
 from onyx.onyxbot.slack.handlers.handle_message import schedule_feedback_reminder
 from onyx.onyxbot.slack.models import SlackMessageInfo
+from onyx.onyxbot.slack.slack_cache import get_slack_expert_info
 from onyx.onyxbot.slack.utils import check_message_limit
 from onyx.onyxbot.slack.utils import decompose_action_id
 from onyx.onyxbot.slack.utils import get_channel_name_from_id
@@ -130,6 +135,34 @@ _SLACK_GREETINGS_TO_IGNORE = {
 # This is always (currently) the user id of Slack's official slackbot
 _OFFICIAL_SLACKBOT_USER_ID = "USLACKBOT"
 
+_BUSY_MESSAGE = (
+    "I'm handling a lot of questions right now, please ask again in a few minutes."
+)
+
+_slack_event_scheduler: TenantFairScheduler | None = None
+_slack_event_scheduler_lock = threading.Lock()
+
+
+def get_slack_event_scheduler() -> TenantFairScheduler | None:
+    """The worker pool processing the Slack events of all tenants of this pod, None
+    if events are processed on the socket mode listener threads."""
+    global _slack_event_scheduler
+
+    if DANSWER_BOT_WORKER_THREADS <= 0:
+        return None
+
+    with _slack_event_scheduler_lock:
+        if _slack_event_scheduler is None:
+            _slack_event_scheduler = TenantFairScheduler(
+                num_workers=DANSWER_BOT_WORKER_THREADS,
+                max_concurrent_per_tenant=DANSWER_BOT_MAX_CONCURRENT_EVENTS_PER_TENANT,
+                max_queued_per_tenant=DANSWER_BOT_MAX_QUEUED_EVENTS_PER_TENANT,
+                tenant_weights=DANSWER_BOT_TENANT_WEIGHTS,
+                name="slack_event_worker",
+            )
+            _slack_event_scheduler.start()
+        return _slack_event_scheduler
+
 
 class SlackbotHandler:
     def __init__(self) -> None:
@@ -158,7 +191,7 @@ class SlackbotHandler:
         # Start the Prometheus metrics server
         logger.info("Starting Prometheus metrics server")
         try:
-        start_http_server(8000)
+            start_http_server(8000)
             logger.info("Prometheus metrics server started on port 8000")
         except OSError as e:
             if "Address already in use" in str(e) or "cannot assign requested address" in str(e):
@@ -597,6 +630,11 @@ class SlackbotHandler:
         logger.info(f"Stopping {len(self.socket_clients)} socket clients")
         SlackbotHandler.stop_socket_clients(self.pod_id, self.socket_clients)
 
+        # Let the workers finish the events they are processing
+        if _slack_event_scheduler is not None:
+            logger.info("Stopping the Slack event workers")
+            _slack_event_scheduler.shutdown(timeout=30.0)
+
         # Release locks for all tenants we currently hold
         logger.info(f"Releasing locks for {len(self.tenant_ids)} tenants")
         for tenant_id in list(self.tenant_ids):
@@ -862,9 +900,7 @@ def build_request_details(
         message_ts = event.get("ts")
         thread_ts = event.get("thread_ts")
         sender_id = event.get("user") or None
-        expert_info = expert_info_from_slack_id(
-            sender_id, client.web_client, user_cache={}
-        )
+        expert_info = get_slack_expert_info(tenant_id, sender_id, client.web_client)
         email = expert_info.email if expert_info else None
 
         msg = remove_onyx_bot_tag(tenant_id, msg, client=client.web_client)
@@ -932,9 +968,7 @@ def build_request_details(
         channel = req.payload["channel_id"]
         msg = req.payload["text"]
         sender = req.payload["user_id"]
-        expert_info = expert_info_from_slack_id(
-            sender, client.web_client, user_cache={}
-        )
+        expert_info = get_slack_expert_info(tenant_id, sender, client.web_client)
         email = expert_info.email if expert_info else None
 
         single_msg = ThreadMessage(message=msg, sender=None, role=MessageType.USER)
@@ -1099,20 +1133,65 @@ def create_process_slack_event() -> (
         
         acknowledge_message(req, client)
 
-        try:
-            if req.type == "interactive":
-                if req.payload.get("type") == "block_actions":
-                    return action_routing(req, client)
-                elif req.payload.get("type") == "view_submission":
-                    return view_routing(req, client)
-            elif req.type == "events_api" or req.type == "slash_commands":
-                return process_message(req, client)
-        except Exception:
-            logger.exception("Failed to process slack event")
+        scheduler = get_slack_event_scheduler()
+        if scheduler is None:
+            return route_slack_event(req, client)
+
+        # process the event on the shared workers, so the tenant's other events
+        # (and other tenants) aren't held up by it
+        if not scheduler.submit(
+            client._tenant_id, lambda: route_slack_event(req, client)
+        ):
+            logger.warning(
+                f"Slack event queue full, rejecting event: "
+                f"tenant_id={client._tenant_id} {req.type=} {req.envelope_id=}"
+            )
+            reply_busy(req, client)
 
     return process_slack_event
 
 
+def route_slack_event(req: SocketModeRequest, client: TenantSocketModeClient) -> None:
+    try:
+        if req.type == "interactive":
+            if req.payload.get("type") == "block_actions":
+                return action_routing(req, client)
+            elif req.payload.get("type") == "view_submission":
+                return view_routing(req, client)
+        elif req.type == "events_api" or req.type == "slash_commands":
+            return process_message(req, client)
+    except Exception:
+        logger.exception("Failed to process slack event")
+
+
+def reply_busy(req: SocketModeRequest, client: TenantSocketModeClient) -> None:
+    """Lets the user know a rejected question won't be answered. Only done for
+    messages addressed to the bot, other rejected events are dropped silently."""
+    if req.type == "slash_commands":
+        channel = req.payload["channel_id"]
+        thread_ts = None
+    elif req.type == "events_api":
+        event = req.payload.get("event", {})
+        if event.get("bot_id") or not (
+            event.get("type") == "app_mention" or event.get("channel_type") == "im"
+        ):
+            return
+        channel = event["channel"]
+        thread_ts = event.get("thread_ts") or event.get("ts")
+    else:
+        return
+
+    try:
+        respond_in_thread_or_channel(
+            client=client.web_client,
+            channel=channel,
+            thread_ts=thread_ts,
+            text=_BUSY_MESSAGE,
+        )
+    except Exception:
+        logger.exception("Failed to send the busy reply")
+
+
 def _get_socket_client(
     slack_bot_tokens: SlackBotTokens, tenant_id: str, slack_bot_id: int
 ) -> TenantSocketModeClient:
@@ -0,0 +1,249 @@
+"""Caches for the Slack Web API lookups OnyxBot makes for every message.
+
+Users, channels and the bot's own ids rarely change, they are kept in a process
+local LRU backed by Redis (shared by all bot pods, tenant prefixed by the Redis
+client). Thread histories are cached as the raw conversations.replies messages, a
+follow up in a cached thread only fetches the messages after the last cached one.
+
+Entries are scoped by tenant and bot token, as a tenant can run several bots in
+different workspaces. Failures of the cache itself never fail the bot, they are
+logged and the Slack API is called instead."""
+
+import hashlib
+import json
+from collections.abc import Callable
+from typing import Any
+from typing import cast
+
+from prometheus_client import Counter
+from redis.exceptions import RedisError
+from slack_sdk import WebClient
+
+from onyx.configs.onyxbot_configs import DANSWER_BOT_SLACK_CACHE_MAX_ENTRIES
+from onyx.configs.onyxbot_configs import DANSWER_BOT_SLACK_CACHE_TTL_SECONDS
+from onyx.configs.onyxbot_configs import DANSWER_BOT_SLACK_THREAD_CACHE_MAX_ENTRIES
+from onyx.configs.onyxbot_configs import DANSWER_BOT_SLACK_THREAD_CACHE_TTL_SECONDS
+from onyx.connectors.models import BasicExpertInfo
+from onyx.connectors.slack.utils import expert_info_from_slack_user
+from onyx.redis.redis_pool import get_redis_client
+from onyx.utils.logger import setup_logger
+from onyx.utils.ttl_cache import TTLCache
+
+logger = setup_logger()
+
+_REDIS_KEY_PREFIX = "slack_cache"
+
+_USER_KIND = "user"
+_CHANNEL_KIND = "channel"
+_AUTH_IDS_KIND = "auth_ids"
+_THREAD_KIND = "thread"
+
+_LOCAL_HIT = "local_hit"
+_REDIS_HIT = "redis_hit"
+_MISS = "miss"
+
+slack_cache_lookups = Counter(
+    "onyx_slack_bot_cache_lookups_total",
+    "Lookups of the OnyxBot Slack API caches",
+    ["kind", "result"],
+)
+slack_thread_messages_fetched = Counter(
+    "onyx_slack_bot_thread_messages_fetched_total",
+    "Slack thread messages OnyxBot fetched from the Slack API",
+)
+
+# (tenant id, kind, bot token hash, key) -> JSON compatible value
+_local_cache: TTLCache[tuple[str, str, str, str], Any] = TTLCache(
+    max_entries=DANSWER_BOT_SLACK_CACHE_MAX_ENTRIES,
+    ttl_seconds=DANSWER_BOT_SLACK_CACHE_TTL_SECONDS,
+)
+_local_thread_cache: TTLCache[tuple[str, str, str, str], list[dict[str, Any]]] = (
+    TTLCache(
+        max_entries=DANSWER_BOT_SLACK_THREAD_CACHE_MAX_ENTRIES,
+        ttl_seconds=DANSWER_BOT_SLACK_THREAD_CACHE_TTL_SECONDS,
+    )
+)
+
+
+def _token_scope(client: WebClient) -> str:
+    # don't keep the raw bot tokens around in cache keys
+    return hashlib.sha256((client.token or "").encode()).hexdigest()[:16]
+
+
+def _redis_key(kind: str, scope: str, key: str) -> str:
+    return f"{_REDIS_KEY_PREFIX}:{kind}:{scope}:{key}"
+
+
+def _get_cached(
+    local_cache: TTLCache[tuple[str, str, str, str], Any],
+    tenant_id: str,
+    kind: str,
+    scope: str,
+    key: str,
+) -> Any | None:
+    if not local_cache.enabled:
+        return None
+
+    value = local_cache.get((tenant_id, kind, scope, key))
+    if value is not None:
+        slack_cache_lookups.labels(kind=kind, result=_LOCAL_HIT).inc()
+        return value
+
+    try:
+        raw_value = get_redis_client(tenant_id=tenant_id).get(
+            _redis_key(kind, scope, key)
+        )
+    except RedisError:
+        logger.warning(f"Failed to read the Slack {kind} cache from Redis")
+        raw_value = None
+    if raw_value is None:
+        slack_cache_lookups.labels(kind=kind, result=_MISS).inc()
+        return None
+
+    value = json.loads(cast(bytes, raw_value))
+    local_cache.set((tenant_id, kind, scope, key), value)
+    slack_cache_lookups.labels(kind=kind, result=_REDIS_HIT).inc()
+    return value
+
+
+def _set_cached(
+    local_cache: TTLCache[tuple[str, str, str, str], Any],
+    tenant_id: str,
+    kind: str,
+    scope: str,
+    key: str,
+    value: Any,
+) -> None:
+    if not local_cache.enabled:
+        return
+
+    local_cache.set((tenant_id, kind, scope, key), value)
+    try:
+        get_redis_client(tenant_id=tenant_id).set(
+            _redis_key(kind, scope, key),
+            json.dumps(value),
+            ex=int(local_cache.ttl_seconds),
+        )
+    except RedisError:
+        logger.warning(f"Failed to write the Slack {kind} cache to Redis")
+
+
+def _get_or_fetch(
+    tenant_id: str,
+    client: WebClient,
+    kind: str,
+    key: str,
+    fetch: Callable[[], Any | None],
+) -> Any | None:
+    scope = _token_scope(client)
+    value = _get_cached(_local_cache, tenant_id, kind, scope, key)
+    if value is not None:
+        return value
+
+    value = fetch()
+    # failed lookups aren't cached, they are retried by the next message
+    if value is not None:
+        _set_cached(_local_cache, tenant_id, kind, scope, key, value)
+    return value
+
+
+def get_slack_user(
+    tenant_id: str, user_id: str, client: WebClient
+) -> dict[str, Any] | None:
+    """The `user` object of users.info, None if the lookup failed."""
+
+    def _fetch() -> dict[str, Any] | None:
+        response = client.users_info(user=user_id)
+        if not response["ok"]:
+            return None
+        return cast(dict[str, Any], response.data).get("user", {})
+
+    return _get_or_fetch(tenant_id, client, _USER_KIND, user_id, _fetch)
+
+
+def get_slack_expert_info(
+    tenant_id: str, user_id: str | None, client: WebClient
+) -> BasicExpertInfo | None:
+    """Cached version of expert_info_from_slack_id."""
+    if not user_id:
+        return None
+    user = get_slack_user(tenant_id, user_id, client)
+    if user is None:
+        return None
+    return expert_info_from_slack_user(user)
+
+
+def get_slack_channel(
+    tenant_id: str, channel_id: str, client: WebClient
+) -> dict[str, Any]:
+    """The `channel` object of conversations.info. Raises SlackApiError like the
+    uncached call if the lookup fails."""
+
+    def _fetch() -> dict[str, Any]:
+        response = client.conversations_info(channel=channel_id)
+        response.validate()
+        return response["channel"]
+
+    return cast(
+        dict[str, Any],
+        _get_or_fetch(tenant_id, client, _CHANNEL_KIND, channel_id, _fetch),
+    )
+
+
+def get_slack_bot_auth_ids(
+    tenant_id: str, client: WebClient
+) -> tuple[str | None, str | None]:
+    """The user id and bot id of the bot the client's token belongs to."""
+
+    def _fetch() -> list[str | None] | None:
+        response = client.auth_test()
+        user_id = response.get("user_id")
+        bot_id = response.get("bot_id")
+        if user_id is None or bot_id is None:
+            return None
+        return [user_id, bot_id]
+
+    auth_ids = _get_or_fetch(tenant_id, client, _AUTH_IDS_KIND, "self", _fetch)
+    if auth_ids is None:
+        return None, None
+    return auth_ids[0], auth_ids[1]
+
+
+def get_slack_thread_messages(
+    tenant_id: str, channel: str, thread: str, client: WebClient
+) -> list[dict[str, Any]]:
+    """The raw messages of the thread (conversations.replies), oldest first. If the
+    thread is cached, only the messages after the last cached one are fetched.
+    Edits and deletions of cached messages show up once the thread expires."""
+    scope = _token_scope(client)
+    key = f"{channel}:{thread}"
+    cached_messages: list[dict[str, Any]] = (
+        _get_cached(_local_thread_cache, tenant_id, _THREAD_KIND, scope, key) or []
+    )
+
+    if cached_messages:
+        latest_ts = cached_messages[-1]["ts"]
+        response = client.conversations_replies(
+            channel=channel, ts=thread, oldest=latest_ts
+        )
+    else:
+        response = client.conversations_replies(channel=channel, ts=thread)
+
+    fetched_messages: list[dict[str, Any]] = cast(dict, response.data).get(
+        "messages", []
+    )
+    slack_thread_messages_fetched.inc(len(fetched_messages))
+
+    # the thread's parent message is always returned, skip what we already have
+    cached_ts = {message["ts"] for message in cached_messages}
+    new_messages = [
+        message for message in fetched_messages if message["ts"] not in cached_ts
+    ]
+    if not new_messages:
+        return cached_messages
+
+    messages = sorted(
+        cached_messages + new_messages, key=lambda message: float(message["ts"])
+    )
+    _set_cached(_local_thread_cache, tenant_id, _THREAD_KIND, scope, key, messages)
+    return messages
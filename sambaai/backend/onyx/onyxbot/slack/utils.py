@@ -2,7 +2,6 @@ import logging
 import random
 import re
 import string
-import threading
 import time
 import uuid
 from collections.abc import Generator
@@ -40,19 +39,20 @@ from onyx.llm.utils import dict_based_prompt_to_langchain_prompt
 from onyx.llm.utils import message_to_string
 from onyx.onyxbot.slack.constants import FeedbackVisibility
 from onyx.onyxbot.slack.models import ThreadMessage
+from onyx.onyxbot.slack.slack_cache import get_slack_bot_auth_ids
+from onyx.onyxbot.slack.slack_cache import get_slack_channel
+from onyx.onyxbot.slack.slack_cache import get_slack_thread_messages
+from onyx.onyxbot.slack.slack_cache import get_slack_user
 from onyx.prompts.miscellaneous_prompts import SLACK_LANGUAGE_REPHRASE_PROMPT
 from onyx.utils.logger import setup_logger
 from onyx.utils.telemetry import optional_telemetry
 from onyx.utils.telemetry import RecordType
 from onyx.utils.text_processing import replace_whitespaces_w_space
 from shared_configs.contextvars import CURRENT_TENANT_ID_CONTEXTVAR
+from shared_configs.contextvars import get_current_tenant_id
 
 logger = setup_logger()
 
-slack_token_user_ids: dict[str, str | None] = {}
-slack_token_bot_ids: dict[str, str | None] = {}
-slack_token_lock = threading.Lock()
-
 _DANSWER_BOT_MESSAGE_COUNT: int = 0
 _DANSWER_BOT_COUNT_START_TIME: float = time.time()
 
@@ -61,26 +61,7 @@ def get_onyx_bot_auth_ids(
     tenant_id: str, web_client: WebClient
 ) -> tuple[str | None, str | None]:
     """Returns a tuple of user_id and bot_id."""
-
-    user_id: str | None
-    bot_id: str | None
-
-    global slack_token_user_ids
-    global slack_token_bot_ids
-
-    with slack_token_lock:
-        user_id = slack_token_user_ids.get(tenant_id)
-        bot_id = slack_token_bot_ids.get(tenant_id)
-
-    if user_id is None or bot_id is None:
-        response = web_client.auth_test()
-        user_id = response.get("user_id")
-        bot_id = response.get("bot_id")
-        with slack_token_lock:
-            slack_token_user_ids[tenant_id] = user_id
-            slack_token_bot_ids[tenant_id] = bot_id
-
-    return user_id, bot_id
+    return get_slack_bot_auth_ids(tenant_id, web_client)
 
 
 def check_message_limit() -> bool:
@@ -420,9 +401,7 @@ def remove_slack_text_interactions(slack_str: str) -> str:
 
 
 def get_channel_from_id(client: WebClient, channel_id: str) -> dict[str, Any]:
-    response = client.conversations_info(channel=channel_id)
-    response.validate()
-    return response["channel"]
+    return get_slack_channel(get_current_tenant_id(), channel_id, client)
 
 
 def get_channel_name_from_id(
@@ -528,12 +507,10 @@ def fetch_user_semantic_id_from_id(
     if not user_id:
         return None
 
-    response = client.users_info(user=user_id)
-    if not response["ok"]:
+    user = get_slack_user(get_current_tenant_id(), user_id, client)
+    if user is None:
         return None
 
-    user: dict = cast(dict[Any, dict], response.data).get("user", {})
-
     return (
         user.get("real_name")
         or user.get("name")
@@ -545,8 +522,7 @@ def read_slack_thread(
     tenant_id: str, channel: str, thread: str, client: WebClient
 ) -> list[ThreadMessage]:
     thread_messages: list[ThreadMessage] = []
-    response = client.conversations_replies(channel=channel, ts=thread)
-    replies = cast(dict, response.data).get("messages", [])
+    replies = get_slack_thread_messages(tenant_id, channel, thread, client)
     for reply in replies:
         if "user" in reply and "bot_id" not in reply:
             message = reply["text"]
@@ -628,7 +604,7 @@ def slack_usage_report(action: str, sender_id: str | None, client: WebClient) ->
     onyx_user = None
     sender_email = None
     try:
-        sender_email = client.users_info(user=sender_id).data["user"]["profile"]["email"]  # type: ignore
+        sender_email = get_slack_user(get_current_tenant_id(), sender_id, client)["profile"]["email"]  # type: ignore
     except Exception:
         logger.warning("Unable to find sender email")
 
@@ -1,6 +1,5 @@
 import time
 from typing import cast
-from uuid import uuid4
 
 import redis
 from celery import Celery
@@ -10,9 +9,6 @@ from sqlalchemy.orm import Session
 
 from onyx.configs.app_configs import DB_YIELD_PER_DEFAULT
 from onyx.configs.constants import CELERY_VESPA_SYNC_BEAT_LOCK_TIMEOUT
-from onyx.configs.constants import OnyxCeleryPriority
-from onyx.configs.constants import OnyxCeleryQueues
-from onyx.configs.constants import OnyxCeleryTask
 from onyx.configs.constants import OnyxRedisConstants
 from onyx.db.connector_credential_pair import get_connector_credential_pair_from_id
 from onyx.db.document import (
@@ -61,6 +57,7 @@ class RedisConnectorCredentialPair(RedisObjectHelper):
         redis_client: Redis,
         lock: RedisLock,
         tenant_id: str,
+        batch_size: int = 1,
     ) -> tuple[int, int] | None:
         """We can limit the number of tasks generated here, which is useful to prevent
         one tenant from overwhelming the sync queue.
@@ -85,6 +82,7 @@ class RedisConnectorCredentialPair(RedisObjectHelper):
         )
 
         num_docs = 0
+        doc_id_batch: list[str] = []
 
         for doc_id in db_session.scalars(stmt).yield_per(DB_YIELD_PER_DEFAULT):
             doc_id = cast(str, doc_id)
@@ -101,34 +99,38 @@ class RedisConnectorCredentialPair(RedisObjectHelper):
             if doc_id in self.skip_docs:
                 continue
 
-            # celery's default task id format is "dd32ded3-00aa-4884-8b21-42f8332e7fac"
-            # the key for the result is "celery-task-meta-dd32ded3-00aa-4884-8b21-42f8332e7fac"
-            # we prefix the task id so it's easier to keep track of who created the task
-            # aka "documentset_1_6dd32ded3-00aa-4884-8b21-42f8332e7fac"
-            custom_task_id = f"{self.task_id_prefix}_{uuid4()}"
+            doc_id_batch.append(doc_id)
+            self.skip_docs.add(doc_id)
+            if len(doc_id_batch) < batch_size:
+                continue
 
-            # add to the tracking taskset in redis BEFORE creating the celery task.
             # note that for the moment we are using a single taskset key, not differentiated by cc_pair id
-            redis_client.sadd(
-                RedisConnectorCredentialPair.get_taskset_key(), custom_task_id
-            )
-
             # Priority on sync's triggered by new indexing should be medium
-            celery_app.send_task(
-                OnyxCeleryTask.VESPA_METADATA_SYNC_TASK,
-                kwargs=dict(document_id=doc_id, tenant_id=tenant_id),
-                queue=OnyxCeleryQueues.VESPA_METADATA_SYNC,
-                task_id=custom_task_id,
-                priority=OnyxCeleryPriority.MEDIUM,
+            self.send_vespa_metadata_sync_batch_task(
+                celery_app,
+                redis_client,
+                RedisConnectorCredentialPair.get_taskset_key(),
+                doc_id_batch,
+                tenant_id,
                 ignore_result=True,
             )
-
             num_tasks_sent += 1
-            self.skip_docs.add(doc_id)
+            doc_id_batch = []
 
             if num_tasks_sent >= max_tasks:
                 break
 
+        if doc_id_batch:
+            self.send_vespa_metadata_sync_batch_task(
+                celery_app,
+                redis_client,
+                RedisConnectorCredentialPair.get_taskset_key(),
+                doc_id_batch,
+                tenant_id,
+                ignore_result=True,
+            )
+            num_tasks_sent += 1
+
         return num_tasks_sent, num_docs
 
 
@@ -1,11 +1,16 @@
 from abc import ABC
 from abc import abstractmethod
+from typing import cast
+from uuid import uuid4
 
 from celery import Celery
 from redis import Redis
 from redis.lock import Lock as RedisLock
 from sqlalchemy.orm import Session
 
+from onyx.configs.constants import OnyxCeleryPriority
+from onyx.configs.constants import OnyxCeleryQueues
+from onyx.configs.constants import OnyxCeleryTask
 from onyx.redis.redis_pool import get_redis_client
 
 
@@ -33,6 +38,20 @@ class RedisObjectHelper(ABC):
         # example: documentset_taskset_1
         return f"{self.TASKSET_PREFIX}_{self._id}"
 
+    @property
+    def synced_docs_key(self) -> str:
+        # documents synced by the tasks of the taskset. Batch tasks add the documents
+        # of every attempt, the per document task adds one when it finishes
+        # example: documentset_taskset_1_synced_docs
+        return f"{self.taskset_key}_synced_docs"
+
+    def get_num_synced_docs(self) -> int:
+        num_synced_docs = self.redis.get(self.synced_docs_key)
+        if num_synced_docs is None:
+            return 0
+
+        return int(cast(int, num_synced_docs))
+
     @staticmethod
     def get_id_from_fence_key(key: str) -> str | None:
         """
@@ -79,6 +98,33 @@ class RedisObjectHelper(ABC):
         object_id = parts[1]
         return object_id
 
+    def send_vespa_metadata_sync_batch_task(
+        self,
+        celery_app: Celery,
+        redis_client: Redis,
+        taskset_key: str,
+        document_ids: list[str],
+        tenant_id: str,
+        ignore_result: bool = False,
+    ) -> None:
+        # celery's default task id format is "dd32ded3-00aa-4884-8b21-42f8332e7fac"
+        # the key for the result is "celery-task-meta-dd32ded3-00aa-4884-8b21-42f8332e7fac"
+        # we prefix the task id so it's easier to keep track of who created the task
+        # aka "documentset_1_6dd32ded3-00aa-4884-8b21-42f8332e7fac"
+        custom_task_id = f"{self.task_id_prefix}_{uuid4()}"
+
+        # add to the set BEFORE creating the task.
+        redis_client.sadd(taskset_key, custom_task_id)
+
+        celery_app.send_task(
+            OnyxCeleryTask.VESPA_METADATA_SYNC_BATCH_TASK,
+            kwargs=dict(document_ids=document_ids, tenant_id=tenant_id),
+            queue=OnyxCeleryQueues.VESPA_METADATA_SYNC,
+            task_id=custom_task_id,
+            priority=OnyxCeleryPriority.MEDIUM,
+            ignore_result=ignore_result,
+        )
+
     @abstractmethod
     def generate_tasks(
         self,
@@ -88,9 +134,11 @@ class RedisObjectHelper(ABC):
         redis_client: Redis,
         lock: RedisLock,
         tenant_id: str,
+        batch_size: int = 1,
     ) -> tuple[int, int] | None:
         """First element should be the number of actual tasks generated, second should
         be the number of docs that were candidates to be synced for the cc pair.
+        Each task syncs up to batch_size documents.
 
         The need for this is when we are syncing stale docs referenced by multiple
         connectors. In a single pass across multiple cc pairs, we only want a task
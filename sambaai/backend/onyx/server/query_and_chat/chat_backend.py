@@ -30,6 +30,7 @@ from onyx.chat.prompt_builder.citations_prompt import (
     compute_max_document_tokens_for_persona,
 )
 from onyx.configs.app_configs import WEB_DOMAIN
+from onyx.configs.chat_configs import ASYNC_CHAT_STREAMING_ENABLED
 from onyx.configs.chat_configs import HARD_DELETE_CHATS
 from onyx.configs.constants import DocumentSource
 from onyx.configs.constants import FileOrigin
@@ -77,6 +78,7 @@ from onyx.secondary_llm_flows.chat_session_naming import (
 )
 from onyx.server.documents.models import ConnectorBase
 from onyx.server.documents.models import CredentialBase
+from onyx.server.query_and_chat.chat_streaming import ChatStreamingResponse
 from onyx.server.query_and_chat.chat_utils import mime_type_to_chat_file_type
 from onyx.server.query_and_chat.models import ChatFeedbackRequest
 from onyx.server.query_and_chat.models import ChatMessageIdentifier
@@ -319,7 +321,7 @@ def rename_chat_session(
         return RenameChatSessionResponse(new_name=full_history[0].message)
 
     new_name = get_renamed_conversation_name(
-        full_history=full_history, 
+        full_history=full_history,
         llm=llm,
         chat_session_id=chat_session_id,  # Pass the session ID
     )
@@ -452,7 +454,9 @@ def handle_new_chat_message(
             db_session=db_session,
         )
 
-    def stream_generator() -> Generator[str, None, None]:
+    def stream_generator(
+        is_connected: Callable[[], bool],
+    ) -> Generator[str, None, None]:
         try:
             for packet in stream_chat_message(
                 new_msg_req=chat_message_req,
@@ -463,7 +467,7 @@ def handle_new_chat_message(
                 custom_tool_additional_headers=get_custom_tool_additional_request_headers(
                     request.headers
                 ),
-                is_connected=is_connected_func,
+                is_connected=is_connected,
             ):
                 yield packet
 
@@ -474,7 +478,12 @@ def handle_new_chat_message(
         finally:
             logger.debug("Stream generator finished")
 
-    return StreamingResponse(stream_generator(), media_type="text/event-stream")
+    if ASYNC_CHAT_STREAMING_ENABLED:
+        return ChatStreamingResponse(stream_generator)
+
+    return StreamingResponse(
+        stream_generator(is_connected_func), media_type="text/event-stream"
+    )
 
 
 @router.put("/set-message-as-latest")
@@ -0,0 +1,187 @@
+"""Async streaming of chat answers.
+
+The answer pipeline is synchronous. Wrapped in a plain StreamingResponse, every
+packet is produced on Starlette's shared threadpool (40 threads by default) and
+the disconnect check blocks a thread while it waits on the event loop, so a few
+dozen long answers starve every other sync endpoint of the API server.
+
+ChatStreamingResponse runs the whole answer on a dedicated, bounded thread pool
+instead. Packets are handed to the event loop through an asyncio queue and written
+in batches. When the client disconnects or the response ends otherwise, a
+threading.Event is set, and the answer pipeline sees it through its `is_connected`
+callback without any round trip to the event loop."""
+
+import asyncio
+import contextvars
+import threading
+import time
+from collections.abc import AsyncIterator
+from collections.abc import Callable
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi.responses import StreamingResponse
+from prometheus_client import Gauge
+from prometheus_client import Histogram
+from starlette.types import Receive
+from starlette.types import Scope
+from starlette.types import Send
+
+from onyx.configs.chat_configs import CHAT_STREAM_COALESCE_MS
+from onyx.configs.chat_configs import CHAT_STREAM_MAX_BUFFERED_PACKETS
+from onyx.configs.chat_configs import CHAT_STREAM_WORKER_THREADS
+from onyx.utils.logger import setup_logger
+
+logger = setup_logger()
+
+# upper bound of a single write to the client
+_MAX_CHUNK_CHARS = 64 * 1024
+# how often a producer waiting for the client checks for a disconnect
+_BUFFER_WAIT_SECONDS = 0.5
+
+chat_streams_active = Gauge(
+    "onyx_chat_streams_active",
+    "Chat answers being streamed on the chat stream thread pool",
+)
+chat_streams_waiting = Gauge(
+    "onyx_chat_streams_waiting",
+    "Chat answers waiting for a thread of the chat stream thread pool",
+)
+chat_stream_packets_per_write = Histogram(
+    "onyx_chat_stream_packets_per_write",
+    "Chat stream packets sent to the client in a single write",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+
+# produces the packets of an answer, given the `is_connected` callback
+PacketProducer = Callable[[Callable[[], bool]], Iterator[str]]
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def get_chat_stream_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=CHAT_STREAM_WORKER_THREADS,
+                    thread_name_prefix="chat_stream",
+                )
+    return _executor
+
+
+def shutdown_chat_stream_executor() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+class ChatStreamingResponse(StreamingResponse):
+    def __init__(
+        self,
+        produce_packets: PacketProducer,
+        executor: ThreadPoolExecutor | None = None,
+        max_buffered_packets: int = CHAT_STREAM_MAX_BUFFERED_PACKETS,
+        coalesce_seconds: float = CHAT_STREAM_COALESCE_MS / 1000,
+    ) -> None:
+        self._produce_packets = produce_packets
+        self._executor = executor
+        self._max_buffered_packets = max(max_buffered_packets, 1)
+        self._coalesce_seconds = coalesce_seconds
+        self._cancelled = threading.Event()
+        super().__init__(self._stream(), media_type="text/event-stream")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            # covers disconnects Starlette only notices while sending
+            self._cancelled.set()
+
+    def _is_connected(self) -> bool:
+        return not self._cancelled.is_set()
+
+    async def _stream(self) -> AsyncIterator[str]:
+        loop = asyncio.get_running_loop()
+        # None marks the end of the answer
+        queue: asyncio.Queue[str | None] = asyncio.Queue()
+        buffer_slots = threading.Semaphore(self._max_buffered_packets)
+
+        chat_streams_waiting.inc()
+        # if the client goes away before the answer got a thread, the producer
+        # returns right away once it gets one
+        loop.run_in_executor(
+            self._executor or get_chat_stream_executor(),
+            contextvars.copy_context().run,
+            self._produce,
+            loop,
+            queue,
+            buffer_slots,
+        )
+        try:
+            finished = False
+            while not finished:
+                packet = await queue.get()
+                if packet is None:
+                    break
+                if self._coalesce_seconds > 0:
+                    await asyncio.sleep(self._coalesce_seconds)
+
+                packets = [packet]
+                chunk_chars = len(packet)
+                while not queue.empty() and chunk_chars < _MAX_CHUNK_CHARS:
+                    next_packet = queue.get_nowait()
+                    if next_packet is None:
+                        finished = True
+                        break
+                    packets.append(next_packet)
+                    chunk_chars += len(next_packet)
+
+                for _ in packets:
+                    buffer_slots.release()
+                chat_stream_packets_per_write.observe(len(packets))
+                yield "".join(packets)
+        finally:
+            self._cancelled.set()
+
+    def _produce(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        queue: "asyncio.Queue[str | None]",
+        buffer_slots: threading.Semaphore,
+    ) -> None:
+        chat_streams_waiting.dec()
+        if self._cancelled.is_set():
+            return
+
+        chat_streams_active.inc()
+        start = time.monotonic()
+        packets: Iterator[str] | None = None
+        try:
+            packets = self._produce_packets(self._is_connected)
+            for packet in packets:
+                # pause the answer while the client is behind
+                while not buffer_slots.acquire(timeout=_BUFFER_WAIT_SECONDS):
+                    if self._cancelled.is_set():
+                        break
+                if self._cancelled.is_set():
+                    logger.debug("Client disconnected, stopping the answer stream")
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, packet)
+        except Exception:
+            logger.exception("Error in chat message streaming")
+        finally:
+            close = getattr(packets, "close", None)
+            if close is not None:
+                close()
+            chat_streams_active.dec()
+            logger.debug(f"Chat stream finished in {time.monotonic() - start:.2f}s")
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, None)
+            except RuntimeError:
+                # the event loop is already closed
+                pass
@@ -2,7 +2,6 @@ from collections.abc import Sequence
 from datetime import datetime
 from datetime import timedelta
 from datetime import timezone
-from functools import lru_cache
 
 from dateutil import tz
 from fastapi import Depends
@@ -17,7 +16,10 @@ from onyx.db.models import ChatMessage
 from onyx.db.models import ChatSession
 from onyx.db.models import TokenRateLimit
 from onyx.db.models import User
+from onyx.db.token_limit import any_rate_limit_exists
 from onyx.db.token_limit import fetch_all_global_token_rate_limits
+from onyx.server.query_and_chat.token_usage import fetch_token_usage
+from onyx.server.query_and_chat.token_usage import GLOBAL_TOKEN_USAGE_SCOPE
 from onyx.utils.logger import setup_logger
 from onyx.utils.variable_functionality import fetch_versioned_implementation
 
@@ -59,7 +61,15 @@ def _user_is_rate_limited_by_global() -> None:
 
         if global_rate_limits:
             global_cutoff_time = _get_cutoff_time(global_rate_limits)
-            global_usage = _fetch_global_usage(global_cutoff_time, db_session)
+            global_usage = fetch_token_usage(
+                [GLOBAL_TOKEN_USAGE_SCOPE],
+                global_cutoff_time,
+                lambda _, cutoff_time: {
+                    GLOBAL_TOKEN_USAGE_SCOPE: _fetch_global_usage(
+                        cutoff_time, db_session
+                    )
+                },
+            )[GLOBAL_TOKEN_USAGE_SCOPE]
 
             if _is_rate_limited(global_rate_limits, global_usage):
                 raise HTTPException(
@@ -117,19 +127,3 @@ def _is_rate_limited(
             return True
 
     return False
-
-
-@lru_cache()
-def any_rate_limit_exists() -> bool:
-    """Checks if any rate limit exists in the database. Is cached, so that if no rate limits
-    are setup, we don't have any effect on average query latency."""
-    logger.debug("Checking for any rate limits...")
-    with get_session_context_manager() as db_session:
-        return (
-            db_session.scalar(
-                select(TokenRateLimit.id).where(
-                    TokenRateLimit.enabled == True  # noqa: E712
-                )
-            )
-            is not None
-        )
@@ -0,0 +1,245 @@
+"""Per minute token usage counters for the token rate limits.
+
+Every chat message's token_count is added to a Redis hash per scope (the whole
+tenant, a user, a user group) keyed by the minute it was sent, so the rate limit
+checks read the usage in O(minutes in the window) instead of aggregating the chat
+messages in Postgres on every message.
+
+The buckets are built from Postgres when a scope has none yet (cold start, a rate
+limit with a longer period than before, lost Redis data) and rebuilt every
+TOKEN_USAGE_COUNTER_RECONCILE_SECONDS, which also corrects for messages that were
+counted but rolled back and for changes of group membership. If Redis is
+unavailable the usage is read from Postgres like before."""
+
+import time
+from collections.abc import Callable
+from collections.abc import Sequence
+from datetime import datetime
+from datetime import timezone
+from uuid import UUID
+
+from prometheus_client import Counter
+from redis.client import Redis
+from redis.exceptions import RedisError
+
+from onyx.configs.chat_configs import TOKEN_USAGE_COUNTER_RECONCILE_SECONDS
+from onyx.configs.chat_configs import TOKEN_USAGE_COUNTER_RETENTION_HOURS
+from onyx.configs.chat_configs import TOKEN_USAGE_COUNTERS_ENABLED
+from onyx.redis.redis_pool import get_raw_redis_client
+from onyx.utils.logger import setup_logger
+from shared_configs.contextvars import get_current_tenant_id
+
+logger = setup_logger()
+
+_BUCKETS_KEY_PREFIX = "token_usage"
+# the start of the window the buckets of a scope are complete for
+_COVERED_SINCE_KEY_PREFIX = "token_usage_covered_since"
+
+_RETENTION_SECONDS = TOKEN_USAGE_COUNTER_RETENTION_HOURS * 60 * 60
+
+GLOBAL_TOKEN_USAGE_SCOPE = "global"
+
+# scope -> usage per minute
+TokenUsage = dict[str, Sequence[tuple[datetime, int]]]
+
+token_usage_lookups = Counter(
+    "onyx_token_usage_lookups_total",
+    "Token usage lookups of the token rate limits per scope",
+    ["source"],
+)
+
+
+def user_token_usage_scope(user_id: UUID) -> str:
+    return f"user:{user_id}"
+
+
+def user_group_token_usage_scope(user_group_id: int) -> str:
+    return f"user_group:{user_group_id}"
+
+
+def _buckets_key(tenant_id: str, scope: str) -> str:
+    # the prefixing client doesn't handle pipelines, so the keys carry the tenant
+    return f"{tenant_id}:{_BUCKETS_KEY_PREFIX}:{scope}"
+
+
+def _covered_since_key(tenant_id: str, scope: str) -> str:
+    return f"{tenant_id}:{_COVERED_SINCE_KEY_PREFIX}:{scope}"
+
+
+def _minute(timestamp: float) -> int:
+    return int(timestamp // 60 * 60)
+
+
+def record_token_usage(
+    token_count: int,
+    user_id: UUID | None,
+    user_group_ids: Sequence[int] = (),
+    redis_client: Redis | None = None,
+) -> None:
+    """Adds the tokens of a chat message to the buckets of the current minute."""
+    if not TOKEN_USAGE_COUNTERS_ENABLED or token_count <= 0:
+        return
+
+    scopes = [GLOBAL_TOKEN_USAGE_SCOPE]
+    if user_id is not None:
+        scopes.append(user_token_usage_scope(user_id))
+    scopes.extend(user_group_token_usage_scope(group_id) for group_id in user_group_ids)
+
+    tenant_id = get_current_tenant_id()
+    minute = str(_minute(time.time()))
+    try:
+        pipe = (redis_client or get_raw_redis_client()).pipeline(transaction=False)
+        for scope in scopes:
+            key = _buckets_key(tenant_id, scope)
+            pipe.hincrby(key, minute, token_count)
+            pipe.expire(key, _RETENTION_SECONDS)
+        pipe.execute()
+    except RedisError:
+        # the usage is corrected by the next rebuild from Postgres
+        logger.warning("Failed to record token usage in Redis")
+
+
+def fetch_token_usage(
+    scopes: list[str],
+    cutoff_time: datetime,
+    fetch_usage_from_db: Callable[[list[str], datetime], TokenUsage],
+    redis_client: Redis | None = None,
+) -> TokenUsage:
+    """Usage per minute since `cutoff_time` for each scope. `fetch_usage_from_db`
+    returns the same from Postgres, it is used to build the buckets of scopes that
+    don't have complete ones and if the counters can't be used."""
+    now = time.time()
+    if (
+        not TOKEN_USAGE_COUNTERS_ENABLED
+        or cutoff_time.timestamp() < now - _RETENTION_SECONDS
+    ):
+        token_usage_lookups.labels(source="postgres").inc(len(scopes))
+        return fetch_usage_from_db(scopes, cutoff_time)
+
+    try:
+        return _fetch_token_usage(
+            redis_client or get_raw_redis_client(),
+            scopes,
+            cutoff_time,
+            now,
+            fetch_usage_from_db,
+        )
+    except RedisError:
+        logger.warning(
+            "Failed to read token usage from Redis, falling back to Postgres"
+        )
+        token_usage_lookups.labels(source="postgres").inc(len(scopes))
+        return fetch_usage_from_db(scopes, cutoff_time)
+
+
+def _fetch_token_usage(
+    redis_client: Redis,
+    scopes: list[str],
+    cutoff_time: datetime,
+    now: float,
+    fetch_usage_from_db: Callable[[list[str], datetime], TokenUsage],
+) -> TokenUsage:
+    tenant_id = get_current_tenant_id()
+    cutoff_minute = _minute(cutoff_time.timestamp())
+
+    pipe = redis_client.pipeline(transaction=False)
+    for scope in scopes:
+        pipe.get(_covered_since_key(tenant_id, scope))
+        pipe.hgetall(_buckets_key(tenant_id, scope))
+    results = pipe.execute()
+
+    buckets: dict[str, dict[int, int]] = {}
+    stale_scopes: list[str] = []
+    for i, scope in enumerate(scopes):
+        covered_since, raw_buckets = results[2 * i], results[2 * i + 1]
+        buckets[scope] = {
+            int(minute): int(tokens) for minute, tokens in raw_buckets.items()
+        }
+        if covered_since is None or int(covered_since) > cutoff_minute:
+            stale_scopes.append(scope)
+
+    token_usage_lookups.labels(source="redis").inc(len(scopes) - len(stale_scopes))
+    if stale_scopes:
+        token_usage_lookups.labels(source="postgres").inc(len(stale_scopes))
+        _rebuild_buckets(
+            redis_client,
+            tenant_id,
+            {scope: buckets[scope] for scope in stale_scopes},
+            cutoff_minute,
+            now,
+            fetch_usage_from_db,
+        )
+
+    _drop_expired_buckets(redis_client, tenant_id, buckets, now)
+
+    return {
+        scope: [
+            (datetime.fromtimestamp(minute, tz=timezone.utc), tokens)
+            for minute, tokens in sorted(scope_buckets.items())
+            if minute >= cutoff_minute
+        ]
+        for scope, scope_buckets in buckets.items()
+    }
+
+
+def _rebuild_buckets(
+    redis_client: Redis,
+    tenant_id: str,
+    buckets: dict[str, dict[int, int]],
+    cutoff_minute: int,
+    now: float,
+    fetch_usage_from_db: Callable[[list[str], datetime], TokenUsage],
+) -> None:
+    """Replaces the buckets of the finished minutes since `cutoff_minute` with the
+    usage in Postgres, in Redis and in `buckets`. The current minute is still being
+    counted, its bucket is kept."""
+    current_minute = _minute(now)
+    db_usage = fetch_usage_from_db(
+        list(buckets), datetime.fromtimestamp(cutoff_minute, tz=timezone.utc)
+    )
+
+    pipe = redis_client.pipeline(transaction=True)
+    for scope, scope_buckets in buckets.items():
+        for minute in scope_buckets:
+            if cutoff_minute <= minute < current_minute:
+                scope_buckets[minute] = 0
+        for time_sent, tokens in db_usage.get(scope, []):
+            minute = _minute(time_sent.timestamp())
+            if cutoff_minute <= minute < current_minute:
+                scope_buckets[minute] = int(tokens or 0)
+
+        finished_minutes = {
+            str(minute): tokens
+            for minute, tokens in scope_buckets.items()
+            if cutoff_minute <= minute < current_minute
+        }
+        if finished_minutes:
+            key = _buckets_key(tenant_id, scope)
+            pipe.hset(key, mapping=finished_minutes)
+            pipe.expire(key, _RETENTION_SECONDS)
+        pipe.set(
+            _covered_since_key(tenant_id, scope),
+            cutoff_minute,
+            ex=TOKEN_USAGE_COUNTER_RECONCILE_SECONDS,
+        )
+    pipe.execute()
+
+    logger.debug(f"Rebuilt the token usage buckets of {len(buckets)} scopes")
+
+
+def _drop_expired_buckets(
+    redis_client: Redis,
+    tenant_id: str,
+    buckets: dict[str, dict[int, int]],
+    now: float,
+) -> None:
+    oldest_minute = _minute(now - _RETENTION_SECONDS)
+    pipe = redis_client.pipeline(transaction=False)
+    has_expired = False
+    for scope, scope_buckets in buckets.items():
+        expired = [str(minute) for minute in scope_buckets if minute < oldest_minute]
+        if expired:
+            pipe.hdel(_buckets_key(tenant_id, scope), *expired)
+            has_expired = True
+    if has_expired:
+        pipe.execute()
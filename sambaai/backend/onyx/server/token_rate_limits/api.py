@@ -5,11 +5,11 @@ from sqlalchemy.orm import Session
 from onyx.auth.users import current_admin_user
 from onyx.db.engine import get_session
 from onyx.db.models import User
+from onyx.db.token_limit import any_rate_limit_exists
 from onyx.db.token_limit import delete_token_rate_limit
 from onyx.db.token_limit import fetch_all_global_token_rate_limits
 from onyx.db.token_limit import insert_global_token_rate_limit
 from onyx.db.token_limit import update_token_rate_limit
-from onyx.server.query_and_chat.token_limit import any_rate_limit_exists
 from onyx.server.token_rate_limits.models import TokenRateLimitArgs
 from onyx.server.token_rate_limits.models import TokenRateLimitDisplay
 
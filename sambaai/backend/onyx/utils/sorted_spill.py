@@ -0,0 +1,162 @@
+"""Sorting and diffing of string sets that don't fit in memory, for example all the
+document ids of a large connector.
+
+SortedStringSpill keeps at most `run_size` strings in memory. Whenever the buffer
+is full it is sorted and written to a temporary "run" file, iterating the spill
+merges the runs into one sorted stream. Two sorted streams are diffed with
+sorted_difference, which only looks at one string of each stream at a time.
+
+Strings are ordered by code point (Python's str ordering), the same as Postgres'
+"C" collation for UTF-8 text."""
+
+import heapq
+import os
+import tempfile
+from collections.abc import Iterable
+from collections.abc import Iterator
+from types import TracebackType
+
+# runs are merged in levels so no more files than this are open at once
+_MAX_MERGE_FAN_IN = 64
+_READ_BUFFER_BYTES = 1024 * 1024
+
+
+def _encode(value: str) -> bytes:
+    # one string per line, so newlines (and the escape character) are escaped
+    return (
+        value.replace("\\", "\\\\")
+        .replace("\n", "\\n")
+        .encode("utf-8", "surrogatepass")
+        + b"\n"
+    )
+
+
+def _decode(line: bytes) -> str:
+    value = line[:-1].decode("utf-8", "surrogatepass")
+    if "\\" not in value:
+        return value
+
+    chars: list[str] = []
+    escaped = False
+    for char in value:
+        if escaped:
+            chars.append("\n" if char == "n" else char)
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        else:
+            chars.append(char)
+    return "".join(chars)
+
+
+def _read_run(path: str) -> Iterator[str]:
+    with open(path, "rb", buffering=_READ_BUFFER_BYTES) as run_file:
+        for line in run_file:
+            yield _decode(line)
+
+
+def _unique(values: Iterable[str]) -> Iterator[str]:
+    previous: str | None = None
+    for value in values:
+        if value != previous:
+            yield value
+            previous = value
+
+
+class SortedStringSpill:
+    """A set of strings with bounded memory use, iterated in sorted order without
+    duplicates. Run files are removed by `close`, use it as a context manager."""
+
+    def __init__(self, run_size: int, directory: str | None = None) -> None:
+        if run_size <= 0:
+            raise ValueError(f"run_size must be positive, got {run_size}")
+        self.run_size = run_size
+        self.directory = directory
+        self.num_runs_written = 0
+
+        self._buffer: set[str] = set()
+        self._run_paths: list[str] = []
+
+    def add(self, value: str) -> None:
+        self._buffer.add(value)
+        if len(self._buffer) >= self.run_size:
+            self._spill()
+
+    def add_many(self, values: Iterable[str]) -> None:
+        for value in values:
+            self.add(value)
+
+    def _write_run(self, values: Iterable[str]) -> str:
+        fd, path = tempfile.mkstemp(
+            prefix="onyx_sorted_run_", suffix=".txt", dir=self.directory
+        )
+        self._run_paths.append(path)
+        with os.fdopen(fd, "wb", buffering=_READ_BUFFER_BYTES) as run_file:
+            run_file.writelines(_encode(value) for value in values)
+        self.num_runs_written += 1
+        return path
+
+    def _spill(self) -> None:
+        if not self._buffer:
+            return
+        self._write_run(sorted(self._buffer))
+        self._buffer = set()
+
+    def _merge_runs(self, paths: list[str]) -> str:
+        merged_path = self._write_run(
+            _unique(heapq.merge(*(_read_run(path) for path in paths)))
+        )
+        for path in paths:
+            self._remove_run(path)
+        return merged_path
+
+    def _remove_run(self, path: str) -> None:
+        self._run_paths.remove(path)
+        os.remove(path)
+
+    def __iter__(self) -> Iterator[str]:
+        """Sorted, deduplicated strings. The spill can still be added to afterwards."""
+        self._spill()
+        while len(self._run_paths) > _MAX_MERGE_FAN_IN:
+            self._merge_runs(self._run_paths[:_MAX_MERGE_FAN_IN])
+        return _unique(heapq.merge(*(_read_run(path) for path in self._run_paths)))
+
+    def close(self) -> None:
+        self._buffer = set()
+        for path in list(self._run_paths):
+            self._remove_run(path)
+
+    def __enter__(self) -> "SortedStringSpill":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+
+def _checked_sorted(values: Iterable[str], name: str) -> Iterator[str]:
+    previous: str | None = None
+    for value in values:
+        if previous is not None and value < previous:
+            raise ValueError(
+                f"{name} is not sorted: {value!r} comes after {previous!r}"
+            )
+        yield value
+        previous = value
+
+
+def sorted_difference(left: Iterable[str], right: Iterable[str]) -> Iterator[str]:
+    """The strings of `left` that aren't in `right`. Both must be sorted by code
+    point, which is verified on the way (a wrong order would silently yield strings
+    that are in `right`)."""
+    right_iter = _checked_sorted(right, "right")
+    right_value = next(right_iter, None)
+    for left_value in _unique(_checked_sorted(left, "left")):
+        while right_value is not None and right_value < left_value:
+            right_value = next(right_iter, None)
+        if right_value != left_value:
+            yield left_value
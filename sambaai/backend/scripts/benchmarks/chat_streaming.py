@@ -0,0 +1,165 @@
+"""Load test for the /send-message streaming of an API server process, comparing the
+legacy StreamingResponse (sync answer generator advanced on Starlette's threadpool,
+disconnects polled through the event loop) with ChatStreamingResponse
+(ASYNC_CHAT_STREAMING_ENABLED).
+
+A uvicorn server is started in process with an endpoint shaped like /send-message.
+Its answers are simulated: --tokens packets, each after --token-seconds of blocking
+work (the LLM call), with a disconnect check per packet like the answer pipeline
+does. --streams clients stream answers at the same time while a sync /health
+endpoint is probed, which shows whether other requests still get a thread.
+Reported are the completed streams per second, time to first packet, total stream
+time, writes per stream and the /health latency. Usage:
+
+python -m scripts.benchmarks.chat_streaming --streams 200 --tokens 100
+"""
+
+import argparse
+import asyncio
+import socket
+import statistics
+import threading
+import time
+from collections.abc import Callable
+from collections.abc import Generator
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import uvicorn
+from fastapi import Depends
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+from onyx.server.query_and_chat.chat_backend import is_connected
+from onyx.server.query_and_chat.chat_streaming import ChatStreamingResponse
+
+
+def _build_app(args: argparse.Namespace, async_streaming: bool) -> FastAPI:
+    app = FastAPI()
+    executor = ThreadPoolExecutor(max_workers=args.workers)
+
+    def _answer(is_connected: Callable[[], bool]) -> Generator[str, None, None]:
+        for i in range(args.tokens):
+            time.sleep(args.token_seconds)
+            if not is_connected():
+                return
+            yield f'{{"answer_piece": "token {i} "}}\n'
+
+    @app.post("/send-message")
+    def send_message(
+        is_connected_func: Callable[[], bool] = Depends(is_connected),
+    ) -> StreamingResponse:
+        if async_streaming:
+            return ChatStreamingResponse(_answer, executor=executor)
+        return StreamingResponse(
+            _answer(is_connected_func), media_type="text/event-stream"
+        )
+
+    @app.get("/health")
+    def health() -> dict[str, str]:
+        return {"status": "ok"}
+
+    return app
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _stream(
+    client: httpx.AsyncClient, results: list[tuple[float, float, int]]
+) -> None:
+    start = time.monotonic()
+    first_packet = None
+    writes = 0
+    async with client.stream("POST", "/send-message") as response:
+        async for _ in response.aiter_raw():
+            if first_packet is None:
+                first_packet = time.monotonic() - start
+            writes += 1
+    results.append((first_packet or 0.0, time.monotonic() - start, writes))
+
+
+async def _probe_health(
+    client: httpx.AsyncClient, stop: asyncio.Event, latencies: list[float]
+) -> None:
+    while not stop.is_set():
+        start = time.monotonic()
+        await client.get("/health")
+        latencies.append(time.monotonic() - start)
+        await asyncio.sleep(0.1)
+
+
+async def _load(port: int, args: argparse.Namespace) -> None:
+    results: list[tuple[float, float, int]] = []
+    health_latencies: list[float] = []
+    limits = httpx.Limits(max_connections=args.streams + 10)
+    async with httpx.AsyncClient(
+        base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=None
+    ) as client:
+        stop = asyncio.Event()
+        prober = asyncio.create_task(_probe_health(client, stop, health_latencies))
+        start = time.monotonic()
+        await asyncio.gather(*(_stream(client, results) for _ in range(args.streams)))
+        elapsed = time.monotonic() - start
+        stop.set()
+        await prober
+
+    first_packets = sorted(result[0] for result in results)
+    totals = sorted(result[1] for result in results)
+    health_latencies.sort()
+    print(f"    {len(results) / elapsed:8.2f} streams/s ({elapsed:.1f}s)")
+    print(
+        f"    first packet p50={first_packets[len(first_packets) // 2]:.2f}s "
+        f"p95={first_packets[int(len(first_packets) * 0.95)]:.2f}s"
+    )
+    print(
+        f"    stream time  p50={totals[len(totals) // 2]:.2f}s "
+        f"p95={totals[int(len(totals) * 0.95)]:.2f}s"
+    )
+    print(f"    writes/stream mean={statistics.mean(r[2] for r in results):.1f}")
+    print(
+        f"    /health      p50={health_latencies[len(health_latencies) // 2] * 1000:.0f}ms "
+        f"max={health_latencies[-1] * 1000:.0f}ms"
+    )
+
+
+def _run(args: argparse.Namespace, async_streaming: bool) -> None:
+    port = _free_port()
+    server = uvicorn.Server(
+        uvicorn.Config(
+            _build_app(args, async_streaming),
+            host="127.0.0.1",
+            port=port,
+            log_level="warning",
+        )
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    asyncio.run(_load(port, args))
+
+    server.should_exit = True
+    thread.join()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--streams", type=int, default=200)
+    parser.add_argument("--tokens", type=int, default=100)
+    parser.add_argument("--token-seconds", type=float, default=0.02)
+    parser.add_argument("--workers", type=int, default=256)
+    args = parser.parse_args()
+
+    print("StreamingResponse on the Starlette threadpool")
+    _run(args, async_streaming=False)
+    print(f"ChatStreamingResponse ({args.workers} workers)")
+    _run(args, async_streaming=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""Micro-benchmark for the CPU-bound batch assembly part of the indexing pipeline
+(grouping chunks per document and attaching access / document set metadata).
+
+No external services are needed. Usage:
+
+python -m scripts.benchmarks.indexing_batch_assembly --docs 1000 --chunks-per-doc 50
+"""
+
+import argparse
+import random
+import time
+from collections.abc import Callable
+
+from onyx.access.models import DocumentAccess
+from onyx.configs.constants import DEFAULT_BOOST
+from onyx.configs.constants import DocumentSource
+from onyx.connectors.models import Document
+from onyx.indexing.indexing_pipeline import build_access_aware_chunks
+from onyx.indexing.indexing_pipeline import group_chunks_by_document
+from onyx.indexing.models import ChunkEmbedding
+from onyx.indexing.models import DocMetadataAwareIndexChunk
+from onyx.indexing.models import IndexChunk
+from shared_configs.configs import POSTGRES_DEFAULT_SCHEMA
+
+
+def generate_chunks(
+    num_docs: int, chunks_per_doc: int, embedding_dim: int
+) -> list[IndexChunk]:
+    chunks: list[IndexChunk] = []
+    for doc_num in range(num_docs):
+        document = Document(
+            id=f"doc_{doc_num}",
+            source=DocumentSource.SALESFORCE,
+            sections=[],
+            metadata={},
+            semantic_identifier=f"Document {doc_num}",
+        )
+        for chunk_id in range(chunks_per_doc):
+            embedding = [random.uniform(-1, 1) for _ in range(embedding_dim)]
+            chunks.append(
+                IndexChunk(
+                    chunk_id=chunk_id,
+                    blurb=f"Blurb {chunk_id}",
+                    content=f"Content for chunk {chunk_id} of document {doc_num}.",
+                    source_links={},
+                    section_continuation=False,
+                    source_document=document,
+                    title_prefix="",
+                    metadata_suffix_semantic="",
+                    metadata_suffix_keyword="",
+                    doc_summary="",
+                    chunk_context="",
+                    mini_chunk_texts=None,
+                    contextual_rag_reserved_tokens=0,
+                    embeddings=ChunkEmbedding(
+                        full_embedding=embedding, mini_chunk_embeddings=[]
+                    ),
+                    title_embedding=embedding,
+                    large_chunk_id=None,
+                    large_chunk_reference_ids=[],
+                    image_file_name=None,
+                )
+            )
+    return chunks
+
+
+def legacy_assembly(
+    chunks: list[IndexChunk],
+    doc_ids: list[str],
+    doc_id_to_access_info: dict[str, DocumentAccess],
+    doc_id_to_document_set: dict[str, list[str]],
+) -> list[DocMetadataAwareIndexChunk]:
+    """The previous implementation: a full chunk scan per document and a
+    dump + re-validation of every chunk."""
+    doc_id_to_new_chunk_cnt = {
+        document_id: len(
+            [chunk for chunk in chunks if chunk.source_document.id == document_id]
+        )
+        for document_id in doc_ids
+    }
+    assert len(doc_id_to_new_chunk_cnt) == len(doc_ids)
+
+    return [
+        DocMetadataAwareIndexChunk(
+            **chunk.model_dump(),
+            access=doc_id_to_access_info[chunk.source_document.id],
+            document_sets=set(doc_id_to_document_set[chunk.source_document.id]),
+            user_file=None,
+            user_folder=None,
+            boost=DEFAULT_BOOST,
+            aggregated_chunk_boost_factor=1.0,
+            tenant_id=POSTGRES_DEFAULT_SCHEMA,
+        )
+        for chunk in chunks
+    ]
+
+
+def current_assembly(
+    chunks: list[IndexChunk],
+    doc_ids: list[str],
+    doc_id_to_access_info: dict[str, DocumentAccess],
+    doc_id_to_document_set: dict[str, list[str]],
+) -> list[DocMetadataAwareIndexChunk]:
+    doc_id_to_chunks = group_chunks_by_document(chunks)
+    doc_id_to_new_chunk_cnt = {
+        document_id: len(doc_id_to_chunks.get(document_id, []))
+        for document_id in doc_ids
+    }
+    assert len(doc_id_to_new_chunk_cnt) == len(doc_ids)
+
+    return build_access_aware_chunks(
+        chunks=chunks,
+        chunk_content_scores=[1.0] * len(chunks),
+        doc_id_to_access_info=doc_id_to_access_info,
+        doc_id_to_document_set=doc_id_to_document_set,
+        doc_id_to_user_file_id={},
+        doc_id_to_user_folder_id={},
+        id_to_db_doc_map={},
+        tenant_id=POSTGRES_DEFAULT_SCHEMA,
+    )
+
+
+def _time(
+    name: str,
+    func: Callable[..., list[DocMetadataAwareIndexChunk]],
+    *args: object,
+) -> float:
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    print(f"{name:>8}: {elapsed:.3f}s for {len(result)} chunks")
+    return elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=1000)
+    parser.add_argument("--chunks-per-doc", type=int, default=50)
+    parser.add_argument("--embedding-dim", type=int, default=128)
+    args = parser.parse_args()
+
+    print(
+        f"Generating {args.docs * args.chunks_per_doc} chunks "
+        f"({args.docs} docs x {args.chunks_per_doc} chunks, dim={args.embedding_dim})"
+    )
+    chunks = generate_chunks(args.docs, args.chunks_per_doc, args.embedding_dim)
+    doc_ids = [f"doc_{i}" for i in range(args.docs)]
+    doc_id_to_access_info = {
+        doc_id: DocumentAccess.build(
+            user_emails=[f"user_{i}@example.com" for i in range(5)],
+            user_groups=["group"],
+            external_user_emails=[],
+            external_user_group_ids=[],
+            is_public=False,
+        )
+        for doc_id in doc_ids
+    }
+    doc_id_to_document_set = {doc_id: ["Document Set"] for doc_id in doc_ids}
+
+    legacy = _time(
+        "legacy",
+        legacy_assembly,
+        chunks,
+        doc_ids,
+        doc_id_to_access_info,
+        doc_id_to_document_set,
+    )
+    current = _time(
+        "current",
+        current_assembly,
+        chunks,
+        doc_ids,
+        doc_id_to_access_info,
+        doc_id_to_document_set,
+    )
+    print(f"speedup: {legacy / current:.1f}x")
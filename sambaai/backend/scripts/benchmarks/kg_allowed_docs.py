@@ -0,0 +1,138 @@
+"""Compares the previous per query KG view setup (CREATE OR REPLACE VIEW + GRANT of
+views that evaluate the document ACLs) with the materialized allowed documents
+(onyx/db/kg_allowed_docs.py) for one user.
+
+Every iteration sets up the user's views and runs a KG style query against the
+entity view, like the KB search agent does. Needs a Postgres with KG data, the
+legacy views are created with a "_legacy" suffix and dropped afterwards. Usage:
+
+python -m scripts.benchmarks.kg_allowed_docs --user-email admin@example.com \
+    --iterations 20
+"""
+
+import argparse
+import statistics
+import time
+from collections.abc import Callable
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from onyx.configs.app_configs import DB_READONLY_USER
+from onyx.db.engine import get_session_with_tenant
+from onyx.db.engine import SqlEngine
+from onyx.db.kg_allowed_docs import _ALLOWED_KG_DOCS_QUERY
+from onyx.db.kg_allowed_docs import invalidate_kg_allowed_documents__no_commit
+from onyx.db.kg_temp_view import create_views
+from onyx.db.kg_temp_view import drop_views
+from onyx.db.kg_temp_view import get_user_view_names
+from shared_configs.configs import POSTGRES_DEFAULT_SCHEMA
+from shared_configs.contextvars import CURRENT_TENANT_ID_CONTEXTVAR
+
+_QUERY = "SELECT entity_type, COUNT(*) FROM {entity_view} GROUP BY entity_type"
+
+
+def _create_legacy_views(
+    db_session: Session, user_email: str, allowed_docs_view: str, entity_view: str
+) -> None:
+    db_session.execute(
+        text(
+            f"CREATE OR REPLACE VIEW {allowed_docs_view} AS {_ALLOWED_KG_DOCS_QUERY}"
+        ).bindparams(user_email=user_email)
+    )
+    db_session.execute(
+        text(
+            f"""
+    CREATE OR REPLACE VIEW {entity_view} AS
+    SELECT kge.id_name as entity,
+           kge.entity_type_id_name as entity_type,
+           kge.attributes as entity_attributes,
+           kge.document_id as source_document,
+           d.doc_updated_at as source_date
+    FROM kg_entity kge
+    INNER JOIN {allowed_docs_view} AD on AD.allowed_doc_id = kge.document_id
+    JOIN document d on d.id = kge.document_id
+    """
+        )
+    )
+    db_session.execute(text(f"GRANT SELECT ON {entity_view} TO {DB_READONLY_USER}"))
+    db_session.commit()
+
+
+def _time(func: Callable[[], None], iterations: int) -> list[float]:
+    timings = []
+    for _ in range(iterations):
+        start = time.monotonic()
+        func()
+        timings.append(time.monotonic() - start)
+    return timings
+
+
+def _report(name: str, timings: list[float]) -> None:
+    timings_ms = sorted(t * 1000 for t in timings)
+    print(
+        f"{name:>28}: mean={statistics.mean(timings_ms):8.1f}ms "
+        f"p50={timings_ms[len(timings_ms) // 2]:8.1f}ms max={timings_ms[-1]:8.1f}ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--user-email", required=True)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--tenant-id", default=POSTGRES_DEFAULT_SCHEMA)
+    args = parser.parse_args()
+
+    SqlEngine.init_engine(pool_size=5, max_overflow=0)
+    CURRENT_TENANT_ID_CONTEXTVAR.set(args.tenant_id)
+
+    view_names = get_user_view_names(args.user_email)
+    legacy_allowed_docs_view = f"{view_names.allowed_docs_view_name}_legacy"
+    legacy_entity_view = f"{view_names.kg_entity_view_name}_legacy"
+
+    with get_session_with_tenant(tenant_id=args.tenant_id) as db_session:
+
+        def _legacy() -> None:
+            _create_legacy_views(
+                db_session,
+                args.user_email,
+                legacy_allowed_docs_view,
+                legacy_entity_view,
+            )
+            db_session.execute(
+                text(_QUERY.format(entity_view=legacy_entity_view))
+            ).all()
+
+        def _materialized() -> None:
+            create_views(
+                db_session,
+                user_email=args.user_email,
+                allowed_docs_view_name=view_names.allowed_docs_view_name,
+                kg_relationships_view_name=view_names.kg_relationships_view_name,
+                kg_entity_view_name=view_names.kg_entity_view_name,
+            )
+            db_session.execute(
+                text(_QUERY.format(entity_view=view_names.kg_entity_view_name))
+            ).all()
+
+        def _materialized_after_invalidation() -> None:
+            invalidate_kg_allowed_documents__no_commit(db_session)
+            db_session.commit()
+            _materialized()
+
+        try:
+            _report("legacy views", _time(_legacy, args.iterations))
+            _report(
+                "materialized, invalidated",
+                _time(_materialized_after_invalidation, args.iterations),
+            )
+            _report("materialized", _time(_materialized, args.iterations))
+        finally:
+            drop_views(
+                allowed_docs_view_name=legacy_allowed_docs_view,
+                kg_entity_view_name=legacy_entity_view,
+            )
+
+
+if __name__ == "__main__":
+    main()
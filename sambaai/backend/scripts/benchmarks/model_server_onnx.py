@@ -0,0 +1,125 @@
+"""Compares the torch, ONNX and int8 quantized ONNX backends of the model server for a
+local embedding model (see model_server/inference_backend.py).
+
+For every backend the same synthetic passages are embedded; reported are the
+throughput and the parity with the torch embeddings (cosine similarity per text, and
+the overlap of the top 10 neighbours of some query texts). ONNX exports are cached in
+--cache-dir, so run the script twice to exclude the one time conversion. Usage:
+
+python -m scripts.benchmarks.model_server_onnx --model nomic-ai/nomic-embed-text-v1 \
+    --texts 512 --batch-size 32
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from model_server.inference_backend import load_sentence_transformer
+from model_server.inference_backend import ONNX_BACKEND
+from model_server.inference_backend import ONNX_INT8_BACKEND
+from model_server.inference_backend import TORCH_BACKEND
+from shared_configs.configs import MODEL_SERVER_ONNX_CACHE_DIR
+from shared_configs.configs import MODEL_SERVER_ONNX_QUANTIZATION_TARGET
+
+_WORDS = (
+    "the quarterly revenue report shows growth in enterprise customers while churn "
+    "remained flat across regions onboarding documentation explains how to configure "
+    "single sign on connectors for slack confluence and google drive deployments with "
+    "kubernetes helm charts require persistent volumes for vespa and postgres"
+).split()
+
+
+def _make_texts(num_texts: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    return [
+        " ".join(rng.choices(_WORDS, k=rng.randint(20, 300))) for _ in range(num_texts)
+    ]
+
+
+def _embed(
+    backend: str,
+    model_name: str,
+    texts: list[str],
+    batch_size: int,
+    max_seq_length: int,
+    cache_dir: str,
+    quantization_target: str,
+) -> tuple[np.ndarray, float, float]:
+    start = time.monotonic()
+    model = load_sentence_transformer(
+        model_name,
+        backend=backend,
+        cache_dir=cache_dir,
+        quantization_target=quantization_target,
+    )
+    model.max_seq_length = max_seq_length
+    load_time = time.monotonic() - start
+
+    # warm up, the first batches of onnxruntime include graph optimizations
+    model.encode(texts[:batch_size], batch_size=batch_size)
+
+    start = time.monotonic()
+    embeddings = model.encode(
+        texts, batch_size=batch_size, normalize_embeddings=True, convert_to_numpy=True
+    )
+    return np.asarray(embeddings), load_time, time.monotonic() - start
+
+
+def _top_k_overlap(reference: np.ndarray, candidate: np.ndarray, k: int) -> float:
+    queries = range(0, len(reference), max(len(reference) // 20, 1))
+    overlaps = []
+    for query in queries:
+        expected = set(np.argsort(-(reference @ reference[query]))[:k])
+        actual = set(np.argsort(-(candidate @ candidate[query]))[:k])
+        overlaps.append(len(expected & actual) / k)
+    return float(np.mean(overlaps))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default="nomic-ai/nomic-embed-text-v1")
+    parser.add_argument("--texts", type=int, default=512)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--max-seq-length", type=int, default=512)
+    parser.add_argument("--cache-dir", default=MODEL_SERVER_ONNX_CACHE_DIR)
+    parser.add_argument(
+        "--quantization-target", default=MODEL_SERVER_ONNX_QUANTIZATION_TARGET
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    texts = _make_texts(args.texts, args.seed)
+    reference: np.ndarray | None = None
+    torch_elapsed = 0.0
+    for backend in [TORCH_BACKEND, ONNX_BACKEND, ONNX_INT8_BACKEND]:
+        embeddings, load_time, elapsed = _embed(
+            backend,
+            args.model,
+            texts,
+            args.batch_size,
+            args.max_seq_length,
+            args.cache_dir,
+            args.quantization_target,
+        )
+
+        line = (
+            f"{backend:>10}: load={load_time:6.1f}s encode={elapsed:6.2f}s "
+            f"texts/s={len(texts) / elapsed:7.1f}"
+        )
+        if reference is None:
+            reference = embeddings
+            torch_elapsed = elapsed
+        else:
+            cosine = np.sum(reference * embeddings, axis=1)
+            line += (
+                f" speedup={torch_elapsed / elapsed:4.1f}x "
+                f"cosine_min={cosine.min():.4f} cosine_mean={cosine.mean():.4f} "
+                f"top10_overlap={_top_k_overlap(reference, embeddings, 10):.3f}"
+            )
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
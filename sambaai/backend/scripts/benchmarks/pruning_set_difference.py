@@ -0,0 +1,108 @@
+"""Memory and time of the pruning set difference (connector_pruning_generator_task in
+onyx/background/celery/tasks/pruning/tasks.py) for a large cc pair, comparing the
+previous in memory sets with the sorted spill + merge.
+
+The source yields --ids document ids in batches, in arbitrary order like a
+connector. The indexed ids come sorted like the Postgres stream, --removed-percent of
+them are no longer in the source. Each variant runs in its own process, reported is
+its peak RSS above the baseline. No external services are needed. Usage:
+
+python -m scripts.benchmarks.pruning_set_difference --ids 5000000
+"""
+
+import argparse
+import multiprocessing
+import resource
+import time
+from collections.abc import Iterator
+
+from onyx.utils.sorted_spill import sorted_difference
+from onyx.utils.sorted_spill import SortedStringSpill
+
+_BATCH_SIZE = 500
+# ids look like the urls most connectors use
+_ID_FORMAT = "https://drive.google.com/file/d/{:012d}/view"
+
+
+def _doc_id(i: int) -> str:
+    return _ID_FORMAT.format(i)
+
+
+def _source_batches(num_ids: int, removed_every: int) -> Iterator[set[str]]:
+    # a permutation of the ids, so they don't arrive sorted
+    stride = 1_000_003
+    batch: set[str] = set()
+    for i in range(num_ids):
+        doc_index = (i * stride) % num_ids
+        if removed_every and doc_index % removed_every == 0:
+            continue
+        batch.add(_doc_id(doc_index))
+        if len(batch) >= _BATCH_SIZE:
+            yield batch
+            batch = set()
+    if batch:
+        yield batch
+
+
+def _indexed_ids(num_ids: int) -> Iterator[str]:
+    # zero padded, so numeric order is string order
+    for i in range(num_ids):
+        yield _doc_id(i)
+
+
+def _max_rss_mb() -> float:
+    # kilobytes on linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _in_memory(args: argparse.Namespace) -> int:
+    all_connector_doc_ids: set[str] = set()
+    for doc_ids in _source_batches(args.ids, args.removed_every):
+        all_connector_doc_ids.update(doc_ids)
+    # previously full Document rows, only their ids were kept
+    all_indexed_document_ids = set(_indexed_ids(args.ids))
+    return len(list(all_indexed_document_ids - all_connector_doc_ids))
+
+
+def _sorted_spill(args: argparse.Namespace) -> int:
+    with SortedStringSpill(run_size=args.run_size) as connector_doc_ids:
+        for doc_ids in _source_batches(args.ids, args.removed_every):
+            connector_doc_ids.add_many(doc_ids)
+        return sum(
+            1 for _ in sorted_difference(_indexed_ids(args.ids), connector_doc_ids)
+        )
+
+
+def _measure(
+    name: str, args: argparse.Namespace, results: "multiprocessing.Queue[str]"
+) -> None:
+    baseline = _max_rss_mb()
+    start = time.monotonic()
+    removed = _in_memory(args) if name == "in memory sets" else _sorted_spill(args)
+    results.put(
+        f"{name:>15}: {time.monotonic() - start:7.1f}s "
+        f"peak rss +{_max_rss_mb() - baseline:7.0f}MB docs_to_remove={removed}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ids", type=int, default=5_000_000)
+    parser.add_argument("--removed-percent", type=float, default=1.0)
+    parser.add_argument("--run-size", type=int, default=200_000)
+    args = parser.parse_args()
+    args.removed_every = (
+        int(100 / args.removed_percent) if args.removed_percent > 0 else 0
+    )
+
+    print(f"{args.ids} ids, run size {args.run_size}")
+    results: multiprocessing.Queue[str] = multiprocessing.Queue()
+    for name in ["in memory sets", "sorted spill"]:
+        process = multiprocessing.Process(target=_measure, args=(name, args, results))
+        process.start()
+        print(results.get())
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
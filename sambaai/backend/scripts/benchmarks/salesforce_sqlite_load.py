@@ -0,0 +1,189 @@
+"""Compares loading Salesforce bulk API CSVs into the sqlite db row by row
+(OnyxSalesforceSQLite.update_from_csv) with the parallel staging + bulk merge path
+(sqlite_bulk_load.stage_csvs_in_parallel + OnyxSalesforceSQLite.merge_staging_dbs).
+
+The records are the Account/Contact/Opportunity example data of the shelve tests
+(create_csv_with_example_data), copied --copies times with new valid ids. Copies
+get an owner and the contacts and opportunities an account, so that parent
+relationships are extracted like for real data. Usage:
+
+python -m scripts.benchmarks.salesforce_sqlite_load --copies 2500 --workers 4
+"""
+
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+from unittest.mock import patch
+
+from onyx.connectors.salesforce import utils as salesforce_utils
+from onyx.connectors.salesforce.shelve_stuff import shelve_utils
+from onyx.connectors.salesforce.shelve_stuff import test_salesforce_shelves
+from onyx.connectors.salesforce.shelve_stuff.test_salesforce_shelves import (
+    clear_sf_db,
+)
+from onyx.connectors.salesforce.shelve_stuff.test_salesforce_shelves import (
+    create_csv_with_example_data,
+)
+from onyx.connectors.salesforce.sqlite_bulk_load import stage_csvs_in_parallel
+from onyx.connectors.salesforce.sqlite_functions import OnyxSalesforceSQLite
+
+# the example data has no users, the owners are generated
+_NUM_USERS = 100
+
+
+def _make_id(prefix: str, n: int) -> str:
+    # no upper case chars in the first 15, so the checksum is always AAA, see
+    # validate_salesforce_id
+    return f"{prefix}bm{n:010d}AAA"
+
+
+def _read_example_records(directory: str) -> dict[str, list[dict[str, str]]]:
+    """The example records of the shelve tests, read back from the CSVs written by
+    create_csv_with_example_data. The helpers write to BASE_DATA_PATH (the
+    connector's data directory), so it is pointed at `directory` meanwhile."""
+    with patch.object(salesforce_utils, "BASE_DATA_PATH", directory), patch.object(
+        shelve_utils, "BASE_DATA_PATH", directory
+    ), patch.object(test_salesforce_shelves, "BASE_DATA_PATH", directory):
+        create_csv_with_example_data()
+        records_by_type: dict[str, list[dict[str, str]]] = {}
+        for object_type in sorted(os.listdir(directory)):
+            csv_path = os.path.join(directory, object_type, "test_data.csv")
+            if os.path.isfile(csv_path):
+                with open(csv_path, newline="", encoding="utf-8") as f:
+                    records_by_type[object_type] = list(csv.DictReader(f))
+        clear_sf_db()
+    return records_by_type
+
+
+def _write_csvs(
+    directory: str, num_copies: int, rows_per_csv: int, seed: int
+) -> dict[str, list[str]]:
+    rng = random.Random(seed)
+    example_records = _read_example_records(os.path.join(directory, "examples"))
+
+    users = [_make_id("005", i) for i in range(_NUM_USERS)]
+    rows_by_type: dict[str, list[dict[str, str]]] = {
+        "User": [
+            {"Id": id, "Email": f"user{i}@example.com", "Name": f"User {i}"}
+            for i, id in enumerate(users)
+        ]
+    }
+    num_accounts = len(example_records["Account"]) * num_copies
+    accounts = [_make_id("001", i) for i in range(num_accounts)]
+    # accounts first, the others reference them
+    for object_type in ["Account", "Contact", "Opportunity"]:
+        records = example_records[object_type]
+        rows = []
+        for copy in range(num_copies):
+            for i, record in enumerate(records):
+                n = copy * len(records) + i
+                row = dict(record, Id=_make_id(record["Id"][:3], n))
+                row["OwnerId"] = rng.choice(users)
+                if object_type != "Account":
+                    row["AccountId"] = rng.choice(accounts)
+                if "Name" in row:
+                    row["Name"] = f"{row['Name']} {copy}"
+                rows.append(row)
+        rows_by_type[object_type] = rows
+
+    csv_paths_by_type: dict[str, list[str]] = {}
+    for object_type, rows in rows_by_type.items():
+        fields = list(dict.fromkeys(field for row in rows[:100] for field in row))
+        paths = []
+        for chunk_num, chunk_start in enumerate(range(0, len(rows), rows_per_csv)):
+            path = os.path.join(directory, f"{object_type}.{chunk_num}.csv")
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=fields)
+                writer.writeheader()
+                writer.writerows(rows[chunk_start : chunk_start + rows_per_csv])
+            paths.append(path)
+        csv_paths_by_type[object_type] = paths
+    return csv_paths_by_type
+
+
+def _new_db(path: str) -> OnyxSalesforceSQLite:
+    sf_db = OnyxSalesforceSQLite(path)
+    sf_db.connect()
+    sf_db.apply_schema()
+    return sf_db
+
+
+def _load_row_by_row(
+    sf_db: OnyxSalesforceSQLite, csv_paths_by_type: dict[str, list[str]]
+) -> int:
+    num_ids = 0
+    for object_type, csv_paths in csv_paths_by_type.items():
+        for csv_path in csv_paths:
+            num_ids += len(sf_db.update_from_csv(object_type, csv_path))
+            sf_db.flush()
+    return num_ids
+
+
+def _load_bulk(
+    sf_db: OnyxSalesforceSQLite,
+    csv_paths_by_type: dict[str, list[str]],
+    staging_dir: str,
+    max_workers: int,
+) -> int:
+    staged = stage_csvs_in_parallel(
+        dict(csv_paths_by_type), staging_dir, remove_ids=True, max_workers=max_workers
+    )
+    return len(sf_db.merge_staging_dbs([s.staging_path for s in staged]))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--copies", type=int, default=2_500)
+    parser.add_argument("--rows-per-csv", type=int, default=50_000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_dir = os.path.join(directory, "csvs")
+        os.makedirs(csv_dir)
+        csv_paths_by_type = _write_csvs(
+            csv_dir, args.copies, args.rows_per_csv, args.seed
+        )
+        num_csvs = sum(len(paths) for paths in csv_paths_by_type.values())
+        csv_bytes = sum(
+            os.path.getsize(path)
+            for paths in csv_paths_by_type.values()
+            for path in paths
+        )
+        print(f"generated {num_csvs} csvs, {csv_bytes / 1024 / 1024:.1f}MB")
+
+        results = {}
+        for name in ["row_by_row", "bulk"]:
+            sf_db = _new_db(os.path.join(directory, f"{name}.sqlite"))
+            start = time.monotonic()
+            if name == "row_by_row":
+                num_ids = _load_row_by_row(sf_db, csv_paths_by_type)
+            else:
+                num_ids = _load_bulk(
+                    sf_db,
+                    csv_paths_by_type,
+                    os.path.join(directory, "staging"),
+                    args.workers,
+                )
+            elapsed = time.monotonic() - start
+            results[name] = elapsed
+
+            num_relationships = (
+                sf_db.cursor().execute("SELECT COUNT(*) FROM relationships").fetchone()
+            )[0]
+            sf_db.close()
+            print(
+                f"{name:>10}: {elapsed:7.2f}s "
+                f"records={num_ids} relationships={num_relationships} "
+                f"records/s={num_ids / elapsed:,.0f}"
+            )
+
+        print(f"speedup: {results['row_by_row'] / results['bulk']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Load test for the Slack event processing of the bot (onyx/onyxbot/slack/listener.py)
+with a noisy tenant next to quiet ones.
+
+Synthetic socket mode events are replayed through the real event handler against
+stubbed Slack clients. Answering is simulated: it takes --noisy-seconds /
+--quiet-seconds and needs one of --backend-capacity slots (the LLM / Postgres
+capacity the tenants share on a pod). The noisy tenant sends a burst of
+--noisy-events at once, the quiet tenants one event every --quiet-interval seconds.
+Reported is the time from event to answer per tenant, once with the events
+processed on the socket mode listener threads (DANSWER_BOT_WORKER_THREADS=0) and
+once with the fair scheduler. Usage:
+
+python -m scripts.benchmarks.slack_fair_scheduler --noisy-events 60 --quiet-tenants 3
+"""
+
+import argparse
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+from slack_sdk.socket_mode.request import SocketModeRequest
+
+from onyx.onyxbot.slack import listener
+from onyx.onyxbot.slack.fair_scheduler import TenantFairScheduler
+
+# slack_sdk runs the listeners of every socket mode client on its own pool
+_SOCKET_CLIENT_LISTENER_THREADS = 10
+
+
+class _StubSocketClient:
+    def __init__(self, tenant_id: str) -> None:
+        self._tenant_id = tenant_id
+        self.slack_bot_id = 1
+        self.web_client = MagicMock()
+
+    def send_socket_mode_response(self, response: Any) -> None:
+        pass
+
+
+def _event(channel: str) -> SocketModeRequest:
+    return SocketModeRequest(
+        type="events_api",
+        envelope_id=str(uuid.uuid4()),
+        payload={
+            "event": {
+                "type": "app_mention",
+                "channel": channel,
+                "user": "U1",
+                "text": "<@UBOT> what is our refund policy?",
+                "ts": f"{time.time():.6f}",
+            }
+        },
+    )
+
+
+def _run(
+    scheduler: TenantFairScheduler | None,
+    args: argparse.Namespace,
+) -> dict[str, list[float]]:
+    backend_capacity = threading.Semaphore(args.backend_capacity)
+    sent_at: dict[str, float] = {}
+    latencies: dict[str, list[float]] = {}
+    latencies_lock = threading.Lock()
+    rejected: dict[str, int] = {}
+
+    def _process_message(req: SocketModeRequest, client: _StubSocketClient) -> None:
+        work = (
+            args.noisy_seconds if client._tenant_id == "noisy" else args.quiet_seconds
+        )
+        with backend_capacity:
+            time.sleep(work)
+        with latencies_lock:
+            latencies.setdefault(client._tenant_id, []).append(
+                time.monotonic() - sent_at[req.envelope_id]
+            )
+
+    def _reply_busy(req: SocketModeRequest, client: _StubSocketClient) -> None:
+        rejected[client._tenant_id] = rejected.get(client._tenant_id, 0) + 1
+
+    tenants = ["noisy"] + [f"quiet_{i}" for i in range(args.quiet_tenants)]
+    clients = {tenant_id: _StubSocketClient(tenant_id) for tenant_id in tenants}
+    listener_pools = {
+        tenant_id: ThreadPoolExecutor(max_workers=_SOCKET_CLIENT_LISTENER_THREADS)
+        for tenant_id in tenants
+    }
+    process_slack_event = listener.create_process_slack_event()
+
+    def _send(tenant_id: str) -> None:
+        req = _event(channel=f"C_{tenant_id}")
+        sent_at[req.envelope_id] = time.monotonic()
+        listener_pools[tenant_id].submit(
+            process_slack_event, clients[tenant_id], req  # type: ignore
+        )
+
+    with (
+        patch.object(listener, "process_message", _process_message),
+        patch.object(listener, "reply_busy", _reply_busy),
+        patch.object(listener, "get_slack_event_scheduler", return_value=scheduler),
+        patch.object(listener, "logger"),
+    ):
+        for _ in range(args.noisy_events):
+            _send("noisy")
+        deadline = time.monotonic() + args.duration
+        while time.monotonic() < deadline:
+            for tenant_id in tenants[1:]:
+                _send(tenant_id)
+            time.sleep(args.quiet_interval)
+
+        expected = len(sent_at) - sum(rejected.values())
+        while sum(len(values) for values in latencies.values()) < expected:
+            time.sleep(0.1)
+
+    for pool in listener_pools.values():
+        pool.shutdown()
+    for tenant_id, count in rejected.items():
+        print(f"    {tenant_id}: {count} events rejected")
+    return latencies
+
+
+def _report(name: str, latencies: dict[str, list[float]]) -> None:
+    print(name)
+    for tenant_id, values in sorted(latencies.items()):
+        values = sorted(values)
+        print(
+            f"    {tenant_id:>8}: events={len(values):4d} "
+            f"p50={values[len(values) // 2]:6.2f}s "
+            f"p95={values[int(len(values) * 0.95)]:6.2f}s "
+            f"mean={statistics.mean(values):6.2f}s"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--noisy-events", type=int, default=60)
+    parser.add_argument("--noisy-seconds", type=float, default=2.0)
+    parser.add_argument("--quiet-tenants", type=int, default=3)
+    parser.add_argument("--quiet-seconds", type=float, default=0.5)
+    parser.add_argument("--quiet-interval", type=float, default=1.0)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--backend-capacity", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--max-concurrent-per-tenant", type=int, default=4)
+    parser.add_argument("--max-queued-per-tenant", type=int, default=100)
+    args = parser.parse_args()
+
+    _report("listener threads", _run(None, args))
+
+    scheduler = TenantFairScheduler(
+        num_workers=args.workers,
+        max_concurrent_per_tenant=args.max_concurrent_per_tenant,
+        max_queued_per_tenant=args.max_queued_per_tenant,
+    )
+    scheduler.start()
+    _report("fair scheduler", _run(scheduler, args))
+    scheduler.shutdown()
+
+
+if __name__ == "__main__":
+    main()
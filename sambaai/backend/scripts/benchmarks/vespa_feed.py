@@ -0,0 +1,214 @@
+"""Compares the per chunk Vespa write path with the streaming feed
+(VESPA_FEED_MODE=streaming) against a local Vespa stand-in that accepts
+document/v1 puts with an artificial per request latency.
+
+The per chunk path talks HTTP/1.1 (like the celery "vespa" httpx pool), the
+streaming feed HTTP/2 with prior knowledge. The stand-in runs on the same host,
+so with few cores both paths end up CPU bound on request serialization; the
+streaming feed pays off once Vespa latency, not CPU, is the limit (raise
+--latency-ms to see it). Usage:
+
+python -m scripts.benchmarks.vespa_feed --chunks 2000 --latency-ms 100
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import time
+
+import h2.config
+import h2.connection
+import h2.events
+import h2.settings
+import httpx
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+_H2_PREFACE = b"PRI * HTTP/2.0\r\n\r\nSM\r\n\r\n"
+
+
+async def _serve_http1(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    latency_seconds: float,
+    head: bytes,
+) -> None:
+    while True:
+        head += await reader.readuntil(b"\r\n\r\n")
+        content_length = 0
+        for line in head.split(b"\r\n"):
+            if line.lower().startswith(b"content-length:"):
+                content_length = int(line.split(b":", 1)[1])
+        if content_length:
+            await reader.readexactly(content_length)
+        await asyncio.sleep(latency_seconds)
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+            b"Content-Length: 2\r\n\r\n{}"
+        )
+        await writer.drain()
+        head = b""
+
+
+async def _serve_h2c(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    latency_seconds: float,
+    head: bytes,
+) -> None:
+    conn = h2.connection.H2Connection(
+        config=h2.config.H2Configuration(client_side=False)
+    )
+    conn.initiate_connection()
+    # large flow control windows, like Vespa, so bodies aren't throttled
+    conn.update_settings(
+        {
+            h2.settings.SettingCodes.MAX_CONCURRENT_STREAMS: 1024,
+            h2.settings.SettingCodes.INITIAL_WINDOW_SIZE: 2**30,
+        }
+    )
+    conn.increment_flow_control_window(2**30)
+    writer.write(conn.data_to_send())
+
+    async def _respond(stream_id: int) -> None:
+        await asyncio.sleep(latency_seconds)
+        conn.send_headers(stream_id, [(":status", "200"), ("content-length", "2")])
+        conn.send_data(stream_id, b"{}", end_stream=True)
+        writer.write(conn.data_to_send())
+
+    data = head
+    while data:
+        for event in conn.receive_data(data):
+            if isinstance(event, h2.events.DataReceived):
+                conn.acknowledge_received_data(
+                    event.flow_controlled_length, event.stream_id
+                )
+            elif isinstance(event, h2.events.StreamEnded):
+                asyncio.ensure_future(_respond(event.stream_id))
+        writer.write(conn.data_to_send())
+        data = await reader.read(65536)
+
+
+async def _handle_connection(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter, latency_seconds: float
+) -> None:
+    """Accepts any request over HTTP/1.1 or HTTP/2 with prior knowledge (like Vespa).
+    Kept deliberately cheap so the stand-in is never the bottleneck."""
+    try:
+        head = await reader.readexactly(len(_H2_PREFACE))
+        if head == _H2_PREFACE:
+            await _serve_h2c(reader, writer, latency_seconds, head)
+        else:
+            await _serve_http1(reader, writer, latency_seconds, head)
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+def _run_vespa_stand_in(port: int, latency_seconds: float) -> None:
+    async def _serve() -> None:
+        server = await asyncio.start_server(
+            lambda reader, writer: _handle_connection(reader, writer, latency_seconds),
+            "127.0.0.1",
+            port,
+            backlog=4096,
+        )
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(_serve())
+
+
+def start_vespa_stand_in(port: int, latency_seconds: float) -> None:
+    # separate process so the stand-in doesn't compete with the client for the GIL
+    multiprocessing.Process(
+        target=_run_vespa_stand_in, args=(port, latency_seconds), daemon=True
+    ).start()
+    while True:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--max-in-flight", type=int, default=256)
+    parser.add_argument("--embedding-dim", type=int, default=768)
+    args = parser.parse_args()
+
+    port = _free_port()
+    # must be set before the onyx modules build their Vespa URLs
+    os.environ["VESPA_HOST"] = "127.0.0.1"
+    os.environ["VESPA_PORT"] = str(port)
+
+    from onyx.access.models import DocumentAccess
+    from onyx.configs.constants import DEFAULT_BOOST
+    from onyx.document_index.vespa.feed import build_put_operation
+    from onyx.document_index.vespa.feed import feed_vespa_operations
+    from onyx.document_index.vespa.indexing_utils import batch_index_vespa_chunks
+    from onyx.document_index.vespa_constants import BATCH_SIZE
+    from onyx.indexing.models import DocMetadataAwareIndexChunk
+    from onyx.utils.batching import batch_generator
+    from scripts.benchmarks.indexing_batch_assembly import generate_chunks
+    from shared_configs.configs import POSTGRES_DEFAULT_SCHEMA
+
+    start_vespa_stand_in(port, args.latency_ms / 1000)
+
+    chunks_per_doc = 10
+    chunks = [
+        DocMetadataAwareIndexChunk.from_index_chunk(
+            index_chunk=chunk,
+            access=DocumentAccess.build(
+                user_emails=["user@example.com"],
+                user_groups=[],
+                external_user_emails=[],
+                external_user_group_ids=[],
+                is_public=False,
+            ),
+            document_sets=set(),
+            user_file=None,
+            user_folder=None,
+            boost=DEFAULT_BOOST,
+            aggregated_chunk_boost_factor=1.0,
+            tenant_id=POSTGRES_DEFAULT_SCHEMA,
+        )
+        for chunk in generate_chunks(
+            max(args.chunks // chunks_per_doc, 1), chunks_per_doc, args.embedding_dim
+        )
+    ]
+    index_name = "danswer_chunk"
+    print(f"Feeding {len(chunks)} chunks, stand-in latency {args.latency_ms}ms")
+
+    start = time.perf_counter()
+    with httpx.Client(http2=False) as http_client:
+        for chunk_batch in batch_generator(chunks, BATCH_SIZE):
+            batch_index_vespa_chunks(
+                chunks=chunk_batch,
+                index_name=index_name,
+                http_client=http_client,
+                multitenant=False,
+            )
+    per_chunk = time.perf_counter() - start
+    print(f"per_chunk: {per_chunk:.2f}s ({len(chunks) / per_chunk:.0f} chunks/s)")
+
+    start = time.perf_counter()
+    stats = feed_vespa_operations(
+        [build_put_operation(chunk, index_name, False) for chunk in chunks],
+        max_in_flight=args.max_in_flight,
+    )
+    streaming = time.perf_counter() - start
+    print(f"streaming: {streaming:.2f}s ({len(chunks) / streaming:.0f} chunks/s)")
+    print(f"streaming feed stats: {stats}")
+    print(f"speedup: {per_chunk / streaming:.1f}x")
@@ -54,6 +54,47 @@ MIN_THREADS_ML_MODELS = int(os.environ.get("MIN_THREADS_ML_MODELS") or 1)
 # or intent classification
 INDEXING_ONLY = os.environ.get("INDEXING_ONLY", "").lower() == "true"
 
+# Concurrent embed / rerank requests to the model server for the same local model are
+# coalesced into shared forward passes. A batch is closed after waiting this long for
+# more requests or once it reaches the token limit (padded tokens per forward pass)
+MODEL_SERVER_MICRO_BATCHING_ENABLED = (
+    os.environ.get("MODEL_SERVER_MICRO_BATCHING_ENABLED", "true").lower() == "true"
+)
+MODEL_SERVER_MAX_BATCH_WAIT_MS = float(
+    os.environ.get("MODEL_SERVER_MAX_BATCH_WAIT_MS") or 5
+)
+MODEL_SERVER_MAX_BATCH_TOKENS = int(
+    os.environ.get("MODEL_SERVER_MAX_BATCH_TOKENS") or 16384
+)
+
+# Inference backend for local embedding models: "torch", "onnx" or "onnx-int8" (ONNX
+# Runtime with int8 dynamic quantization, much faster on nodes without a GPU). The
+# ONNX backends need optimum[onnxruntime] installed, otherwise torch is used.
+MODEL_SERVER_INFERENCE_BACKEND = (
+    os.environ.get("MODEL_SERVER_INFERENCE_BACKEND") or "torch"
+).lower()
+# Per model backends, e.g. "nomic-ai/nomic-embed-text-v1=onnx-int8,other/model=torch"
+MODEL_SERVER_INFERENCE_BACKEND_OVERRIDES = {
+    model_name.strip(): backend.strip().lower()
+    for model_name, _, backend in (
+        override.rpartition("=")
+        for override in (
+            os.environ.get("MODEL_SERVER_INFERENCE_BACKEND_OVERRIDES") or ""
+        ).split(",")
+        if "=" in override
+    )
+}
+# CPU instruction set the int8 models are quantized for: arm64, avx2, avx512 or
+# avx512_vnni. avx2 runs on nearly every x86 node.
+MODEL_SERVER_ONNX_QUANTIZATION_TARGET = (
+    os.environ.get("MODEL_SERVER_ONNX_QUANTIZATION_TARGET") or "avx2"
+)
+# Exported (and quantized) ONNX models are cached here, so they are only converted
+# on the first load
+MODEL_SERVER_ONNX_CACHE_DIR = os.environ.get(
+    "MODEL_SERVER_ONNX_CACHE_DIR"
+) or os.path.join(os.path.expanduser("~"), ".cache", "onyx_onnx")
+
 # The process needs to have this for the log file to write to
 # otherwise, it will not create additional log files
 # This should just be the filename base without extension or path.
@@ -80,6 +121,21 @@ OPENAI_EMBEDDING_TIMEOUT = int(
     os.environ.get("OPENAI_EMBEDDING_TIMEOUT", API_BASED_EMBEDDING_TIMEOUT)
 )
 
+# Cloud embedding provider clients (and their connection pools) are kept per provider,
+# API key, URL and version, and closed after being idle for this long
+MODEL_SERVER_CLOUD_CLIENT_IDLE_SECONDS = int(
+    os.environ.get("MODEL_SERVER_CLOUD_CLIENT_IDLE_SECONDS") or 300
+)
+# Max concurrent calls to a cloud embedding provider per API key
+MODEL_SERVER_CLOUD_EMBEDDING_MAX_CONCURRENCY = int(
+    os.environ.get("MODEL_SERVER_CLOUD_EMBEDDING_MAX_CONCURRENCY") or 16
+)
+# Rate limited (429) provider calls are retried this many times with backoff before
+# the model server responds with a 429 itself
+MODEL_SERVER_CLOUD_EMBEDDING_RATE_LIMIT_RETRIES = int(
+    os.environ.get("MODEL_SERVER_CLOUD_EMBEDDING_RATE_LIMIT_RETRIES") or 5
+)
+
 # Whether or not to strictly enforce token limit for chunking.
 STRICT_CHUNK_TOKEN_LIMIT = (
     os.environ.get("STRICT_CHUNK_TOKEN_LIMIT", "").lower() == "true"
@@ -0,0 +1,94 @@
+"""Binary wire format for embeddings returned by the model server.
+
+JSON encodes every float as text, which for large indexing batches is megabytes per
+call and a lot of CPU on both ends. Clients can instead ask for raw vectors by
+sending `Accept: application/x-onyx-embeddings; dtype=float32` (or float16); the
+model server falls back to JSON for anything else.
+
+Layout (all little-endian): a 16 byte header
+    magic (4 bytes) | version (u8) | dtype (u8) | reserved (u16) | count (u32) | dim (u32)
+followed by count * dim values of the given dtype, row major."""
+
+import struct
+
+import numpy as np
+
+from shared_configs.model_server_models import Embedding
+
+EMBEDDINGS_BINARY_MEDIA_TYPE = "application/x-onyx-embeddings"
+
+_MAGIC = b"OXEB"
+_VERSION = 1
+_HEADER = struct.Struct("<4sBBHII")
+
+_DTYPES: dict[str, np.dtype] = {
+    "float32": np.dtype("<f4"),
+    "float16": np.dtype("<f2"),
+}
+_DTYPE_CODES = {"float32": 0, "float16": 1}
+_DTYPES_BY_CODE = {code: name for name, code in _DTYPE_CODES.items()}
+
+SUPPORTED_EMBEDDING_DTYPES = tuple(_DTYPES)
+
+
+def build_accept_header(dtype: str) -> str:
+    if dtype not in _DTYPES:
+        raise ValueError(f"Unsupported embedding transport dtype: {dtype}")
+    # JSON is still accepted, e.g. from model servers that predate this format
+    return f"{EMBEDDINGS_BINARY_MEDIA_TYPE}; dtype={dtype}, application/json; q=0.5"
+
+
+def parse_accept_header(accept: str | None) -> str | None:
+    """Returns the dtype the client wants binary embeddings in, None for JSON."""
+    if not accept:
+        return None
+
+    for media_range in accept.split(","):
+        media_type, *params = [part.strip() for part in media_range.split(";")]
+        if media_type.lower() != EMBEDDINGS_BINARY_MEDIA_TYPE:
+            continue
+
+        dtype = "float32"
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "dtype":
+                dtype = value.strip().strip('"').lower()
+        return dtype if dtype in _DTYPES else None
+    return None
+
+
+def encode_embeddings(
+    embeddings: list[Embedding] | np.ndarray, dtype: str = "float32"
+) -> bytes:
+    """Raises ValueError if the embeddings don't all have the same dimension."""
+    array = np.asarray(embeddings, dtype=_DTYPES[dtype])
+    if array.size == 0:
+        array = array.reshape(len(embeddings), 0)
+    if array.ndim != 2:
+        raise ValueError(f"Expected a 2d array of embeddings, got {array.shape}")
+
+    count, dim = array.shape
+    header = _HEADER.pack(_MAGIC, _VERSION, _DTYPE_CODES[dtype], 0, count, dim)
+    return header + np.ascontiguousarray(array).tobytes()
+
+
+def decode_embeddings(data: bytes) -> np.ndarray:
+    """Returns a (count, dim) float32 array, float16 payloads are upcast."""
+    if len(data) < _HEADER.size:
+        raise ValueError("Embedding payload is shorter than its header")
+
+    magic, version, dtype_code, _, count, dim = _HEADER.unpack_from(data)
+    if magic != _MAGIC or version != _VERSION:
+        raise ValueError(f"Unknown embedding payload: magic={magic!r} v{version}")
+    if dtype_code not in _DTYPES_BY_CODE:
+        raise ValueError(f"Unknown embedding payload dtype: {dtype_code}")
+
+    dtype = _DTYPES[_DTYPES_BY_CODE[dtype_code]]
+    expected_size = _HEADER.size + count * dim * dtype.itemsize
+    if len(data) != expected_size:
+        raise ValueError(
+            f"Embedding payload has {len(data)} bytes, expected {expected_size}"
+        )
+
+    array = np.frombuffer(data, dtype=dtype, offset=_HEADER.size).reshape(count, dim)
+    return array.astype(np.float32)
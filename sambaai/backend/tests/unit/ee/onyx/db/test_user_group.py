@@ -0,0 +1,65 @@
+from unittest.mock import MagicMock
+from unittest.mock import patch
+from uuid import UUID
+from uuid import uuid4
+
+import pytest
+
+from ee.onyx.db import user_group
+from ee.onyx.db.user_group import update_user_group
+from ee.onyx.server.user_group.models import UserGroupUpdate
+
+_KEPT_USER_ID = uuid4()
+_REMOVED_USER_ID = uuid4()
+_ADDED_USER_ID = uuid4()
+
+
+def _update_user_group(cc_pair_ids: list[int]) -> set[UUID]:
+    """Moves the group from (kept, removed) to (kept, added) and returns the ids of
+    the users whose KG allowed documents were invalidated."""
+    db_user_group = MagicMock(
+        id=1,
+        is_up_to_date=True,
+        users=[MagicMock(id=_KEPT_USER_ID), MagicMock(id=_REMOVED_USER_ID)],
+        cc_pairs=[MagicMock(id=1)],
+    )
+    db_session = MagicMock()
+    db_session.scalar.return_value = db_user_group
+
+    with (
+        patch.object(user_group, "_cleanup_user__user_group_relationships__no_commit"),
+        patch.object(user_group, "_add_user__user_group_relationships__no_commit"),
+        patch.object(
+            user_group, "_mark_user_group__cc_pair_relationships_outdated__no_commit"
+        ),
+        patch.object(user_group, "_add_user_group__cc_pair_relationships__no_commit"),
+        patch.object(
+            user_group, "invalidate_kg_allowed_documents_for_users__no_commit"
+        ) as invalidate,
+    ):
+        update_user_group(
+            db_session,
+            user=None,
+            user_group_id=1,
+            user_group_update=UserGroupUpdate(
+                user_ids=[_KEPT_USER_ID, _ADDED_USER_ID], cc_pair_ids=cc_pair_ids
+            ),
+        )
+
+    invalidate.assert_called_once()
+    return set(invalidate.call_args.args[1])
+
+
+@pytest.mark.parametrize(
+    "cc_pair_ids,invalidated_user_ids",
+    [
+        # only the membership changed
+        ([1], {_REMOVED_USER_ID, _ADDED_USER_ID}),
+        # the group's documents changed for every previous and current member
+        ([1, 2], {_KEPT_USER_ID, _REMOVED_USER_ID, _ADDED_USER_ID}),
+    ],
+)
+def test_update_user_group_invalidates_the_affected_users(
+    cc_pair_ids: list[int], invalidated_user_ids: set[UUID]
+) -> None:
+    assert _update_user_group(cc_pair_ids) == invalidated_user_ids
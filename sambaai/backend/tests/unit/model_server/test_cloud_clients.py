@@ -0,0 +1,87 @@
+import asyncio
+
+import httpx
+import pytest
+
+from model_server.cloud_clients import CloudClientRegistry
+from model_server.cloud_clients import PooledCloudClients
+from model_server.cloud_clients import ProviderRateLimitError
+from shared_configs.enums import EmbeddingProvider
+
+
+def _rate_limit_error(retry_after: str | None = None) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "https://provider.example/embed")
+    headers = {"retry-after": retry_after} if retry_after else {}
+    response = httpx.Response(429, request=request, headers=headers)
+    return httpx.HTTPStatusError("429", request=request, response=response)
+
+
+@pytest.mark.asyncio
+async def test_registry_reuses_clients_per_key_and_evicts_idle_ones() -> None:
+    registry = CloudClientRegistry(idle_seconds=60)
+
+    async with registry.acquire(EmbeddingProvider.OPENAI, "key-1") as first:
+        pass
+    async with registry.acquire(EmbeddingProvider.OPENAI, "key-1") as second:
+        assert second is first
+        assert second.openai_client() is first.openai_client()
+    async with registry.acquire(EmbeddingProvider.OPENAI, "key-2") as other_key:
+        assert other_key is not first
+
+    registry.idle_seconds = 0
+    async with registry.acquire(EmbeddingProvider.COHERE, "key-1") as cohere:
+        assert cohere is not first
+    assert first.closed and other_key.closed
+    assert not cohere.closed
+
+    await registry.aclose()
+    assert cohere.closed
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_calls_are_retried() -> None:
+    clients = PooledCloudClients(
+        EmbeddingProvider.OPENAI, "key", max_rate_limit_retries=3, base_delay=0
+    )
+    attempts = 0
+
+    async def _embed() -> str:
+        nonlocal attempts
+        attempts += 1
+        if attempts < 3:
+            raise _rate_limit_error(retry_after="0")
+        return "embeddings"
+
+    assert await clients.call(_embed) == "embeddings"
+    assert attempts == 3
+
+    async def _always_rate_limited() -> str:
+        raise _rate_limit_error()
+
+    with pytest.raises(ProviderRateLimitError):
+        await clients.call(_always_rate_limited)
+
+    async def _fails() -> str:
+        raise RuntimeError("not a rate limit")
+
+    with pytest.raises(RuntimeError):
+        await clients.call(_fails)
+    await clients.aclose()
+
+
+@pytest.mark.asyncio
+async def test_calls_are_limited_to_max_concurrency() -> None:
+    clients = PooledCloudClients(EmbeddingProvider.VOYAGE, "key", max_concurrency=2)
+    running = 0
+    max_running = 0
+
+    async def _embed() -> None:
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    await asyncio.gather(*[clients.call(_embed) for _ in range(6)])
+    assert max_running == 2
+    await clients.aclose()
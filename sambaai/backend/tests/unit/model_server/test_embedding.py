@@ -7,7 +7,9 @@ from unittest.mock import AsyncMock
 from unittest.mock import MagicMock
 from unittest.mock import patch
 
+import numpy as np
 import pytest
+from fastapi import Response
 from httpx import AsyncClient
 from litellm.exceptions import RateLimitError
 
@@ -15,9 +17,14 @@ from model_server.encoders import CloudEmbedding
 from model_server.encoders import embed_text
 from model_server.encoders import local_rerank
 from model_server.encoders import process_embed_request
+from model_server.encoders import route_bi_encoder_embed
+from shared_configs.embedding_transport import build_accept_header
+from shared_configs.embedding_transport import decode_embeddings
+from shared_configs.embedding_transport import EMBEDDINGS_BINARY_MEDIA_TYPE
 from shared_configs.enums import EmbeddingProvider
 from shared_configs.enums import EmbedTextType
 from shared_configs.model_server_models import EmbedRequest
+from shared_configs.model_server_models import EmbedResponse
 
 
 @pytest.fixture
@@ -118,10 +125,49 @@ async def test_embed_text_local_model() -> None:
             reduced_dimension=None,
         )
 
-        assert result == [[0.1, 0.2], [0.3, 0.4]]
+        # local models return the array, converted to lists only for JSON responses
+        assert isinstance(result, np.ndarray)
+        assert result.tolist() == [[0.1, 0.2], [0.3, 0.4]]
         mock_model.encode.assert_called_once()
 
 
+@pytest.mark.asyncio
+async def test_embed_route_response_formats() -> None:
+    embed_request = EmbedRequest(
+        texts=["test"],
+        model_name="fake-local-model",
+        deployment_name=None,
+        max_context_length=512,
+        normalize_embeddings=True,
+        api_key=None,
+        provider_type=None,
+        text_type=EmbedTextType.QUERY,
+        manual_query_prefix=None,
+        manual_passage_prefix=None,
+        api_url=None,
+        api_version=None,
+        reduced_dimension=None,
+    )
+    vectors = np.array([[0.5, 0.25]], dtype=np.float32)
+
+    with patch(
+        "model_server.encoders.embed_text", AsyncMock(return_value=vectors)
+    ) as mock_embed_text:
+        request = MagicMock()
+        request.headers = {"accept": build_accept_header("float32")}
+        binary_response = await route_bi_encoder_embed(request, embed_request)
+
+        request.headers = {}
+        json_response = await route_bi_encoder_embed(request, embed_request)
+
+    assert isinstance(binary_response, Response)
+    assert binary_response.media_type == EMBEDDINGS_BINARY_MEDIA_TYPE
+    assert decode_embeddings(bytes(binary_response.body)).tolist() == [[0.5, 0.25]]
+    assert isinstance(json_response, EmbedResponse)
+    assert json_response.embeddings == [[0.5, 0.25]]
+    assert mock_embed_text.await_count == 2
+
+
 @pytest.mark.asyncio
 async def test_local_rerank() -> None:
     with patch("model_server.encoders.get_local_reranking_model") as mock_get_model:
@@ -165,9 +211,10 @@ async def test_rate_limit_handling() -> None:
 
 @pytest.mark.asyncio
 async def test_concurrent_embeddings() -> None:
-    def mock_encode(*args: Any, **kwargs: Any) -> List[List[float]]:
+    def mock_encode(texts: list[str], **kwargs: Any) -> List[List[float]]:
         time.sleep(5)
-        return [[0.1, 0.2, 0.3]]
+        # concurrent requests may share a single encode call
+        return [[0.1, 0.2, 0.3] for _ in texts]
 
     test_req = EmbedRequest(
         texts=["test"],
@@ -0,0 +1,88 @@
+import os
+from pathlib import Path
+from typing import Any
+from unittest.mock import Mock
+from unittest.mock import patch
+
+import pytest
+
+from model_server import inference_backend
+from model_server.inference_backend import get_inference_backend
+from model_server.inference_backend import get_onnx_export_path
+from model_server.inference_backend import get_onnx_file_name
+from model_server.inference_backend import load_sentence_transformer
+from model_server.inference_backend import ONNX_BACKEND
+from model_server.inference_backend import ONNX_INT8_BACKEND
+from model_server.inference_backend import TORCH_BACKEND
+
+
+def test_backend_is_chosen_per_model(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(inference_backend, "MODEL_SERVER_INFERENCE_BACKEND", "onnx")
+    monkeypatch.setattr(
+        inference_backend,
+        "MODEL_SERVER_INFERENCE_BACKEND_OVERRIDES",
+        {"org/quantized": ONNX_INT8_BACKEND, "org/broken": "tensorrt"},
+    )
+
+    assert get_inference_backend("org/any") == ONNX_BACKEND
+    assert get_inference_backend("org/quantized") == ONNX_INT8_BACKEND
+    assert get_inference_backend("org/broken") == TORCH_BACKEND
+
+
+def test_onnx_artifact_paths(tmp_path: Path) -> None:
+    assert get_onnx_export_path("org/model", str(tmp_path)) == os.path.join(
+        tmp_path, "org__model"
+    )
+    assert get_onnx_file_name(ONNX_BACKEND) == "onnx/model.onnx"
+    assert (
+        get_onnx_file_name(ONNX_INT8_BACKEND, "avx512_vnni")
+        == "onnx/model_int8_avx512_vnni.onnx"
+    )
+
+
+def test_onnx_models_are_exported_once(tmp_path: Path) -> None:
+    def _export(model_name: str, export_path: str, *_: Any) -> None:
+        os.makedirs(os.path.join(export_path, "onnx"))
+        Path(export_path, "onnx", "model_int8_avx2.onnx").touch()
+
+    with (
+        patch.object(inference_backend, "is_onnx_runtime_available", return_value=True),
+        patch.object(
+            inference_backend, "_export_onnx_model", side_effect=_export
+        ) as export,
+        patch("sentence_transformers.SentenceTransformer") as sentence_transformer,
+    ):
+        for _ in range(2):
+            load_sentence_transformer(
+                "org/model",
+                backend=ONNX_INT8_BACKEND,
+                cache_dir=str(tmp_path),
+                quantization_target="avx2",
+            )
+
+    assert export.call_count == 1
+    sentence_transformer.assert_called_with(
+        model_name_or_path=os.path.join(tmp_path, "org__model"),
+        backend="onnx",
+        model_kwargs={"file_name": "onnx/model_int8_avx2.onnx"},
+        trust_remote_code=True,
+    )
+
+
+def test_falls_back_to_torch_without_onnx_runtime(tmp_path: Path) -> None:
+    with (
+        patch.object(
+            inference_backend, "is_onnx_runtime_available", return_value=False
+        ),
+        patch.object(inference_backend, "_export_onnx_model") as export,
+        patch("sentence_transformers.SentenceTransformer") as sentence_transformer,
+    ):
+        sentence_transformer.return_value = Mock()
+        load_sentence_transformer(
+            "org/model", backend=ONNX_INT8_BACKEND, cache_dir=str(tmp_path)
+        )
+
+    export.assert_not_called()
+    sentence_transformer.assert_called_once_with(
+        model_name_or_path="org/model", trust_remote_code=True
+    )
@@ -0,0 +1,90 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from model_server.micro_batcher import MicroBatcher
+from model_server.micro_batcher import split_into_buckets
+
+
+def test_split_into_buckets_groups_similar_lengths() -> None:
+    token_counts = [100, 5, 90, 6, 7, 300]
+    buckets = split_into_buckets(token_counts, max_batch_tokens=200)
+
+    assert buckets == [[1, 3, 4], [2, 0], [5]]
+    for bucket in buckets[:-1]:
+        assert len(bucket) * max(token_counts[i] for i in bucket) <= 200
+
+
+def _make_batcher(
+    calls: list[list[str]], fail_on: str | None = None, max_batch_tokens: int = 1000
+) -> MicroBatcher[str, str]:
+    lock = threading.Lock()
+
+    def _run_batch(items: list[str]) -> list[str]:
+        with lock:
+            calls.append(items)
+        if fail_on in items:
+            raise ValueError("bad input")
+        return [item.upper() for item in items]
+
+    return MicroBatcher(
+        endpoint="test",
+        run_batch=_run_batch,
+        count_tokens=len,
+        executor=ThreadPoolExecutor(max_workers=1),
+        max_batch_tokens=max_batch_tokens,
+        max_wait_seconds=0.05,
+    )
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_a_batch() -> None:
+    calls: list[list[str]] = []
+    batcher = _make_batcher(calls)
+
+    results = await asyncio.gather(
+        batcher.submit(["a", "bb"]),
+        batcher.submit(["ccc"]),
+        batcher.submit(["dddd", "e"]),
+    )
+
+    assert list(results) == [["A", "BB"], ["CCC"], ["DDDD", "E"]]
+    assert len(calls) == 1
+    assert sorted(calls[0]) == ["a", "bb", "ccc", "dddd", "e"]
+    await batcher.aclose()
+
+
+@pytest.mark.asyncio
+async def test_batches_respect_the_token_limit() -> None:
+    calls: list[list[str]] = []
+    batcher = _make_batcher(calls, max_batch_tokens=8)
+
+    results = await asyncio.gather(
+        batcher.submit(["aaaa", "b"]), batcher.submit(["cccc", "dd"])
+    )
+
+    assert list(results) == [["AAAA", "B"], ["CCCC", "DD"]]
+    for call in calls:
+        assert len(call) * max(len(item) for item in call) <= 8
+    await batcher.aclose()
+
+
+@pytest.mark.asyncio
+async def test_failed_request_is_isolated_from_its_batch() -> None:
+    calls: list[list[str]] = []
+    batcher = _make_batcher(calls, fail_on="bad")
+
+    failed, ok = await asyncio.gather(
+        batcher.submit(["bad"]), batcher.submit(["x"]), return_exceptions=True
+    )
+    assert isinstance(failed, ValueError)
+    # the unrelated request is re-run on its own
+    assert ok == ["X"]
+    assert sorted(calls[0]) == ["bad", "x"]
+    assert sorted(calls[1:]) == [["bad"], ["x"]]
+
+    # the batcher keeps serving requests afterwards
+    assert await batcher.submit(["good"]) == ["GOOD"]
+    await batcher.aclose()
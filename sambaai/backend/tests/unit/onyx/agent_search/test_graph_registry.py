@@ -0,0 +1,57 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock
+
+from langgraph.graph import END
+from langgraph.graph import START
+from langgraph.graph import StateGraph
+from pydantic import BaseModel
+
+from onyx.agents.agent_search.graph_registry import AgentGraph
+from onyx.agents.agent_search.graph_registry import CompiledGraphRegistry
+from onyx.agents.agent_search.graph_registry import GraphNodeTimingCallbackHandler
+
+
+class _State(BaseModel):
+    value: int = 0
+
+
+def _add_one(state: _State) -> dict[str, int]:
+    time.sleep(0.01)
+    return {"value": state.value + 1}
+
+
+def _graph_builder() -> StateGraph:
+    graph = StateGraph(_State)
+    graph.add_node("first", _add_one)
+    graph.add_node("second", _add_one)
+    graph.add_edge(START, "first")
+    graph.add_edge("first", "second")
+    graph.add_edge("second", END)
+    return graph
+
+
+def test_graphs_are_compiled_once_across_threads() -> None:
+    builder = Mock(side_effect=_graph_builder)
+    registry = CompiledGraphRegistry({AgentGraph.BASIC: builder})
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        compiled_graphs = list(
+            executor.map(lambda _: registry.get(AgentGraph.BASIC), range(32))
+        )
+
+    assert builder.call_count == 1
+    assert all(graph is compiled_graphs[0] for graph in compiled_graphs)
+
+
+def test_node_timings_are_recorded() -> None:
+    registry = CompiledGraphRegistry({AgentGraph.BASIC: _graph_builder})
+    handler = GraphNodeTimingCallbackHandler(AgentGraph.BASIC)
+
+    result = registry.get(AgentGraph.BASIC).invoke(
+        _State(value=0), config={"callbacks": [handler]}
+    )
+
+    assert result["value"] == 2
+    assert [node for node, _ in handler.node_timings] == ["first", "second"]
+    assert all(elapsed >= 0.01 for _, elapsed in handler.node_timings)
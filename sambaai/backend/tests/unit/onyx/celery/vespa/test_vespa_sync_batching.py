@@ -0,0 +1,123 @@
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import pytest
+
+from onyx.background.celery.apps import app_base
+from onyx.background.celery.tasks.vespa import tasks as vespa_tasks
+from onyx.background.celery.tasks.vespa.tasks import get_vespa_sync_batch_size
+from onyx.configs.app_configs import VESPA_SYNC_BATCH_QUEUE_DEPTH_STEP
+from onyx.configs.app_configs import VESPA_SYNC_BATCH_SIZE_MAX
+from onyx.configs.app_configs import VESPA_SYNC_BATCH_SIZE_MIN
+from onyx.configs.constants import OnyxCeleryTask
+from onyx.redis import redis_document_set
+from onyx.redis import redis_object_helper
+from onyx.redis.redis_document_set import RedisDocumentSet
+
+
+def test_batch_size_grows_with_queue_depth() -> None:
+    assert get_vespa_sync_batch_size(0) == VESPA_SYNC_BATCH_SIZE_MIN
+    assert (
+        get_vespa_sync_batch_size(VESPA_SYNC_BATCH_QUEUE_DEPTH_STEP)
+        == VESPA_SYNC_BATCH_SIZE_MIN * 2
+    )
+    assert get_vespa_sync_batch_size(10**9) == VESPA_SYNC_BATCH_SIZE_MAX
+
+    sizes = [
+        get_vespa_sync_batch_size(depth)
+        for depth in range(0, 20 * VESPA_SYNC_BATCH_QUEUE_DEPTH_STEP, 50)
+    ]
+    assert sizes == sorted(sizes)
+
+
+@pytest.mark.parametrize("batch_size,expected_tasks", [(1, 10), (4, 3), (16, 1)])
+def test_document_set_tasks_are_batched(batch_size: int, expected_tasks: int) -> None:
+    doc_ids = [f"doc_{i}" for i in range(10)]
+    db_session = MagicMock()
+    db_session.scalars.return_value.yield_per.return_value = doc_ids
+    redis_client = MagicMock()
+    celery_app = MagicMock()
+
+    with patch.object(redis_object_helper, "get_redis_client"), patch.object(
+        redis_document_set, "construct_document_id_select_by_docset"
+    ):
+        rds = RedisDocumentSet("tenant", 1)
+        result = rds.generate_tasks(
+            1000,
+            celery_app,
+            db_session,
+            redis_client,
+            MagicMock(),
+            "tenant",
+            batch_size=batch_size,
+        )
+
+    assert result == (expected_tasks, len(doc_ids))
+
+    sent_calls = celery_app.send_task.call_args_list
+    assert len(sent_calls) == expected_tasks
+    assert all(
+        call.args[0] == OnyxCeleryTask.VESPA_METADATA_SYNC_BATCH_TASK
+        for call in sent_calls
+    )
+    sent_doc_ids = [
+        doc_id
+        for call in sent_calls
+        for doc_id in call.kwargs["kwargs"]["document_ids"]
+    ]
+    assert sent_doc_ids == doc_ids
+
+    # every task is tracked in the taskset before it is sent, under its own id
+    task_ids = [call.kwargs["task_id"] for call in sent_calls]
+    assert [call.args[1] for call in redis_client.sadd.call_args_list] == task_ids
+    assert all(task_id.startswith(rds.task_id_prefix) for task_id in task_ids)
+
+
+def test_finished_tasks_count_their_document_once() -> None:
+    redis_client = MagicMock()
+    redis_client.srem.side_effect = [1, 0]
+    task = MagicMock()
+    task.name = OnyxCeleryTask.VESPA_METADATA_SYNC_TASK
+
+    with patch.object(redis_object_helper, "get_redis_client"), patch.object(
+        app_base, "get_redis_client", return_value=redis_client
+    ):
+        rds = RedisDocumentSet("tenant", 1)
+        task_id = f"{rds.task_id_prefix}_abc"
+        for _ in range(2):
+            app_base.on_task_postrun(
+                task_id=task_id,
+                task=task,
+                kwargs=dict(document_id="doc_1", tenant_id="t"),
+                state="SUCCESS",
+            )
+
+    # the second postrun for the same task id doesn't count its document again
+    redis_client.incr.assert_called_once_with(rds.synced_docs_key)
+
+
+def test_batch_tasks_count_the_documents_of_every_attempt() -> None:
+    redis_client = MagicMock()
+    task = MagicMock()
+    task.name = OnyxCeleryTask.VESPA_METADATA_SYNC_BATCH_TASK
+
+    with patch.object(redis_object_helper, "get_redis_client"), patch.object(
+        app_base, "get_redis_client", return_value=redis_client
+    ), patch.object(vespa_tasks, "get_redis_client", return_value=redis_client):
+        rds = RedisDocumentSet("tenant", 1)
+        task_id = f"{rds.task_id_prefix}_abc"
+        # the first attempt synced 2 documents, the retry the last one
+        vespa_tasks._count_synced_docs(task_id, "t", 2)
+        vespa_tasks._count_synced_docs(task_id, "t", 1)
+        app_base.on_task_postrun(
+            task_id=task_id,
+            task=task,
+            kwargs=dict(document_ids=["doc_3"], tenant_id="t"),
+            state="SUCCESS",
+        )
+
+    assert [call.args for call in redis_client.incrby.call_args_list] == [
+        (rds.synced_docs_key, 2),
+        (rds.synced_docs_key, 1),
+    ]
+    redis_client.incr.assert_not_called()
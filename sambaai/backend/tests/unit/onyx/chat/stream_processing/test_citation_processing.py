@@ -1,3 +1,4 @@
+import random
 from datetime import datetime
 
 import pytest
@@ -6,6 +7,8 @@ from onyx.chat.models import CitationInfo
 from onyx.chat.models import LlmDoc
 from onyx.chat.models import OnyxAnswerPiece
 from onyx.chat.stream_processing.citation_processing import CitationProcessor
+from onyx.chat.stream_processing.citation_processing import CodeFenceTracker
+from onyx.chat.stream_processing.citation_processing import in_code_block
 from onyx.chat.stream_processing.utils import DocumentIdOrderMapping
 from onyx.configs.constants import DocumentSource
 
@@ -436,3 +439,15 @@ def test_citation_extraction(
     ] == expected_citations, (
         f"Test '{test_name}' failed: Citations do not match expected output."
     )
+
+
+def test_code_fence_tracker_matches_in_code_block() -> None:
+    rng = random.Random(0)
+    for _ in range(200):
+        tracker = CodeFenceTracker()
+        text = ""
+        for _ in range(rng.randint(1, 30)):
+            token = "".join(rng.choice(["`", "`", "a", "\n", ""]) for _ in range(4))
+            tracker.feed(token)
+            text += token
+            assert tracker.in_code_block == in_code_block(text), repr(text)
@@ -1,10 +1,16 @@
+from unittest.mock import patch
+
 import pytest
 
+from onyx.chat import prune_and_merge
+from onyx.chat.prune_and_merge import _apply_pruning
 from onyx.chat.prune_and_merge import _merge_sections
 from onyx.configs.constants import DocumentSource
 from onyx.context.search.models import InferenceChunk
 from onyx.context.search.models import InferenceSection
 from onyx.context.search.utils import inference_section_from_chunks
+from onyx.llm.interfaces import LLMConfig
+from onyx.natural_language_processing.utils import BaseTokenizer
 
 
 # This large test accounts for all of the following:
@@ -224,3 +230,63 @@ def test_merge_minimal_sections(
     merged_sections = _merge_sections(sections)
     assert merged_sections[0].combined_content == expected_content
     assert merged_sections[0].center_chunk == expected_center_chunk
+
+
+class WordTokenizer(BaseTokenizer):
+    def __init__(self) -> None:
+        self.encoded: list[str] = []
+
+    def encode(self, string: str) -> list[int]:
+        self.encoded.append(string)
+        return [len(word) for word in string.split()]
+
+    def tokenize(self, string: str) -> list[str]:
+        return string.split()
+
+    def decode(self, tokens: list[int]) -> str:
+        return " ".join("x" * token for token in tokens)
+
+
+def test_apply_pruning_copies_on_write_and_reuses_token_counts() -> None:
+    sections = [
+        InferenceSection(
+            center_chunk=chunk,
+            chunks=[chunk],
+            combined_content=" ".join([chunk.content] * 20),
+        )
+        for chunk in [DOC_1_TOP_CHUNK, DOC_1_MID_CHUNK, DOC_2_TOP_CHUNK]
+    ]
+    original_contents = [section.combined_content for section in sections]
+    tokenizer = WordTokenizer()
+    llm_config = LLMConfig(
+        model_provider="test",
+        model_name="word-tokenizer",
+        temperature=0,
+        max_input_tokens=4096,
+    )
+
+    def _prune() -> list[InferenceSection]:
+        return _apply_pruning(
+            sections=sections,
+            section_relevance_list=None,
+            token_limit=130,
+            is_manually_selected_docs=False,
+            use_sections=True,
+            using_tool_message=True,
+            llm_config=llm_config,
+        )
+
+    with patch.object(prune_and_merge, "get_tokenizer", return_value=tokenizer):
+        first = _prune()
+        num_encoded = len(tokenizer.encoded)
+        second = _prune()
+
+    # the final section is trimmed in the output but the input is left untouched
+    assert [section.combined_content for section in sections] == original_contents
+    assert len(first) == 3
+    assert first[-1].combined_content != original_contents[-1]
+    assert first[-1].chunks[0] is sections[-1].chunks[0]
+    assert first[0] is sections[0]
+    assert [s.combined_content for s in second] == [s.combined_content for s in first]
+    # token counts come from the cache the second time, only trimming encodes
+    assert len(tokenizer.encoded) - num_encoded < num_encoded
@@ -18,6 +18,7 @@ from onyx.connectors.models import BasicExpertInfo
 from onyx.connectors.models import Document
 from onyx.connectors.models import ImageSection
 from onyx.connectors.models import TextSection
+from onyx.connectors.salesforce.connector import SalesforceConnector
 from onyx.connectors.salesforce.doc_conversion import _extract_section
 from onyx.connectors.salesforce.doc_conversion import ID_PREFIX
 from onyx.connectors.salesforce.onyx_salesforce import OnyxSalesforce
@@ -25,6 +26,7 @@ from onyx.connectors.salesforce.salesforce_calls import _bulk_retrieve_from_sale
 from onyx.connectors.salesforce.salesforce_calls import _make_time_filter_for_sf_type
 from onyx.connectors.salesforce.salesforce_calls import _make_time_filtered_query
 from onyx.connectors.salesforce.salesforce_calls import get_object_by_id_query
+from onyx.connectors.salesforce.sqlite_bulk_load import stage_csvs_in_parallel
 from onyx.connectors.salesforce.sqlite_functions import OnyxSalesforceSQLite
 from onyx.utils.logger import setup_logger
 
@@ -802,6 +804,164 @@ def test_salesforce_sqlite() -> None:
         _clear_sf_db(directory)
 
 
+def _write_csv(directory: str, filename: str, records: list[dict]) -> str:
+    fields = sorted({field for record in records for field in record})
+    csv_path = os.path.join(directory, filename)
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(records)
+    return csv_path
+
+
+def _dump_sf_db(sf_db: OnyxSalesforceSQLite) -> dict[str, list[tuple]]:
+    cursor = sf_db.cursor()
+    return {
+        table: sorted(cursor.execute(f"SELECT {columns} FROM {table}").fetchall())
+        for table, columns in [
+            ("salesforce_objects", "id, object_type, data"),
+            ("relationships", "child_id, parent_id"),
+            ("relationship_types", "child_id, parent_id, parent_type"),
+            ("user_email_map", "email, user_id"),
+        ]
+    }
+
+
+def test_salesforce_sqlite_bulk_load_matches_update_from_csv() -> None:
+    account_ids = _VALID_SALESFORCE_IDS[0:3]
+    contact_ids = _VALID_SALESFORCE_IDS[40:44]
+    user_ids = _VALID_SALESFORCE_IDS[-2:]
+
+    # update_from_csv only links parents that are already loaded, so the parent
+    # types go first (the bulk load doesn't depend on the order)
+    first_sync: dict[str, list[list[dict]]] = {
+        "Account": [
+            [{"Id": id, "Name": f"Account {i}"} for i, id in enumerate(account_ids)],
+            # the same id again in a later CSV, the last one wins
+            [{"Id": account_ids[0], "Name": "Account 0 renamed", "Industry": ""}],
+        ],
+        "User": [
+            [
+                {"Id": id, "Email": f"user{i}@example.com"}
+                for i, id in enumerate(user_ids)
+            ]
+        ],
+        "Contact": [
+            [
+                {
+                    "Id": id,
+                    "AccountId": account_ids[i % len(account_ids)],
+                    "OwnerId": user_ids[0],
+                    "LastName": f"Contact {i}",
+                }
+                for i, id in enumerate(contact_ids)
+            ]
+        ],
+    }
+    second_sync: dict[str, list[list[dict]]] = {
+        "Contact": [
+            [
+                {
+                    "Id": contact_ids[0],
+                    "AccountId": account_ids[2],
+                    "LastName": "Contact 0 moved",
+                }
+            ]
+        ],
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        legacy_db = OnyxSalesforceSQLite(os.path.join(directory, "legacy.sqlite"))
+        legacy_db.connect()
+        legacy_db.apply_schema()
+        bulk_db = OnyxSalesforceSQLite(os.path.join(directory, "bulk.sqlite"))
+        bulk_db.connect()
+        bulk_db.apply_schema()
+
+        for sync_num, sync in enumerate([first_sync, second_sync]):
+            csv_paths_by_type: dict[str, list[str] | None] = {}
+            legacy_ids: dict[str, str] = {}
+            for object_type, csvs in sync.items():
+                csv_paths = [
+                    _write_csv(directory, f"{object_type}.{sync_num}.{i}.csv", records)
+                    for i, records in enumerate(csvs)
+                ]
+                csv_paths_by_type[object_type] = csv_paths
+                for csv_path in csv_paths:
+                    for id in legacy_db.update_from_csv(object_type, csv_path):
+                        legacy_ids[id] = object_type
+
+            staged = list(
+                stage_csvs_in_parallel(
+                    csv_paths_by_type,
+                    os.path.join(directory, "staging"),
+                    remove_ids=True,
+                    max_workers=4,
+                )
+            )
+            bulk_ids = bulk_db.merge_staging_dbs([s.staging_path for s in staged])
+
+            assert bulk_ids == legacy_ids
+            assert _dump_sf_db(bulk_db) == _dump_sf_db(legacy_db)
+
+        # indexes dropped for the initial load are back
+        index_names = {
+            row[0]
+            for row in bulk_db.cursor().execute(
+                "SELECT name FROM sqlite_master WHERE type='index'"
+            )
+        }
+        assert set(OnyxSalesforceSQLite.INDEXES) <= index_names
+
+        assert bulk_db.get_user_id_by_email("user1@example.com") == user_ids[1]
+        assert bulk_db.get_child_ids(account_ids[2]) == {
+            contact_ids[0],
+            contact_ids[2],
+        }
+
+        legacy_db.close()
+        bulk_db.close()
+
+
+def test_load_csvs_to_db_keeps_alive_while_merging() -> None:
+    account_ids = _VALID_SALESFORCE_IDS[0:2]
+    contact_ids = _VALID_SALESFORCE_IDS[40:42]
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_dir = os.path.join(directory, "csvs")
+        os.makedirs(csv_dir)
+        _write_csv(csv_dir, "Account.0.csv", [{"Id": id} for id in account_ids])
+        _write_csv(
+            csv_dir,
+            "Contact.0.csv",
+            [{"Id": id, "AccountId": account_ids[0]} for id in contact_ids],
+        )
+        sf_db = OnyxSalesforceSQLite(os.path.join(directory, "salesforce.sqlite"))
+        sf_db.connect()
+        sf_db.apply_schema()
+
+        load = SalesforceConnector._load_csvs_to_db(csv_dir, True, sf_db)
+        num_keep_alives = 0
+        updated_ids: dict[str, str] = {}
+        try:
+            while True:
+                assert next(load) == []
+                num_keep_alives += 1
+        except StopIteration as e:
+            updated_ids = e.value
+
+        # one per staged object type, then one per staging db for the merge of the
+        # records and for the merge of the relationship types
+        assert num_keep_alives == 2 + 2 * 2
+        assert updated_ids == {
+            **{id: "Account" for id in account_ids},
+            **{id: "Contact" for id in contact_ids},
+        }
+        assert sf_db.get_child_ids(account_ids[0]) == set(contact_ids)
+
+        sf_db.close()
+
+
 @pytest.mark.skip(reason="Enable when credentials are available")
 def test_salesforce_bulk_retrieve() -> None:
 
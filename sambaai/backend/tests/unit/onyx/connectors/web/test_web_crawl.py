@@ -0,0 +1,170 @@
+import time
+from collections.abc import Generator
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from typing import Any
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import pytest
+
+from onyx.configs.constants import DocumentSource
+from onyx.connectors.models import Document
+from onyx.connectors.models import TextSection
+from onyx.connectors.web import connector as web_connector
+from onyx.connectors.web.connector import ScrapeResult
+from onyx.connectors.web.connector import WEB_CONNECTOR_VALID_SETTINGS
+from onyx.connectors.web.connector import WebConnector
+from onyx.connectors.web.crawler import CrawlFrontier
+from onyx.db.models import WebCrawlState
+
+BASE_URL = "https://docs.example.com/"
+
+# url -> (etag, links)
+SITE: dict[str, tuple[str, list[str]]] = {
+    BASE_URL: ("v1", [BASE_URL + "a", BASE_URL + "b"]),
+    BASE_URL + "a": ("v1", [BASE_URL + "c", BASE_URL]),
+    BASE_URL + "b": ("v2", []),
+    BASE_URL + "c": ("v1", []),
+}
+
+
+def _fake_scrape(
+    self: WebConnector,
+    index: int,
+    initial_url: str,
+    browser: Any,
+    http_session: Any,
+    known_page: WebCrawlState | None = None,
+) -> ScrapeResult:
+    etag, links = SITE[initial_url]
+    if known_page is not None and known_page.etag == etag:
+        return ScrapeResult(unchanged=True, etag=etag)
+
+    return ScrapeResult(
+        doc=Document(
+            id=initial_url,
+            sections=[TextSection(link=initial_url, text=initial_url)],
+            source=DocumentSource.WEB,
+            semantic_identifier=initial_url,
+            metadata={},
+        ),
+        links=set(links),
+        etag=etag,
+        content_hash=f"{initial_url}_{etag}",
+    )
+
+
+def _known_page(url: str, etag: str, changed_at: datetime) -> WebCrawlState:
+    return WebCrawlState(
+        url=url,
+        etag=etag,
+        content_hash=f"{url}_{etag}",
+        changed_at=changed_at,
+    )
+
+
+@pytest.fixture
+def crawl_state() -> Generator[dict[str, MagicMock], None, None]:
+    mocks = {
+        "fetch_web_crawl_states": MagicMock(return_value={}),
+        "fetch_web_crawl_links": MagicMock(
+            side_effect=lambda db_session, crawl_key, url: SITE[url][1]
+        ),
+        "upsert_web_crawl_states": MagicMock(),
+    }
+    with (
+        patch.object(web_connector, "check_internet_connection"),
+        patch.object(web_connector, "get_session_with_current_tenant"),
+        patch.object(web_connector, "PlaywrightBrowser"),
+        patch.object(WebConnector, "_do_scrape", _fake_scrape),
+        patch.multiple(web_connector, **mocks),
+    ):
+        yield mocks
+
+
+def _crawled_ids(batches: Any) -> set[str]:
+    return {doc.id for batch in batches for doc in batch}
+
+
+def test_load_crawls_every_page(crawl_state: dict[str, MagicMock]) -> None:
+    connector = WebConnector(BASE_URL, WEB_CONNECTOR_VALID_SETTINGS.RECURSIVE.value)
+    assert _crawled_ids(connector.load_from_state()) == set(SITE)
+    crawl_state["upsert_web_crawl_states"].assert_not_called()
+
+
+def test_poll_skips_unchanged_pages(crawl_state: dict[str, MagicMock]) -> None:
+    poll_start = datetime.now(timezone.utc) - timedelta(hours=1)
+    long_ago = poll_start - timedelta(days=1)
+    crawl_state["fetch_web_crawl_states"].return_value = {
+        BASE_URL: _known_page(BASE_URL, "v1", long_ago),
+        BASE_URL + "a": _known_page(BASE_URL + "a", "v1", long_ago),
+        # changed since
+        BASE_URL + "b": _known_page(BASE_URL + "b", "v1", long_ago),
+    }
+
+    connector = WebConnector(BASE_URL, WEB_CONNECTOR_VALID_SETTINGS.RECURSIVE.value)
+    crawled = _crawled_ids(connector.poll_source(poll_start.timestamp(), time.time()))
+
+    # c is only linked from a, which was skipped
+    assert crawled == {BASE_URL + "b", BASE_URL + "c"}
+
+    saved = {
+        state.url: state
+        for call in crawl_state["upsert_web_crawl_states"].call_args_list
+        for state in call.args[1]
+    }
+    assert set(saved) == {BASE_URL + "b", BASE_URL + "c"}
+    assert saved[BASE_URL + "b"].etag == "v2"
+    assert saved[BASE_URL + "b"].changed_at > poll_start
+    assert all(state.crawl_key == connector.crawl_key for state in saved.values())
+
+
+def test_poll_returns_pages_changed_in_window(
+    crawl_state: dict[str, MagicMock],
+) -> None:
+    # e.g. the attempt that saw these versions failed, or this is a new index
+    poll_start = datetime.now(timezone.utc) - timedelta(hours=1)
+    crawl_state["fetch_web_crawl_states"].return_value = {
+        url: _known_page(url, etag, poll_start + timedelta(minutes=1))
+        for url, (etag, _) in SITE.items()
+    }
+
+    connector = WebConnector(BASE_URL, WEB_CONNECTOR_VALID_SETTINGS.RECURSIVE.value)
+    assert _crawled_ids(
+        connector.poll_source(poll_start.timestamp(), time.time())
+    ) == set(SITE)
+
+
+def test_frontier_limits_requests_per_host() -> None:
+    frontier = CrawlFrontier(max_per_host=2)
+    for i in range(3):
+        frontier.add(f"https://a.com/{i}")
+    frontier.add("https://b.com/0")
+    # already seen
+    frontier.add("https://a.com/0")
+    assert len(frontier) == 4
+
+    popped = [frontier.pop() for _ in range(4)]
+    assert popped[-1] is None
+    assert sorted(url for url in popped if url) == [
+        "https://a.com/1",
+        "https://a.com/2",
+        "https://b.com/0",
+    ]
+
+    frontier.done("https://a.com/2")
+    assert frontier.pop() == "https://a.com/0"
+    assert not frontier
+
+
+def test_frontier_host_crawl_delay() -> None:
+    frontier = CrawlFrontier(max_per_host=10, host_delay_seconds=60)
+    frontier.add("https://a.com/0")
+    frontier.add("https://a.com/1")
+
+    assert frontier.pop() == "https://a.com/1"
+    assert frontier.pop() is None
+    wait = frontier.seconds_until_ready()
+    assert wait is not None and 0 < wait <= 60
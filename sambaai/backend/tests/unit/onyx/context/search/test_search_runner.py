@@ -0,0 +1,60 @@
+from collections.abc import Iterator
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import pytest
+
+from onyx.context.search.retrieval import search_runner
+from onyx.context.search.retrieval.search_runner import get_query_embeddings
+
+
+@pytest.fixture(autouse=True)
+def _clear_caches() -> Iterator[None]:
+    search_runner._QUERY_EMBEDDINGS.clear()
+    search_runner._QUERY_EMBEDDING_MODELS.clear()
+    yield
+    search_runner._QUERY_EMBEDDINGS.clear()
+    search_runner._QUERY_EMBEDDING_MODELS.clear()
+
+
+def _search_settings(api_key: str) -> MagicMock:
+    search_settings = MagicMock()
+    search_settings.id = 1
+    search_settings.model_name = "embedding-model"
+    search_settings.api_key = api_key
+    return search_settings
+
+
+def test_repeated_queries_reuse_the_model_and_the_embeddings() -> None:
+    search_settings = _search_settings("secret-key")
+    model = MagicMock()
+    model.encode.side_effect = lambda texts, text_type: [
+        [float(len(text))] for text in texts
+    ]
+
+    with patch.object(
+        search_runner, "get_current_search_settings", return_value=search_settings
+    ), patch.object(
+        search_runner.EmbeddingModel, "from_db_model", return_value=model
+    ) as from_db_model:
+        first = get_query_embeddings(["what is onyx", "hello"], MagicMock())
+        # whitespace differences map to the same cached vector
+        second = get_query_embeddings(["what  is onyx ", "new query"], MagicMock())
+
+    assert first == [[12.0], [5.0]]
+    assert second == [[12.0], [9.0]]
+    assert from_db_model.call_count == 1
+    # only the queries that weren't cached yet go to the model server
+    assert [call.args[0] for call in model.encode.call_args_list] == [
+        ["what is onyx", "hello"],
+        ["new query"],
+    ]
+
+
+def test_model_cache_key_does_not_contain_the_api_key() -> None:
+    model_key = search_runner._query_embedding_model_key(_search_settings("secret-key"))
+
+    assert "secret-key" not in model_key
+    assert model_key != search_runner._query_embedding_model_key(
+        _search_settings("rotated-key")
+    )
@@ -0,0 +1,85 @@
+from collections.abc import Generator
+from typing import Any
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from onyx.document_index.vespa import chunk_retrieval
+from onyx.document_index.vespa.shared_utils import utils as vespa_utils
+from onyx.document_index.vespa.shared_utils.utils import vespa_request_latency
+from onyx.httpx.httpx_pool import HttpxPool
+
+_HIT = {
+    "id": "id:default:danswer_chunk::doc_1__0",
+    "relevance": 0.5,
+    "fields": {
+        "document_id": "doc_1",
+        "chunk_id": 0,
+        "blurb": "blurb",
+        "content": "content",
+        "source_type": "web",
+        "semantic_identifier": "Doc 1",
+        "title": "Doc 1",
+        "section_continuation": False,
+        "boost": 0,
+        "hidden": False,
+        "metadata": "{}",
+        "source_links": '{"0": "https://example.com"}',
+    },
+}
+
+
+@pytest.fixture
+def mock_transport() -> Generator[list[httpx.Request], None, None]:
+    requests: list[httpx.Request] = []
+
+    def _handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json={"root": {"children": [_HIT]}})
+
+    kwargs = vespa_utils._vespa_query_client_kwargs()
+
+    def _client_kwargs() -> dict[str, Any]:
+        return {**kwargs, "http2": False, "transport": httpx.MockTransport(_handler)}
+
+    HttpxPool.close_client(vespa_utils.VESPA_QUERY_HTTPX_POOL_NAME)
+    with patch.object(
+        vespa_utils, "_vespa_query_client_kwargs", side_effect=_client_kwargs
+    ):
+        yield requests
+    HttpxPool.close_client(vespa_utils.VESPA_QUERY_HTTPX_POOL_NAME)
+
+
+def _latency_count(endpoint: str) -> float:
+    for metric in vespa_request_latency.collect():
+        for sample in metric.samples:
+            if (
+                sample.name.endswith("_count")
+                and sample.labels.get("endpoint") == endpoint
+            ):
+                return sample.value
+    return 0.0
+
+
+def test_query_vespa_reuses_pooled_client(mock_transport: list[httpx.Request]) -> None:
+    count_before = _latency_count("search")
+
+    first = chunk_retrieval.query_vespa({"yql": "select * from sources *"})
+    client = vespa_utils.get_vespa_query_http_client()
+    second = chunk_retrieval.query_vespa({"yql": "select * from sources *"})
+
+    assert [c.document_id for c in first + second] == ["doc_1", "doc_1"]
+    assert len(mock_transport) == 2
+    # the client is shared and stays open between queries
+    assert vespa_utils.get_vespa_query_http_client() is client
+    assert not client.is_closed
+    assert _latency_count("search") == count_before + 2
+
+
+def test_pool_is_recreated_after_fork(mock_transport: list[httpx.Request]) -> None:
+    client = vespa_utils.get_vespa_query_http_client()
+    with patch.object(HttpxPool, "_pid", -1):
+        assert vespa_utils.get_vespa_query_http_client() is not client
+    # the parent's client is left alone, its connections aren't ours to close
+    assert not client.is_closed
@@ -0,0 +1,114 @@
+import asyncio
+from uuid import uuid4
+
+import httpx
+import pytest
+
+from onyx.document_index.vespa import feed
+from onyx.document_index.vespa.feed import build_delete_operation
+from onyx.document_index.vespa.feed import feed_vespa_operations
+from onyx.document_index.vespa.feed import VespaFeeder
+from onyx.document_index.vespa.feed import VespaFeedOperation
+
+
+def _put(i: int) -> VespaFeedOperation:
+    return VespaFeedOperation(
+        method="POST",
+        url=f"http://vespa/document/v1/default/index/docid/{i}",
+        document_id=f"doc_{i}",
+        body=b'{"fields": {}}',
+    )
+
+
+def test_feed_bounds_requests_in_flight() -> None:
+    in_flight = 0
+    max_seen = 0
+    seen_urls: list[str] = []
+
+    async def _handler(request: httpx.Request) -> httpx.Response:
+        nonlocal in_flight, max_seen
+        in_flight += 1
+        max_seen = max(max_seen, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        seen_urls.append(str(request.url))
+        return httpx.Response(200)
+
+    operations = [_put(i) for i in range(50)] + [
+        build_delete_operation(uuid4(), "index")
+    ]
+    stats = feed_vespa_operations(
+        operations,
+        max_in_flight=8,
+        client=httpx.AsyncClient(transport=httpx.MockTransport(_handler)),
+    )
+
+    assert len(seen_urls) == 51
+    assert 1 < max_seen <= 8
+    assert stats.puts == 50
+    assert stats.deletes == 1
+    assert stats.bytes_sent == 50 * len(b'{"fields": {}}')
+    assert stats.operations_per_second > 0
+
+
+def test_feed_retries_transient_errors() -> None:
+    attempts = 0
+
+    def _handler(request: httpx.Request) -> httpx.Response:
+        nonlocal attempts
+        attempts += 1
+        return httpx.Response(503 if attempts < 3 else 200)
+
+    feed_vespa_operations(
+        [_put(0)],
+        client=httpx.AsyncClient(transport=httpx.MockTransport(_handler)),
+        delay=0,
+    )
+    assert attempts == 3
+
+
+def test_feed_raises_on_client_errors() -> None:
+    attempts = 0
+
+    def _handler(request: httpx.Request) -> httpx.Response:
+        nonlocal attempts
+        attempts += 1
+        return httpx.Response(400, text="bad field")
+
+    with pytest.raises(httpx.HTTPStatusError):
+        feed_vespa_operations(
+            [_put(0)],
+            client=httpx.AsyncClient(transport=httpx.MockTransport(_handler)),
+            delay=0,
+        )
+    # not retried
+    assert attempts == 1
+
+
+def test_feeder_shares_one_client_across_feeds(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    methods: list[str] = []
+    num_clients = 0
+
+    def _handler(request: httpx.Request) -> httpx.Response:
+        methods.append(request.method)
+        return httpx.Response(200)
+
+    def _client_kwargs() -> dict:
+        nonlocal num_clients
+        num_clients += 1
+        return {"transport": httpx.MockTransport(_handler)}
+
+    monkeypatch.setattr(feed, "_get_feed_client_kwargs", _client_kwargs)
+
+    with VespaFeeder() as feeder:
+        stats = feeder.feed([build_delete_operation(uuid4(), "index")]) + feeder.feed(
+            [_put(0), _put(1)]
+        )
+        client = feeder._client
+
+    assert methods == ["DELETE", "POST", "POST"]
+    assert (stats.deletes, stats.puts) == (1, 2)
+    assert num_clients == 1
+    assert client is not None and client.is_closed
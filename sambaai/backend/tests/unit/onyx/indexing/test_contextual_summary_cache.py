@@ -0,0 +1,192 @@
+from typing import Any
+from typing import cast
+from unittest.mock import Mock
+
+from onyx.indexing.contextual_summary_cache import ContextualSummaryCache
+from onyx.indexing.indexing_pipeline import add_contextual_summaries
+from onyx.indexing.models import DocAwareChunk
+from onyx.natural_language_processing.utils import BaseTokenizer
+
+
+class CharTokenizer(BaseTokenizer):
+    def encode(self, string: str) -> list[int]:
+        return [ord(c) for c in string]
+
+    def tokenize(self, string: str) -> list[str]:
+        return list(string)
+
+    def decode(self, tokens: list[int]) -> str:
+        return "".join(chr(t) for t in tokens)
+
+
+class FakePipeline:
+    def __init__(self, redis: "FakeRedis") -> None:
+        self.redis = redis
+        self.ops: list[tuple[str, tuple[Any, ...]]] = []
+
+    def __getattr__(self, name: str) -> Any:
+        def _queue(*args: Any, **kwargs: Any) -> None:
+            self.ops.append((name, args))
+
+        return _queue
+
+    def execute(self) -> list[Any]:
+        results = [getattr(self.redis, op)(*args) for op, args in self.ops]
+        self.ops = []
+        return results
+
+
+class FakeRedis:
+    def __init__(self) -> None:
+        self.store: dict[str, str] = {}
+        self.index: dict[str, float] = {}
+
+    def pipeline(self, transaction: bool = True) -> FakePipeline:
+        return FakePipeline(self)
+
+    def getex(self, key: str) -> bytes | None:
+        value = self.store.get(key)
+        return value.encode() if value is not None else None
+
+    def set(self, key: str, value: str) -> bool:
+        self.store[key] = value
+        return True
+
+    def zadd(self, name: str, mapping: dict[str, float]) -> int:
+        self.index.update(mapping)
+        return len(mapping)
+
+    def zremrangebyscore(self, name: str, min: str, max: float) -> int:
+        expired = [key for key, score in self.index.items() if score <= max]
+        for key in expired:
+            del self.index[key]
+        return len(expired)
+
+    def zcard(self, name: str) -> int:
+        return len(self.index)
+
+    def zpopmin(self, name: str, count: int) -> list[tuple[str, float]]:
+        popped = sorted(self.index.items(), key=lambda item: item[1])[:count]
+        for key, _ in popped:
+            del self.index[key]
+        return popped
+
+    def delete(self, *keys: str) -> int:
+        for key in keys:
+            self.store.pop(key, None)
+        return len(keys)
+
+
+def _make_chunks(doc_id: str, contents: list[str]) -> list[DocAwareChunk]:
+    source_document = Mock()
+    source_document.id = doc_id
+    source_document.get_text_content.return_value = " ".join(contents)
+    chunks = []
+    for content in contents:
+        chunk = Mock()
+        chunk.source_document = source_document
+        chunk.content = content
+        chunk.contextual_rag_reserved_tokens = 64
+        chunk.doc_summary = ""
+        chunk.chunk_context = ""
+        chunks.append(chunk)
+    return cast(list[DocAwareChunk], chunks)
+
+
+def _make_llm() -> tuple[Mock, list[str]]:
+    prompts: list[str] = []
+
+    def _invoke(prompt: str, **_: Any) -> Mock:
+        prompts.append(prompt)
+        message = Mock()
+        message.content = f"summary {len(prompts)}"
+        return message
+
+    llm = Mock()
+    llm.config.model_provider = "openai"
+    llm.config.model_name = "gpt-4o-mini"
+    llm.config.max_input_tokens = 10_000
+    llm.invoke.side_effect = _invoke
+    return llm, prompts
+
+
+def test_reindex_only_summarizes_changed_chunks() -> None:
+    redis_client = FakeRedis()
+    llm, prompts = _make_llm()
+
+    def _run(contents: list[str]) -> list[DocAwareChunk]:
+        cache = ContextualSummaryCache.for_llm(llm, tenant_id="tenant")
+        cache._redis_client = cast(Any, redis_client)
+        return add_contextual_summaries(
+            chunks=_make_chunks("doc", contents),
+            llm=llm,
+            tokenizer=CharTokenizer(),
+            chunk_token_limit=100,
+            summary_cache=cache,
+        )
+
+    first = _run(["alpha", "beta"])
+    # one document summary + one context per chunk
+    assert len(prompts) == 3
+
+    second = _run(["alpha", "beta"])
+    assert len(prompts) == 3
+    assert [c.chunk_context for c in second] == [c.chunk_context for c in first]
+    assert second[0].doc_summary == first[0].doc_summary
+
+    # changing the document changes every prompt
+    _run(["alpha", "gamma"])
+    assert len(prompts) == 6
+
+
+def test_keys_are_scoped_by_model() -> None:
+    redis_client = FakeRedis()
+    cache = ContextualSummaryCache(
+        model_provider="openai",
+        model_name="gpt-4o-mini",
+        tenant_id="tenant",
+        redis_client=cast(Any, redis_client),
+    )
+    cache.add("prompt", "summary")
+    cache.flush()
+
+    other_model = ContextualSummaryCache(
+        model_provider="openai",
+        model_name="gpt-4o",
+        tenant_id="tenant",
+        redis_client=cast(Any, redis_client),
+    )
+    assert other_model.get_many(["prompt"]) == [None]
+    assert cache.get_many(["prompt"]) == ["summary"]
+
+
+def test_size_eviction() -> None:
+    redis_client = FakeRedis()
+    cache = ContextualSummaryCache(
+        model_provider="openai",
+        model_name="gpt-4o-mini",
+        tenant_id="tenant",
+        redis_client=cast(Any, redis_client),
+        max_entries=2,
+    )
+    for i in range(3):
+        cache.add(f"prompt {i}", f"summary {i}")
+        cache.flush()
+
+    assert len(redis_client.store) == 2
+    assert cache.get_many(["prompt 0", "prompt 2"]) == [None, "summary 2"]
+
+
+def test_redis_failure_is_a_miss() -> None:
+    broken_redis = Mock()
+    broken_redis.pipeline.side_effect = ConnectionError("redis is down")
+    cache = ContextualSummaryCache(
+        model_provider="openai",
+        model_name="gpt-4o-mini",
+        tenant_id="tenant",
+        redis_client=broken_redis,
+    )
+    cache.add("prompt", "summary")
+    cache.flush()
+
+    assert cache.get_many(["prompt"]) == [None]
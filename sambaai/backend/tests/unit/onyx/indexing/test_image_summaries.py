@@ -0,0 +1,130 @@
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+from typing import cast
+from unittest.mock import Mock
+from unittest.mock import patch
+
+import pytest
+
+from onyx.indexing.image_summaries import IMAGE_ERROR_TEXT
+from onyx.indexing.image_summaries import IMAGE_NOT_FOUND_TEXT
+from onyx.indexing.image_summaries import ImageSummaryCache
+from onyx.indexing.image_summaries import RateLimitBackoff
+from onyx.indexing.image_summaries import summarize_image_files
+from onyx.llm.chat_llm import LLMRateLimitError
+from tests.unit.onyx.indexing.test_contextual_summary_cache import FakeRedis
+
+_FILES = {
+    "logo_1.png": b"logo",
+    "logo_2.png": b"logo",
+    "diagram.png": b"diagram",
+}
+
+
+def _make_llm(fail_for: bytes | None = None) -> tuple[Mock, list[str]]:
+    invoked_with: list[str] = []
+
+    def _invoke(messages: list[Any], **_: Any) -> Mock:
+        file_name = messages[-1].content[0]["text"].split("'")[1]
+        invoked_with.append(file_name)
+        if _FILES[file_name] == fail_for:
+            raise RuntimeError("vision model unavailable")
+        message = Mock()
+        message.content = f"summary of {file_name}"
+        return message
+
+    llm = Mock()
+    llm.config.model_provider = "openai"
+    llm.config.model_name = "gpt-4o"
+    llm.invoke.side_effect = _invoke
+    return llm, invoked_with
+
+
+def _summarize(
+    file_names: list[str], llm: Mock, redis_client: FakeRedis
+) -> dict[str, str]:
+    @contextmanager
+    def _session() -> Iterator[Mock]:
+        yield Mock()
+
+    def _read(requested: list[str], db_session: Any) -> list[tuple[Mock, bytes]]:
+        files = []
+        for file_name in requested:
+            if file_name not in _FILES:
+                continue
+            pgfilestore = Mock()
+            pgfilestore.file_name = file_name
+            pgfilestore.display_name = file_name
+            files.append((pgfilestore, _FILES[file_name]))
+        return files
+
+    cache = ImageSummaryCache.for_llm(llm, tenant_id="tenant")
+    cache._redis_client = cast(Any, redis_client)
+    with (
+        patch(
+            "onyx.indexing.image_summaries.get_session_with_current_tenant", _session
+        ),
+        patch("onyx.indexing.image_summaries.read_pgfilestores_with_content", _read),
+    ):
+        return summarize_image_files(file_names, llm, summary_cache=cache)
+
+
+def test_identical_images_are_summarized_once_and_cached() -> None:
+    redis_client = FakeRedis()
+    llm, invoked_with = _make_llm()
+    file_names = ["logo_1.png", "diagram.png", "logo_2.png", "missing.png"]
+
+    texts = _summarize(file_names, llm, redis_client)
+    assert sorted(invoked_with) == ["diagram.png", "logo_1.png"]
+    assert texts == {
+        "logo_1.png": "summary of logo_1.png",
+        "logo_2.png": "summary of logo_1.png",
+        "diagram.png": "summary of diagram.png",
+        "missing.png": IMAGE_NOT_FOUND_TEXT,
+    }
+
+    # re-indexing doesn't call the LLM again
+    assert _summarize(file_names, llm, redis_client) == texts
+    assert len(invoked_with) == 2
+
+
+def test_failed_summaries_are_not_cached() -> None:
+    redis_client = FakeRedis()
+    llm, invoked_with = _make_llm(fail_for=b"diagram")
+
+    texts = _summarize(["diagram.png", "logo_1.png"], llm, redis_client)
+    assert texts["diagram.png"] == IMAGE_ERROR_TEXT
+    assert texts["logo_1.png"] == "summary of logo_1.png"
+
+    llm, invoked_with = _make_llm()
+    texts = _summarize(["diagram.png", "logo_1.png"], llm, redis_client)
+    assert invoked_with == ["diagram.png"]
+    assert texts["diagram.png"] == "summary of diagram.png"
+
+
+def test_rate_limited_calls_are_retried() -> None:
+    attempts = 0
+
+    def _call() -> str:
+        nonlocal attempts
+        attempts += 1
+        if attempts < 3:
+            try:
+                raise LLMRateLimitError("429")
+            except LLMRateLimitError as e:
+                # like summarize_image_pipeline, which wraps LLM errors
+                raise ValueError("Summarization failed") from e
+        return "summary"
+
+    backoff = RateLimitBackoff(max_retries=5, base_delay=0)
+    assert backoff.call(_call) == "summary"
+    assert attempts == 3
+
+    with pytest.raises(RuntimeError):
+        backoff.call(Mock(side_effect=RuntimeError("not a rate limit")))
+
+    attempts = -10
+    with pytest.raises(ValueError):
+        RateLimitBackoff(max_retries=2, base_delay=0).call(_call)
+    assert attempts == -7
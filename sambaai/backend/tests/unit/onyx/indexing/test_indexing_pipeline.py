@@ -6,7 +6,9 @@ from unittest.mock import patch
 
 import pytest
 
+from onyx.access.models import DocumentAccess
 from onyx.configs.app_configs import MAX_DOCUMENT_CHARS
+from onyx.configs.constants import DEFAULT_BOOST
 from onyx.connectors.models import Document
 from onyx.connectors.models import DocumentSource
 from onyx.connectors.models import ImageSection
@@ -15,7 +17,9 @@ from onyx.indexing.chunker import Chunker
 from onyx.indexing.embedder import DefaultIndexingEmbedder
 from onyx.indexing.indexing_pipeline import _get_aggregated_chunk_boost_factor
 from onyx.indexing.indexing_pipeline import add_contextual_summaries
+from onyx.indexing.indexing_pipeline import build_access_aware_chunks
 from onyx.indexing.indexing_pipeline import filter_documents
+from onyx.indexing.indexing_pipeline import group_chunks_by_document
 from onyx.indexing.indexing_pipeline import process_image_sections
 from onyx.indexing.models import ChunkEmbedding
 from onyx.indexing.models import IndexChunk
@@ -144,6 +148,62 @@ def test_filter_documents_empty_batch() -> None:
     assert len(result) == 0
 
 
+# Tests for batch assembly
+
+
+def test_group_chunks_by_document_preserves_order() -> None:
+    chunks = [
+        create_test_chunk("a", 0, doc_id="doc_1"),
+        create_test_chunk("b", 0, doc_id="doc_2"),
+        create_test_chunk("c", 1, doc_id="doc_1"),
+    ]
+    grouped = group_chunks_by_document(chunks)
+    assert [c.content for c in grouped["doc_1"]] == ["a", "c"]
+    assert [c.content for c in grouped["doc_2"]] == ["b"]
+    assert "doc_3" not in grouped
+
+
+def test_build_access_aware_chunks() -> None:
+    chunks = [
+        create_test_chunk("a", 0, doc_id="doc_1"),
+        create_test_chunk("b", 1, doc_id="doc_1"),
+        create_test_chunk("c", 0, doc_id="doc_2"),
+    ]
+    access = DocumentAccess.build(
+        user_emails=["user@example.com"],
+        user_groups=[],
+        external_user_emails=[],
+        external_user_group_ids=[],
+        is_public=False,
+    )
+    db_doc = Mock(boost=2)
+
+    result = build_access_aware_chunks(
+        chunks=chunks,
+        chunk_content_scores=[0.5, 1.0, 0.7],
+        doc_id_to_access_info={"doc_1": access},
+        doc_id_to_document_set={"doc_1": ["set_a", "set_b"]},
+        doc_id_to_user_file_id={"doc_1": 10},
+        doc_id_to_user_folder_id={},
+        id_to_db_doc_map={"doc_1": db_doc},
+        tenant_id="tenant",
+    )
+
+    assert [chunk.content for chunk in result] == ["a", "b", "c"]
+    assert [chunk.aggregated_chunk_boost_factor for chunk in result] == [0.5, 1.0, 0.7]
+    assert result[0].access == access
+    assert result[0].document_sets == {"set_a", "set_b"}
+    assert result[0].user_file == 10
+    assert result[0].boost == 2
+    # documents without any metadata fall back to no access and the default boost
+    assert result[2].access.is_public is False
+    assert result[2].access.to_acl() == set()
+    assert result[2].document_sets == set()
+    assert result[2].user_file is None
+    assert result[2].boost == DEFAULT_BOOST
+    assert result[2].tenant_id == "tenant"
+
+
 # Tests for get_aggregated_boost_factor
 
 
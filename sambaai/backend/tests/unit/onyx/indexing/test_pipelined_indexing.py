@@ -0,0 +1,108 @@
+import threading
+import time
+from unittest.mock import Mock
+
+from onyx.configs.constants import DocumentSource
+from onyx.connectors.models import Document
+from onyx.connectors.models import IndexAttemptMetadata
+from onyx.connectors.models import TextSection
+from onyx.indexing.indexing_pipeline import EmbeddedDocumentBatch
+from onyx.indexing.indexing_pipeline import IndexingPipelineResult
+from onyx.indexing.pipelined_indexing import PipelinedIndexingPipeline
+
+
+def _make_batch(batch_num: int) -> list[Document]:
+    return [
+        Document(
+            id=f"doc_{batch_num}_{i}",
+            source=DocumentSource.WEB,
+            semantic_identifier=f"Doc {batch_num} {i}",
+            metadata={},
+            sections=[TextSection(text="content", link=None)],
+        )
+        for i in range(2)
+    ]
+
+
+def _make_embedded_batch(document_batch: list[Document]) -> EmbeddedDocumentBatch:
+    return EmbeddedDocumentBatch.model_construct(
+        filtered_documents=document_batch,
+        ctx=Mock(),
+        chunks_with_embeddings=[],
+        embedding_failures=[],
+        chunk_content_scores=[],
+    )
+
+
+def test_stages_overlap_and_all_results_are_returned() -> None:
+    write_started = threading.Event()
+    embedded_while_writing: list[bool] = []
+
+    def embed_stage(
+        document_batch: list[Document], metadata: IndexAttemptMetadata
+    ) -> EmbeddedDocumentBatch:
+        embedded_while_writing.append(write_started.is_set())
+        return _make_embedded_batch(document_batch)
+
+    def write_stage(
+        embedded_batch: EmbeddedDocumentBatch, metadata: IndexAttemptMetadata
+    ) -> IndexingPipelineResult:
+        write_started.set()
+        time.sleep(0.05)
+        return IndexingPipelineResult(
+            new_docs=len(embedded_batch.filtered_documents),
+            total_docs=len(embedded_batch.filtered_documents),
+            total_chunks=0,
+            failures=[],
+        )
+
+    pipeline = PipelinedIndexingPipeline(
+        embed_stage=embed_stage, write_stage=write_stage, max_queued_batches=1
+    )
+    metadata = IndexAttemptMetadata(connector_id=1, credential_id=1)
+    for batch_num in range(4):
+        metadata.batch_num = batch_num
+        pipeline.submit(_make_batch(batch_num), metadata)
+
+    completed = pipeline.get_completed() + pipeline.drain()
+    pipeline.close()
+
+    assert sorted(c.index_attempt_metadata.batch_num or 0 for c in completed) == [
+        0,
+        1,
+        2,
+        3,
+    ]
+    assert sum(c.result.total_docs for c in completed) == 8
+    # later batches were embedded while earlier ones were being written
+    assert any(embedded_while_writing)
+    assert pipeline.write_stats.batches == 4
+
+
+def test_stage_exceptions_become_batch_failures() -> None:
+    def embed_stage(
+        document_batch: list[Document], metadata: IndexAttemptMetadata
+    ) -> EmbeddedDocumentBatch:
+        return _make_embedded_batch(document_batch)
+
+    def write_stage(
+        embedded_batch: EmbeddedDocumentBatch, metadata: IndexAttemptMetadata
+    ) -> IndexingPipelineResult:
+        raise ValueError("vespa is down")
+
+    pipeline = PipelinedIndexingPipeline(
+        embed_stage=embed_stage, write_stage=write_stage
+    )
+    pipeline.submit(
+        _make_batch(0), IndexAttemptMetadata(connector_id=1, credential_id=1)
+    )
+    completed = pipeline.drain()
+    pipeline.close()
+
+    assert len(completed) == 1
+    failures = completed[0].result.failures
+    assert [f.failed_document.document_id for f in failures if f.failed_document] == [
+        "doc_0_0",
+        "doc_0_1",
+    ]
+    assert all(f.failure_message == "vespa is down" for f in failures)
@@ -0,0 +1,113 @@
+from datetime import datetime
+from typing import Any
+from unittest.mock import patch
+
+import onyx.db.document  # noqa: F401 # imported first to resolve the kg / document import cycle
+from onyx.kg.clustering import entity_index
+from onyx.kg.clustering import normalizations
+from onyx.kg.clustering.entity_index import get_entity_type_indices
+from onyx.kg.clustering.entity_index import KGEntityTypeIndex
+
+
+def _trigrams(name: str) -> list[str]:
+    # same as pg_trgm's show_trgm for a single alphanumeric word
+    padded = f"  {name} "
+    return sorted({padded[i : i + 3] for i in range(len(padded) - 2)})
+
+
+_ROWS: list[tuple[str, str, str, list[str], str | None, Any]] = [
+    ("ACCOUNT", "ACCOUNT::acme", "Acme", _trigrams("acme"), "doc_1", None),
+    ("ACCOUNT", "ACCOUNT::acmecorp", "Acme Corp", _trigrams("acmecorp"), None, None),
+    ("ACCOUNT", "ACCOUNT::globex", "Globex", _trigrams("globex"), "doc_2", "partner"),
+    ("ACCOUNT", "ACCOUNT::acmee", "Acmee", _trigrams("acmee"), "doc_3", ["partner"]),
+    ("PERSON", "PERSON::alice", "Alice", _trigrams("alice"), None, None),
+]
+
+
+def _index(entity_type: str) -> KGEntityTypeIndex:
+    return KGEntityTypeIndex(
+        version=(0, None),
+        rows=[tuple(row[1:]) for row in _ROWS if row[0] == entity_type],  # type: ignore
+    )
+
+
+def test_search_scores_like_postgres() -> None:
+    index = _index("ACCOUNT")
+    mask = index.allowed_mask({"doc_1", "doc_2", "doc_3"})
+
+    candidates = index.search(_trigrams("acme"), mask, limit=10)
+
+    assert candidates[0] == ("ACCOUNT::acme", "Acme", 1.0)
+    assert {id_name for id_name, _, _ in candidates} == {
+        "ACCOUNT::acme",
+        "ACCOUNT::acmecorp",
+        "ACCOUNT::acmee",
+    }
+    # | Q ∩ E | / min(|Q|, |E|)
+    expected = len(set(_trigrams("acme")) & set(_trigrams("acmee"))) / 5
+    assert dict((c[0], c[2]) for c in candidates)["ACCOUNT::acmee"] == expected
+    assert index.search(_trigrams("zzz"), mask, limit=10) == []
+    assert len(index.search(_trigrams("acme"), mask, limit=1)) == 1
+
+
+def test_search_filters_allowed_docs_and_subtype() -> None:
+    index = _index("ACCOUNT")
+
+    # entities without a document are always allowed
+    candidates = index.search(_trigrams("acme"), index.allowed_mask(set()), limit=10)
+    assert [id_name for id_name, _, _ in candidates] == ["ACCOUNT::acmecorp"]
+
+    mask = index.allowed_mask({"doc_1", "doc_2", "doc_3"}) & index.subtype_mask(
+        "partner"
+    )
+    candidates = index.search(_trigrams("acme"), mask, limit=10)
+    assert [id_name for id_name, _, _ in candidates] == ["ACCOUNT::acmee"]
+
+
+def test_indices_are_cached_until_the_entity_type_changes() -> None:
+    versions = {
+        "ACCOUNT": (4, datetime(2025, 1, 1)),
+        "PERSON": (1, datetime(2025, 1, 1)),
+    }
+    loaded_types: list[list[str]] = []
+
+    def _get_rows(_: Any, entity_types: list[str]) -> list[tuple]:
+        loaded_types.append(entity_types)
+        return [row for row in _ROWS if row[0] in entity_types]
+
+    entity_index._ENTITY_TYPE_INDICES.clear()
+    with patch.object(
+        entity_index, "get_entity_type_versions", side_effect=lambda *_: versions
+    ), patch.object(entity_index, "get_entity_names_by_types", side_effect=_get_rows):
+        first = get_entity_type_indices(None, "tenant", ["ACCOUNT", "PERSON"])  # type: ignore
+        second = get_entity_type_indices(None, "tenant", ["ACCOUNT", "PERSON"])  # type: ignore
+        versions["PERSON"] = (2, datetime(2025, 1, 2))
+        third = get_entity_type_indices(None, "tenant", ["ACCOUNT", "PERSON"])  # type: ignore
+
+    assert loaded_types == [["ACCOUNT", "PERSON"], ["PERSON"]]
+    assert len(first["ACCOUNT"]) == 4
+    assert second["ACCOUNT"] is first["ACCOUNT"]
+    assert third["ACCOUNT"] is first["ACCOUNT"]
+    assert third["PERSON"] is not first["PERSON"]
+    entity_index._ENTITY_TYPE_INDICES.clear()
+
+
+def test_normalize_entities_batch() -> None:
+    indices = {"ACCOUNT": _index("ACCOUNT"), "PERSON": _index("PERSON")}
+
+    with patch.object(normalizations, "get_session_with_current_tenant"), patch.object(
+        normalizations, "get_allowed_doc_ids", return_value={"doc_1"}
+    ), patch.object(
+        normalizations, "get_entity_type_indices", return_value=indices
+    ), patch.object(
+        normalizations,
+        "get_name_trigrams",
+        side_effect=lambda _, names: [_trigrams(name) for name in names],
+    ):
+        mapping = normalizations._normalize_entities_batch(
+            ["ACCOUNT::ACME", "PERSON::*", "PERSON::Alise", "ACCOUNT::Initech"],
+            [{}, {}, {}, {}],
+            "allowed_docs_view",
+        )
+
+    assert mapping == ["ACCOUNT::acme", "PERSON::*", "PERSON::alice", None]
@@ -0,0 +1,231 @@
+from collections.abc import Iterable
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from typing import Any
+from unittest.mock import MagicMock
+from unittest.mock import patch
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+import onyx.db.document  # noqa: F401 # imported first to resolve the kg / document import cycle
+from onyx.db import kg_allowed_docs
+from onyx.db.connector_credential_pair import _update_connector_credential_pair
+from onyx.db.enums import ConnectorCredentialPairStatus
+from onyx.db.kg_allowed_docs import (
+    invalidate_kg_allowed_documents_for_cc_pair__no_commit,
+)
+from onyx.db.kg_allowed_docs import (
+    invalidate_kg_allowed_documents_for_document__no_commit,
+)
+from onyx.db.kg_allowed_docs import invalidate_kg_allowed_documents_for_users__no_commit
+from onyx.db.kg_allowed_docs import refresh_kg_allowed_documents
+
+_USER_EMAIL = "alice@example.com"
+
+
+class _FakeSession:
+    """Answers scalar / scalars with the given results in order and records the
+    executed statements, compiled for postgres."""
+
+    def __init__(
+        self,
+        scalar_results: Iterable[Any] = (),
+        scalars_results: Iterable[Iterable[Any]] = (),
+    ) -> None:
+        self._scalar_results = list(scalar_results)
+        self._scalars_results = list(scalars_results)
+        self.executed: list[tuple[str, str, dict[str, Any]]] = []
+        self.committed = False
+
+    def scalar(self, statement: Any) -> Any:
+        return self._scalar_results.pop(0)
+
+    def scalars(self, statement: Any) -> Iterable[Any]:
+        return iter(self._scalars_results.pop(0))
+
+    def execute(self, statement: Any, params: Any = None) -> None:
+        verb = "delete" if statement.is_delete else "insert"
+        compiled = statement.compile(dialect=postgresql.dialect())
+        self.executed.append((verb, statement.table.name, compiled.params))
+
+    def commit(self) -> None:
+        self.committed = True
+
+
+def _invalidated_emails(session: _FakeSession) -> set[str] | None:
+    """The emails whose refresh rows were deleted, None if all of them were."""
+    (verb, table, params), *_ = session.executed
+    assert (verb, table) == ("delete", "kg_user_allowed_documents_refresh")
+    return set(params["user_email_1"]) if params else None
+
+
+def test_refresh_applies_only_the_difference() -> None:
+    session = _FakeSession(scalar_results=[None], scalars_results=[["b", "c"]])
+
+    with patch.object(
+        kg_allowed_docs, "compute_allowed_kg_doc_ids", return_value={"a", "b"}
+    ):
+        refreshed = refresh_kg_allowed_documents(session, _USER_EMAIL)  # type: ignore
+
+    assert refreshed
+    assert session.committed
+    removed, added, refresh_row = session.executed
+    assert removed == (
+        "delete",
+        "kg_user_allowed_document",
+        {"user_email_1": _USER_EMAIL, "document_id_1": ["c"]},
+    )
+    assert added == (
+        "insert",
+        "kg_user_allowed_document",
+        {"user_email_m0": _USER_EMAIL, "document_id_m0": "a"},
+    )
+    assert refresh_row[:2] == ("insert", "kg_user_allowed_documents_refresh")
+
+
+def test_refresh_without_changes_only_renews_the_refresh_time() -> None:
+    session = _FakeSession(scalar_results=[None], scalars_results=[["a"]])
+
+    with patch.object(
+        kg_allowed_docs, "compute_allowed_kg_doc_ids", return_value={"a"}
+    ):
+        refresh_kg_allowed_documents(session, _USER_EMAIL)  # type: ignore
+
+    assert [statement[:2] for statement in session.executed] == [
+        ("insert", "kg_user_allowed_documents_refresh")
+    ]
+
+
+@pytest.mark.parametrize(
+    "refreshed_ago,refreshes",
+    [
+        (timedelta(minutes=1), False),
+        (timedelta(minutes=10), True),
+        # invalidated, the refresh row was deleted
+        (None, True),
+    ],
+)
+def test_refresh_respects_max_age(
+    refreshed_ago: timedelta | None, refreshes: bool
+) -> None:
+    refreshed_at = datetime.now(timezone.utc) - refreshed_ago if refreshed_ago else None
+    session = _FakeSession(scalar_results=[refreshed_at], scalars_results=[[]])
+
+    with patch.object(
+        kg_allowed_docs, "compute_allowed_kg_doc_ids", return_value=set()
+    ) as compute:
+        refreshed = refresh_kg_allowed_documents(
+            session, _USER_EMAIL, max_age=timedelta(minutes=5)  # type: ignore
+        )
+
+    assert refreshed == refreshes
+    assert compute.called == refreshes
+    assert session.committed == refreshes
+
+
+def test_users_invalidation_is_scoped_to_the_users() -> None:
+    session = _FakeSession(scalars_results=[[_USER_EMAIL, "bob@example.com"]])
+
+    invalidate_kg_allowed_documents_for_users__no_commit(
+        session, [uuid4(), uuid4()]  # type: ignore
+    )
+
+    assert _invalidated_emails(session) == {_USER_EMAIL, "bob@example.com"}
+
+
+def test_users_invalidation_without_users_does_nothing() -> None:
+    session = _FakeSession()
+
+    invalidate_kg_allowed_documents_for_users__no_commit(session, [])  # type: ignore
+
+    assert session.executed == []
+
+
+def test_document_invalidation_refreshes_previous_and_new_holders() -> None:
+    session = _FakeSession(
+        # has KG entities
+        scalar_results=[True],
+        scalars_results=[
+            # users that currently have the document
+            [_USER_EMAIL],
+            # members of the external groups of the new ACL
+            ["carol@example.com"],
+        ],
+    )
+
+    invalidate_kg_allowed_documents_for_document__no_commit(
+        session,  # type: ignore
+        document_id="doc_1",
+        is_public=False,
+        external_user_emails=["bob@example.com"],
+        external_user_group_ids=["group_1"],
+    )
+
+    assert _invalidated_emails(session) == {
+        _USER_EMAIL,
+        "bob@example.com",
+        "carol@example.com",
+    }
+
+
+def test_public_document_invalidation_refreshes_everyone() -> None:
+    session = _FakeSession(scalar_results=[True])
+
+    invalidate_kg_allowed_documents_for_document__no_commit(
+        session,  # type: ignore
+        document_id="doc_1",
+        is_public=True,
+        external_user_emails=[],
+        external_user_group_ids=[],
+    )
+
+    assert _invalidated_emails(session) is None
+
+
+def test_document_without_kg_entities_does_not_invalidate() -> None:
+    session = _FakeSession(scalar_results=[False])
+
+    invalidate_kg_allowed_documents_for_document__no_commit(
+        session,  # type: ignore
+        document_id="doc_1",
+        is_public=True,
+        external_user_emails=[_USER_EMAIL],
+        external_user_group_ids=[],
+    )
+
+    assert session.executed == []
+
+
+def test_cc_pair_invalidation_refreshes_the_owner_and_group_members() -> None:
+    session = _FakeSession(scalars_results=[[_USER_EMAIL], ["bob@example.com"]])
+
+    invalidate_kg_allowed_documents_for_cc_pair__no_commit(session, 1)  # type: ignore
+
+    assert _invalidated_emails(session) == {_USER_EMAIL, "bob@example.com"}
+
+
+@pytest.mark.parametrize(
+    "status,invalidates",
+    [
+        (ConnectorCredentialPairStatus.DELETING, True),
+        (ConnectorCredentialPairStatus.PAUSED, False),
+    ],
+)
+def test_cc_pair_status_change_invalidates_only_when_deleting(
+    status: ConnectorCredentialPairStatus, invalidates: bool
+) -> None:
+    session = _FakeSession(scalars_results=[[_USER_EMAIL], []])
+    cc_pair = MagicMock(
+        id=1, status=ConnectorCredentialPairStatus.ACTIVE, is_user_file=False
+    )
+
+    _update_connector_credential_pair(session, cc_pair, status=status)  # type: ignore
+
+    assert cc_pair.status == status
+    if invalidates:
+        assert _invalidated_emails(session) == {_USER_EMAIL}
+    else:
+        assert session.executed == []
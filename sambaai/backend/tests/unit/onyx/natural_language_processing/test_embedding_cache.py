@@ -0,0 +1,151 @@
+from collections.abc import Generator
+from typing import Any
+from unittest.mock import Mock
+from unittest.mock import patch
+
+import pytest
+
+from onyx.natural_language_processing.embedding_cache import clear_local_embedding_cache
+from onyx.natural_language_processing.embedding_cache import EmbeddingCache
+from onyx.natural_language_processing.search_nlp_models import EmbeddingModel
+from shared_configs.enums import EmbeddingProvider
+from shared_configs.enums import EmbedTextType
+from shared_configs.model_server_models import EmbedRequest
+from shared_configs.model_server_models import EmbedResponse
+
+
+class FakePipeline:
+    def __init__(self, store: dict[str, bytes]) -> None:
+        self.store = store
+        self.ops: list[tuple[str, str, Any]] = []
+
+    def getex(self, key: str, ex: int) -> None:
+        self.ops.append(("get", key, None))
+
+    def set(self, key: str, value: bytes, ex: int) -> None:
+        self.ops.append(("set", key, value))
+
+    def execute(self) -> list[Any]:
+        results: list[Any] = []
+        for op, key, value in self.ops:
+            if op == "get":
+                results.append(self.store.get(key))
+            else:
+                self.store[key] = value
+                results.append(True)
+        self.ops = []
+        return results
+
+
+class FakeRedis:
+    def __init__(self) -> None:
+        self.store: dict[str, bytes] = {}
+
+    def pipeline(self, transaction: bool = True) -> FakePipeline:
+        return FakePipeline(self.store)
+
+
+@pytest.fixture
+def fake_redis() -> Generator[FakeRedis, None, None]:
+    clear_local_embedding_cache()
+    redis_client = FakeRedis()
+    with patch(
+        "onyx.natural_language_processing.embedding_cache.get_raw_redis_client",
+        return_value=redis_client,
+    ):
+        yield redis_client
+    clear_local_embedding_cache()
+
+
+def _build_cache(**kwargs: Any) -> EmbeddingCache:
+    params: dict[str, Any] = dict(
+        model_name="test-model",
+        provider_type=EmbeddingProvider.OPENAI,
+        text_type=EmbedTextType.PASSAGE,
+        prefix=None,
+        normalize=True,
+        max_seq_length=512,
+        tenant_id="tenant_a",
+    )
+    params.update(kwargs)
+    return EmbeddingCache(**params)
+
+
+def test_round_trip_float16(fake_redis: FakeRedis) -> None:
+    cache = _build_cache()
+    cache.set_many(["hello", "world"], [[0.5, -0.25], [1.0, 2.0]])
+
+    clear_local_embedding_cache()
+    assert cache.get_many(["world", "missing", "hello"]) == [
+        [1.0, 2.0],
+        None,
+        [0.5, -0.25],
+    ]
+    # each vector is stored as 2 bytes per dimension
+    assert all(len(raw) == 4 for raw in fake_redis.store.values())
+
+
+def test_keys_are_scoped_by_settings_and_tenant(fake_redis: FakeRedis) -> None:
+    cache = _build_cache()
+    cache.set_many(["hello"], [[1.0, 2.0]])
+
+    assert _build_cache(text_type=EmbedTextType.QUERY).get_many(["hello"]) == [None]
+    assert _build_cache(reduced_dimension=256).get_many(["hello"]) == [None]
+    assert _build_cache(api_url="http://litellm:4000").get_many(["hello"]) == [None]
+    assert _build_cache(api_version="2024-02-01").get_many(["hello"]) == [None]
+    assert _build_cache(tenant_id="tenant_b").get_many(["hello"]) == [None]
+    assert _build_cache().get_many(["hello"]) == [[1.0, 2.0]]
+
+
+def test_redis_failure_is_a_miss() -> None:
+    clear_local_embedding_cache()
+    broken_redis = Mock()
+    broken_redis.pipeline.side_effect = ConnectionError("redis is down")
+
+    cache = _build_cache(redis_client=broken_redis)
+    cache.set_many(["hello"], [[1.0]])
+
+    clear_local_embedding_cache()
+    assert cache.get_many(["hello"]) == [None]
+
+
+def test_embedding_model_only_embeds_misses(fake_redis: FakeRedis) -> None:
+    with patch(
+        "onyx.natural_language_processing.search_nlp_models.get_tokenizer"
+    ), patch(
+        "onyx.natural_language_processing.search_nlp_models.EMBEDDING_CACHE_ENABLED",
+        True,
+    ):
+        model = EmbeddingModel(
+            server_host="localhost",
+            server_port=9000,
+            model_name="test-model",
+            normalize=True,
+            query_prefix=None,
+            passage_prefix=None,
+            api_key="key",
+            api_url=None,
+            provider_type=EmbeddingProvider.OPENAI,
+        )
+
+        requested_texts: list[list[str]] = []
+
+        def _fake_request(embed_request: EmbedRequest, **_: Any) -> EmbedResponse:
+            requested_texts.append(embed_request.texts)
+            return EmbedResponse(
+                embeddings=[[float(len(text))] for text in embed_request.texts]
+            )
+
+        with patch.object(
+            model, "_make_model_server_request", side_effect=_fake_request
+        ):
+            first = model.encode(
+                ["a", "bb", "a"], text_type=EmbedTextType.PASSAGE, tenant_id="t"
+            )
+            second = model.encode(
+                ["bb", "ccc"], text_type=EmbedTextType.PASSAGE, tenant_id="t"
+            )
+
+    assert first == [[1.0], [2.0], [1.0]]
+    assert second == [[2.0], [3.0]]
+    assert requested_texts == [["a", "bb"], ["ccc"]]
@@ -0,0 +1,67 @@
+import json
+
+import numpy as np
+import pytest
+from requests import Response
+
+from onyx.natural_language_processing.search_nlp_models import _parse_embed_response
+from shared_configs.embedding_transport import build_accept_header
+from shared_configs.embedding_transport import decode_embeddings
+from shared_configs.embedding_transport import EMBEDDINGS_BINARY_MEDIA_TYPE
+from shared_configs.embedding_transport import encode_embeddings
+from shared_configs.embedding_transport import parse_accept_header
+
+_EMBEDDINGS = [[0.25, -1.5, 3.0], [0.1, 0.2, 0.3]]
+
+
+def _make_response(content: bytes, content_type: str) -> Response:
+    response = Response()
+    response.status_code = 200
+    response._content = content
+    response.headers["content-type"] = content_type
+    return response
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16"])
+def test_binary_round_trip(dtype: str) -> None:
+    decoded = decode_embeddings(encode_embeddings(_EMBEDDINGS, dtype))
+
+    assert decoded.dtype == np.float32
+    assert decoded.shape == (2, 3)
+    np.testing.assert_allclose(decoded, _EMBEDDINGS, rtol=1e-3)
+
+    assert decode_embeddings(encode_embeddings([], dtype)).shape == (0, 0)
+
+
+def test_invalid_payloads_are_rejected() -> None:
+    with pytest.raises(ValueError):
+        encode_embeddings([[1.0, 2.0], [1.0]])
+
+    payload = encode_embeddings(_EMBEDDINGS)
+    with pytest.raises(ValueError):
+        decode_embeddings(payload[:-4])
+    with pytest.raises(ValueError):
+        decode_embeddings(b"JSON" + payload[4:])
+
+
+def test_accept_header_negotiation() -> None:
+    assert parse_accept_header(build_accept_header("float16")) == "float16"
+    assert parse_accept_header(EMBEDDINGS_BINARY_MEDIA_TYPE) == "float32"
+    assert parse_accept_header(f"{EMBEDDINGS_BINARY_MEDIA_TYPE}; dtype=int8") is None
+    assert parse_accept_header("application/json") is None
+    assert parse_accept_header(None) is None
+
+    with pytest.raises(ValueError):
+        build_accept_header("int8")
+
+
+def test_embed_response_is_parsed_from_either_format() -> None:
+    # exactly representable in float32, so both formats give the same values
+    embeddings = [[0.25, -1.5, 3.0], [0.5, 0.125, -2.0]]
+    binary = _make_response(encode_embeddings(embeddings), EMBEDDINGS_BINARY_MEDIA_TYPE)
+    as_json = _make_response(
+        json.dumps({"embeddings": embeddings}).encode(), "application/json"
+    )
+
+    assert _parse_embed_response(binary).embeddings == embeddings
+    assert _parse_embed_response(as_json).embeddings == embeddings
@@ -0,0 +1,70 @@
+import threading
+from functools import partial
+
+from onyx.onyxbot.slack.fair_scheduler import TenantFairScheduler
+from shared_configs.contextvars import CURRENT_TENANT_ID_CONTEXTVAR
+from shared_configs.contextvars import get_current_tenant_id
+
+
+def test_full_tenant_queues_reject_events() -> None:
+    # no workers, so nothing is taken off the queues
+    scheduler = TenantFairScheduler(
+        num_workers=0, max_concurrent_per_tenant=1, max_queued_per_tenant=2
+    )
+
+    assert scheduler.submit("noisy", lambda: None)
+    assert scheduler.submit("noisy", lambda: None)
+    assert not scheduler.submit("noisy", lambda: None)
+    assert scheduler.submit("quiet", lambda: None)
+    assert scheduler.queued("noisy") == 2
+
+
+def test_quiet_tenant_is_not_stuck_behind_a_burst() -> None:
+    scheduler = TenantFairScheduler(
+        num_workers=1, max_concurrent_per_tenant=1, max_queued_per_tenant=10
+    )
+    order: list[str] = []
+    release = threading.Event()
+    done = threading.Semaphore(0)
+
+    def _task(name: str, block: bool = False) -> None:
+        if block:
+            release.wait()
+        order.append(name)
+        done.release()
+
+    scheduler.submit("noisy", lambda: _task("noisy_0", block=True))
+    scheduler.start()
+    for i in range(1, 4):
+        scheduler.submit("noisy", partial(_task, f"noisy_{i}"))
+    scheduler.submit("quiet", lambda: _task("quiet_0"))
+    release.set()
+
+    for _ in range(5):
+        assert done.acquire(timeout=10)
+    scheduler.shutdown(timeout=10)
+
+    assert order[:2] == ["noisy_0", "quiet_0"]
+
+
+def test_tasks_run_in_the_submitting_context() -> None:
+    scheduler = TenantFairScheduler(
+        num_workers=2, max_concurrent_per_tenant=2, max_queued_per_tenant=10
+    )
+    scheduler.start()
+    seen: list[str] = []
+    done = threading.Event()
+
+    def _task() -> None:
+        seen.append(get_current_tenant_id())
+        done.set()
+
+    token = CURRENT_TENANT_ID_CONTEXTVAR.set("tenant_abc")
+    try:
+        scheduler.submit("tenant_abc", _task)
+    finally:
+        CURRENT_TENANT_ID_CONTEXTVAR.reset(token)
+
+    assert done.wait(timeout=10)
+    scheduler.shutdown(timeout=10)
+    assert seen == ["tenant_abc"]
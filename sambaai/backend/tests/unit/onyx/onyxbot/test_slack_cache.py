@@ -0,0 +1,103 @@
+from collections.abc import Iterator
+from typing import Any
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import pytest
+
+from onyx.onyxbot.slack import slack_cache
+from onyx.onyxbot.slack.slack_cache import get_slack_expert_info
+from onyx.onyxbot.slack.slack_cache import get_slack_thread_messages
+
+
+class _FakeRedis:
+    def __init__(self) -> None:
+        self.data: dict[str, bytes] = {}
+
+    def get(self, key: str) -> bytes | None:
+        return self.data.get(key)
+
+    def set(self, key: str, value: str, ex: int) -> None:
+        self.data[key] = value.encode()
+
+
+@pytest.fixture
+def redis() -> Iterator[dict[str, _FakeRedis]]:
+    # like the tenant prefixed clients, every tenant has its own keys
+    tenant_redis: dict[str, _FakeRedis] = {}
+    slack_cache._local_cache.clear()
+    slack_cache._local_thread_cache.clear()
+    with patch.object(
+        slack_cache,
+        "get_redis_client",
+        side_effect=lambda tenant_id: tenant_redis.setdefault(tenant_id, _FakeRedis()),
+    ):
+        yield tenant_redis
+
+
+def _response(data: dict[str, Any]) -> MagicMock:
+    response = MagicMock()
+    response.data = data
+    response.__getitem__.side_effect = data.__getitem__
+    return response
+
+
+def _client(token: str = "xoxb-1") -> MagicMock:
+    client = MagicMock()
+    client.token = token
+    client.users_info.return_value = _response(
+        {
+            "ok": True,
+            "user": {"real_name": "Jane Doe", "profile": {"email": "jane@onyx.app"}},
+        }
+    )
+    return client
+
+
+def test_users_are_cached_per_tenant_and_bot(redis: dict[str, _FakeRedis]) -> None:
+    client = _client()
+    for _ in range(3):
+        expert = get_slack_expert_info("tenant_a", "U1", client)
+        assert expert is not None and expert.email == "jane@onyx.app"
+    assert client.users_info.call_count == 1
+
+    # another pod only has the Redis entry
+    slack_cache._local_cache.clear()
+    assert get_slack_expert_info("tenant_a", "U1", client) is not None
+    assert client.users_info.call_count == 1
+
+    other_bot = _client(token="xoxb-2")
+    get_slack_expert_info("tenant_a", "U1", other_bot)
+    get_slack_expert_info("tenant_b", "U1", client)
+    assert other_bot.users_info.call_count == 1
+    assert client.users_info.call_count == 2
+
+
+def test_thread_follow_ups_only_fetch_new_messages(
+    redis: dict[str, _FakeRedis],
+) -> None:
+    client = _client()
+    parent = {"ts": "100.0", "user": "U1", "text": "question"}
+    answer = {"ts": "101.0", "bot_id": "B1", "text": "answer"}
+    follow_up = {"ts": "102.0", "user": "U1", "text": "follow up"}
+
+    client.conversations_replies.return_value = _response(
+        {"messages": [parent, answer]}
+    )
+    assert get_slack_thread_messages("tenant_a", "C1", "100.0", client) == [
+        parent,
+        answer,
+    ]
+
+    # Slack always returns the parent message, even with `oldest`
+    client.conversations_replies.return_value = _response(
+        {"messages": [parent, follow_up]}
+    )
+    assert get_slack_thread_messages("tenant_a", "C1", "100.0", client) == [
+        parent,
+        answer,
+        follow_up,
+    ]
+    client.conversations_replies.assert_called_with(
+        channel="C1", ts="100.0", oldest="101.0"
+    )
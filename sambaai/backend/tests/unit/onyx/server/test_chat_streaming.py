@@ -0,0 +1,82 @@
+import asyncio
+import threading
+import time
+from collections.abc import Callable
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from onyx.server.query_and_chat.chat_streaming import ChatStreamingResponse
+from shared_configs.contextvars import CURRENT_TENANT_ID_CONTEXTVAR
+from shared_configs.contextvars import get_current_tenant_id
+
+_SCOPE = {"type": "http", "asgi": {"spec_version": "2.3"}}
+
+
+async def _never_disconnect() -> dict[str, Any]:
+    await asyncio.Event().wait()
+    return {}
+
+
+def test_packets_are_streamed_in_order_and_coalesced() -> None:
+    tenant_ids: list[str] = []
+
+    def _produce(is_connected: Callable[[], bool]) -> Iterator[str]:
+        tenant_ids.append(get_current_tenant_id())
+        for i in range(50):
+            yield f"{i}\n"
+
+    bodies: list[bytes] = []
+
+    async def _send(message: dict[str, Any]) -> None:
+        if message["type"] == "http.response.body" and message["body"]:
+            bodies.append(message["body"])
+
+    async def _run() -> None:
+        response = ChatStreamingResponse(
+            _produce,
+            executor=ThreadPoolExecutor(max_workers=1),
+            coalesce_seconds=0.05,
+        )
+        await response(_SCOPE, _never_disconnect, _send)  # type: ignore
+
+    token = CURRENT_TENANT_ID_CONTEXTVAR.set("tenant_abc")
+    try:
+        asyncio.run(_run())
+    finally:
+        CURRENT_TENANT_ID_CONTEXTVAR.reset(token)
+
+    assert b"".join(bodies) == "".join(f"{i}\n" for i in range(50)).encode()
+    assert len(bodies) < 50
+    assert tenant_ids == ["tenant_abc"]
+
+
+def test_disconnect_stops_the_answer() -> None:
+    closed = threading.Event()
+    disconnect = asyncio.Event()
+
+    def _produce(is_connected: Callable[[], bool]) -> Iterator[str]:
+        try:
+            while is_connected():
+                yield "token\n"
+                time.sleep(0.01)
+        finally:
+            closed.set()
+
+    async def _receive() -> dict[str, Any]:
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def _send(message: dict[str, Any]) -> None:
+        if message["type"] == "http.response.body":
+            disconnect.set()
+
+    async def _run() -> None:
+        response = ChatStreamingResponse(
+            _produce, executor=ThreadPoolExecutor(max_workers=1)
+        )
+        await response(_SCOPE, _receive, _send)  # type: ignore
+
+    asyncio.run(_run())
+
+    assert closed.wait(timeout=10)
@@ -0,0 +1,141 @@
+import time
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from typing import Any
+from unittest.mock import MagicMock
+from uuid import uuid4
+
+from onyx.server.query_and_chat.token_usage import fetch_token_usage
+from onyx.server.query_and_chat.token_usage import GLOBAL_TOKEN_USAGE_SCOPE
+from onyx.server.query_and_chat.token_usage import record_token_usage
+from onyx.server.query_and_chat.token_usage import TokenUsage
+from onyx.server.query_and_chat.token_usage import user_group_token_usage_scope
+from onyx.server.query_and_chat.token_usage import user_token_usage_scope
+
+
+class _FakePipeline:
+    def __init__(self, redis: "_FakeRedis") -> None:
+        self._redis = redis
+        self._commands: list[tuple[str, tuple[Any, ...], dict[str, Any]]] = []
+
+    def __getattr__(self, name: str) -> Any:
+        def _queue(*args: Any, **kwargs: Any) -> None:
+            self._commands.append((name, args, kwargs))
+
+        return _queue
+
+    def execute(self) -> list[Any]:
+        return [
+            getattr(self._redis, name)(*args, **kwargs)
+            for name, args, kwargs in self._commands
+        ]
+
+
+class _FakeRedis:
+    def __init__(self) -> None:
+        self.values: dict[str, bytes] = {}
+        self.hashes: dict[str, dict[bytes, bytes]] = {}
+
+    def pipeline(self, transaction: bool = True) -> _FakePipeline:
+        return _FakePipeline(self)
+
+    def get(self, key: str) -> bytes | None:
+        return self.values.get(key)
+
+    def set(self, key: str, value: Any, ex: int | None = None) -> None:
+        self.values[key] = str(value).encode()
+
+    def expire(self, key: str, seconds: int) -> None:
+        pass
+
+    def hgetall(self, key: str) -> dict[bytes, bytes]:
+        return dict(self.hashes.get(key, {}))
+
+    def hincrby(self, key: str, field: str, amount: int) -> None:
+        fields = self.hashes.setdefault(key, {})
+        fields[field.encode()] = str(
+            int(fields.get(field.encode(), b"0")) + amount
+        ).encode()
+
+    def hset(self, key: str, mapping: dict[str, int]) -> None:
+        fields = self.hashes.setdefault(key, {})
+        for field, value in mapping.items():
+            fields[field.encode()] = str(value).encode()
+
+    def hdel(self, key: str, *fields: str) -> None:
+        for field in fields:
+            self.hashes.get(key, {}).pop(field.encode(), None)
+
+
+def _minutes_ago(minutes: int) -> datetime:
+    now = datetime.now(tz=timezone.utc).replace(second=0, microsecond=0)
+    return now - timedelta(minutes=minutes)
+
+
+def test_cold_start_is_backfilled_from_postgres_once() -> None:
+    redis = _FakeRedis()
+    user_id = uuid4()
+    scope = user_token_usage_scope(user_id)
+    db_usage = [(_minutes_ago(30), 100), (_minutes_ago(10), 50)]
+    fetch_usage_from_db = MagicMock(return_value={scope: db_usage})
+    cutoff_time = datetime.now(tz=timezone.utc) - timedelta(hours=1)
+
+    usage = fetch_token_usage(
+        [scope], cutoff_time, fetch_usage_from_db, redis_client=redis  # type: ignore
+    )
+    assert usage[scope] == db_usage
+    assert fetch_usage_from_db.call_count == 1
+
+    record_token_usage(25, user_id, redis_client=redis)  # type: ignore
+    usage = fetch_token_usage(
+        [scope], cutoff_time, fetch_usage_from_db, redis_client=redis  # type: ignore
+    )
+    assert fetch_usage_from_db.call_count == 1
+    assert sum(tokens for _, tokens in usage[scope]) == 175
+
+    # a longer window than the buckets are complete for is backfilled again
+    fetch_token_usage(
+        [scope],
+        cutoff_time - timedelta(hours=1),
+        fetch_usage_from_db,
+        redis_client=redis,  # type: ignore
+    )
+    assert fetch_usage_from_db.call_count == 2
+
+
+def test_usage_is_counted_per_scope() -> None:
+    redis = _FakeRedis()
+    user_id = uuid4()
+    scopes = [
+        GLOBAL_TOKEN_USAGE_SCOPE,
+        user_token_usage_scope(user_id),
+        user_group_token_usage_scope(1),
+        user_group_token_usage_scope(2),
+    ]
+
+    def _fetch_usage_from_db(scopes: list[str], cutoff_time: datetime) -> TokenUsage:
+        return {}
+
+    fetch_token_usage(
+        scopes,
+        datetime.now(tz=timezone.utc) - timedelta(hours=1),
+        _fetch_usage_from_db,
+        redis_client=redis,  # type: ignore
+    )
+    record_token_usage(10, user_id, [1], redis_client=redis)  # type: ignore
+    record_token_usage(5, None, redis_client=redis)  # type: ignore
+    usage = fetch_token_usage(
+        scopes,
+        datetime.fromtimestamp(time.time() - 60 * 60, tz=timezone.utc),
+        _fetch_usage_from_db,
+        redis_client=redis,  # type: ignore
+    )
+
+    totals = {scope: sum(tokens for _, tokens in usage[scope]) for scope in scopes}
+    assert totals == {
+        GLOBAL_TOKEN_USAGE_SCOPE: 15,
+        user_token_usage_scope(user_id): 10,
+        user_group_token_usage_scope(1): 10,
+        user_group_token_usage_scope(2): 0,
+    }
@@ -0,0 +1,51 @@
+import os
+import random
+from pathlib import Path
+
+import pytest
+
+from onyx.utils import sorted_spill
+from onyx.utils.sorted_spill import sorted_difference
+from onyx.utils.sorted_spill import SortedStringSpill
+
+
+def test_spill_sorts_and_deduplicates_across_runs(tmp_path: Path) -> None:
+    random.seed(0)
+    values = [f"doc_{random.randrange(5_000)}" for _ in range(20_000)]
+    # odd ids of real connectors: newlines, escapes, non ascii
+    values += ["a\nb", "a\\nb", "a\\", "ünïcode", "😀", ""]
+
+    with SortedStringSpill(run_size=1_000, directory=str(tmp_path)) as spill:
+        spill.add_many(values)
+        assert spill.num_runs_written > 1
+        assert list(spill) == sorted(set(values))
+    assert os.listdir(tmp_path) == []
+
+
+def test_runs_are_merged_in_levels(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(sorted_spill, "_MAX_MERGE_FAN_IN", 3)
+    values = [str(i) for i in range(100)]
+    random.seed(1)
+    random.shuffle(values)
+
+    with SortedStringSpill(run_size=7, directory=str(tmp_path)) as spill:
+        spill.add_many(values)
+        assert list(spill) == sorted(values)
+        assert len(os.listdir(tmp_path)) <= 3
+
+
+def test_sorted_difference() -> None:
+    indexed = ["a", "b", "c", "e", "g"]
+    source = ["b", "d", "e", "f"]
+    assert list(sorted_difference(indexed, source)) == ["a", "c", "g"]
+    assert list(sorted_difference(indexed, [])) == indexed
+    assert list(sorted_difference([], source)) == []
+
+
+def test_sorted_difference_rejects_unsorted_input() -> None:
+    with pytest.raises(ValueError):
+        list(sorted_difference(["a", "c", "b"], ["a"]))
+    with pytest.raises(ValueError):
+        list(sorted_difference(["z"], ["b", "a"]))